@@ -0,0 +1,211 @@
+-- Migration 122: Per-metric telemetry rollups (1m / 1h / 1d)
+--
+-- telemetry_hourly (migration 034) only covers battery_pct and temp_c, so
+-- every chart and analytics query for any other metric re-aggregates raw
+-- JSONB telemetry. These tiers store one long/narrow row per
+-- (tenant, device, metric, bucket) with mergeable min/max/sum/count so a
+-- coarser bucket can be derived from any finer one.
+--
+--   telemetry_rollup_1m  hypertable, filled by a scheduled job from raw telemetry
+--   telemetry_rollup_1h  continuous aggregate over telemetry_rollup_1m
+--   telemetry_rollup_1d  continuous aggregate over telemetry_rollup_1m
+--
+-- A continuous aggregate cannot expand JSONB keys (no LATERAL in the view
+-- definition), hence the job-maintained 1m tier feeding the CAGGs.
+-- The time column is named "time" in every tier so queries can switch
+-- source relation without rewriting their filters.
+
+-- ============================================================
+-- 1-minute tier
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS telemetry_rollup_1m (
+    time          TIMESTAMPTZ      NOT NULL,
+    tenant_id     TEXT             NOT NULL,
+    device_id     TEXT             NOT NULL,
+    metric_key    TEXT             NOT NULL,
+    min_value     DOUBLE PRECISION,
+    max_value     DOUBLE PRECISION,
+    sum_value     DOUBLE PRECISION,
+    sample_count  BIGINT           NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, device_id, metric_key, time)
+);
+
+SELECT create_hypertable(
+    'telemetry_rollup_1m',
+    'time',
+    chunk_time_interval => INTERVAL '1 day',
+    if_not_exists => TRUE
+);
+
+CREATE INDEX IF NOT EXISTS idx_telemetry_rollup_1m_tenant_metric_time
+    ON telemetry_rollup_1m (tenant_id, metric_key, time DESC);
+
+ALTER TABLE telemetry_rollup_1m SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'tenant_id, device_id, metric_key',
+    timescaledb.compress_orderby = 'time DESC'
+);
+
+SELECT add_compression_policy('telemetry_rollup_1m', INTERVAL '1 day');
+
+-- Kept a little longer than raw telemetry (30 days) so the CAGG refresh
+-- windows below never reach into dropped chunks.
+SELECT add_retention_policy('telemetry_rollup_1m', INTERVAL '35 days');
+
+-- Aggregates raw telemetry in [window_start, window_end) into the 1m tier.
+-- Whole minutes are recomputed, so re-running a window folds in late rows.
+CREATE OR REPLACE PROCEDURE rollup_telemetry_1m_window(window_start TIMESTAMPTZ, window_end TIMESTAMPTZ)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO telemetry_rollup_1m (
+        time, tenant_id, device_id, metric_key,
+        min_value, max_value, sum_value, sample_count
+    )
+    SELECT
+        time_bucket(INTERVAL '1 minute', t.time) AS time,
+        t.tenant_id,
+        t.device_id,
+        m.key,
+        MIN(m.value::double precision),
+        MAX(m.value::double precision),
+        SUM(m.value::double precision),
+        COUNT(*)
+    FROM telemetry t
+    CROSS JOIN LATERAL jsonb_each(t.metrics) AS m(key, value)
+    WHERE t.time >= window_start
+      AND t.time < window_end
+      AND t.msg_type = 'telemetry'
+      AND jsonb_typeof(m.value) = 'number'
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (tenant_id, device_id, metric_key, time) DO UPDATE SET
+        min_value = EXCLUDED.min_value,
+        max_value = EXCLUDED.max_value,
+        sum_value = EXCLUDED.sum_value,
+        sample_count = EXCLUDED.sample_count;
+END
+$$;
+
+-- Re-aggregates completed minutes in [now - lookback, current minute), so
+-- late rows inside the lookback window are picked up on the next run.
+CREATE OR REPLACE PROCEDURE refresh_telemetry_rollup_1m(job_id INT, config JSONB)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    window_end   TIMESTAMPTZ := time_bucket(INTERVAL '1 minute', now());
+    window_start TIMESTAMPTZ := window_end
+        - COALESCE((config->>'lookback')::interval, INTERVAL '15 minutes');
+BEGIN
+    CALL rollup_telemetry_1m_window(window_start, window_end);
+END
+$$;
+
+SELECT add_job(
+    'refresh_telemetry_rollup_1m',
+    INTERVAL '1 minute',
+    config => '{"lookback": "15 minutes"}'
+);
+
+-- One-off backfill of the retained raw window, one chunk per run, newest
+-- first. It runs as a job rather than inside this migration so the deploy
+-- does not decode 30 days of JSONB in one transaction. Each run moves
+-- config.cursor back by config.chunk; at config.stop the job unschedules
+-- itself. Until it finishes, charts over older ranges show gaps in the
+-- rollup tiers. The 1h/1d policies below pick up the backfilled minutes
+-- through invalidation.
+CREATE OR REPLACE PROCEDURE backfill_telemetry_rollup_1m(job_id INT, config JSONB)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    chunk       INTERVAL    := COALESCE((config->>'chunk')::interval, INTERVAL '1 hour');
+    stop_at     TIMESTAMPTZ := (config->>'stop')::timestamptz;
+    cursor_at   TIMESTAMPTZ := (config->>'cursor')::timestamptz;
+    next_cursor TIMESTAMPTZ := GREATEST(cursor_at - chunk, stop_at);
+BEGIN
+    IF cursor_at > stop_at THEN
+        CALL rollup_telemetry_1m_window(next_cursor, cursor_at);
+    END IF;
+    IF next_cursor <= stop_at THEN
+        PERFORM alter_job(job_id, scheduled => false);
+    ELSE
+        PERFORM alter_job(job_id, config => jsonb_set(config, '{cursor}', to_jsonb(next_cursor)));
+    END IF;
+END
+$$;
+
+SELECT add_job(
+    'backfill_telemetry_rollup_1m',
+    INTERVAL '30 seconds',
+    config => jsonb_build_object(
+        'cursor', time_bucket(INTERVAL '1 minute', now()),
+        'stop', time_bucket(INTERVAL '1 minute', now()) - INTERVAL '30 days',
+        'chunk', '1 hour'
+    )
+);
+
+-- ============================================================
+-- 1-hour and 1-day tiers
+-- ============================================================
+
+-- materialized_only = false: buckets newer than the last refresh are
+-- aggregated on the fly from telemetry_rollup_1m.
+CREATE MATERIALIZED VIEW IF NOT EXISTS telemetry_rollup_1h
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket(INTERVAL '1 hour', time) AS time,
+    tenant_id,
+    device_id,
+    metric_key,
+    MIN(min_value) AS min_value,
+    MAX(max_value) AS max_value,
+    SUM(sum_value) AS sum_value,
+    SUM(sample_count)::bigint AS sample_count
+FROM telemetry_rollup_1m
+GROUP BY 1, tenant_id, device_id, metric_key
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS telemetry_rollup_1d
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket(INTERVAL '1 day', time) AS time,
+    tenant_id,
+    device_id,
+    metric_key,
+    MIN(min_value) AS min_value,
+    MAX(max_value) AS max_value,
+    SUM(sum_value) AS sum_value,
+    SUM(sample_count)::bigint AS sample_count
+FROM telemetry_rollup_1m
+GROUP BY 1, tenant_id, device_id, metric_key
+WITH NO DATA;
+
+-- Refresh windows start inside the 1m retention period; only invalidated
+-- ranges are recomputed, so the wide start_offset is cheap in steady state.
+SELECT add_continuous_aggregate_policy('telemetry_rollup_1h',
+    start_offset => INTERVAL '30 days',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '15 minutes'
+);
+
+SELECT add_continuous_aggregate_policy('telemetry_rollup_1d',
+    start_offset => INTERVAL '30 days',
+    end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 hour'
+);
+
+SELECT add_retention_policy('telemetry_rollup_1h', INTERVAL '400 days');
+SELECT add_retention_policy('telemetry_rollup_1d', INTERVAL '5 years');
+
+-- ============================================================
+-- GRANTS
+-- ============================================================
+-- Like telemetry (see 034), the rollups carry no RLS; every query filters
+-- on tenant_id explicitly.
+
+GRANT SELECT ON telemetry_rollup_1m TO pulse_app;
+GRANT SELECT ON telemetry_rollup_1h TO pulse_app;
+GRANT SELECT ON telemetry_rollup_1d TO pulse_app;
+GRANT SELECT ON telemetry_rollup_1m TO pulse_operator;
+GRANT SELECT ON telemetry_rollup_1h TO pulse_operator;
+GRANT SELECT ON telemetry_rollup_1d TO pulse_operator;
@@ -0,0 +1,189 @@
+-- Migration 123: Mergeable quantile sketches for telemetry percentiles
+--
+-- The rollups from migration 122 carry min/max/sum/count, which cannot
+-- answer p95. These tiers store a DDSketch-style histogram per
+-- (tenant, device, metric, time): values are mapped to logarithmic bins with
+-- 1% relative accuracy, and each bin is one row with a count. Merging
+-- sketches is SUM(bin_count) per bin, so coarser buckets (and the 1d
+-- continuous aggregate) need nothing beyond standard aggregates.
+--
+--   telemetry_sketch_1h  hypertable, filled by a scheduled job from raw telemetry
+--   telemetry_sketch_1d  continuous aggregate over telemetry_sketch_1h
+
+-- ============================================================
+-- Bin mapping (gamma = 1.01 / 0.99, i.e. alpha = 1%)
+-- ============================================================
+-- Positive values map to 100000 + ceil(log_gamma(v)), negatives to the
+-- mirrored negative range and near-zero values to bin 0, so bins sort in
+-- value order and a running SUM over bins walks the distribution.
+
+CREATE OR REPLACE FUNCTION telemetry_sketch_bin(v DOUBLE PRECISION)
+RETURNS INT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE
+        WHEN abs(v) < 1e-9 THEN 0
+        WHEN v > 0 THEN 100000 + ceil(ln(v) / ln(1.01::float8 / 0.99::float8))::int
+        ELSE -(100000 + ceil(ln(-v) / ln(1.01::float8 / 0.99::float8))::int)
+    END
+$$;
+
+-- Midpoint estimate 2 * gamma^i / (gamma + 1); within 1% of every value in the bin.
+CREATE OR REPLACE FUNCTION telemetry_sketch_value(bin INT)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE
+        WHEN bin = 0 THEN 0::float8
+        WHEN bin > 0 THEN
+            2 * power(1.01::float8 / 0.99::float8, bin - 100000) / (1.01::float8 / 0.99::float8 + 1)
+        ELSE
+            -2 * power(1.01::float8 / 0.99::float8, -bin - 100000) / (1.01::float8 / 0.99::float8 + 1)
+    END
+$$;
+
+-- ============================================================
+-- 1-hour tier
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS telemetry_sketch_1h (
+    time        TIMESTAMPTZ NOT NULL,
+    tenant_id   TEXT        NOT NULL,
+    device_id   TEXT        NOT NULL,
+    metric_key  TEXT        NOT NULL,
+    bin         INT         NOT NULL,
+    bin_count   BIGINT      NOT NULL,
+    PRIMARY KEY (tenant_id, device_id, metric_key, time, bin)
+);
+
+SELECT create_hypertable(
+    'telemetry_sketch_1h',
+    'time',
+    chunk_time_interval => INTERVAL '7 days',
+    if_not_exists => TRUE
+);
+
+CREATE INDEX IF NOT EXISTS idx_telemetry_sketch_1h_tenant_metric_time
+    ON telemetry_sketch_1h (tenant_id, metric_key, time DESC);
+
+ALTER TABLE telemetry_sketch_1h SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'tenant_id, device_id, metric_key',
+    timescaledb.compress_orderby = 'time DESC, bin'
+);
+
+SELECT add_compression_policy('telemetry_sketch_1h', INTERVAL '1 day');
+SELECT add_retention_policy('telemetry_sketch_1h', INTERVAL '90 days');
+
+-- Rebuilds the sketches for raw telemetry in [window_start, window_end).
+-- Whole hours are recomputed, so re-running a window folds in late rows.
+CREATE OR REPLACE PROCEDURE sketch_telemetry_1h_window(window_start TIMESTAMPTZ, window_end TIMESTAMPTZ)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO telemetry_sketch_1h (time, tenant_id, device_id, metric_key, bin, bin_count)
+    SELECT
+        time_bucket(INTERVAL '1 hour', t.time) AS time,
+        t.tenant_id,
+        t.device_id,
+        m.key,
+        telemetry_sketch_bin(m.value::double precision),
+        COUNT(*)
+    FROM telemetry t
+    CROSS JOIN LATERAL jsonb_each(t.metrics) AS m(key, value)
+    WHERE t.time >= window_start
+      AND t.time < window_end
+      AND t.msg_type = 'telemetry'
+      AND jsonb_typeof(m.value) = 'number'
+    GROUP BY 1, 2, 3, 4, 5
+    ON CONFLICT (tenant_id, device_id, metric_key, time, bin) DO UPDATE SET
+        bin_count = EXCLUDED.bin_count;
+END
+$$;
+
+-- Recomputes completed hours in [now - lookback, current hour).
+CREATE OR REPLACE PROCEDURE refresh_telemetry_sketch_1h(job_id INT, config JSONB)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    window_end   TIMESTAMPTZ := time_bucket(INTERVAL '1 hour', now());
+    window_start TIMESTAMPTZ := window_end
+        - COALESCE((config->>'lookback')::interval, INTERVAL '3 hours');
+BEGIN
+    CALL sketch_telemetry_1h_window(window_start, window_end);
+END
+$$;
+
+SELECT add_job(
+    'refresh_telemetry_sketch_1h',
+    INTERVAL '15 minutes',
+    config => '{"lookback": "3 hours"}'
+);
+
+-- One-off backfill of the retained raw window, one hour per run, newest
+-- first, as a job rather than inside this migration (see
+-- backfill_telemetry_rollup_1m in 122). The job unschedules itself at
+-- config.stop.
+CREATE OR REPLACE PROCEDURE backfill_telemetry_sketch_1h(job_id INT, config JSONB)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    chunk       INTERVAL    := COALESCE((config->>'chunk')::interval, INTERVAL '1 hour');
+    stop_at     TIMESTAMPTZ := (config->>'stop')::timestamptz;
+    cursor_at   TIMESTAMPTZ := (config->>'cursor')::timestamptz;
+    next_cursor TIMESTAMPTZ := GREATEST(cursor_at - chunk, stop_at);
+BEGIN
+    IF cursor_at > stop_at THEN
+        CALL sketch_telemetry_1h_window(next_cursor, cursor_at);
+    END IF;
+    IF next_cursor <= stop_at THEN
+        PERFORM alter_job(job_id, scheduled => false);
+    ELSE
+        PERFORM alter_job(job_id, config => jsonb_set(config, '{cursor}', to_jsonb(next_cursor)));
+    END IF;
+END
+$$;
+
+SELECT add_job(
+    'backfill_telemetry_sketch_1h',
+    INTERVAL '30 seconds',
+    config => jsonb_build_object(
+        'cursor', time_bucket(INTERVAL '1 hour', now()),
+        'stop', time_bucket(INTERVAL '1 hour', now()) - INTERVAL '30 days',
+        'chunk', '1 hour'
+    )
+);
+
+-- ============================================================
+-- 1-day tier
+-- ============================================================
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS telemetry_sketch_1d
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket(INTERVAL '1 day', time) AS time,
+    tenant_id,
+    device_id,
+    metric_key,
+    bin,
+    SUM(bin_count)::bigint AS bin_count
+FROM telemetry_sketch_1h
+GROUP BY 1, tenant_id, device_id, metric_key, bin
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('telemetry_sketch_1d',
+    start_offset => INTERVAL '30 days',
+    end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 hour'
+);
+
+SELECT add_retention_policy('telemetry_sketch_1d', INTERVAL '5 years');
+
+-- ============================================================
+-- GRANTS
+-- ============================================================
+
+GRANT SELECT ON telemetry_sketch_1h TO pulse_app;
+GRANT SELECT ON telemetry_sketch_1d TO pulse_app;
+GRANT SELECT ON telemetry_sketch_1h TO pulse_operator;
+GRANT SELECT ON telemetry_sketch_1d TO pulse_operator;
@@ -0,0 +1,108 @@
+-- Migration 124: Telemetry metric key catalog
+--
+-- Metric pickers and export key discovery used to scan telemetry JSONB with
+-- jsonb_object_keys/jsonb_each. Ingest now records each
+-- (tenant, device, metric_key) it sees here as a side effect of sensor
+-- auto-discovery. last_seen is refreshed at most every few minutes per key,
+-- so it is approximate.
+
+CREATE TABLE IF NOT EXISTS telemetry_metric_catalog (
+    tenant_id   TEXT        NOT NULL,
+    device_id   TEXT        NOT NULL,
+    metric_key  TEXT        NOT NULL,
+    value_type  TEXT        NOT NULL DEFAULT 'number'
+        CHECK (value_type IN ('number', 'boolean', 'string', 'json')),
+    first_seen  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_seen   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (tenant_id, device_id, metric_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_telemetry_metric_catalog_tenant_seen
+    ON telemetry_metric_catalog (tenant_id, last_seen DESC);
+
+CREATE INDEX IF NOT EXISTS idx_telemetry_metric_catalog_tenant_metric
+    ON telemetry_metric_catalog (tenant_id, metric_key);
+
+ALTER TABLE telemetry_metric_catalog ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS telemetry_metric_catalog_tenant_isolation ON telemetry_metric_catalog;
+CREATE POLICY telemetry_metric_catalog_tenant_isolation ON telemetry_metric_catalog
+    USING (tenant_id = current_setting('app.tenant_id', true))
+    WITH CHECK (tenant_id = current_setting('app.tenant_id', true));
+
+DROP POLICY IF EXISTS telemetry_metric_catalog_operator_read ON telemetry_metric_catalog;
+CREATE POLICY telemetry_metric_catalog_operator_read ON telemetry_metric_catalog
+    FOR SELECT
+    USING (current_setting('app.role', true) = 'operator');
+
+DROP POLICY IF EXISTS telemetry_metric_catalog_service ON telemetry_metric_catalog;
+CREATE POLICY telemetry_metric_catalog_service ON telemetry_metric_catalog
+    USING (current_setting('app.role', true) = 'iot_service')
+    WITH CHECK (current_setting('app.role', true) = 'iot_service');
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON telemetry_metric_catalog TO pulse_app;
+GRANT SELECT, INSERT, UPDATE, DELETE ON telemetry_metric_catalog TO pulse_operator;
+
+-- Seeds keys seen in raw telemetry in [window_start, window_end). Keys
+-- already recorded (by ingest or an earlier chunk) only widen their
+-- first_seen/last_seen.
+CREATE OR REPLACE PROCEDURE seed_telemetry_metric_catalog_window(window_start TIMESTAMPTZ, window_end TIMESTAMPTZ)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO telemetry_metric_catalog (tenant_id, device_id, metric_key, value_type, first_seen, last_seen)
+    SELECT
+        t.tenant_id,
+        t.device_id,
+        m.key,
+        CASE
+            WHEN bool_and(jsonb_typeof(m.value) = 'number') THEN 'number'
+            WHEN bool_and(jsonb_typeof(m.value) = 'boolean') THEN 'boolean'
+            WHEN bool_and(jsonb_typeof(m.value) = 'string') THEN 'string'
+            ELSE 'json'
+        END,
+        MIN(t.time),
+        MAX(t.time)
+    FROM telemetry t
+    CROSS JOIN LATERAL jsonb_each(t.metrics) AS m(key, value)
+    WHERE t.time >= window_start AND t.time < window_end
+    GROUP BY t.tenant_id, t.device_id, m.key
+    ON CONFLICT (tenant_id, device_id, metric_key) DO UPDATE SET
+        first_seen = LEAST(telemetry_metric_catalog.first_seen, EXCLUDED.first_seen),
+        last_seen = GREATEST(telemetry_metric_catalog.last_seen, EXCLUDED.last_seen);
+END
+$$;
+
+-- One-off seed from the last 7 days of telemetry (the window the analytics
+-- metric picker used to scan), one hour per run, newest first, as a job
+-- rather than inside this migration (see backfill_telemetry_rollup_1m in
+-- 122). The job unschedules itself at config.stop.
+CREATE OR REPLACE PROCEDURE backfill_telemetry_metric_catalog(job_id INT, config JSONB)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    chunk       INTERVAL    := COALESCE((config->>'chunk')::interval, INTERVAL '1 hour');
+    stop_at     TIMESTAMPTZ := (config->>'stop')::timestamptz;
+    cursor_at   TIMESTAMPTZ := (config->>'cursor')::timestamptz;
+    next_cursor TIMESTAMPTZ := GREATEST(cursor_at - chunk, stop_at);
+BEGIN
+    IF cursor_at > stop_at THEN
+        CALL seed_telemetry_metric_catalog_window(next_cursor, cursor_at);
+    END IF;
+    IF next_cursor <= stop_at THEN
+        PERFORM alter_job(job_id, scheduled => false);
+    ELSE
+        PERFORM alter_job(job_id, config => jsonb_set(config, '{cursor}', to_jsonb(next_cursor)));
+    END IF;
+END
+$$;
+
+SELECT add_job(
+    'backfill_telemetry_metric_catalog',
+    INTERVAL '30 seconds',
+    config => jsonb_build_object(
+        'cursor', now(),
+        'stop', now() - INTERVAL '7 days',
+        'chunk', '1 hour'
+    )
+);
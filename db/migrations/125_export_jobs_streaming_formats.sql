@@ -0,0 +1,15 @@
+-- Migration 125: NDJSON format and gzip compression for export jobs
+-- Exports are now streamed from server-side cursors; NDJSON and gzip let
+-- large telemetry exports be produced and consumed incrementally.
+
+BEGIN;
+
+ALTER TABLE export_jobs DROP CONSTRAINT IF EXISTS export_jobs_format_check;
+ALTER TABLE export_jobs
+    ADD CONSTRAINT export_jobs_format_check CHECK (format IN ('json', 'csv', 'ndjson'));
+
+ALTER TABLE export_jobs
+    ADD COLUMN IF NOT EXISTS compression TEXT NOT NULL DEFAULT 'none'
+        CHECK (compression IN ('none', 'gzip'));
+
+COMMIT;
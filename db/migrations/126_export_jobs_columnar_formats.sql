@@ -0,0 +1,13 @@
+-- Migration 126: Columnar (Parquet / Arrow IPC) telemetry exports
+-- Telemetry exports can be written as Parquet or Arrow IPC files with one
+-- typed column per metric. Both formats compress internally, so they are
+-- stored with compression = 'none'.
+
+BEGIN;
+
+ALTER TABLE export_jobs DROP CONSTRAINT IF EXISTS export_jobs_format_check;
+ALTER TABLE export_jobs
+    ADD CONSTRAINT export_jobs_format_check
+        CHECK (format IN ('json', 'csv', 'ndjson', 'parquet', 'arrow'));
+
+COMMIT;
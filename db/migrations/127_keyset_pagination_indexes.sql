@@ -0,0 +1,25 @@
+-- Migration 127: Indexes backing keyset pagination of device and alert lists
+-- List endpoints page with row comparisons on their sort key instead of
+-- OFFSET; these indexes match each sort key so a page is a range scan.
+
+-- Customer device list: ORDER BY site_id, device_id within a tenant.
+CREATE INDEX IF NOT EXISTS idx_device_registry_tenant_site_device
+ON device_registry(tenant_id, site_id, device_id);
+
+-- Operator device list: ORDER BY tenant_id, site_id, device_id.
+CREATE INDEX IF NOT EXISTS idx_device_state_tenant_site_device
+ON device_state(tenant_id, site_id, device_id);
+
+-- Alert lists: ORDER BY created_at DESC, id DESC, with and without status.
+CREATE INDEX IF NOT EXISTS idx_fleet_alert_tenant_status_created_id
+ON fleet_alert(tenant_id, status, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_fleet_alert_tenant_created_id
+ON fleet_alert(tenant_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_fleet_alert_status_created_id
+ON fleet_alert(status, created_at DESC, id DESC);
+
+-- Superseded by idx_device_registry_tenant_site_device.
+DROP INDEX IF EXISTS idx_device_registry_site;
+DROP INDEX IF EXISTS idx_device_registry_tenant_site_id;
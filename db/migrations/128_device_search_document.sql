@@ -0,0 +1,24 @@
+-- Migration 128: Trigram device search document
+-- Device search used five ILIKE '%q%' predicates, which no B-tree index can
+-- serve. search_document concatenates the searchable identity fields in
+-- lower case and is maintained by Postgres as a generated column; a pg_trgm
+-- GIN index answers substring (LIKE) and fuzzy (<%) matches on it.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE device_registry
+  ADD COLUMN IF NOT EXISTS search_document text
+    GENERATED ALWAYS AS (
+      lower(
+        coalesce(device_id, '') || ' ' ||
+        coalesce(site_id, '') || ' ' ||
+        coalesce(model, '') || ' ' ||
+        coalesce(manufacturer, '') || ' ' ||
+        coalesce(serial_number, '') || ' ' ||
+        coalesce(imei, '') || ' ' ||
+        coalesce(address, '')
+      )
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_device_registry_search_document_trgm
+  ON device_registry USING GIN (search_document gin_trgm_ops);
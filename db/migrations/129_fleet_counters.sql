@@ -0,0 +1,347 @@
+-- Migration 129: Incrementally maintained fleet counters
+--
+-- Fleet summaries (dashboard widgets, WebSocket fleet subscribers, operator
+-- tenant stats) used to GROUP BY over device_state, device_registry and
+-- fleet_alert on every request. fleet_counters keeps one row per tenant,
+-- adjusted by row triggers only when a counted attribute changes (device
+-- status transitions, registrations, alert open/acknowledge/close), so
+-- readers do a primary-key lookup.
+--
+-- reconcile_fleet_counters(tenant_id) recounts one tenant from the source
+-- tables and corrects any drift (e.g. after TRUNCATE or bulk loads with
+-- triggers disabled). ops_worker calls it periodically for every tenant.
+-- last_activity (MAX(device_state.last_seen_at)) changes on every
+-- heartbeat, so it is only refreshed by reconciliation.
+--
+-- active_online / active_stale count device_state statuses of devices whose
+-- registry status is ACTIVE (the fleet summary widget's population), so both
+-- the device_state and device_registry triggers look up the other table.
+-- Concurrent transactions changing a device's registry status and its state
+-- at the same moment can each miss the other's change; reconciliation
+-- corrects that.
+
+CREATE TABLE IF NOT EXISTS fleet_counters (
+    tenant_id                TEXT PRIMARY KEY,
+    -- device_state rows, by status
+    devices_total            INTEGER NOT NULL DEFAULT 0,
+    devices_online           INTEGER NOT NULL DEFAULT 0,
+    devices_stale            INTEGER NOT NULL DEFAULT 0,
+    devices_offline          INTEGER NOT NULL DEFAULT 0,
+    -- device_registry rows
+    registered_total         INTEGER NOT NULL DEFAULT 0,
+    registered_active        INTEGER NOT NULL DEFAULT 0,
+    -- ACTIVE device_registry rows joined to device_state, by status
+    active_online            INTEGER NOT NULL DEFAULT 0,
+    active_stale             INTEGER NOT NULL DEFAULT 0,
+    -- fleet_alert rows
+    alerts_open              INTEGER NOT NULL DEFAULT 0,
+    alerts_acknowledged      INTEGER NOT NULL DEFAULT 0,
+    alerts_critical_active   INTEGER NOT NULL DEFAULT 0,  -- OPEN/ACKNOWLEDGED, severity >= 5
+    alerts_no_telemetry_open INTEGER NOT NULL DEFAULT 0,
+    last_activity            TIMESTAMPTZ,
+    updated_at               TIMESTAMPTZ NOT NULL DEFAULT now(),
+    reconciled_at            TIMESTAMPTZ
+);
+
+ALTER TABLE fleet_counters ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS fleet_counters_tenant_isolation ON fleet_counters;
+CREATE POLICY fleet_counters_tenant_isolation ON fleet_counters
+    FOR SELECT
+    USING (tenant_id = current_setting('app.tenant_id', true));
+
+DROP POLICY IF EXISTS fleet_counters_operator_read ON fleet_counters;
+CREATE POLICY fleet_counters_operator_read ON fleet_counters
+    FOR SELECT
+    USING (current_setting('app.role', true) = 'operator');
+
+-- Writes happen only through the SECURITY DEFINER functions below.
+GRANT SELECT ON fleet_counters TO pulse_app;
+GRANT SELECT ON fleet_counters TO pulse_operator;
+
+CREATE OR REPLACE FUNCTION fleet_counters_add(
+    p_tenant_id                TEXT,
+    p_devices_total            INTEGER DEFAULT 0,
+    p_devices_online           INTEGER DEFAULT 0,
+    p_devices_stale            INTEGER DEFAULT 0,
+    p_devices_offline          INTEGER DEFAULT 0,
+    p_registered_total         INTEGER DEFAULT 0,
+    p_registered_active        INTEGER DEFAULT 0,
+    p_active_online            INTEGER DEFAULT 0,
+    p_active_stale             INTEGER DEFAULT 0,
+    p_alerts_open              INTEGER DEFAULT 0,
+    p_alerts_acknowledged      INTEGER DEFAULT 0,
+    p_alerts_critical_active   INTEGER DEFAULT 0,
+    p_alerts_no_telemetry_open INTEGER DEFAULT 0
+) RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO fleet_counters AS fc (
+        tenant_id, devices_total, devices_online, devices_stale, devices_offline,
+        registered_total, registered_active, active_online, active_stale,
+        alerts_open, alerts_acknowledged, alerts_critical_active, alerts_no_telemetry_open
+    )
+    VALUES (
+        p_tenant_id, p_devices_total, p_devices_online, p_devices_stale, p_devices_offline,
+        p_registered_total, p_registered_active, p_active_online, p_active_stale,
+        p_alerts_open, p_alerts_acknowledged, p_alerts_critical_active, p_alerts_no_telemetry_open
+    )
+    ON CONFLICT (tenant_id) DO UPDATE SET
+        devices_total            = fc.devices_total            + EXCLUDED.devices_total,
+        devices_online           = fc.devices_online           + EXCLUDED.devices_online,
+        devices_stale            = fc.devices_stale            + EXCLUDED.devices_stale,
+        devices_offline          = fc.devices_offline          + EXCLUDED.devices_offline,
+        registered_total         = fc.registered_total         + EXCLUDED.registered_total,
+        registered_active        = fc.registered_active        + EXCLUDED.registered_active,
+        active_online            = fc.active_online            + EXCLUDED.active_online,
+        active_stale             = fc.active_stale             + EXCLUDED.active_stale,
+        alerts_open              = fc.alerts_open              + EXCLUDED.alerts_open,
+        alerts_acknowledged      = fc.alerts_acknowledged      + EXCLUDED.alerts_acknowledged,
+        alerts_critical_active   = fc.alerts_critical_active   + EXCLUDED.alerts_critical_active,
+        alerts_no_telemetry_open = fc.alerts_no_telemetry_open + EXCLUDED.alerts_no_telemetry_open,
+        updated_at               = now();
+$$;
+
+-- Each trigger removes the OLD row's contribution and adds the NEW row's.
+
+CREATE OR REPLACE FUNCTION fleet_counters_device_state_trg() RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    registered_active boolean;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        registered_active := EXISTS (
+            SELECT 1 FROM device_registry
+            WHERE tenant_id = OLD.tenant_id AND device_id = OLD.device_id AND status = 'ACTIVE'
+        );
+        PERFORM fleet_counters_add(
+            OLD.tenant_id,
+            p_devices_total   => -1,
+            p_devices_online  => -(OLD.status IS NOT DISTINCT FROM 'ONLINE')::int,
+            p_devices_stale   => -(OLD.status IS NOT DISTINCT FROM 'STALE')::int,
+            p_devices_offline => -(OLD.status IS NOT DISTINCT FROM 'OFFLINE')::int,
+            p_active_online   => -(registered_active AND OLD.status IS NOT DISTINCT FROM 'ONLINE')::int,
+            p_active_stale    => -(registered_active AND OLD.status IS NOT DISTINCT FROM 'STALE')::int
+        );
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        registered_active := EXISTS (
+            SELECT 1 FROM device_registry
+            WHERE tenant_id = NEW.tenant_id AND device_id = NEW.device_id AND status = 'ACTIVE'
+        );
+        PERFORM fleet_counters_add(
+            NEW.tenant_id,
+            p_devices_total   => 1,
+            p_devices_online  => (NEW.status IS NOT DISTINCT FROM 'ONLINE')::int,
+            p_devices_stale   => (NEW.status IS NOT DISTINCT FROM 'STALE')::int,
+            p_devices_offline => (NEW.status IS NOT DISTINCT FROM 'OFFLINE')::int,
+            p_active_online   => (registered_active AND NEW.status IS NOT DISTINCT FROM 'ONLINE')::int,
+            p_active_stale    => (registered_active AND NEW.status IS NOT DISTINCT FROM 'STALE')::int
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION fleet_counters_device_registry_trg() RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    state_status TEXT;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        SELECT status INTO state_status
+        FROM device_state
+        WHERE tenant_id = OLD.tenant_id AND device_id = OLD.device_id;
+        PERFORM fleet_counters_add(
+            OLD.tenant_id,
+            p_registered_total  => -1,
+            p_registered_active => -(OLD.status IS NOT DISTINCT FROM 'ACTIVE')::int,
+            p_active_online     => -(OLD.status IS NOT DISTINCT FROM 'ACTIVE' AND state_status IS NOT DISTINCT FROM 'ONLINE')::int,
+            p_active_stale      => -(OLD.status IS NOT DISTINCT FROM 'ACTIVE' AND state_status IS NOT DISTINCT FROM 'STALE')::int
+        );
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        SELECT status INTO state_status
+        FROM device_state
+        WHERE tenant_id = NEW.tenant_id AND device_id = NEW.device_id;
+        PERFORM fleet_counters_add(
+            NEW.tenant_id,
+            p_registered_total  => 1,
+            p_registered_active => (NEW.status IS NOT DISTINCT FROM 'ACTIVE')::int,
+            p_active_online     => (NEW.status IS NOT DISTINCT FROM 'ACTIVE' AND state_status IS NOT DISTINCT FROM 'ONLINE')::int,
+            p_active_stale      => (NEW.status IS NOT DISTINCT FROM 'ACTIVE' AND state_status IS NOT DISTINCT FROM 'STALE')::int
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION fleet_counters_fleet_alert_trg() RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM fleet_counters_add(
+            OLD.tenant_id,
+            p_alerts_open              => -(OLD.status = 'OPEN')::int,
+            p_alerts_acknowledged      => -(OLD.status = 'ACKNOWLEDGED')::int,
+            p_alerts_critical_active   => -(OLD.status IN ('OPEN', 'ACKNOWLEDGED') AND OLD.severity >= 5)::int,
+            p_alerts_no_telemetry_open => -(OLD.status = 'OPEN' AND OLD.alert_type = 'NO_TELEMETRY')::int
+        );
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM fleet_counters_add(
+            NEW.tenant_id,
+            p_alerts_open              => (NEW.status = 'OPEN')::int,
+            p_alerts_acknowledged      => (NEW.status = 'ACKNOWLEDGED')::int,
+            p_alerts_critical_active   => (NEW.status IN ('OPEN', 'ACKNOWLEDGED') AND NEW.severity >= 5)::int,
+            p_alerts_no_telemetry_open => (NEW.status = 'OPEN' AND NEW.alert_type = 'NO_TELEMETRY')::int
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- UPDATE triggers fire only on transitions; heartbeats that rewrite
+-- last_seen_at and state do not touch the counters.
+DROP TRIGGER IF EXISTS trg_fleet_counters_device_state ON device_state;
+CREATE TRIGGER trg_fleet_counters_device_state
+    AFTER INSERT OR DELETE ON device_state
+    FOR EACH ROW EXECUTE FUNCTION fleet_counters_device_state_trg();
+
+DROP TRIGGER IF EXISTS trg_fleet_counters_device_state_status ON device_state;
+CREATE TRIGGER trg_fleet_counters_device_state_status
+    AFTER UPDATE OF status, tenant_id ON device_state
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.tenant_id IS DISTINCT FROM NEW.tenant_id)
+    EXECUTE FUNCTION fleet_counters_device_state_trg();
+
+DROP TRIGGER IF EXISTS trg_fleet_counters_device_registry ON device_registry;
+CREATE TRIGGER trg_fleet_counters_device_registry
+    AFTER INSERT OR DELETE ON device_registry
+    FOR EACH ROW EXECUTE FUNCTION fleet_counters_device_registry_trg();
+
+DROP TRIGGER IF EXISTS trg_fleet_counters_device_registry_status ON device_registry;
+CREATE TRIGGER trg_fleet_counters_device_registry_status
+    AFTER UPDATE OF status, tenant_id ON device_registry
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.tenant_id IS DISTINCT FROM NEW.tenant_id)
+    EXECUTE FUNCTION fleet_counters_device_registry_trg();
+
+DROP TRIGGER IF EXISTS trg_fleet_counters_fleet_alert ON fleet_alert;
+CREATE TRIGGER trg_fleet_counters_fleet_alert
+    AFTER INSERT OR DELETE ON fleet_alert
+    FOR EACH ROW EXECUTE FUNCTION fleet_counters_fleet_alert_trg();
+
+DROP TRIGGER IF EXISTS trg_fleet_counters_fleet_alert_status ON fleet_alert;
+CREATE TRIGGER trg_fleet_counters_fleet_alert_status
+    AFTER UPDATE OF status, severity, alert_type, tenant_id ON fleet_alert
+    FOR EACH ROW
+    WHEN (
+        OLD.status IS DISTINCT FROM NEW.status
+        OR OLD.severity IS DISTINCT FROM NEW.severity
+        OR OLD.alert_type IS DISTINCT FROM NEW.alert_type
+        OR OLD.tenant_id IS DISTINCT FROM NEW.tenant_id
+    )
+    EXECUTE FUNCTION fleet_counters_fleet_alert_trg();
+
+-- Recount one tenant. The counter row is locked first: writers with pending
+-- deltas already hold it (so the recount waits for them and then sees their
+-- rows), and later writers queue behind it. Returns true if any counter
+-- had drifted.
+CREATE OR REPLACE FUNCTION reconcile_fleet_counters(p_tenant_id TEXT) RETURNS boolean
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    before fleet_counters%ROWTYPE;
+    after  fleet_counters%ROWTYPE;
+BEGIN
+    INSERT INTO fleet_counters (tenant_id) VALUES (p_tenant_id)
+    ON CONFLICT (tenant_id) DO NOTHING;
+
+    SELECT * INTO before FROM fleet_counters WHERE tenant_id = p_tenant_id FOR UPDATE;
+
+    UPDATE fleet_counters fc SET
+        devices_total            = s.devices_total,
+        devices_online           = s.devices_online,
+        devices_stale            = s.devices_stale,
+        devices_offline          = s.devices_offline,
+        last_activity            = s.last_activity,
+        registered_total         = r.registered_total,
+        registered_active        = r.registered_active,
+        active_online            = r.active_online,
+        active_stale             = r.active_stale,
+        alerts_open              = a.alerts_open,
+        alerts_acknowledged      = a.alerts_acknowledged,
+        alerts_critical_active   = a.alerts_critical_active,
+        alerts_no_telemetry_open = a.alerts_no_telemetry_open,
+        reconciled_at            = now()
+    FROM (
+        SELECT
+            COUNT(*) AS devices_total,
+            COUNT(*) FILTER (WHERE status = 'ONLINE') AS devices_online,
+            COUNT(*) FILTER (WHERE status = 'STALE') AS devices_stale,
+            COUNT(*) FILTER (WHERE status = 'OFFLINE') AS devices_offline,
+            MAX(last_seen_at) AS last_activity
+        FROM device_state
+        WHERE tenant_id = p_tenant_id
+    ) s,
+    (
+        SELECT
+            COUNT(*) AS registered_total,
+            COUNT(*) FILTER (WHERE dr.status = 'ACTIVE') AS registered_active,
+            COUNT(*) FILTER (WHERE dr.status = 'ACTIVE' AND ds.status = 'ONLINE') AS active_online,
+            COUNT(*) FILTER (WHERE dr.status = 'ACTIVE' AND ds.status = 'STALE') AS active_stale
+        FROM device_registry dr
+        LEFT JOIN device_state ds
+          ON ds.tenant_id = dr.tenant_id AND ds.device_id = dr.device_id
+        WHERE dr.tenant_id = p_tenant_id
+    ) r,
+    (
+        SELECT
+            COUNT(*) FILTER (WHERE status = 'OPEN') AS alerts_open,
+            COUNT(*) FILTER (WHERE status = 'ACKNOWLEDGED') AS alerts_acknowledged,
+            COUNT(*) FILTER (WHERE severity >= 5) AS alerts_critical_active,
+            COUNT(*) FILTER (WHERE status = 'OPEN' AND alert_type = 'NO_TELEMETRY') AS alerts_no_telemetry_open
+        FROM fleet_alert
+        WHERE tenant_id = p_tenant_id
+          AND status IN ('OPEN', 'ACKNOWLEDGED')
+    ) a
+    WHERE fc.tenant_id = p_tenant_id
+    RETURNING fc.* INTO after;
+
+    RETURN (
+        before.devices_total, before.devices_online, before.devices_stale, before.devices_offline,
+        before.registered_total, before.registered_active, before.active_online,
+        before.active_stale, before.alerts_open,
+        before.alerts_acknowledged, before.alerts_critical_active, before.alerts_no_telemetry_open
+    ) IS DISTINCT FROM (
+        after.devices_total, after.devices_online, after.devices_stale, after.devices_offline,
+        after.registered_total, after.registered_active, after.active_online,
+        after.active_stale, after.alerts_open,
+        after.alerts_acknowledged, after.alerts_critical_active, after.alerts_no_telemetry_open
+    );
+END;
+$$;
+
+-- Initial population.
+SELECT reconcile_fleet_counters(tenant_id)
+FROM (
+    SELECT tenant_id FROM device_registry
+    UNION
+    SELECT tenant_id FROM device_state
+    UNION
+    SELECT tenant_id FROM fleet_alert WHERE status IN ('OPEN', 'ACKNOWLEDGED')
+) t;
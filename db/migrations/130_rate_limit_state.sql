@@ -0,0 +1,87 @@
+-- Migration 130: Shared GCRA rate limit state
+--
+-- shared/rate_limiter.py keeps per-process GCRA state by default, so each
+-- ui_iot replica enforces its own copy of every limit. With
+-- RATE_LIMIT_BACKEND=postgres the limiter instead calls
+-- rate_limit_acquire(), which applies GCRA to one row per key in a single
+-- round trip so limits hold across replicas.
+--
+-- State is one theoretical arrival time (TAT, epoch seconds) per key. The
+-- table is UNLOGGED: it is rebuilt from scratch after a crash, which only
+-- forgets in-flight limits.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_state (
+    key TEXT PRIMARY KEY,
+    tat DOUBLE PRECISION NOT NULL
+);
+
+-- For each (key, limit, window, request) tuple: allow if the key's TAT is
+-- within the burst tolerance, advancing it by window/limit. Tuples with the
+-- same p_requests number belong to one request and are checked in order;
+-- after the first rejection the request's remaining keys are skipped
+-- (allowed and used are NULL) and not charged, as the in-process limiter
+-- stops at the first rejected layer. Rejected requests do not move the TAT,
+-- and a key's row is only written when its TAT advances. Returns the
+-- approximate number of requests counted against the key in the current
+-- window.
+CREATE OR REPLACE FUNCTION rate_limit_acquire(
+    p_keys TEXT[],
+    p_limits INTEGER[],
+    p_windows DOUBLE PRECISION[],
+    p_requests INTEGER[]
+)
+RETURNS TABLE (limit_key TEXT, allowed BOOLEAN, used INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_now DOUBLE PRECISION := extract(epoch FROM clock_timestamp());
+    v_interval DOUBLE PRECISION;
+    v_tat DOUBLE PRECISION;
+    v_rejected INTEGER;
+    i INTEGER;
+BEGIN
+    FOR i IN 1 .. coalesce(array_length(p_keys, 1), 0) LOOP
+        limit_key := p_keys[i];
+        IF p_requests[i] = v_rejected THEN
+            allowed := NULL;
+            used := NULL;
+            RETURN NEXT;
+            CONTINUE;
+        END IF;
+
+        v_interval := p_windows[i] / greatest(p_limits[i], 1);
+
+        SELECT tat INTO v_tat FROM rate_limit_state WHERE key = p_keys[i] FOR UPDATE;
+        IF NOT FOUND THEN
+            INSERT INTO rate_limit_state (key, tat)
+            VALUES (p_keys[i], v_now)
+            ON CONFLICT (key) DO NOTHING;
+            SELECT tat INTO v_tat FROM rate_limit_state WHERE key = p_keys[i] FOR UPDATE;
+        END IF;
+
+        v_tat := greatest(coalesce(v_tat, v_now), v_now);
+        allowed := v_tat - v_now <= p_windows[i] - v_interval + 1e-9;
+        IF allowed THEN
+            v_tat := v_tat + v_interval;
+            UPDATE rate_limit_state SET tat = v_tat WHERE key = p_keys[i];
+        ELSE
+            v_rejected := p_requests[i];
+        END IF;
+        used := least(p_limits[i], ceil((v_tat - v_now) / v_interval - 1e-9)::INTEGER);
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
+
+-- Keys whose TAT is in the past are fully drained and carry no state.
+CREATE OR REPLACE FUNCTION rate_limit_cleanup()
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH deleted AS (
+        DELETE FROM rate_limit_state
+        WHERE tat < extract(epoch FROM clock_timestamp())
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM deleted;
+$$;
@@ -0,0 +1,46 @@
+-- Migration 131: NOTIFY when commands or jobs are queued for a device
+--
+-- The ingest service LISTENs on device_work and wakes long-polling devices
+-- (GET /device/v1/commands/pending?wait=..., /device/v1/jobs/pending?wait=...)
+-- instead of devices polling the database on a timer.
+-- Payload: {"tenant_id": ..., "device_id": ..., "kind": "command" | "job"}
+
+CREATE OR REPLACE FUNCTION notify_device_command_queued()
+RETURNS trigger AS $$
+BEGIN
+  IF NEW.status = 'queued' THEN
+    PERFORM pg_notify(
+      'device_work',
+      json_build_object('tenant_id', NEW.tenant_id, 'device_id', NEW.device_id, 'kind', 'command')::text
+    );
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_device_command_queued ON device_commands;
+
+CREATE TRIGGER trg_notify_device_command_queued
+AFTER INSERT OR UPDATE OF status ON device_commands
+FOR EACH ROW
+EXECUTE FUNCTION notify_device_command_queued();
+
+CREATE OR REPLACE FUNCTION notify_device_job_queued()
+RETURNS trigger AS $$
+BEGIN
+  IF NEW.status = 'QUEUED' THEN
+    PERFORM pg_notify(
+      'device_work',
+      json_build_object('tenant_id', NEW.tenant_id, 'device_id', NEW.device_id, 'kind', 'job')::text
+    );
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_device_job_queued ON job_executions;
+
+CREATE TRIGGER trg_notify_device_job_queued
+AFTER INSERT OR UPDATE OF status ON job_executions
+FOR EACH ROW
+EXECUTE FUNCTION notify_device_job_queued();
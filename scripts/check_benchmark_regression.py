@@ -2,15 +2,35 @@
 """
 Compare benchmark results against baseline and fail on >20% regression.
 
+Besides pytest-benchmark's mean time, benchmarks that report pipeline
+numbers in extra_info (tests/benchmarks/test_pipeline_throughput.py) are
+also gated on throughput (msgs_per_sec, higher is better) and tail latency
+(p99_ms, lower is better).
+
 Usage:
     python scripts/check_benchmark_regression.py benchmarks/baseline.json benchmarks/current.json
 """
 import json
+import os
 import sys
 
 REGRESSION_THRESHOLD = 0.20  # 20% slower = fail
 
 
+# extra_info metric -> True when a higher value is better
+GATED_EXTRA_INFO = {
+    "msgs_per_sec": True,
+    "p99_ms": False,
+}
+
+
+def warn(message: str) -> None:
+    """Print a warning; under GitHub Actions also raise a run annotation."""
+    if os.environ.get("GITHUB_ACTIONS") == "true":
+        print(f"::warning title=Benchmark gate::{message}")
+    print(f"WARNING: {message}")
+
+
 def load_means(path: str) -> dict[str, float]:
     with open(path) as f:
         data = json.load(f)
@@ -26,6 +46,21 @@ def load_means(path: str) -> dict[str, float]:
     return means
 
 
+def load_extra_info(path: str) -> dict[tuple[str, str], float]:
+    with open(path) as f:
+        data = json.load(f)
+    values = {}
+    for b in data.get("benchmarks") or []:
+        name = b.get("name")
+        extra = b.get("extra_info") or {}
+        for metric in GATED_EXTRA_INFO:
+            value = extra.get(metric)
+            if name is None or not isinstance(value, (int, float)) or value <= 0:
+                continue
+            values[(name, metric)] = float(value)
+    return values
+
+
 def main():
     if len(sys.argv) != 3:
         print("Usage: check_benchmark_regression.py <baseline.json> <current.json>")
@@ -36,14 +71,20 @@ def main():
     baseline = load_means(baseline_path)
     current = load_means(current_path)
 
-    if not baseline:
-        print("WARNING: baseline is empty — cannot detect regressions.")
-        sys.exit(0)
-
     if not current:
         print("ERROR: current benchmark run produced no results.")
         sys.exit(1)
 
+    if not baseline:
+        warn(
+            f"{baseline_path} has no benchmarks, so nothing is gated. Commit this run's "
+            f"{current_path} (benchmark-results artifact) as the baseline to enable the gate."
+        )
+        sys.exit(0)
+
+    for name in sorted(set(current) - set(baseline)):
+        warn(f"benchmark '{name}' has no baseline and is not gated")
+
     regressions: list[str] = []
     for name, baseline_mean in baseline.items():
         if name not in current:
@@ -58,6 +99,24 @@ def main():
         if delta > REGRESSION_THRESHOLD:
             regressions.append(name)
 
+    baseline_extra = load_extra_info(baseline_path)
+    current_extra = load_extra_info(current_path)
+    for (name, metric), baseline_value in baseline_extra.items():
+        if (name, metric) not in current_extra:
+            continue
+        current_value = current_extra[(name, metric)]
+        if GATED_EXTRA_INFO[metric]:
+            delta = (baseline_value - current_value) / baseline_value
+        else:
+            delta = (current_value - baseline_value) / baseline_value
+        status = "OK" if delta <= REGRESSION_THRESHOLD else "REGRESSION"
+        change = (current_value - baseline_value) / baseline_value
+        print(
+            f"{status}: {name} {metric} — baseline {baseline_value:.1f}, current {current_value:.1f} ({change:+.1%})"
+        )
+        if delta > REGRESSION_THRESHOLD:
+            regressions.append(f"{name} ({metric})")
+
     if regressions:
         print(
             f"\nFAILED: {len(regressions)} benchmark(s) regressed beyond {REGRESSION_THRESHOLD:.0%} threshold:"
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 """
 Update benchmark baseline after intentional performance changes.
-Usage: python scripts/update_benchmark_baseline.py
+Usage: python scripts/update_benchmark_baseline.py [pytest args...]
+
+Extra arguments are passed to pytest, e.g. to refresh only the pipeline
+throughput numbers:
+
+    python scripts/update_benchmark_baseline.py tests/benchmarks/test_pipeline_throughput.py
 """
 import subprocess
 import sys
@@ -12,7 +17,15 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 
 def main() -> int:
     result = subprocess.run(
-        ["pytest", "-m", "benchmark", "--benchmark-json=benchmarks/baseline.json", "-q"],
+        [
+            "pytest",
+            "-m",
+            "benchmark",
+            "--benchmark-enable",
+            "--benchmark-json=benchmarks/baseline.json",
+            "-q",
+            *sys.argv[1:],
+        ],
         cwd=REPO_ROOT,
     )
     if result.returncode != 0:
@@ -23,6 +23,7 @@ from shared.metrics import (
     pulse_db_pool_free,
 )
 from shared.config import require_env, optional_env
+from shared.instrumentation import add_debug_routes, stage_clock
 
 # PHASE 44 AUDIT — Time-Window Rules
 #
@@ -151,6 +152,7 @@ async def start_health_server():
     app.router.add_get("/health", health_handler)
     app.router.add_get("/ready", ready_handler)
     app.router.add_get("/metrics", metrics_handler)
+    add_debug_routes(app)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", 8080)
@@ -1255,6 +1257,7 @@ async def main():
                 tenant_mapping_cache = {}
 
                 for r in rows:
+                    clock = stage_clock("evaluator")
                     tenant_id = r["tenant_id"]
                     device_id = r["device_id"]
                     site_id = r["site_id"]
@@ -1385,6 +1388,7 @@ async def main():
                     else:
                         await close_alert(conn, tenant_id, fp_nohb)
 
+                    clock.lap("db_device_state")
                     # --- Threshold rule evaluation ---
                     if tenant_id not in tenant_rules_cache:
                         tenant_rules_cache[tenant_id] = await fetch_tenant_rules(conn, tenant_id)
@@ -1420,11 +1424,15 @@ async def main():
                         )
                         device_groups = {str(row["group_id"]) for row in group_rows}
 
+                    clock.lap("db_rule_lookup")
+                    rule_stage = None
                     for rule in rules:
+                        clock.lap(rule_stage)
                         COUNTERS["rules_evaluated"] += 1
                         evaluator_rules_evaluated_total.labels(tenant_id=tenant_id).inc()
                         rule_id = rule["rule_id"]
                         rule_type = str(rule.get("rule_type") or "threshold").lower()
+                        rule_stage = f"rule_{rule_type}"
                         metric_name = rule["metric_name"]
                         operator = rule["operator"]
                         threshold = rule["threshold"]
@@ -1726,6 +1734,7 @@ async def main():
                                     device_id,
                                     summary,
                                 )
+                    clock.lap(rule_stage)
 
                 total_rules = sum(len(v) for v in tenant_rules_cache.values())
                 log_event(
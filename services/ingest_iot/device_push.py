@@ -0,0 +1,166 @@
+"""
+Push-style delivery of device commands and jobs over the ingest HTTP API.
+
+Devices used to poll /device/v1/commands/pending and /device/v1/jobs/pending,
+and every poll resolved the provision token and queried the database even
+when nothing was queued. Two pieces remove that idle cost:
+
+- ``DeviceTokenCache`` caches provision-token resolution by token hash.
+- ``DeviceWorkNotifier`` LISTENs on the ``device_work`` channel (migration
+  131 notifies on queued commands and job executions). Pending endpoints
+  accept ``?wait=<seconds>`` and hold the request until work is queued
+  for that device (long-poll). After a device has seen an empty result, a
+  per-device "quiet" marker lets later polls answer from memory until a
+  notification arrives for it.
+
+Quiet markers are only trusted while the LISTEN connection is up. On
+reconnect every marker is dropped and every waiter is woken to re-query,
+so a missed notification costs one query, never a lost command. The
+listener needs a direct (non-PgBouncer) connection; without one it is not
+started, no marker is ever trusted, and a long poll re-queries once its
+wait elapses.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator
+
+import asyncpg
+
+logger = logging.getLogger("ingest.device_push")
+
+NOTIFY_CHANNEL = "device_work"
+WORK_KINDS = ("command", "job")
+
+
+class DeviceTokenCache:
+    """Provision token hash -> (tenant_id, device_id), for ``ttl_seconds``."""
+
+    def __init__(self, ttl_seconds: int = 60, max_size: int = 100000):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self._cache: dict[str, tuple[str, str, float]] = {}
+
+    def get(self, token_hash: str) -> tuple[str, str] | None:
+        entry = self._cache.get(token_hash)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[2]:
+            self._cache.pop(token_hash, None)
+            return None
+        return entry[0], entry[1]
+
+    def put(self, token_hash: str, tenant_id: str, device_id: str) -> None:
+        if self.ttl <= 0:
+            return
+        if len(self._cache) >= self.max_size:
+            now = time.monotonic()
+            self._cache = {k: v for k, v in self._cache.items() if v[2] > now}
+            if len(self._cache) >= self.max_size:
+                self._cache.clear()
+        self._cache[token_hash] = (tenant_id, device_id, time.monotonic() + self.ttl)
+
+
+class DeviceWorkNotifier:
+    """Wakes long-polling devices when commands or jobs are queued for them."""
+
+    def __init__(self, quiet_ttl_seconds: float = 300.0, max_quiet: int = 200000):
+        self.quiet_ttl = quiet_ttl_seconds
+        self.max_quiet = max_quiet
+        self.connected = False
+        self._waiters: dict[tuple[str, str, str], set[asyncio.Event]] = {}
+        self._quiet: dict[tuple[str, str, str], float] = {}
+
+    @contextmanager
+    def subscribe(self, tenant_id: str, device_id: str, kind: str) -> Iterator[asyncio.Event]:
+        """Register interest before querying, so a notify during the query is not missed."""
+        key = (tenant_id, device_id, kind)
+        event = asyncio.Event()
+        self._waiters.setdefault(key, set()).add(event)
+        try:
+            yield event
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    self._waiters.pop(key, None)
+
+    def is_quiet(self, tenant_id: str, device_id: str, kind: str) -> bool:
+        if not self.connected:
+            return False
+        marked_at = self._quiet.get((tenant_id, device_id, kind))
+        return marked_at is not None and time.monotonic() - marked_at < self.quiet_ttl
+
+    def mark_quiet(self, tenant_id: str, device_id: str, kind: str) -> None:
+        if not self.connected:
+            return
+        if len(self._quiet) >= self.max_quiet:
+            self._quiet.clear()
+        self._quiet[(tenant_id, device_id, kind)] = time.monotonic()
+
+    def notify(self, tenant_id: str, device_id: str, kind: str) -> None:
+        key = (tenant_id, device_id, kind)
+        self._quiet.pop(key, None)
+        for event in self._waiters.get(key, ()):
+            event.set()
+
+    def reset(self) -> None:
+        """Forget every quiet marker and wake every waiter to re-query."""
+        self._quiet.clear()
+        for waiters in self._waiters.values():
+            for event in waiters:
+                event.set()
+
+    def on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            self.notify(data["tenant_id"], data["device_id"], data["kind"])
+        except (ValueError, KeyError, TypeError):
+            logger.debug("device_work_notify_ignored", extra={"payload": payload})
+
+    async def run_listener(
+        self,
+        connect: Callable[[], Awaitable[asyncpg.Connection]],
+        check_interval: float = 5.0,
+    ) -> None:
+        """Keep a dedicated LISTEN connection open, reconnecting with backoff."""
+        backoff = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await connect()
+                await conn.add_listener(NOTIFY_CHANNEL, self.on_notify)
+                self.connected = True
+                backoff = 1.0
+                logger.info("device_work_listener_connected")
+                while not conn.is_closed():
+                    await asyncio.sleep(check_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("device_work_listener_failed", extra={"error": str(exc)})
+            finally:
+                self.connected = False
+                self.reset()
+                if conn is not None and not conn.is_closed():
+                    try:
+                        await conn.close()
+                    except Exception:
+                        logger.debug("device_work_listener_close_failed", exc_info=True)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+async def wait_for_work(event: asyncio.Event, timeout: float) -> bool:
+    """True if ``event`` fired within ``timeout`` seconds."""
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
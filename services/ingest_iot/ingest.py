@@ -19,17 +19,22 @@ from shared.ingest_core import (
     TimescaleBatchWriter,
     TelemetryRecord,
 )
+from shared.telemetry_spool import TelemetrySpool
 from shared.audit import init_audit_logger, get_audit_logger
 from shared.logging import trace_id_var
 from shared.logging import configure_logging, log_event
 from shared.metrics import ingest_messages_total, ingest_queue_depth
 from shared.config import require_env, optional_env
+from shared.instrumentation import add_debug_routes, stage_clock
+from shared.db_context import set_db_context
 try:
     # Package import (e.g. `import services.ingest_iot.ingest`)
     from .topic_matcher import mqtt_topic_matches, evaluate_payload_filter
+    from .device_push import DeviceTokenCache, DeviceWorkNotifier, wait_for_work
 except ImportError:  # pragma: no cover
     # Script/legacy import when `services/ingest_iot` is on sys.path
     from topic_matcher import mqtt_topic_matches, evaluate_payload_filter
+    from device_push import DeviceTokenCache, DeviceWorkNotifier, wait_for_work
 
 NATS_URL = optional_env("NATS_URL", "nats://iot-nats:4222")
 SHADOW_REPORTED_TOPIC = "tenant/+/device/+/shadow/reported"
@@ -57,6 +62,13 @@ AUTH_CACHE_MAX_SIZE = int(optional_env("AUTH_CACHE_MAX_SIZE", "10000"))
 BATCH_SIZE = int(optional_env("BATCH_SIZE", "500"))
 FLUSH_INTERVAL_MS = int(optional_env("FLUSH_INTERVAL_MS", "1000"))
 MAX_BUFFER_SIZE = int(optional_env("MAX_BUFFER_SIZE", "5000"))
+MIN_BATCH_SIZE = int(optional_env("MIN_BATCH_SIZE", "50"))
+MAX_BATCH_SIZE = int(optional_env("MAX_BATCH_SIZE", "2000"))
+MIN_FLUSH_INTERVAL_MS = int(optional_env("MIN_FLUSH_INTERVAL_MS", "50"))
+MAX_CONCURRENT_FLUSHES = int(optional_env("MAX_CONCURRENT_FLUSHES", "4"))
+TELEMETRY_SPOOL_DIR = optional_env("TELEMETRY_SPOOL_DIR", "")
+TELEMETRY_SPOOL_MAX_MB = int(optional_env("TELEMETRY_SPOOL_MAX_MB", "1024"))
+TELEMETRY_SPOOL_REPLAY_RATE = int(optional_env("TELEMETRY_SPOOL_REPLAY_RATE", "5000"))
 INGEST_WORKER_COUNT = int(optional_env("INGEST_WORKER_COUNT", "4"))
 BUCKET_TTL_SECONDS = int(optional_env("BUCKET_TTL_SECONDS", "3600"))
 BUCKET_CLEANUP_INTERVAL = int(optional_env("BUCKET_CLEANUP_INTERVAL", "300"))
@@ -64,6 +76,16 @@ BUCKET_CLEANUP_INTERVAL = int(optional_env("BUCKET_CLEANUP_INTERVAL", "300"))
 # Phase 172: Metric key map cache (raw -> semantic normalization)
 METRIC_MAP_CACHE_TTL = int(optional_env("METRIC_MAP_CACHE_TTL", "300"))
 METRIC_MAP_CACHE_SIZE = int(optional_env("METRIC_MAP_CACHE_SIZE", "10000"))
+# Minimum seconds between telemetry_metric_catalog.last_seen refreshes per key.
+METRIC_CATALOG_TOUCH_SECONDS = int(optional_env("METRIC_CATALOG_TOUCH_SECONDS", "300"))
+
+# Device command/job delivery: provision-token cache and long-poll limits.
+DEVICE_TOKEN_CACHE_TTL = int(optional_env("DEVICE_TOKEN_CACHE_TTL", "60"))
+DEVICE_LONG_POLL_MAX_SECONDS = int(optional_env("DEVICE_LONG_POLL_MAX_SECONDS", "60"))
+# Direct (non-PgBouncer) DSN for the device_work LISTEN. No fallback to
+# DATABASE_URL: a LISTEN through a transaction pooler misses notifications.
+# Unset disables the listener, so pending polls always query the database.
+NOTIFY_DATABASE_URL = os.getenv("NOTIFY_DATABASE_URL")
 
 # Operational metrics (Phase 164)
 ingest_batch_write_seconds = Histogram(
@@ -87,6 +109,11 @@ ingest_metric_key_map_cache_misses_total = Counter(
     "ingest_metric_key_map_cache_misses_total",
     "Cache misses for metric_key_map lookups",
 )
+ingest_device_pending_polls_total = Counter(
+    "ingest_device_pending_polls_total",
+    "Device pending command/job requests by how they were answered",
+    ["kind", "source"],  # source: db | quiet | woken | timeout
+)
 
 COUNTERS = {
     "messages_received": 0,
@@ -247,8 +274,14 @@ async def metrics_handler(_request):
     return web.Response(body=generate_latest(), content_type=CONTENT_TYPE_LATEST.split(";")[0])
 
 
-async def _resolve_device_by_token(token: str, pool: asyncpg.Pool) -> tuple[str, str]:
+async def _resolve_device_by_token(
+    token: str, pool: asyncpg.Pool, cache: DeviceTokenCache | None = None
+) -> tuple[str, str]:
     token_hash = sha256_hex(token)
+    if cache is not None:
+        cached = cache.get(token_hash)
+        if cached is not None:
+            return cached
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
             """
@@ -265,9 +298,53 @@ async def _resolve_device_by_token(token: str, pool: asyncpg.Pool) -> tuple[str,
             text=json.dumps({"detail": "Invalid provision token"}),
             content_type="application/json",
         )
+    if cache is not None:
+        cache.put(token_hash, row["tenant_id"], row["device_id"])
     return row["tenant_id"], row["device_id"]
 
 
+def _long_poll_seconds(request: web.Request) -> float:
+    raw = request.query.get("wait")
+    if not raw:
+        return 0.0
+    try:
+        wait = float(raw)
+    except ValueError:
+        raise web.HTTPBadRequest(
+            text=json.dumps({"detail": "wait must be a number of seconds"}),
+            content_type="application/json",
+        )
+    return max(0.0, min(wait, float(DEVICE_LONG_POLL_MAX_SECONDS)))
+
+
+async def _pending_for_device(kind: str, tenant_id: str, device_id: str, fetch, wait_seconds: float) -> list:
+    """
+    Pending rows for a device, answering from the quiet marker when nothing has
+    been queued since the device's last empty result, and holding the request
+    up to ``wait_seconds`` for a device_work notification.
+    """
+    notifier = INGESTOR_REF.device_work
+    with notifier.subscribe(tenant_id, device_id, kind) as woken:
+        if notifier.is_quiet(tenant_id, device_id, kind):
+            rows = []
+            ingest_device_pending_polls_total.labels(kind=kind, source="quiet").inc()
+        else:
+            rows = await fetch()
+            ingest_device_pending_polls_total.labels(kind=kind, source="db").inc()
+            if not rows and not woken.is_set():
+                notifier.mark_quiet(tenant_id, device_id, kind)
+        if rows or wait_seconds <= 0:
+            return rows
+        if await wait_for_work(woken, wait_seconds):
+            ingest_device_pending_polls_total.labels(kind=kind, source="woken").inc()
+            return await fetch()
+        ingest_device_pending_polls_total.labels(kind=kind, source="timeout").inc()
+        if not notifier.connected:
+            # No LISTEN could have woken this request; look again before answering.
+            return await fetch()
+        return []
+
+
 async def device_get_shadow(request: web.Request):
     if INGESTOR_REF is None or INGESTOR_REF.pool is None:
         raise web.HTTPServiceUnavailable(text="ingestor unavailable")
@@ -277,7 +354,9 @@ async def device_get_shadow(request: web.Request):
             text=json.dumps({"detail": "Missing provision token"}),
             content_type="application/json",
         )
-    tenant_id, device_id = await _resolve_device_by_token(token, INGESTOR_REF.pool)
+    tenant_id, device_id = await _resolve_device_by_token(
+        token, INGESTOR_REF.pool, INGESTOR_REF.device_token_cache
+    )
 
     async with INGESTOR_REF.pool.acquire() as conn:
         await _set_tenant_write_context(conn, tenant_id)
@@ -313,7 +392,9 @@ async def device_report_shadow(request: web.Request):
             text=json.dumps({"detail": "Missing provision token"}),
             content_type="application/json",
         )
-    tenant_id, device_id = await _resolve_device_by_token(token, INGESTOR_REF.pool)
+    tenant_id, device_id = await _resolve_device_by_token(
+        token, INGESTOR_REF.pool, INGESTOR_REF.device_token_cache
+    )
 
     try:
         body = await request.json()
@@ -358,31 +439,38 @@ async def device_get_pending_jobs(request: web.Request):
             text=json.dumps({"detail": "Missing provision token"}),
             content_type="application/json",
         )
-    tenant_id, device_id = await _resolve_device_by_token(token, INGESTOR_REF.pool)
+    tenant_id, device_id = await _resolve_device_by_token(
+        token, INGESTOR_REF.pool, INGESTOR_REF.device_token_cache
+    )
+    wait_seconds = _long_poll_seconds(request)
 
-    async with INGESTOR_REF.pool.acquire() as conn:
-        await _set_tenant_write_context(conn, tenant_id)
-        rows = await conn.fetch(
-            """
-            SELECT
-                e.job_id,
-                e.execution_number,
-                e.queued_at,
-                j.document_type,
-                j.document_params,
-                j.expires_at
-            FROM job_executions e
-            JOIN jobs j USING (tenant_id, job_id)
-            WHERE e.tenant_id = $1
-              AND e.device_id = $2
-              AND e.status = 'QUEUED'
-              AND (j.expires_at IS NULL OR j.expires_at > NOW())
-            ORDER BY e.queued_at ASC
-            LIMIT 10
-            """,
-            tenant_id,
-            device_id,
-        )
+    async def _fetch():
+        async with INGESTOR_REF.pool.acquire() as conn:
+            async with conn.transaction():
+                await _set_tenant_write_context(conn, tenant_id)
+                return await conn.fetch(
+                    """
+                    SELECT
+                        e.job_id,
+                        e.execution_number,
+                        e.queued_at,
+                        j.document_type,
+                        j.document_params,
+                        j.expires_at
+                    FROM job_executions e
+                    JOIN jobs j USING (tenant_id, job_id)
+                    WHERE e.tenant_id = $1
+                      AND e.device_id = $2
+                      AND e.status = 'QUEUED'
+                      AND (j.expires_at IS NULL OR j.expires_at > NOW())
+                    ORDER BY e.queued_at ASC
+                    LIMIT 10
+                    """,
+                    tenant_id,
+                    device_id,
+                )
+
+    rows = await _pending_for_device("job", tenant_id, device_id, _fetch, wait_seconds)
     return web.json_response(
         {
             "jobs": [
@@ -411,25 +499,31 @@ async def device_get_pending_commands(request: web.Request):
             text=json.dumps({"detail": "Missing provision token"}),
             content_type="application/json",
         )
-    tenant_id, device_id = await _resolve_device_by_token(token, INGESTOR_REF.pool)
+    tenant_id, device_id = await _resolve_device_by_token(
+        token, INGESTOR_REF.pool, INGESTOR_REF.device_token_cache
+    )
+    wait_seconds = _long_poll_seconds(request)
 
-    async with INGESTOR_REF.pool.acquire() as conn:
-        async with conn.transaction():
-            await _set_tenant_write_context(conn, tenant_id)
-            rows = await conn.fetch(
-                """
-                SELECT command_id, command_type, command_params, expires_at, created_at
-                FROM device_commands
-                WHERE tenant_id = $1
-                  AND device_id = $2
-                  AND status = 'queued'
-                  AND expires_at > NOW()
-                ORDER BY created_at ASC
-                LIMIT 20
-                """,
-                tenant_id,
-                device_id,
-            )
+    async def _fetch():
+        async with INGESTOR_REF.pool.acquire() as conn:
+            async with conn.transaction():
+                await _set_tenant_write_context(conn, tenant_id)
+                return await conn.fetch(
+                    """
+                    SELECT command_id, command_type, command_params, expires_at, created_at
+                    FROM device_commands
+                    WHERE tenant_id = $1
+                      AND device_id = $2
+                      AND status = 'queued'
+                      AND expires_at > NOW()
+                    ORDER BY created_at ASC
+                    LIMIT 20
+                    """,
+                    tenant_id,
+                    device_id,
+                )
+
+    rows = await _pending_for_device("command", tenant_id, device_id, _fetch, wait_seconds)
 
     return web.json_response(
         {
@@ -455,7 +549,9 @@ async def device_ack_command(request: web.Request):
             text=json.dumps({"detail": "Missing provision token"}),
             content_type="application/json",
         )
-    tenant_id, device_id = await _resolve_device_by_token(token, INGESTOR_REF.pool)
+    tenant_id, device_id = await _resolve_device_by_token(
+        token, INGESTOR_REF.pool, INGESTOR_REF.device_token_cache
+    )
     command_id = request.match_info.get("command_id")
     if not command_id:
         raise web.HTTPBadRequest(
@@ -514,7 +610,9 @@ async def device_update_job_execution(request: web.Request):
             text=json.dumps({"detail": "Missing provision token"}),
             content_type="application/json",
         )
-    tenant_id, device_id = await _resolve_device_by_token(token, INGESTOR_REF.pool)
+    tenant_id, device_id = await _resolve_device_by_token(
+        token, INGESTOR_REF.pool, INGESTOR_REF.device_token_cache
+    )
     job_id = request.match_info.get("job_id")
     if not job_id:
         raise web.HTTPBadRequest(
@@ -625,7 +723,9 @@ async def device_get_job_execution(request: web.Request):
             text=json.dumps({"detail": "Missing provision token"}),
             content_type="application/json",
         )
-    tenant_id, device_id = await _resolve_device_by_token(token, INGESTOR_REF.pool)
+    tenant_id, device_id = await _resolve_device_by_token(
+        token, INGESTOR_REF.pool, INGESTOR_REF.device_token_cache
+    )
     job_id = request.match_info.get("job_id")
     if not job_id:
         raise web.HTTPBadRequest(
@@ -683,6 +783,7 @@ async def start_health_server():
     app.router.add_get("/device/v1/jobs/pending", device_get_pending_jobs)
     app.router.add_put("/device/v1/jobs/{job_id}/execution", device_update_job_execution)
     app.router.add_get("/device/v1/jobs/{job_id}/execution", device_get_job_execution)
+    add_debug_routes(app)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", 8080)
@@ -901,15 +1002,22 @@ async def auto_provision_device(
     return True
 
 
+def _metric_value_type(value) -> str:
+    """Catalog value_type for a metric value (bool is checked before int)."""
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return "json"
+
+
 async def _set_tenant_write_context(conn: asyncpg.Connection, tenant_id: str | None) -> None:
     """
     Set DB role + tenant context for write operations.
     """
-    await conn.execute("SET LOCAL ROLE pulse_app")
-    await conn.execute(
-        "SELECT set_config('app.tenant_id', $1, true)",
-        str(tenant_id or "__unknown__"),
-    )
+    await set_db_context(conn, role="pulse_app", tenant_id=tenant_id or "__unknown__")
 
 
 async def _set_service_write_context(conn: asyncpg.Connection) -> None:
@@ -955,6 +1063,8 @@ class Ingestor:
         self.auth_cache = DeviceAuthCache(ttl_seconds=AUTH_CACHE_TTL, max_size=AUTH_CACHE_MAX_SIZE)
         self.device_subscription_cache = DeviceSubscriptionCache(ttl_seconds=60, max_size=50000)
         self.cert_auth_cache = CertificateAuthCache(ttl_seconds=300, max_size=50000)
+        self.device_token_cache = DeviceTokenCache(ttl_seconds=DEVICE_TOKEN_CACHE_TTL)
+        self.device_work = DeviceWorkNotifier()
         self.metric_key_map_cache = MetricKeyMapCache(
             ttl_seconds=METRIC_MAP_CACHE_TTL,
             max_size=METRIC_MAP_CACHE_SIZE,
@@ -966,6 +1076,10 @@ class Ingestor:
         # Sensor auto-discovery cache: set of (tenant_id, device_id, metric_key) tuples
         # that are known to exist. Avoids DB lookup on every telemetry message.
         self._known_sensors: set[tuple[str, str, str]] = set()
+        # Metric catalog write-behind: (tenant_id, device_id, metric_key) -> monotonic
+        # time of the last catalog upsert, so last_seen is refreshed at most once
+        # per METRIC_CATALOG_TOUCH_SECONDS per key.
+        self._catalog_touched: dict[tuple[str, str, str], float] = {}
 
     async def _normalize_metric_keys(
         self,
@@ -996,15 +1110,64 @@ class Ingestor:
             ingest_metric_keys_normalized_total.labels(tenant_id=tenant_id).inc(normalized_count)
         return normalized
 
+    def _catalog_due(self, tenant_id: str, device_id: str, metrics: dict) -> list[str]:
+        """Return metric keys whose catalog row is new or due a last_seen refresh."""
+        now = time.monotonic()
+        due: list[str] = []
+        for key in metrics:
+            cache_key = (tenant_id, device_id, key)
+            touched = self._catalog_touched.get(cache_key)
+            if touched is None or now - touched >= METRIC_CATALOG_TOUCH_SECONDS:
+                self._catalog_touched[cache_key] = now
+                due.append(key)
+        return due
+
+    def _forget_catalog_keys(self, tenant_id: str, device_id: str, keys: list[str]) -> None:
+        """Make keys due again after a failed catalog write."""
+        for key in keys:
+            self._catalog_touched.pop((tenant_id, device_id, key), None)
+
+    async def _touch_metric_catalog(
+        self,
+        conn: asyncpg.Connection,
+        tenant_id: str,
+        device_id: str,
+        metrics: dict,
+        keys: list[str],
+        ts,
+    ) -> None:
+        """Upsert catalog rows for ``keys`` in one statement (caller sets tenant context)."""
+        if not keys:
+            return
+        await conn.execute(
+            """
+            INSERT INTO telemetry_metric_catalog (
+                tenant_id, device_id, metric_key, value_type, first_seen, last_seen
+            )
+            SELECT $1, $2, k.metric_key, k.value_type, $5, $5
+            FROM unnest($3::text[], $4::text[]) AS k(metric_key, value_type)
+            ON CONFLICT (tenant_id, device_id, metric_key) DO UPDATE SET
+                value_type = EXCLUDED.value_type,
+                last_seen = GREATEST(telemetry_metric_catalog.last_seen, EXCLUDED.last_seen)
+            """,
+            tenant_id,
+            device_id,
+            keys,
+            [_metric_value_type(metrics.get(key)) for key in keys],
+            ts,
+        )
+
     async def _ensure_sensors(self, tenant_id: str, device_id: str, metrics: dict, ts):
         """Auto-discover sensors from telemetry metric keys.
 
         For each metric key in the payload, ensure a sensor record exists.
         Uses an in-memory cache to avoid DB hits on known sensors.
-        Respects the device's sensor_limit.
+        Respects the device's sensor_limit. Every key (including ones over
+        the sensor limit) is also recorded in telemetry_metric_catalog.
         """
         if not metrics:
             return
+        catalog_keys = self._catalog_due(tenant_id, device_id, metrics)
 
         new_keys: list[str] = []
         for key in metrics:
@@ -1018,6 +1181,9 @@ class Ingestor:
                 async with self.pool.acquire() as conn:
                     async with conn.transaction():
                         await _set_tenant_write_context(conn, tenant_id)
+                        await self._touch_metric_catalog(
+                            conn, tenant_id, device_id, metrics, catalog_keys, ts
+                        )
                         for key in metrics:
                             value = metrics[key]
                             last_value = float(value) if isinstance(value, (int, float)) else None
@@ -1039,6 +1205,7 @@ class Ingestor:
                                 key,
                             )
             except Exception as e:
+                self._forget_catalog_keys(tenant_id, device_id, catalog_keys)
                 logger.debug("sensor_last_value_update_failed: %s", e)
             return
 
@@ -1048,6 +1215,9 @@ class Ingestor:
             async with self.pool.acquire() as conn:
                 async with conn.transaction():
                     await _set_tenant_write_context(conn, tenant_id)
+                    await self._touch_metric_catalog(
+                        conn, tenant_id, device_id, metrics, catalog_keys, ts
+                    )
 
                     # Fetch all existing sensors for this device
                     existing = await conn.fetch(
@@ -1175,6 +1345,7 @@ class Ingestor:
 
         except Exception as e:
             # Sensor auto-discovery failure should NOT block telemetry ingestion
+            self._forget_catalog_keys(tenant_id, device_id, catalog_keys)
             logger.warning("sensor_autodiscovery_failed: %s", e)
 
     async def _get_device_subscription_status(
@@ -1243,6 +1414,10 @@ class Ingestor:
                     raise
                 await asyncio.sleep(1)
 
+    async def _connect_notify_listener(self) -> asyncpg.Connection:
+        """Dedicated LISTEN connection (not pooled; PgBouncer transaction mode cannot LISTEN)."""
+        return await asyncpg.connect(NOTIFY_DATABASE_URL)
+
     async def settings_worker(self):
         while True:
             try:
@@ -1297,6 +1472,8 @@ class Ingestor:
             # Evict sensor cache periodically to prevent unbounded growth and pick up manual deletions.
             if self._known_sensors and len(self._known_sensors) > 10000:
                 self._known_sensors.clear()
+            if len(self._catalog_touched) > 50000:
+                self._catalog_touched.clear()
             cache_stats = self.auth_cache.stats()
             batch_stats = {
                 "records_written": 0,
@@ -1357,6 +1534,10 @@ class Ingestor:
                 ts_errors=batch_stats["write_errors"],
                 ts_flushes=batch_stats["batches_flushed"],
                 ts_pending=batch_stats["pending_records"],
+                ts_in_flight=batch_stats.get("flushes_in_flight", 0),
+                ts_batch_size=batch_stats.get("batch_size", BATCH_SIZE),
+                ts_flush_interval_ms=batch_stats.get("flush_interval_ms", FLUSH_INTERVAL_MS),
+                ts_spool_pending=batch_stats.get("spool_pending_records", 0),
                 workers=INGEST_WORKER_COUNT,
                 nats_url=NATS_URL,
             )
@@ -1551,6 +1732,7 @@ class Ingestor:
         mqtt_username: str = "",
     ) -> None:
         """Process a single telemetry message through the validation pipeline."""
+        clock = stage_clock("ingest")
         try:
             event_ts = parse_ts(payload.get("ts"))
 
@@ -1606,6 +1788,7 @@ class Ingestor:
                 )
                 return
 
+            clock.lap("validate")
             token = payload.get("provision_token") or None
             token_hash = sha256_hex(str(token)) if token is not None else None
 
@@ -1685,7 +1868,9 @@ class Ingestor:
                     reg["status"],
                 )
 
+            clock.lap("db_device_auth")
             subscription_id, sub_status = await self._get_device_subscription_status(tenant_id, device_id)
+            clock.lap("db_subscription")
             if subscription_id and sub_status in ("SUSPENDED", "EXPIRED"):
                 await self._insert_quarantine(
                     topic,
@@ -1760,6 +1945,7 @@ class Ingestor:
                 )
                 return
 
+            clock.lap("auth_check")
             # Primary write: TimescaleDB (batched)
             ts = event_ts or utcnow()
             metrics = payload.get("metrics", {}) or {}
@@ -1775,11 +1961,14 @@ class Ingestor:
                 seq=payload.get("seq", 0),
                 metrics=metrics,
             )
+            clock.lap("normalize")
             COUNTERS["last_write_at"] = utcnow().isoformat()
             await self.batch_writer.add(record)
+            clock.lap("enqueue")
 
             # Sensor auto-discovery
             await self._ensure_sensors(tenant_id, device_id, record.metrics, ts)
+            clock.lap("db_sensors")
 
             # Message route fan-out (publish to NATS for async delivery)
             if self._nc:
@@ -1864,6 +2053,7 @@ class Ingestor:
                                 lat,
                                 lng,
                             )
+            clock.lap("routes_and_state")
             audit = get_audit_logger()
             if audit:
                 audit.device_telemetry(
@@ -2124,6 +2314,16 @@ class Ingestor:
             batch_size=BATCH_SIZE,
             flush_interval_ms=FLUSH_INTERVAL_MS,
             max_buffer_size=MAX_BUFFER_SIZE,
+            max_concurrent_flushes=MAX_CONCURRENT_FLUSHES,
+            min_batch_size=MIN_BATCH_SIZE,
+            max_batch_size=MAX_BATCH_SIZE,
+            min_flush_interval_ms=MIN_FLUSH_INTERVAL_MS,
+            spool=(
+                TelemetrySpool(TELEMETRY_SPOOL_DIR, max_bytes=TELEMETRY_SPOOL_MAX_MB * 1024 * 1024)
+                if TELEMETRY_SPOOL_DIR
+                else None
+            ),
+            spool_replay_rate=TELEMETRY_SPOOL_REPLAY_RATE,
         )
         await self.batch_writer.start()
         audit = init_audit_logger(self.pool, "ingest")
@@ -2154,6 +2354,15 @@ class Ingestor:
             self._workers.append(asyncio.create_task(self._nats_telemetry_worker(i)))
         self._workers.append(asyncio.create_task(self._nats_shadow_worker()))
         self._workers.append(asyncio.create_task(self._nats_commands_worker()))
+        if NOTIFY_DATABASE_URL:
+            self._workers.append(
+                asyncio.create_task(self.device_work.run_listener(self._connect_notify_listener))
+            )
+        else:
+            logger.warning(
+                "device_work_listener_disabled",
+                extra={"reason": "NOTIFY_DATABASE_URL is not set; pending polls always query"},
+            )
 
         asyncio.create_task(self.stats_worker())
 
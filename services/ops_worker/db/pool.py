@@ -3,6 +3,8 @@ from typing import AsyncGenerator
 
 import asyncpg
 
+from shared.db_context import set_db_context
+
 
 @asynccontextmanager
 async def tenant_connection(pool: asyncpg.Pool, tenant_id: str) -> AsyncGenerator[asyncpg.Connection, None]:
@@ -19,10 +21,8 @@ async def tenant_connection(pool: asyncpg.Pool, tenant_id: str) -> AsyncGenerato
 
     async with pool.acquire() as conn:
         async with conn.transaction():
-            # Set role to pulse_app (subject to RLS)
-            await conn.execute("SET LOCAL ROLE pulse_app")
-            # Set tenant context for RLS policies
-            await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+            # Role pulse_app (subject to RLS) and tenant context in one round trip
+            await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
             yield conn
             # Connection returned to pool; SET LOCAL resets automatically
 
@@ -43,5 +43,5 @@ async def operator_connection(pool: asyncpg.Pool) -> AsyncGenerator[asyncpg.Conn
     async with pool.acquire() as conn:
         async with conn.transaction():
             # Set role to pulse_operator (BYPASSRLS)
-            await conn.execute("SET LOCAL ROLE pulse_operator")
+            await set_db_context(conn, role="pulse_operator")
             yield conn
@@ -14,12 +14,17 @@ from workers.commands_worker import run_commands_expiry_tick
 from workers.certificate_worker import run_certificate_tick
 from workers.escalation_worker import run_escalation_tick
 from workers.export_worker import run_export_cleanup, run_export_tick
+from workers.fleet_counters_worker import (
+    FLEET_COUNTERS_RECONCILE_SECONDS,
+    run_fleet_counters_reconcile_tick,
+)
 from workers.jobs_worker import run_jobs_expiry_tick
 from workers.ota_worker import run_ota_campaign_tick
 from workers.ota_status_worker import run_ota_status_listener
 from workers.report_worker import run_report_tick
 from shared.logging import trace_id_var
 from shared.config import require_env, optional_env
+from shared.instrumentation import add_debug_routes
 from shared.metrics import (
     pulse_processing_duration_seconds,
     pulse_db_pool_size,
@@ -57,6 +62,7 @@ async def start_health_server(pool_obj: asyncpg.Pool) -> None:
     app.router.add_get("/health", health_handler)
     app.router.add_get("/ready", ready_handler)
     app.router.add_get("/metrics", metrics_handler)
+    add_debug_routes(app)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", 8080)
@@ -136,6 +142,9 @@ async def main() -> None:
         worker_loop(run_report_tick, pool, interval=86400),
         worker_loop(run_export_tick, pool, interval=5),
         worker_loop(run_export_cleanup, pool, interval=3600),
+        worker_loop(
+            run_fleet_counters_reconcile_tick, pool, interval=FLEET_COUNTERS_RECONCILE_SECONDS
+        ),
         worker_loop(run_certificate_tick, pool, interval=3600),  # hourly: CRL + expiry
         worker_loop(run_ota_campaign_tick, pool, interval=10),   # NEW: OTA rollout
         run_ota_status_listener(pool),                           # NEW: OTA status ingestion
@@ -15,6 +15,7 @@ from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
 from shared.config import require_env, optional_env
+from shared.db_context import set_db_context
 
 logger = logging.getLogger(__name__)
 
@@ -140,8 +141,7 @@ async def check_expired_certificates(pool: asyncpg.Pool) -> None:
         tenant_id = row["tenant_id"]
         async with pool.acquire() as conn:
             async with conn.transaction():
-                await conn.execute("SET LOCAL ROLE pulse_app")
-                await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+                await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
                 result = await conn.execute(
                     """
                     UPDATE device_certificates
@@ -199,8 +199,7 @@ async def check_expiring_certificates(pool: asyncpg.Pool) -> None:
 
         async with pool.acquire() as conn:
             async with conn.transaction():
-                await conn.execute("SET LOCAL ROLE pulse_app")
-                await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+                await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
 
                 existing = await conn.fetchval(
                     """
@@ -1,8 +1,5 @@
 """Background worker for processing async data export jobs."""
 
-import csv
-import io
-import json
 import logging
 import os
 import tempfile
@@ -16,6 +13,22 @@ except ImportError:
     Config = None  # type: ignore[assignment]
 import httpx
 from shared.config import require_env, optional_env
+from shared.export_columnar import (
+    COLUMNAR_FORMATS,
+    resolve_metric_type,
+    write_telemetry_columnar,
+)
+from shared.export_stream import (
+    TELEMETRY_BASE_COLUMNS,
+    csv_chunks,
+    gzip_chunks,
+    iter_cursor,
+    json_document_chunks,
+    ndjson_chunks,
+    telemetry_csv_row,
+    telemetry_row,
+    write_chunks,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +37,8 @@ S3_BUCKET = optional_env("S3_BUCKET", "exports")
 S3_ACCESS_KEY = require_env("S3_ACCESS_KEY")
 S3_SECRET_KEY = require_env("S3_SECRET_KEY")
 S3_REGION = optional_env("S3_REGION", "us-east-1")
+# Exports stream with flat memory; this only bounds runaway job size.
+EXPORT_MAX_ROWS = int(optional_env("EXPORT_MAX_ROWS", "10000000"))
 
 
 def get_s3_client():
@@ -65,7 +80,7 @@ async def run_export_tick(pool):
                 LIMIT 1
                 FOR UPDATE SKIP LOCKED
             )
-            RETURNING id, tenant_id, export_type, format, filters, callback_url
+            RETURNING id, tenant_id, export_type, format, compression, filters, callback_url
             """
         )
 
@@ -76,6 +91,7 @@ async def run_export_tick(pool):
     tenant_id = row["tenant_id"]
     export_type = row["export_type"]
     export_format = row["format"]
+    compression = row["compression"] or "none"
     filters = row["filters"] or {}
     callback_url = row["callback_url"]
 
@@ -91,15 +107,20 @@ async def run_export_tick(pool):
 
     try:
         local_path, row_count = await _process_export(
-            pool, tenant_id, export_type, export_format, filters, export_id
+            pool, tenant_id, export_type, export_format, filters, export_id, compression
         )
 
         file_size = os.path.getsize(local_path) if local_path else 0
 
         # Upload to S3-compatible storage; store the object key in export_jobs.file_path.
-        s3_key = f"{export_id}.{export_format}"
+        s3_key = f"{export_id}.{_file_extension(export_format, compression)}"
         s3 = get_s3_client()
-        s3.upload_file(local_path, S3_BUCKET, s3_key)
+        s3.upload_file(
+            local_path,
+            S3_BUCKET,
+            s3_key,
+            ExtraArgs={"ContentType": _content_type(export_format, compression)},
+        )
 
         try:
             os.remove(local_path)
@@ -160,6 +181,28 @@ async def run_export_tick(pool):
             await _send_callback(callback_url, export_id, "FAILED", 0, error_msg)
 
 
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+def _content_type(export_format: str, compression: str) -> str:
+    if _file_extension(export_format, compression).endswith(".gz"):
+        return "application/gzip"
+    return CONTENT_TYPES.get(export_format, "application/octet-stream")
+
+
+def _file_extension(export_format: str, compression: str) -> str:
+    # Columnar formats compress internally; gzip would only add overhead.
+    if compression == "gzip" and export_format not in COLUMNAR_FORMATS:
+        return f"{export_format}.gz"
+    return export_format
+
+
 async def _process_export(
     pool,
     tenant_id: str,
@@ -167,28 +210,80 @@ async def _process_export(
     export_format: str,
     filters: dict,
     export_id: str,
+    compression: str = "none",
 ) -> tuple[str, int]:
-    """Process an export job and write results to a temp file.
+    """Process an export job and stream results to a temp file.
 
     Returns: (file_path, row_count)
     """
-    file_path = os.path.join(tempfile.gettempdir(), f"pulse-export-{export_id}.{export_format}")
+    file_path = os.path.join(
+        tempfile.gettempdir(),
+        f"pulse-export-{export_id}.{_file_extension(export_format, compression)}",
+    )
+    export = _ExportFile(file_path, export_format, compression)
 
     async with pool.acquire() as conn:
-        # Set tenant context for RLS
-        await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
-
-        if export_type == "devices":
-            return await _export_devices(conn, tenant_id, filters, file_path, export_format)
-        elif export_type == "alerts":
-            return await _export_alerts(conn, tenant_id, filters, file_path, export_format)
-        elif export_type == "telemetry":
-            return await _export_telemetry(conn, tenant_id, filters, file_path, export_format)
+        # Server-side cursors need a transaction, which also scopes the RLS
+        # tenant context below.
+        async with conn.transaction():
+            await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+
+            if export_type == "devices":
+                return await _export_devices(conn, tenant_id, filters, export)
+            elif export_type == "alerts":
+                return await _export_alerts(conn, tenant_id, filters, export)
+            elif export_type == "telemetry":
+                return await _export_telemetry(conn, tenant_id, filters, export)
+            else:
+                raise ValueError(f"Unknown export type: {export_type}")
+
+
+class _ExportFile:
+    """Destination file plus encoding options for one export job."""
+
+    def __init__(self, file_path: str, fmt: str, compression: str = "none"):
+        self.file_path = file_path
+        self.fmt = fmt
+        self.compression = compression
+        self.row_count = 0
+
+    async def _counted(self, rows, transform):
+        async for row in rows:
+            self.row_count += 1
+            yield transform(row)
+
+    @property
+    def columnar(self) -> bool:
+        return self.fmt in COLUMNAR_FORMATS
+
+    async def write(self, rows, fieldnames: list[str], array_key: str, csv_row=None, json_row=None):
+        """Stream ``rows`` (an async iterator of records) into the file."""
+        if self.columnar:
+            raise ValueError(f"{self.fmt} exports are only supported for telemetry")
+        if self.fmt == "csv":
+            csv_row = csv_row or (lambda row: [row[key] for key in fieldnames])
+            chunks = csv_chunks(fieldnames, self._counted(rows, csv_row))
         else:
-            raise ValueError(f"Unknown export type: {export_type}")
+            json_row = json_row or (lambda row: {key: row[key] for key in fieldnames})
+            encoded = self._counted(rows, json_row)
+            if self.fmt == "ndjson":
+                chunks = ndjson_chunks(encoded)
+            else:
+                chunks = json_document_chunks(array_key, encoded)
+        if self.compression == "gzip":
+            chunks = gzip_chunks(chunks)
+        await write_chunks(self.file_path, chunks)
+        return self.file_path, self.row_count
+
+    async def write_columnar(self, rows, metric_types: dict[str, str]):
+        """Stream telemetry records into Parquet/Arrow row groups."""
+        self.row_count = await write_telemetry_columnar(
+            self.file_path, self.fmt, rows, metric_types
+        )
+        return self.file_path, self.row_count
 
 
-async def _export_devices(conn, tenant_id, filters, file_path, fmt) -> tuple[str, int]:
+async def _export_devices(conn, tenant_id, filters, export: _ExportFile) -> tuple[str, int]:
     """Export device data."""
     conditions = ["dr.tenant_id = $1"]
     params = [tenant_id]
@@ -210,7 +305,8 @@ async def _export_devices(conn, tenant_id, filters, file_path, fmt) -> tuple[str
         idx += 1
 
     where = " AND ".join(conditions)
-    rows = await conn.fetch(
+    rows = iter_cursor(
+        conn,
         f"""
         SELECT dr.device_id, COALESCE(dr.name, dr.device_id) AS name,
                dr.model, dr.device_type, dr.site_id,
@@ -225,10 +321,9 @@ async def _export_devices(conn, tenant_id, filters, file_path, fmt) -> tuple[str
         *params,
     )
 
-    return _write_rows(
-        file_path,
-        fmt,
+    return await export.write(
         rows,
+        array_key="data",
         fieldnames=[
             "device_id",
             "name",
@@ -243,7 +338,7 @@ async def _export_devices(conn, tenant_id, filters, file_path, fmt) -> tuple[str
     )
 
 
-async def _export_alerts(conn, tenant_id, filters, file_path, fmt) -> tuple[str, int]:
+async def _export_alerts(conn, tenant_id, filters, export: _ExportFile) -> tuple[str, int]:
     """Export alert data."""
     conditions = ["tenant_id = $1"]
     params = [tenant_id]
@@ -269,7 +364,8 @@ async def _export_alerts(conn, tenant_id, filters, file_path, fmt) -> tuple[str,
         idx += 1
 
     where = " AND ".join(conditions)
-    rows = await conn.fetch(
+    rows = iter_cursor(
+        conn,
         f"""
         SELECT id AS alert_id, device_id, site_id, alert_type, severity,
                status, summary, created_at, acknowledged_at, closed_at
@@ -280,10 +376,9 @@ async def _export_alerts(conn, tenant_id, filters, file_path, fmt) -> tuple[str,
         *params,
     )
 
-    return _write_rows(
-        file_path,
-        fmt,
+    return await export.write(
         rows,
+        array_key="data",
         fieldnames=[
             "alert_id",
             "device_id",
@@ -299,8 +394,8 @@ async def _export_alerts(conn, tenant_id, filters, file_path, fmt) -> tuple[str,
     )
 
 
-async def _export_telemetry(conn, tenant_id, filters, file_path, fmt) -> tuple[str, int]:
-    """Export telemetry data. Processes in chunks to handle large datasets."""
+async def _export_telemetry(conn, tenant_id, filters, export: _ExportFile) -> tuple[str, int]:
+    """Export telemetry data, streamed from a server-side cursor."""
     conditions = ["tenant_id = $1"]
     params = [tenant_id]
     idx = 2
@@ -322,88 +417,55 @@ async def _export_telemetry(conn, tenant_id, filters, file_path, fmt) -> tuple[s
     where = " AND ".join(conditions)
 
     # For large telemetry exports, use cursor-based iteration
-    # First pass: discover metric keys
-    sample_rows = await conn.fetch(
+    # First pass: metric keys from the catalog. Ingest refreshes last_seen
+    # every few minutes, hence the margin. Site filters are not tracked there,
+    # so a site-scoped export may carry a few always-empty columns.
+    catalog_conditions = [
+        "tenant_id = $1",
+        f"last_seen >= NOW() - '{pg_interval}'::interval - interval '10 minutes'",
+    ]
+    catalog_params = [tenant_id]
+    if filters.get("device_ids"):
+        catalog_conditions.append("device_id = ANY($2::text[])")
+        catalog_params.append(filters["device_ids"])
+    key_rows = await conn.fetch(
         f"""
-        SELECT metrics FROM telemetry
-        WHERE {where}
-        LIMIT 1000
+        SELECT metric_key, array_agg(DISTINCT value_type) AS value_types
+        FROM telemetry_metric_catalog
+        WHERE {" AND ".join(catalog_conditions)}
+        GROUP BY metric_key
+        ORDER BY metric_key
         """,
-        *params,
+        *catalog_params,
     )
 
-    metric_keys = sorted({key for row in sample_rows for key in ((row["metrics"] or {}).keys())})
+    metric_keys = [row["metric_key"] for row in key_rows]
 
-    # Fetch all rows
-    rows = await conn.fetch(
+    rows = iter_cursor(
+        conn,
         f"""
         SELECT time, device_id, site_id, seq, metrics
         FROM telemetry
         WHERE {where}
         ORDER BY time ASC
-        LIMIT 1000000
+        LIMIT {EXPORT_MAX_ROWS}
         """,
         *params,
     )
 
-    if fmt == "csv":
-        fieldnames = ["time", "device_id", "site_id", "seq", *metric_keys]
-        with open(file_path, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in rows:
-                metrics = row["metrics"] or {}
-                csv_row = {
-                    "time": row["time"].isoformat() if row["time"] else "",
-                    "device_id": row["device_id"],
-                    "site_id": row["site_id"] or "",
-                    "seq": row["seq"],
-                }
-                for key in metric_keys:
-                    csv_row[key] = metrics.get(key, "")
-                writer.writerow(csv_row)
-        return file_path, len(rows)
-    else:
-        data = []
-        for row in rows:
-            data.append(
-                {
-                    "time": row["time"].isoformat() if row["time"] else None,
-                    "device_id": row["device_id"],
-                    "site_id": row["site_id"],
-                    "seq": row["seq"],
-                    "metrics": row["metrics"] or {},
-                }
-            )
-        with open(file_path, "w") as f:
-            json.dump({"telemetry": data, "count": len(data)}, f, default=str)
-        return file_path, len(rows)
-
-
-def _write_rows(file_path: str, fmt: str, rows, fieldnames: list[str]) -> tuple[str, int]:
-    """Write query results to a file in the specified format."""
-    if fmt == "csv":
-        with open(file_path, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in rows:
-                row_dict = dict(row)
-                csv_row = {}
-                for key in fieldnames:
-                    value = row_dict.get(key)
-                    if isinstance(value, list):
-                        csv_row[key] = ",".join(str(v) for v in value)
-                    elif isinstance(value, datetime):
-                        csv_row[key] = value.isoformat()
-                    else:
-                        csv_row[key] = value
-                writer.writerow(csv_row)
-        return file_path, len(rows)
-    else:
-        data = [dict(row) for row in rows]
-        with open(file_path, "w") as f:
-            json.dump({"data": data, "count": len(data)}, f, default=str)
-        return file_path, len(rows)
+    if export.columnar:
+        metric_types = {
+            row["metric_key"]: resolve_metric_type(row["value_types"]) for row in key_rows
+        }
+        return await export.write_columnar(rows, metric_types)
+
+    return await export.write(
+        rows,
+        array_key="telemetry",
+        fieldnames=[*TELEMETRY_BASE_COLUMNS, *metric_keys],
+        csv_row=lambda row: telemetry_csv_row(row, metric_keys),
+        json_row=telemetry_row,
+    )
 
 
 async def _send_callback(
@@ -0,0 +1,47 @@
+"""
+Fleet counter reconciliation.
+
+fleet_counters (migration 129) is kept current by triggers; this tick
+recounts each tenant from the source tables to correct drift and to
+refresh last_activity, which the triggers deliberately do not track.
+"""
+
+import uuid
+
+from shared.config import optional_env
+from shared.logging import get_logger, trace_id_var
+
+logger = get_logger("pulse.fleet_counters_worker")
+
+FLEET_COUNTERS_RECONCILE_SECONDS = int(optional_env("FLEET_COUNTERS_RECONCILE_SECONDS", "300"))
+
+
+async def run_fleet_counters_reconcile_tick(pool) -> None:
+    """Recount fleet_counters for every tenant, one short transaction each."""
+    token = trace_id_var.set(str(uuid.uuid4()))
+    try:
+        async with pool.acquire() as conn:
+            tenant_rows = await conn.fetch(
+                """
+                SELECT tenant_id FROM tenants WHERE status != 'DELETED'
+                UNION
+                SELECT tenant_id FROM fleet_counters
+                """
+            )
+            drifted = []
+            for row in tenant_rows:
+                tenant_id = row["tenant_id"]
+                async with conn.transaction():
+                    if await conn.fetchval("SELECT reconcile_fleet_counters($1)", tenant_id):
+                        drifted.append(tenant_id)
+        if drifted:
+            logger.warning(
+                "fleet_counters_drift_corrected",
+                extra={"tenant_count": len(drifted), "tenant_ids": drifted[:20]},
+            )
+        logger.info(
+            "fleet_counters_reconcile_tick",
+            extra={"tenants": len(tenant_rows), "drifted": len(drifted)},
+        )
+    finally:
+        trace_id_var.reset(token)
@@ -1,5 +1,6 @@
 import uuid
 
+from shared.db_context import set_db_context
 from shared.logging import get_logger, trace_id_var
 
 logger = get_logger("pulse.jobs_worker")
@@ -26,11 +27,7 @@ async def run_jobs_expiry_tick(pool) -> None:
             for job in expired_jobs:
                 tenant_id = job["tenant_id"]
                 job_id = job["job_id"]
-                await conn.execute("SET LOCAL ROLE pulse_app")
-                await conn.execute(
-                    "SELECT set_config('app.tenant_id', $1, true)",
-                    tenant_id,
-                )
+                await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
 
                 timed_out = await conn.execute(
                     """
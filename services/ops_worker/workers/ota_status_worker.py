@@ -13,6 +13,7 @@ import os
 import re
 from typing import Any
 from shared.config import require_env, optional_env
+from shared.db_context import set_db_context
 
 logger = logging.getLogger("pulse.ota_status_worker")
 
@@ -130,11 +131,7 @@ async def _handle_ota_status(pool, topic: str, payload: bytes) -> None:
     try:
         async with pool.acquire() as conn:
             # Set RLS context
-            await conn.execute("SET LOCAL ROLE pulse_app")
-            await conn.execute(
-                "SELECT set_config('app.tenant_id', $1, true)",
-                tenant_id,
-            )
+            await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
 
             # Build the update
             is_terminal = status in ("SUCCESS", "FAILED")
@@ -14,6 +14,7 @@ import json
 import os
 import uuid
 
+from shared.db_context import set_db_context
 from shared.logging import get_logger, trace_id_var
 from shared.config import require_env, optional_env
 
@@ -124,11 +125,7 @@ async def run_ota_campaign_tick(pool) -> None:
                 abort_threshold = campaign["abort_threshold"]
 
                 # Set RLS context for this tenant
-                await conn.execute("SET LOCAL ROLE pulse_app")
-                await conn.execute(
-                    "SELECT set_config('app.tenant_id', $1, true)",
-                    tenant_id,
-                )
+                await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
 
                 # 2. Pick up to rollout_rate PENDING devices
                 pending_devices = await conn.fetch(
@@ -19,6 +19,8 @@ import asyncpg
 from aiohttp import web
 from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
 from shared.config import require_env, optional_env
+from shared.instrumentation import add_debug_routes
+from shared.db_context import set_db_context
 
 logger = logging.getLogger("route_delivery")
 logging.basicConfig(
@@ -197,11 +199,7 @@ class RouteDeliveryService:
         try:
             async with self._pool.acquire() as conn:
                 async with conn.transaction():
-                    await conn.execute("SET LOCAL ROLE pulse_app")
-                    await conn.execute(
-                        "SELECT set_config('app.tenant_id', $1, true)",
-                        job["tenant_id"],
-                    )
+                    await set_db_context(conn, role="pulse_app", tenant_id=job["tenant_id"])
                     await conn.execute(
                         """
                         INSERT INTO dead_letter_messages
@@ -329,6 +327,7 @@ class RouteDeliveryService:
         app.router.add_get("/health", health_handler)
         app.router.add_get("/ready", ready_handler)
         app.router.add_get("/metrics", metrics_handler)
+        add_debug_routes(app)
         runner = web.AppRunner(app)
         await runner.setup()
         site = web.TCPSite(runner, "0.0.0.0", 8080)
@@ -0,0 +1,44 @@
+"""
+Transaction-local DB role and tenant context for RLS connections.
+
+Every tenant-scoped connection used to send ``SET LOCAL ROLE <role>`` and
+``SELECT set_config('app.tenant_id', $1, true)`` as two statements after
+BEGIN. ``set_db_context`` sets both in one statement, using
+``set_config('role', ..., true)``, which is exactly what ``SET LOCAL ROLE``
+does. Role and tenant are bind parameters, so the statement text is one of
+three constants and stays in asyncpg's prepared statement cache.
+
+BEGIN itself stays with ``conn.transaction()``: asyncpg tracks transaction
+state per connection, and nested ``conn.transaction()`` blocks (savepoints)
+depend on it.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+_ROLE_AND_TENANT_SQL = (
+    "SELECT set_config('role', $1, true), set_config('app.tenant_id', $2, true)"
+)
+_ROLE_SQL = "SELECT set_config('role', $1, true)"
+_TENANT_SQL = "SELECT set_config('app.tenant_id', $1, true)"
+
+
+def db_context_statement(role: str | None = None, tenant_id: str | None = None) -> tuple[str, tuple[str, ...]]:
+    """SQL and arguments that set ``role`` and/or ``tenant_id`` for the current transaction."""
+    if role and tenant_id is not None:
+        return _ROLE_AND_TENANT_SQL, (role, str(tenant_id))
+    if role:
+        return _ROLE_SQL, (role,)
+    if tenant_id is not None:
+        return _TENANT_SQL, (str(tenant_id),)
+    raise ValueError("role or tenant_id is required")
+
+
+async def set_db_context(conn: Any, *, role: str | None = None, tenant_id: str | None = None) -> None:
+    """Set the transaction-local role and tenant context in a single round trip.
+
+    Must be called inside a transaction; both settings reset at commit/rollback.
+    """
+    query, args = db_context_statement(role, tenant_id)
+    await conn.execute(query, *args)
@@ -0,0 +1,106 @@
+"""
+Chart downsampling shared by time-series endpoints.
+
+Two strategies, depending on where the series comes from:
+
+- Raw series (e.g. system_metrics) are thinned with Largest-Triangle-Three-
+  Buckets (LTTB), which keeps the points that carry the visual shape of
+  the line. ``lttb_indices`` is a single O(n) pass over parallel x/y
+  sequences and returns the indices to keep, so callers can keep their own
+  row objects.
+- Bucketed series (telemetry time_bucket aggregates) are reduced in the
+  database: ``chart_bucket`` widens the bucket so at most ``max_points``
+  buckets cover the lookback. Each bucket already carries min/max, which
+  is the min/max-per-pixel envelope.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import timedelta
+from typing import Sequence
+
+# Bucket widths a chart may be widened to. Each is a whole multiple of the
+# next smaller telemetry rollup tier (1m / 1h / 1d), so rollups still apply.
+CHART_BUCKET_WIDTHS: tuple[timedelta, ...] = (
+    timedelta(minutes=1),
+    timedelta(minutes=2),
+    timedelta(minutes=5),
+    timedelta(minutes=10),
+    timedelta(minutes=15),
+    timedelta(minutes=30),
+    timedelta(hours=1),
+    timedelta(hours=2),
+    timedelta(hours=3),
+    timedelta(hours=6),
+    timedelta(hours=12),
+    timedelta(days=1),
+    timedelta(days=2),
+    timedelta(days=7),
+)
+
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float], threshold: int) -> list[int]:
+    """Indices of the points LTTB keeps when reducing a series to ``threshold``.
+
+    ``xs`` must be ascending. The first and last points are always kept.
+    """
+    n = len(xs)
+    if threshold >= n or n <= 2:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex.
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        span = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / span
+        avg_y = sum(ys[avg_start:avg_end]) / span
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = -1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def lttb(points: Sequence[dict], threshold: int, x: str = "time", y: str = "value") -> list[dict]:
+    """Downsample dict points whose ``x`` is a datetime and ``y`` a number."""
+    if threshold >= len(points):
+        return list(points)
+    xs = [p[x].timestamp() for p in points]
+    ys = [float(p[y]) for p in points]
+    return [points[i] for i in lttb_indices(xs, ys, threshold)]
+
+
+def chart_bucket(lookback: timedelta, bucket: timedelta, max_points: int | None) -> timedelta:
+    """Smallest bucket >= ``bucket`` that covers ``lookback`` in <= max_points buckets."""
+    if not max_points:
+        return bucket
+    needed = timedelta(seconds=math.ceil(lookback.total_seconds() / max_points))
+    if needed <= bucket:
+        return bucket
+    for width in CHART_BUCKET_WIDTHS:
+        if width >= needed and width >= bucket:
+            return width
+    return CHART_BUCKET_WIDTHS[-1]
+
+
+def format_interval(delta: timedelta) -> str:
+    """Human/Postgres interval text such as '15 minutes' or '1 day'."""
+    seconds = int(delta.total_seconds())
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds % size == 0:
+            count = seconds // size
+            return f"{count} {unit}" + ("" if count == 1 else "s")
+    return f"{seconds} seconds"
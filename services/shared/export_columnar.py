@@ -0,0 +1,219 @@
+"""
+Columnar (Parquet / Arrow IPC) encoding for telemetry exports.
+
+Metrics are pivoted into one typed column per catalog key. device_id and
+site_id are dictionary-encoded against a dictionary that grows over the
+whole file. Rows are buffered per column and written one row group (or
+record batch) at a time, so memory is bounded by the row group size.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, AsyncIterable, Iterable
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None  # type: ignore[assignment]
+    pq = None  # type: ignore[assignment]
+
+from shared.export_stream import TELEMETRY_BASE_COLUMNS, telemetry_metrics
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+ROW_GROUP_ROWS = 65536
+COLUMNAR_COMPRESSION = "zstd"
+
+DICTIONARY_COLUMNS = ("device_id", "site_id")
+
+
+def resolve_metric_type(value_types: Iterable[str]) -> str:
+    """Column type for a metric key given every value_type seen for it.
+
+    Keys reported with a single type keep it; mixed or JSON keys fall back
+    to string so no value is lost.
+    """
+    types = set(value_types)
+    if len(types) == 1 and types <= {"number", "boolean", "string"}:
+        return types.pop()
+    return "string"
+
+
+def _coerce(value: Any, metric_type: str) -> Any:
+    if value is None:
+        return None
+    if metric_type == "number":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return float(value)
+    if metric_type == "boolean":
+        return value if isinstance(value, bool) else None
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _require_pyarrow() -> None:
+    if pa is None or pq is None:
+        raise RuntimeError(
+            "pyarrow is required for parquet/arrow exports. Install it with: pip install pyarrow"
+        )
+
+
+class _GrowingDictionary:
+    """Stable value -> index mapping shared by every batch of one file."""
+
+    def __init__(self):
+        self.index: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def encode(self, values: list[Any]):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            idx = self.index.get(value)
+            if idx is None:
+                idx = self.index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(idx)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()),
+            pa.array(self.values, type=pa.string()),
+        )
+
+
+class ColumnarTelemetryWriter:
+    """Write telemetry records to a Parquet or Arrow IPC file in row groups."""
+
+    def __init__(
+        self,
+        path: str,
+        fmt: str,
+        metric_types: dict[str, str],
+        row_group_rows: int = ROW_GROUP_ROWS,
+    ):
+        _require_pyarrow()
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported columnar format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        # A metric named like a base column cannot share the schema with it.
+        self.metric_types = {
+            key: metric_type
+            for key, metric_type in metric_types.items()
+            if key not in TELEMETRY_BASE_COLUMNS
+        }
+        self.row_group_rows = row_group_rows
+        self.row_count = 0
+        self.schema = pa.schema(
+            [
+                pa.field("time", pa.timestamp("us", tz="UTC")),
+                pa.field("device_id", pa.dictionary(pa.int32(), pa.string())),
+                pa.field("site_id", pa.dictionary(pa.int32(), pa.string())),
+                pa.field("seq", pa.int64()),
+                *[
+                    pa.field(key, _ARROW_TYPES[metric_type]())
+                    for key, metric_type in self.metric_types.items()
+                ],
+            ]
+        )
+        self._dictionaries = {name: _GrowingDictionary() for name in DICTIONARY_COLUMNS}
+        self._columns = self._empty_columns()
+        self._writer = None
+
+    def _empty_columns(self) -> dict[str, list]:
+        return {name: [] for name in self.schema.names}
+
+    def append(self, time, device_id, site_id, seq, metrics: dict) -> bool:
+        """Buffer one row; returns True when a row group is ready to flush."""
+        columns = self._columns
+        columns["time"].append(time)
+        columns["device_id"].append(device_id)
+        columns["site_id"].append(site_id)
+        columns["seq"].append(seq)
+        for key, metric_type in self.metric_types.items():
+            columns[key].append(_coerce(metrics.get(key), metric_type))
+        self.row_count += 1
+        return len(columns["time"]) >= self.row_group_rows
+
+    def take_batch(self):
+        """Detach buffered rows as a RecordBatch (None when empty)."""
+        columns, self._columns = self._columns, self._empty_columns()
+        if not columns["time"]:
+            return None
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if field.name in self._dictionaries:
+                arrays.append(self._dictionaries[field.name].encode(values))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def write_batch(self, batch) -> None:
+        if self._writer is None:
+            self._writer = self._open()
+        if self.fmt == "parquet":
+            self._writer.write_batch(batch, row_group_size=batch.num_rows)
+        else:
+            self._writer.write_batch(batch)
+
+    def _open(self):
+        if self.fmt == "parquet":
+            return pq.ParquetWriter(
+                self.path,
+                self.schema,
+                compression=COLUMNAR_COMPRESSION,
+                use_dictionary=list(DICTIONARY_COLUMNS),
+            )
+        options = pa.ipc.IpcWriteOptions(
+            compression=COLUMNAR_COMPRESSION,
+            emit_dictionary_deltas=True,
+        )
+        return pa.ipc.new_file(self.path, self.schema, options=options)
+
+    def close(self) -> None:
+        """Flush remaining rows and finalize the file (valid even when empty)."""
+        batch = self.take_batch()
+        if batch is not None:
+            self.write_batch(batch)
+        if self._writer is None:
+            self._writer = self._open()
+        self._writer.close()
+
+
+_ARROW_TYPES = {
+    "number": lambda: pa.float64(),
+    "boolean": lambda: pa.bool_(),
+    "string": lambda: pa.string(),
+}
+
+
+async def write_telemetry_columnar(
+    path: str,
+    fmt: str,
+    records: AsyncIterable[Any],
+    metric_types: dict[str, str],
+    row_group_rows: int = ROW_GROUP_ROWS,
+) -> int:
+    """Stream telemetry records into a columnar file; returns rows written.
+
+    Encoding and compression of each row group run in a worker thread while
+    the cursor keeps the connection busy on the event loop.
+    """
+    writer = ColumnarTelemetryWriter(path, fmt, metric_types, row_group_rows)
+    async for record in records:
+        full = writer.append(
+            record["time"],
+            record["device_id"],
+            record["site_id"],
+            record["seq"],
+            telemetry_metrics(record["metrics"]),
+        )
+        if full:
+            batch = writer.take_batch()
+            await asyncio.to_thread(writer.write_batch, batch)
+    await asyncio.to_thread(writer.close)
+    return writer.row_count
@@ -0,0 +1,166 @@
+"""
+Streaming export encoders shared by the export worker and HTTP export routes.
+
+Rows are pulled from a server-side cursor and encoded into bounded byte
+chunks (CSV, NDJSON or a single JSON document), optionally gzip-compressed
+on the fly. Memory stays proportional to the chunk size, not the export size.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable
+
+import asyncpg
+
+CHUNK_BYTES = 64 * 1024
+CURSOR_PREFETCH = 2000
+
+TELEMETRY_BASE_COLUMNS = ["time", "device_id", "site_id", "seq"]
+
+
+async def iter_cursor(
+    conn: asyncpg.Connection,
+    query: str,
+    *args: Any,
+    prefetch: int = CURSOR_PREFETCH,
+) -> AsyncIterator[asyncpg.Record]:
+    """Yield rows from a server-side cursor. The caller must hold a transaction."""
+    async for record in conn.cursor(query, *args, prefetch=prefetch):
+        yield record
+
+
+async def aiter_rows(rows: Iterable[Any]) -> AsyncIterator[Any]:
+    """Adapt an in-memory iterable to the async encoders below."""
+    for row in rows:
+        yield row
+
+
+async def map_rows(rows: AsyncIterable[Any], transform: Callable[[Any], Any]) -> AsyncIterator[Any]:
+    """Apply ``transform`` to each row of an async iterator."""
+    async for row in rows:
+        yield transform(row)
+
+
+def _cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ",".join(str(v) for v in value)
+    return value
+
+
+async def csv_chunks(
+    header: list[str],
+    rows: AsyncIterable[list[Any]],
+    chunk_bytes: int = CHUNK_BYTES,
+) -> AsyncIterator[bytes]:
+    """Encode a header plus row lists as CSV, yielding ~chunk_bytes pieces."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    async for row in rows:
+        writer.writerow([_cell(value) for value in row])
+        if buf.tell() >= chunk_bytes:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+async def ndjson_chunks(
+    rows: AsyncIterable[dict],
+    chunk_bytes: int = CHUNK_BYTES,
+) -> AsyncIterator[bytes]:
+    """Encode dict rows as newline-delimited JSON."""
+    parts: list[str] = []
+    size = 0
+    async for row in rows:
+        line = json.dumps(row, default=str) + "\n"
+        parts.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield "".join(parts).encode()
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts).encode()
+
+
+async def json_document_chunks(
+    array_key: str,
+    rows: AsyncIterable[dict],
+    chunk_bytes: int = CHUNK_BYTES,
+) -> AsyncIterator[bytes]:
+    """Encode rows as {"<array_key>": [...], "count": N} without holding the array."""
+    parts = [f"{{{json.dumps(array_key)}: ["]
+    size = len(parts[0])
+    count = 0
+    async for row in rows:
+        item = ("," if count else "") + json.dumps(row, default=str)
+        parts.append(item)
+        size += len(item)
+        count += 1
+        if size >= chunk_bytes:
+            yield "".join(parts).encode()
+            parts, size = [], 0
+    parts.append(f'], "count": {count}}}')
+    yield "".join(parts).encode()
+
+
+async def gzip_chunks(chunks: AsyncIterable[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Gzip-compress a byte stream incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def telemetry_row(record: Any) -> dict:
+    """Telemetry record as a JSON-ready dict (NDJSON / JSON exports)."""
+    return {
+        "time": record["time"].isoformat() if record["time"] else None,
+        "device_id": record["device_id"],
+        "site_id": record["site_id"],
+        "seq": record["seq"],
+        "metrics": telemetry_metrics(record["metrics"]),
+    }
+
+
+def telemetry_csv_row(record: Any, metric_keys: list[str]) -> list[Any]:
+    """Telemetry record pivoted to TELEMETRY_BASE_COLUMNS + metric_keys."""
+    metrics = telemetry_metrics(record["metrics"])
+    return [
+        record["time"],
+        record["device_id"],
+        record["site_id"],
+        record["seq"],
+        *[metrics.get(key) for key in metric_keys],
+    ]
+
+
+def telemetry_metrics(value: Any) -> dict:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+async def write_chunks(path: str, chunks: AsyncIterable[bytes]) -> int:
+    """Write a chunk stream to a file; returns bytes written."""
+    written = 0
+    with open(path, "wb") as f:
+        async for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    return written
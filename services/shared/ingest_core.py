@@ -3,13 +3,26 @@ import hashlib
 import time
 import json
 import logging
+from collections import deque
 from datetime import datetime, timezone
 from dateutil import parser as dtparser
 from dataclasses import dataclass
 from typing import Optional
 
 import asyncpg
-from shared.metrics import ingest_records_dropped_total
+from shared.metrics import (
+    ingest_records_dropped_total,
+    ingest_spool_bytes,
+    ingest_spool_records_total,
+    ingest_spool_replayed_total,
+)
+from shared.telemetry_spool import (
+    COPY_COLUMNS,
+    TelemetrySpool,
+    copy_payload,
+    copy_row_tenant,
+    encode_copy_row,
+)
 
 logger = logging.getLogger(__name__)
 SUPPORTED_ENVELOPE_VERSIONS = {"1"}
@@ -17,6 +30,34 @@ SUPPORTED_ENVELOPE_VERSIONS = {"1"}
 MAX_METRIC_KEY_LENGTH = 128
 MAX_METRIC_KEYS = 50
 
+# TimescaleBatchWriter tuning
+COPY_THRESHOLD = 100
+FLUSH_LATENCY_ALPHA = 0.2
+ARRIVAL_RATE_ALPHA = 0.3
+BATCH_HEADROOM = 2.0
+SPOOL_RETRY_SECONDS = 5.0
+SPOOL_SYNC_SECONDS = 1.0
+
+# Errors that mean the database could not take the write right now (down,
+# failing over, out of connections), as opposed to rejecting the rows.
+# Only these are worth spooling and retrying.
+DB_UNAVAILABLE_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.OperatorInterventionError,
+    asyncpg.InsufficientResourcesError,
+    asyncpg.ReadOnlySQLTransactionError,
+)
+
+
+def is_db_unavailable(exc: BaseException) -> bool:
+    # asyncpg's client-side argument encoding error subclasses InterfaceError.
+    if isinstance(exc, asyncpg.exceptions._base.DataError):
+        return False
+    return isinstance(exc, DB_UNAVAILABLE_ERRORS)
+
 
 def parse_ts(v):
     """
@@ -120,6 +161,39 @@ class TimescaleBatchWriter:
     """
     Batched writer for TimescaleDB telemetry table.
     Collects records and flushes periodically or when batch is full.
+
+    ``add()`` never waits on the database: when the buffer reaches the
+    current batch size it is swapped out and written by a background task.
+    Up to ``max_concurrent_flushes`` batches are written at once, each on
+    its own pool connection. While all flush slots are busy, records keep
+    accumulating in the buffer (up to ``max_buffer_size``) and go out with
+    the next free slot.
+
+    After every flush the batch size and flush interval are re-derived from
+    the smoothed flush latency and arrival rate:
+
+    - batch size ~= arrival_rate * flush_latency * BATCH_HEADROOM / max_concurrent_flushes,
+      i.e. large enough that the flush slots keep up with arrivals,
+      clamped to [min_batch_size, max_batch_size];
+    - flush interval ~= time to fill one batch at the observed rate,
+      clamped to [min_flush_interval_ms, flush_interval_ms], so a partial
+      batch never waits much longer than a full one would have.
+
+    Setting min_batch_size == max_batch_size == batch_size and
+    min_flush_interval_ms == flush_interval_ms gives the old fixed behaviour.
+
+    With a ``spool`` (see shared.telemetry_spool), records are never dropped
+    while the spool has room: a full buffer spills its oldest batch to disk
+    and a flush the database could not take (``is_db_unavailable``) spills
+    the whole batch. A background task replays the spool with binary COPY,
+    at most ``spool_replay_rate`` records/s so catch-up after an outage does
+    not starve live writes. Without a spool, a full buffer drops its oldest
+    record and a failed batch is lost.
+
+    A batch the database rejects (e.g. a NaN metric or a NUL byte, which
+    jsonb refuses) is never spooled: it is split in halves and retried until
+    the bad records are isolated, and only those are dropped. Replay does
+    the same and moves rejected rows to the spool's quarantine file.
     """
 
     def __init__(
@@ -128,20 +202,47 @@ class TimescaleBatchWriter:
         batch_size: int = 500,
         flush_interval_ms: int = 1000,
         max_buffer_size: int = 5000,
+        max_concurrent_flushes: int = 4,
+        min_batch_size: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        min_flush_interval_ms: Optional[int] = None,
+        spool: Optional[TelemetrySpool] = None,
+        spool_replay_rate: int = 5000,
     ):
         self.pool = pool
+        self.min_batch_size = max(1, min(batch_size, min_batch_size or 50))
+        self.max_batch_size = max(batch_size, max_batch_size or batch_size * 4)
         self.batch_size = batch_size
-        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_flush_interval = flush_interval_ms / 1000.0
+        self.min_flush_interval = min(
+            self.max_flush_interval,
+            (min_flush_interval_ms if min_flush_interval_ms is not None else 50) / 1000.0,
+        )
+        self.flush_interval = self.max_flush_interval
         self.max_buffer_size = max_buffer_size
-        self.batch: list[TelemetryRecord] = []
-        self._lock = asyncio.Lock()
+        self.max_concurrent_flushes = max(1, max_concurrent_flushes)
+        self.batch: deque[TelemetryRecord] = deque()
+        self.spool = spool
+        self.spool_replay_rate = max(1, spool_replay_rate)
         self._flush_task: Optional[asyncio.Task] = None
+        self._replay_task: Optional[asyncio.Task] = None
+        self._last_spool_sync = time.monotonic()
+        self._in_flight: set[asyncio.Task] = set()
         self._running = False
 
+        # Adaptation state
+        self._arrivals = 0
+        self._rate_sampled_at = time.monotonic()
+        self.arrival_rate: float = 0.0
+        self.flush_latency_ewma_ms: float = 0.0
+
         # Metrics
         self.records_written = 0
         self.batches_flushed = 0
         self.write_errors = 0
+        self.records_spooled = 0
+        self.records_replayed = 0
+        self.records_rejected = 0
         self.last_flush_time: Optional[datetime] = None
         self.last_flush_latency_ms: float = 0
 
@@ -151,103 +252,229 @@ class TimescaleBatchWriter:
             return
         self._running = True
         self._flush_task = asyncio.create_task(self._flush_loop())
+        if self.spool is not None:
+            self._replay_task = asyncio.create_task(self._replay_loop())
         logger.info(
-            "TimescaleBatchWriter started (batch_size=%d, flush_interval=%.1fs)",
-            self.batch_size,
-            self.flush_interval,
+            "TimescaleBatchWriter started (batch_size=%d-%d, flush_interval=%.2f-%.1fs, concurrency=%d)",
+            self.min_batch_size,
+            self.max_batch_size,
+            self.min_flush_interval,
+            self.max_flush_interval,
+            self.max_concurrent_flushes,
         )
 
     async def stop(self):
-        """Stop the flush loop and flush remaining records."""
+        """Stop the flush loop, wait for in-flight flushes and flush remaining records."""
         self._running = False
-        if self._flush_task:
-            self._flush_task.cancel()
-            try:
-                await self._flush_task
-            except asyncio.CancelledError:
-                pass
-        await self._flush()
+        for task in (self._flush_task, self._replay_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await self._drain_in_flight()
+        while self.batch:
+            await self._flush()
+        if self.spool is not None:
+            self.spool.close()
         logger.info("TimescaleBatchWriter stopped")
 
     async def add(self, record: TelemetryRecord):
         """Add a record to the batch."""
-        async with self._lock:
-            if len(self.batch) >= self.max_buffer_size:
-                dropped = self.batch.pop(0)
-                ingest_records_dropped_total.labels(
-                    tenant_id=dropped.tenant_id or "unknown"
-                ).inc()
-                logger.warning(
-                    "batch writer buffer full, dropping oldest record",
-                    extra={
-                        "tenant_id": dropped.tenant_id,
-                        "device_id": dropped.device_id,
-                        "buffer_size": self.max_buffer_size,
-                    },
-                )
-            self.batch.append(record)
-            if len(self.batch) >= self.batch_size:
-                await self._flush_locked()
+        self._append(record)
+        if len(self.batch) >= self.batch_size:
+            self._schedule_flushes()
 
     async def add_many(self, records: list[TelemetryRecord]):
         """Add multiple records to the batch."""
-        async with self._lock:
-            for record in records:
-                if len(self.batch) >= self.max_buffer_size:
-                    dropped = self.batch.pop(0)
-                    ingest_records_dropped_total.labels(
-                        tenant_id=dropped.tenant_id or "unknown"
-                    ).inc()
-                    logger.warning(
-                        "batch writer buffer full, dropping oldest record",
-                        extra={
-                            "tenant_id": dropped.tenant_id,
-                            "device_id": dropped.device_id,
-                            "buffer_size": self.max_buffer_size,
-                        },
-                    )
-                self.batch.append(record)
-            if len(self.batch) >= self.batch_size:
-                await self._flush_locked()
+        for record in records:
+            self._append(record)
+        if len(self.batch) >= self.batch_size:
+            self._schedule_flushes()
+
+    def _append(self, record: TelemetryRecord):
+        if len(self.batch) >= self.max_buffer_size and self.spool is not None:
+            self._spill(self._take_batch(), "overflow")
+        elif len(self.batch) >= self.max_buffer_size:
+            dropped = self.batch.popleft()
+            ingest_records_dropped_total.labels(
+                tenant_id=dropped.tenant_id or "unknown"
+            ).inc()
+            logger.warning(
+                "batch writer buffer full, dropping oldest record",
+                extra={
+                    "tenant_id": dropped.tenant_id,
+                    "device_id": dropped.device_id,
+                    "buffer_size": self.max_buffer_size,
+                },
+            )
+        self.batch.append(record)
+        self._arrivals += 1
+
+    def _take_batch(self) -> list[TelemetryRecord]:
+        """Swap out up to max_batch_size buffered records.
+
+        Runs without awaiting, so no other coroutine can touch the buffer
+        mid-swap; this is the only critical section left on the add path.
+        """
+        if len(self.batch) <= self.max_batch_size:
+            records = list(self.batch)
+            self.batch.clear()
+        else:
+            popleft = self.batch.popleft
+            records = [popleft() for _ in range(self.max_batch_size)]
+        return records
+
+    def _spill(self, records: list[TelemetryRecord], reason: str):
+        """Append records to the spool; whatever does not fit is dropped."""
+        spooled = 0
+        dropped = 0
+        for record in records:
+            if self.spool.append(encode_copy_row(record)):
+                spooled += 1
+                continue
+            dropped += 1
+            ingest_records_dropped_total.labels(
+                tenant_id=record.tenant_id or "unknown"
+            ).inc()
+        self.records_spooled += spooled
+        ingest_spool_records_total.labels(reason=reason).inc(spooled)
+        ingest_spool_bytes.set(self.spool.pending_bytes)
+        if dropped:
+            logger.warning(
+                "telemetry spool full, dropping records",
+                extra={"dropped": dropped, "reason": reason, "spool_bytes": self.spool.pending_bytes},
+            )
+
+    def _schedule_flushes(self, partial: bool = False):
+        """Hand buffered records to background flushes while slots are free.
+
+        Without ``partial`` only full batches are sent; the flush loop passes
+        ``partial=True`` to push out whatever has accumulated.
+        """
+        while self.batch and len(self._in_flight) < self.max_concurrent_flushes:
+            if not partial and len(self.batch) < self.batch_size:
+                return
+            task = asyncio.create_task(self._write(self._take_batch()))
+            self._in_flight.add(task)
+            task.add_done_callback(self._flush_done)
+            partial = False
+
+    def _flush_done(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        if not task.cancelled():
+            self._schedule_flushes()
+
+    async def _drain_in_flight(self):
+        while self._in_flight:
+            await asyncio.gather(*list(self._in_flight), return_exceptions=True)
 
     async def _flush_loop(self):
         """Background loop that flushes periodically."""
         while self._running:
             await asyncio.sleep(self.flush_interval)
-            await self._flush()
+            self._schedule_flushes(partial=True)
+            now = time.monotonic()
+            if self.spool is not None and now - self._last_spool_sync >= SPOOL_SYNC_SECONDS:
+                self._last_spool_sync = now
+                self.spool.sync()
+
+    async def _replay_loop(self):
+        """Copy spooled records back into telemetry at spool_replay_rate."""
+        while self._running:
+            rows, offset = self.spool.read(self.max_batch_size)
+            if not rows:
+                await asyncio.sleep(self.max_flush_interval)
+                continue
+            started = time.monotonic()
+            try:
+                try:
+                    await self._replay(rows)
+                except Exception as e:
+                    if is_db_unavailable(e):
+                        raise
+                    logger.error("Spool replay rejected by database, isolating bad rows: %s", e)
+                    rejected = await self._replay_split(rows)
+                    if rejected:
+                        self.spool.quarantine(rejected)
+                        self.records_rejected += len(rejected)
+                        logger.error(
+                            "Quarantined %d spooled rows the database rejected", len(rejected)
+                        )
+            except Exception as e:
+                logger.warning("Spool replay failed, retrying in %.0fs: %s", SPOOL_RETRY_SECONDS, e)
+                await asyncio.sleep(SPOOL_RETRY_SECONDS)
+                continue
+            self.spool.commit(len(rows), offset)
+            self.records_replayed += len(rows)
+            ingest_spool_replayed_total.inc(len(rows))
+            ingest_spool_bytes.set(self.spool.pending_bytes)
+            budget = len(rows) / self.spool_replay_rate
+            await asyncio.sleep(max(0.0, budget - (time.monotonic() - started)))
+
+    async def _replay_split(self, rows: list[bytes]) -> list[bytes]:
+        """Replay ``rows`` in halves until the rejected ones are isolated; returns them.
+
+        Raises if the database becomes unavailable midway; the whole chunk is
+        then retried, so halves already copied are inserted again (replay is
+        at-least-once anyway).
+        """
+        if len(rows) == 1:
+            return rows
+        mid = len(rows) // 2
+        rejected: list[bytes] = []
+        for part in (rows[:mid], rows[mid:]):
+            try:
+                await self._replay(part)
+            except Exception as e:
+                if is_db_unavailable(e):
+                    raise
+                rejected.extend(await self._replay_split(part))
+        return rejected
+
+    async def _replay(self, rows: list[bytes]):
+        async with self.pool.acquire() as conn:
+            await conn.copy_to_table(
+                "telemetry",
+                source=copy_payload(rows),
+                columns=COPY_COLUMNS,
+                format="binary",
+            )
+            await self._notify_inserted(conn, {copy_row_tenant(row) for row in rows})
+
+    async def _notify_inserted(self, conn: asyncpg.Connection, tenant_ids: set):
+        notify_payload = json.dumps({"tenant_ids": sorted(t for t in tenant_ids if t)})
+        try:
+            await conn.execute("SELECT pg_notify('telemetry_inserted', $1)", notify_payload)
+        except Exception as notify_err:
+            logger.warning("Failed to send telemetry_inserted notify: %s", notify_err)
 
     async def _flush(self):
-        """Flush the current batch."""
-        async with self._lock:
-            await self._flush_locked()
+        """Flush one batch from the buffer and wait for it to be written."""
+        if self.batch:
+            await self._write(self._take_batch())
 
-    async def _flush_locked(self):
-        """Flush while holding the lock."""
-        if not self.batch:
+    async def _write(self, records_to_write: list[TelemetryRecord]):
+        """Write one swapped-out batch on its own connection."""
+        if not records_to_write:
             return
 
-        records_to_write = self.batch
-        self.batch = []
-
         start_time = time.time()
         try:
             async with self.pool.acquire() as conn:
-                if len(records_to_write) > 100:
+                if len(records_to_write) > COPY_THRESHOLD:
                     await self._copy_insert(conn, records_to_write)
                 else:
                     await self._batch_insert(conn, records_to_write)
-                tenant_ids = sorted({r.tenant_id for r in records_to_write if r.tenant_id})
-                notify_payload = json.dumps({"tenant_ids": tenant_ids})
-                try:
-                    await conn.execute("SELECT pg_notify('telemetry_inserted', $1)", notify_payload)
-                except Exception as notify_err:
-                    logger.warning("Failed to send telemetry_inserted notify: %s", notify_err)
+                await self._notify_inserted(conn, {r.tenant_id for r in records_to_write})
 
             elapsed_ms = (time.time() - start_time) * 1000
             self.records_written += len(records_to_write)
             self.batches_flushed += 1
             self.last_flush_time = datetime.now(timezone.utc)
             self.last_flush_latency_ms = elapsed_ms
+            self._adapt(elapsed_ms)
 
             if elapsed_ms > 100:
                 logger.warning(
@@ -258,7 +485,57 @@ class TimescaleBatchWriter:
 
         except Exception as e:
             self.write_errors += 1
-            logger.error("Batch write failed: %s", e)
+            if is_db_unavailable(e):
+                logger.error("Batch write failed: %s", e)
+                if self.spool is not None:
+                    self._spill(records_to_write, "flush_failed")
+            elif len(records_to_write) > 1:
+                # The database rejected some row; write the halves separately
+                # so only the bad records are lost.
+                logger.error("Batch write rejected, splitting %d records: %s", len(records_to_write), e)
+                mid = len(records_to_write) // 2
+                await self._write(records_to_write[:mid])
+                await self._write(records_to_write[mid:])
+            else:
+                record = records_to_write[0]
+                self.records_rejected += 1
+                ingest_records_dropped_total.labels(tenant_id=record.tenant_id or "unknown").inc()
+                logger.error(
+                    "Dropping telemetry record rejected by database: %s",
+                    e,
+                    extra={"tenant_id": record.tenant_id, "device_id": record.device_id},
+                )
+
+    def _adapt(self, flush_latency_ms: float):
+        """Re-derive batch size and flush interval from latency and arrival rate."""
+        if self.flush_latency_ewma_ms:
+            self.flush_latency_ewma_ms += FLUSH_LATENCY_ALPHA * (
+                flush_latency_ms - self.flush_latency_ewma_ms
+            )
+        else:
+            self.flush_latency_ewma_ms = flush_latency_ms
+
+        now = time.monotonic()
+        elapsed = now - self._rate_sampled_at
+        if elapsed >= self.min_flush_interval:
+            rate = self._arrivals / elapsed
+            self.arrival_rate += ARRIVAL_RATE_ALPHA * (rate - self.arrival_rate)
+            self._arrivals = 0
+            self._rate_sampled_at = now
+
+        if self.arrival_rate <= 0:
+            return
+        target = (
+            self.arrival_rate
+            * (self.flush_latency_ewma_ms / 1000.0)
+            * BATCH_HEADROOM
+            / self.max_concurrent_flushes
+        )
+        self.batch_size = int(min(self.max_batch_size, max(self.min_batch_size, target)))
+        self.flush_interval = min(
+            self.max_flush_interval,
+            max(self.min_flush_interval, self.batch_size / self.arrival_rate),
+        )
 
     async def _batch_insert(self, conn: asyncpg.Connection, records: list[TelemetryRecord]):
         """Insert using executemany (good for small batches)."""
@@ -311,6 +588,16 @@ class TimescaleBatchWriter:
             "pending_records": len(self.batch),
             "last_flush_time": self.last_flush_time.isoformat() if self.last_flush_time else None,
             "last_flush_latency_ms": self.last_flush_latency_ms,
+            "flushes_in_flight": len(self._in_flight),
+            "batch_size": self.batch_size,
+            "flush_interval_ms": round(self.flush_interval * 1000, 1),
+            "flush_latency_ewma_ms": round(self.flush_latency_ewma_ms, 1),
+            "arrival_rate": round(self.arrival_rate, 1),
+            "records_spooled": self.records_spooled,
+            "records_replayed": self.records_replayed,
+            "records_rejected": self.records_rejected,
+            "spool_pending_records": self.spool.pending_records if self.spool is not None else 0,
+            "spool_bytes": self.spool.pending_bytes if self.spool is not None else 0,
         }
 
 
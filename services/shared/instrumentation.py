@@ -0,0 +1,163 @@
+"""
+Hot-path instrumentation shared by the backend services.
+
+Stage timing
+    ``stage_clock(service)`` returns a clock for one pass through a hot path
+    (one telemetry message, one evaluator rule). ``lap(stage)`` records the
+    time since the previous lap into ``pulse_stage_duration_seconds``. Stages
+    that wait on the database are named ``db_*``, so DB time and Python time
+    can be told apart. When PULSE_STAGE_TIMING is off, ``stage_clock``
+    returns a shared no-op clock and a lap costs one method call.
+
+    Each service records at most MAX_STAGES_PER_SERVICE distinct stage
+    names. Any further stage is recorded as ``other``, so stage labels built
+    from data (such as rule types) cannot inflate metric cardinality.
+
+Profiling
+    With PULSE_PROFILING_ENABLED=1, ``add_debug_routes(app)`` adds
+    ``GET /debug/profile?seconds=10&interval_ms=10`` to an aiohttp health
+    server. A background thread samples the event-loop thread's stack for
+    the requested duration. The response is folded stacks
+    (``frame;frame;frame count``, one line per stack), ready for flamegraph
+    tools. Only one profile runs at a time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from shared.metrics import pulse_stage_duration_seconds
+
+MAX_STAGES_PER_SERVICE = 64
+PROFILE_MAX_SECONDS = 60.0
+
+_stage_timing = os.getenv("PULSE_STAGE_TIMING", "0") == "1"
+_profiling = os.getenv("PULSE_PROFILING_ENABLED", "0") == "1"
+_children: dict[tuple[str, str], Any] = {}
+_stage_counts: dict[str, int] = {}
+_profile_lock: asyncio.Lock | None = None
+
+
+def set_stage_timing(enabled: bool) -> None:
+    global _stage_timing
+    _stage_timing = enabled
+
+
+def stage_timing_enabled() -> bool:
+    return _stage_timing
+
+
+def _histogram(service: str, stage: str):
+    child = _children.get((service, stage))
+    if child is not None:
+        return child
+    if _stage_counts.get(service, 0) >= MAX_STAGES_PER_SERVICE:
+        stage = "other"
+        child = _children.get((service, stage))
+        if child is not None:
+            return child
+    _stage_counts[service] = _stage_counts.get(service, 0) + 1
+    child = _children[(service, stage)] = pulse_stage_duration_seconds.labels(
+        service=service, stage=stage
+    )
+    return child
+
+
+class StageClock:
+    """Records the time between consecutive laps against the named stage."""
+
+    __slots__ = ("service", "_last")
+
+    def __init__(self, service: str):
+        self.service = service
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str | None) -> None:
+        """Charge the time since the previous lap to ``stage`` (None only restarts)."""
+        now = time.perf_counter()
+        if stage is not None:
+            _histogram(self.service, stage).observe(now - self._last)
+        self._last = now
+
+
+class _NoopClock:
+    __slots__ = ()
+
+    def lap(self, stage: str | None) -> None:
+        pass
+
+
+_NOOP_CLOCK = _NoopClock()
+
+
+def stage_clock(service: str) -> StageClock | _NoopClock:
+    if not _stage_timing:
+        return _NOOP_CLOCK
+    return StageClock(service)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{os.path.basename(code.co_filename)}:{name}"
+
+
+def sample_stacks(thread_id: int, seconds: float, interval: float) -> Counter:
+    """Sample ``thread_id``'s stack every ``interval`` seconds; returns folded stack counts."""
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        if stack:
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def folded_stacks(counts: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def _query_float(request, name: str, default: float, low: float, high: float) -> float:
+    from aiohttp import web
+
+    raw = request.query.get(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be a number")
+    return max(low, min(value, high))
+
+
+async def profile_handler(request):
+    from aiohttp import web
+
+    global _profile_lock
+    seconds = _query_float(request, "seconds", 10.0, 0.1, PROFILE_MAX_SECONDS)
+    interval = _query_float(request, "interval_ms", 10.0, 1.0, 1000.0) / 1000.0
+    if _profile_lock is None:
+        _profile_lock = asyncio.Lock()
+    if _profile_lock.locked():
+        raise web.HTTPConflict(text="a profile is already running")
+    async with _profile_lock:
+        loop_thread = threading.get_ident()
+        counts = await asyncio.to_thread(sample_stacks, loop_thread, seconds, interval)
+    return web.Response(text=folded_stacks(counts), content_type="text/plain")
+
+
+def add_debug_routes(app) -> None:
+    """Register /debug/profile on an aiohttp app when PULSE_PROFILING_ENABLED=1."""
+    if _profiling:
+        app.router.add_get("/debug/profile", profile_handler)
@@ -25,6 +25,22 @@ ingest_records_dropped_total = Counter(
     ["tenant_id"],
 )
 
+ingest_spool_records_total = Counter(
+    "pulse_ingest_spool_records_total",
+    "Telemetry records spilled to the on-disk overflow spool",
+    ["reason"],  # overflow | flush_failed
+)
+
+ingest_spool_replayed_total = Counter(
+    "pulse_ingest_spool_replayed_total",
+    "Telemetry records replayed from the overflow spool into the database",
+)
+
+ingest_spool_bytes = Gauge(
+    "pulse_ingest_spool_bytes",
+    "Bytes of telemetry waiting in the overflow spool",
+)
+
 # Evaluator
 evaluator_rules_evaluated_total = Counter(
     "pulse_evaluator_rules_evaluated_total",
@@ -56,6 +72,23 @@ fleet_devices_by_status = Gauge(
     ["tenant_id", "status"],
 )
 
+ws_fanout_refresh_seconds = Histogram(
+    "pulse_ws_fanout_refresh_seconds",
+    "Time to compute and fan out one tenant's WebSocket payloads",
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+)
+
+ws_frames_dropped_total = Counter(
+    "pulse_ws_frames_dropped_total",
+    "WebSocket frames discarded because a client's send queue was full",
+)
+
+response_cache_requests_total = Counter(
+    "pulse_response_cache_requests_total",
+    "Cached read endpoint lookups by outcome",
+    ["cache", "result"],  # hit | coalesced | miss
+)
+
 delivery_jobs_failed_total = Counter(
     "pulse_delivery_jobs_failed_total",
     "Total delivery jobs that reached FAILED status",
@@ -83,6 +116,12 @@ pulse_auth_failures_total = Counter(
     ["reason"],
 )
 
+pulse_auth_token_cache_total = Counter(
+    "pulse_auth_token_cache_total",
+    "Verified-token claim cache lookups by outcome",
+    ["result"],  # hit | miss
+)
+
 # Per-service operational metrics
 pulse_queue_depth = Gauge(
     "pulse_queue_depth",
@@ -97,6 +136,14 @@ pulse_processing_duration_seconds = Histogram(
     buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0],
 )
 
+# Hot-path stage timings (shared.instrumentation; off unless PULSE_STAGE_TIMING=1)
+pulse_stage_duration_seconds = Histogram(
+    "pulse_stage_duration_seconds",
+    "Time spent in one stage of a hot path; db_* stages are database waits",
+    ["service", "stage"],
+    buckets=[0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 2.5],
+)
+
 pulse_db_pool_size = Gauge(
     "pulse_db_pool_size",
     "Current total size of the database connection pool",
@@ -108,3 +155,28 @@ pulse_db_pool_free = Gauge(
     "Current number of free (idle) connections in the pool",
     ["service"],
 )
+
+db_workload_budget = Gauge(
+    "pulse_db_workload_budget",
+    "Concurrent connection budget of a DB workload class",
+    ["workload"],
+)
+
+db_workload_in_use = Gauge(
+    "pulse_db_workload_in_use",
+    "Connections currently held by a DB workload class",
+    ["workload"],
+)
+
+db_workload_waiting = Gauge(
+    "pulse_db_workload_waiting",
+    "Callers waiting for a connection slot in a DB workload class",
+    ["workload"],
+)
+
+db_workload_acquire_seconds = Histogram(
+    "pulse_db_workload_acquire_seconds",
+    "Time to obtain a connection for a DB workload class",
+    ["workload"],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+)
@@ -1,14 +1,24 @@
 """
-Rate limiter for ingest endpoint using sliding window algorithm.
-Uses in-memory storage with automatic cleanup.
+Rate limiter for ingest endpoint using GCRA (generic cell rate algorithm).
+
+Each key keeps a single theoretical arrival time (TAT), so a check is O(1)
+regardless of the limit: ``requests`` per ``window_seconds`` becomes one
+emission interval of window/requests with a burst of ``requests``.
+
+State is in-memory per process by default. With RATE_LIMIT_BACKEND=postgres
+and a backend attached, ``check_all_async`` applies the same algorithm in
+Postgres (see migration 130) so limits hold across replicas; if the backend
+errors, the in-memory limiter is used for that request. ``check_many_async``
+checks a whole ingest batch in one backend round trip.
 """
+import math
 import os
 import random
 import time
 import threading
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import logging
 
@@ -24,17 +34,14 @@ class RateLimitConfig:
     log_sample_rate: float = 1.0
 
 
-@dataclass
-class SlidingWindow:
-    """Sliding window counter for rate limiting."""
-    timestamps: list = None
-    lock: threading.Lock = None
+class GcraWindow:
+    """GCRA state for one key: the theoretical arrival time of the next request."""
 
-    def __post_init__(self):
-        if self.timestamps is None:
-            self.timestamps = []
-        if self.lock is None:
-            self.lock = threading.Lock()
+    __slots__ = ("tat", "lock")
+
+    def __init__(self):
+        self.tat = 0.0
+        self.lock = threading.Lock()
 
     def add_request(
         self, now: float, window_seconds: float, max_requests: int
@@ -43,30 +50,62 @@ class SlidingWindow:
         Add a request and check if within limit.
         Returns (allowed, current_count).
         """
+        interval = window_seconds / max(max_requests, 1)
         with self.lock:
-            cutoff = now - window_seconds
-            self.timestamps = [ts for ts in self.timestamps if ts > cutoff]
-            current_count = len(self.timestamps)
-            if current_count >= max_requests:
-                return False, current_count
-            self.timestamps.append(now)
-            return True, current_count + 1
+            tat = max(self.tat, now)
+            if tat - now > window_seconds - interval + 1e-9:
+                return False, _used(tat, now, interval, max_requests)
+            self.tat = tat + interval
+            return True, _used(self.tat, now, interval, max_requests)
+
+
+def _used(tat: float, now: float, interval: float, max_requests: int) -> int:
+    return min(max_requests, math.ceil((tat - now) / interval - 1e-9))
+
+
+# Backward-compatible name; the window is no longer a timestamp list.
+SlidingWindow = GcraWindow
+
+
+class PostgresRateLimitBackend:
+    """Cluster-wide GCRA state in the rate_limit_state table (migration 130)."""
+
+    def __init__(self, pool: Any, cleanup_interval: float = 60.0):
+        self._pool = pool
+        self._cleanup_interval = cleanup_interval
+        self._last_cleanup = time.time()
+
+    async def acquire(
+        self, checks: List[Tuple[str, int, float, int]]
+    ) -> List[Tuple[Optional[bool], Optional[int]]]:
+        """
+        Apply (key, requests, window_seconds, request_no) checks in one round trip.
+        Checks after the first rejection within a request_no are skipped (None, None).
+        """
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT limit_key, allowed, used FROM "
+                "rate_limit_acquire($1::text[], $2::int[], $3::float8[], $4::int[])",
+                [c[0] for c in checks],
+                [c[1] for c in checks],
+                [c[2] for c in checks],
+                [c[3] for c in checks],
+            )
+            if time.time() - self._last_cleanup >= self._cleanup_interval:
+                self._last_cleanup = time.time()
+                await conn.execute("SELECT rate_limit_cleanup()")
+        return [(row["allowed"], row["used"]) for row in rows]
 
 
 class RateLimiter:
     """Multi-layer rate limiter with automatic cleanup."""
 
-    def __init__(self):
-        self._device_windows: Dict[str, SlidingWindow] = defaultdict(
-            lambda: SlidingWindow()
-        )
-        self._ip_windows: Dict[str, SlidingWindow] = defaultdict(
-            lambda: SlidingWindow()
-        )
-        self._unknown_ip_windows: Dict[str, SlidingWindow] = defaultdict(
-            lambda: SlidingWindow()
-        )
-        self._global_window = SlidingWindow()
+    def __init__(self, backend: Optional[PostgresRateLimitBackend] = None):
+        self._device_windows: Dict[str, GcraWindow] = defaultdict(GcraWindow)
+        self._ip_windows: Dict[str, GcraWindow] = defaultdict(GcraWindow)
+        self._unknown_ip_windows: Dict[str, GcraWindow] = defaultdict(GcraWindow)
+        self._global_window = GcraWindow()
+        self.backend = backend
 
         self.config = {
             "device": RateLimitConfig(
@@ -182,6 +221,88 @@ class RateLimiter:
         self._increment_stat("allowed")
         return True, "", 200
 
+    async def check_all_async(
+        self,
+        device_id: Optional[str],
+        ip: str,
+        is_known_device: bool,
+    ) -> Tuple[bool, str, int]:
+        """
+        Same checks as ``check_all``, against the shared backend when one is set.
+        Returns (allowed, reason, http_status_code).
+        """
+        return (await self.check_many_async([(device_id, ip, is_known_device)]))[0]
+
+    async def check_many_async(
+        self,
+        requests: List[Tuple[Optional[str], str, bool]],
+    ) -> List[Tuple[bool, str, int]]:
+        """
+        ``check_all_async`` for several (device_id, ip, is_known_device) requests,
+        in order, with one backend round trip for all of them.
+        """
+        if self.backend is None:
+            return [self.check_all(*request) for request in requests]
+
+        per_request = [self._backend_checks(*request) for request in requests]
+        try:
+            results = await self.backend.acquire(
+                [
+                    (
+                        f"{limit_type}:{key}",
+                        self.config[limit_type].requests,
+                        self.config[limit_type].window_seconds,
+                        request_no,
+                    )
+                    for request_no, checks in enumerate(per_request)
+                    for limit_type, key in checks
+                ]
+            )
+        except Exception:
+            logger.warning("Shared rate limit backend failed; using local limits", exc_info=True)
+            return [self.check_all(*request) for request in requests]
+
+        verdicts = []
+        offset = 0
+        for checks in per_request:
+            verdicts.append(self._backend_verdict(checks, results[offset : offset + len(checks)]))
+            offset += len(checks)
+        return verdicts
+
+    @staticmethod
+    def _backend_checks(
+        device_id: Optional[str], ip: str, is_known_device: bool
+    ) -> List[Tuple[str, str]]:
+        checks = [("global", "global")]
+        if not is_known_device:
+            checks.append(("ip_unknown", ip))
+        if device_id and is_known_device:
+            checks.append(("device", device_id))
+            checks.append(("ip_known", ip))
+        return checks
+
+    def _backend_verdict(
+        self, checks: List[Tuple[str, str]], results: List[Tuple[Optional[bool], Optional[int]]]
+    ) -> Tuple[bool, str, int]:
+        # Layers after the first rejection are skipped by the backend, so
+        # the loop always returns at or before the first non-True result.
+        for (limit_type, key), (allowed, count) in zip(checks, results):
+            if allowed:
+                continue
+            cfg = self.config[limit_type]
+            self._increment_stat(f"{limit_type}_limited")
+            if limit_type == "global":
+                logger.warning("Global rate limit reached: %s/%s", count, cfg.requests)
+                return False, "Service temporarily unavailable", 503
+            label = "Device" if limit_type == "device" else "IP"
+            return False, (
+                f"{label} {key} rate limited "
+                f"({count}/{cfg.requests} per {cfg.window_seconds}s)"
+            ), 429
+
+        self._increment_stat("allowed")
+        return True, "", 200
+
     def should_log_rejection(self, limit_type: str) -> bool:
         cfg = self.config.get(limit_type)
         if not cfg or not cfg.log_rejections:
@@ -206,17 +327,13 @@ class RateLimiter:
             if now - self._last_cleanup < self._cleanup_interval:
                 return
             self._last_cleanup = now
-            cutoff = now - 300
             for d in (
                 self._device_windows,
                 self._ip_windows,
                 self._unknown_ip_windows,
             ):
-                to_remove = [
-                    k
-                    for k, w in list(d.items())
-                    if not w.timestamps or max(w.timestamps) < cutoff
-                ]
+                # A window whose TAT has passed is fully drained.
+                to_remove = [k for k, w in list(d.items()) if w.tat < now]
                 for k in to_remove:
                     del d[k]
             logger.debug("Rate limiter cleanup complete")
@@ -230,3 +347,12 @@ def get_rate_limiter() -> RateLimiter:
     if _rate_limiter is None:
         _rate_limiter = RateLimiter()
     return _rate_limiter
+
+
+def configure_shared_backend(pool: Any) -> Optional[PostgresRateLimitBackend]:
+    """Attach the Postgres backend when RATE_LIMIT_BACKEND=postgres."""
+    if os.getenv("RATE_LIMIT_BACKEND", "memory").lower() != "postgres":
+        return None
+    backend = PostgresRateLimitBackend(pool)
+    get_rate_limiter().backend = backend
+    return backend
@@ -0,0 +1,325 @@
+"""
+Durable on-disk overflow spool for telemetry the batch writer cannot write.
+
+TimescaleBatchWriter spills records here when its in-memory buffer
+overflows or a flush fails (database down, failover in progress), and
+replays them into ``telemetry`` at a bounded rate once writes succeed
+again.
+
+Layout
+    The spool is a directory of fixed-size, memory-mapped, append-only
+    segment files (``000000000001.spool``, ...)::
+
+        header  magic "PLSSPOOL" | u32 version | u32 reserved | u64 read offset | u64 reserved
+        frames  u32 length | u32 crc32 | payload, repeated; length 0 ends the segment
+
+    Each payload is one row in PostgreSQL binary COPY tuple format, so
+    replay concatenates payloads between a COPY header and trailer and
+    hands them to ``copy_to_table(format="binary")`` without decoding.
+
+Durability
+    A frame's payload is written before its length, and segment files
+    start zero-filled, so a torn append reads as length 0 or fails its CRC
+    and recovery stops there. Segments found on disk at startup are
+    sealed; new appends always go to a fresh segment. The read offset in
+    the header only moves after a replay COPY succeeds, so a crash in
+    between replays that chunk again (at-least-once).
+
+Ownership
+    One process owns a spool directory at a time: ``TelemetrySpool`` takes
+    an exclusive ``flock`` on ``spool.lock`` and fails fast if another
+    process holds it.
+
+Quarantine
+    Rows the database rejects (invalid jsonb, NUL bytes, ...) are moved
+    to ``quarantine.rows`` in the same frame format, so replay can commit
+    past them instead of retrying the same chunk forever.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"PLSSPOOL"
+SEGMENT_VERSION = 1
+SEGMENT_SUFFIX = ".spool"
+LOCK_FILE = "spool.lock"
+QUARANTINE_FILE = "quarantine.rows"
+HEADER = struct.Struct(">8sIIQQ")
+FRAME = struct.Struct(">II")
+READ_OFFSET_AT = 16
+
+COPY_COLUMNS = ["time", "tenant_id", "device_id", "site_id", "msg_type", "seq", "metrics"]
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+_INT16 = struct.Struct(">h")
+_INT32 = struct.Struct(">i")
+_INT64 = struct.Struct(">q")
+_UINT64 = struct.Struct(">Q")
+_NULL = _INT32.pack(-1)
+# field count, then the time field's length and value
+_TENANT_AT = _INT16.size + _INT32.size + _INT64.size
+
+
+def _text_field(value: Optional[str]) -> bytes:
+    if value is None:
+        return _NULL
+    data = str(value).encode("utf-8")
+    return _INT32.pack(len(data)) + data
+
+
+def encode_copy_row(record) -> bytes:
+    """Encode a TelemetryRecord as one binary COPY tuple in COPY_COLUMNS order."""
+    ts = record.time
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    micros = (ts - PG_EPOCH) // timedelta(microseconds=1)
+    # jsonb binary format: version byte 1, then the JSON text.
+    metrics = b"\x01" + json.dumps(record.metrics).encode("utf-8")
+    seq = _NULL if record.seq is None else _INT32.pack(8) + _INT64.pack(int(record.seq))
+    return b"".join(
+        (
+            _INT16.pack(len(COPY_COLUMNS)),
+            _INT32.pack(8),
+            _INT64.pack(micros),
+            _text_field(record.tenant_id),
+            _text_field(record.device_id),
+            _text_field(record.site_id),
+            _text_field(record.msg_type),
+            seq,
+            _INT32.pack(len(metrics)),
+            metrics,
+        )
+    )
+
+
+def copy_row_tenant(row: bytes) -> Optional[str]:
+    """tenant_id of an encoded row (the field after the 8-byte time)."""
+    (length,) = _INT32.unpack_from(row, _TENANT_AT)
+    if length < 0:
+        return None
+    start = _TENANT_AT + _INT32.size
+    return bytes(row[start : start + length]).decode("utf-8")
+
+
+def copy_payload(rows: list[bytes]) -> bytes:
+    """Wrap encoded tuples into a complete binary COPY stream."""
+    return b"".join((COPY_HEADER, *rows, COPY_TRAILER))
+
+
+class _Segment:
+    __slots__ = ("seq", "path", "file", "mm", "read_offset", "write_offset")
+
+    def __init__(self, seq: int, path: str, file, mm: mmap.mmap, read_offset: int):
+        self.seq = seq
+        self.path = path
+        self.file = file
+        self.mm = mm
+        self.read_offset = read_offset
+        self.write_offset = read_offset
+
+    @classmethod
+    def create(cls, directory: str, seq: int, size: int) -> "_Segment":
+        path = os.path.join(directory, f"{seq:012d}{SEGMENT_SUFFIX}")
+        file = open(path, "w+b")
+        file.truncate(size)
+        mm = mmap.mmap(file.fileno(), size)
+        mm[: HEADER.size] = HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, 0, HEADER.size, 0)
+        return cls(seq, path, file, mm, HEADER.size)
+
+    @classmethod
+    def open(cls, path: str, seq: int) -> "_Segment":
+        file = open(path, "r+b")
+        try:
+            mm = mmap.mmap(file.fileno(), 0)
+        except ValueError:
+            file.close()
+            raise ValueError("empty segment file")
+        try:
+            magic, version, _, read_offset, _ = HEADER.unpack_from(mm, 0)
+        except struct.error:
+            magic = None
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION or read_offset < HEADER.size:
+            mm.close()
+            file.close()
+            raise ValueError("bad segment header")
+        return cls(seq, path, file, mm, read_offset)
+
+    def scan(self) -> int:
+        """Find the end of the valid frames after read_offset; returns their count."""
+        mm = self.mm
+        size = len(mm)
+        offset = self.read_offset
+        count = 0
+        while offset + FRAME.size <= size:
+            length, crc = FRAME.unpack_from(mm, offset)
+            end = offset + FRAME.size + length
+            if length == 0 or end > size or zlib.crc32(mm[offset + FRAME.size : end]) != crc:
+                break
+            offset = end
+            count += 1
+        self.write_offset = offset
+        return count
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+class TelemetrySpool:
+    """Append-only spool of binary COPY rows, bounded to ``max_bytes`` on disk."""
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30, segment_bytes: int = 64 << 20):
+        self.directory = directory
+        self.segment_bytes = min(segment_bytes, max_bytes)
+        self.max_bytes = max_bytes
+        self.pending_records = 0
+        self.pending_bytes = 0
+        self._segments: deque[_Segment] = deque()
+        self._active: Optional[_Segment] = None
+        self._dirty = False
+        self._next_seq = 1
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, LOCK_FILE), "a+b")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(f"telemetry spool {directory} is in use by another process")
+        self._recover()
+
+    def _recover(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX))
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                seq = int(name[: -len(SEGMENT_SUFFIX)])
+                segment = _Segment.open(path, seq)
+            except (ValueError, OSError, struct.error) as exc:
+                logger.warning("telemetry spool: skipping unreadable segment %s: %s", path, exc)
+                os.replace(path, path + ".corrupt")
+                continue
+            self._next_seq = max(self._next_seq, seq + 1)
+            count = segment.scan()
+            if count == 0:
+                segment.close()
+                os.unlink(path)
+                continue
+            self._segments.append(segment)
+            self.pending_records += count
+            self.pending_bytes += segment.write_offset - segment.read_offset
+        if self.pending_records:
+            logger.info(
+                "telemetry spool recovered %d records (%d bytes) from %s",
+                self.pending_records,
+                self.pending_bytes,
+                self.directory,
+            )
+
+    @property
+    def disk_bytes(self) -> int:
+        return len(self._segments) * self.segment_bytes
+
+    def append(self, payload: bytes) -> bool:
+        """Append one encoded row; returns False when the spool is full."""
+        need = FRAME.size + len(payload)
+        segment = self._active
+        if segment is None or segment.write_offset + need > self.segment_bytes:
+            if HEADER.size + need > self.segment_bytes:
+                return False
+            self._drop_consumed()
+            if self.disk_bytes + self.segment_bytes > self.max_bytes:
+                return False
+            if segment is not None:
+                segment.mm.flush()
+            segment = self._active = _Segment.create(self.directory, self._next_seq, self.segment_bytes)
+            self._next_seq += 1
+            self._segments.append(segment)
+        offset = segment.write_offset
+        segment.mm[offset + FRAME.size : offset + need] = payload
+        segment.mm[offset : offset + FRAME.size] = FRAME.pack(len(payload), zlib.crc32(payload))
+        segment.write_offset += need
+        self.pending_records += 1
+        self.pending_bytes += need
+        self._dirty = True
+        return True
+
+    def read(self, max_records: int) -> tuple[list[bytes], int]:
+        """Return up to ``max_records`` rows from the oldest segment and the offset after them.
+
+        Nothing is consumed until ``commit`` is called with that offset.
+        """
+        self._drop_consumed()
+        if not self._segments:
+            return [], 0
+        segment = self._segments[0]
+        mm = segment.mm
+        offset = segment.read_offset
+        rows = []
+        while offset < segment.write_offset and len(rows) < max_records:
+            length, _ = FRAME.unpack_from(mm, offset)
+            start = offset + FRAME.size
+            rows.append(mm[start : start + length])
+            offset = start + length
+        return rows, offset
+
+    def commit(self, count: int, offset: int):
+        """Mark rows returned by ``read`` as written."""
+        segment = self._segments[0]
+        self.pending_records -= count
+        self.pending_bytes -= offset - segment.read_offset
+        segment.read_offset = offset
+        segment.mm[READ_OFFSET_AT : READ_OFFSET_AT + _UINT64.size] = _UINT64.pack(offset)
+        self._dirty = True
+        self._drop_consumed()
+
+    def quarantine(self, rows: list[bytes]):
+        """Move rows the database rejected to the quarantine file (fsynced)."""
+        with open(os.path.join(self.directory, QUARANTINE_FILE), "ab") as file:
+            for row in rows:
+                file.write(FRAME.pack(len(row), zlib.crc32(row)))
+                file.write(row)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _drop_consumed(self):
+        while self._segments:
+            segment = self._segments[0]
+            if segment is self._active or segment.read_offset < segment.write_offset:
+                return
+            self._segments.popleft()
+            segment.close()
+            os.unlink(segment.path)
+
+    def sync(self):
+        """msync the segments that changed since the last sync."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        head = self._segments[0] if self._segments else None
+        if head is not None:
+            head.mm.flush()
+        if self._active is not None and self._active is not head:
+            self._active.mm.flush()
+
+    def close(self):
+        self.sync()
+        while self._segments:
+            self._segments.popleft().close()
+        self._active = None
+        if not self._lock_file.closed:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
@@ -63,6 +63,7 @@ from routes.billing import (
 )
 from routes.organization import router as organization_router
 from routes.certificates import router as certificates_router, operator_router as operator_certificates_router
+from db.pool_manager import pool_manager
 from middleware.auth import validate_token
 from services.carrier_sync import carrier_sync_loop
 from shared.ingest_core import DeviceAuthCache, TimescaleBatchWriter
@@ -70,7 +71,8 @@ from shared.audit import init_audit_logger
 from shared.http_client import traced_client
 from shared.logging import configure_logging
 from shared.jwks_cache import init_jwks_cache, get_jwks_cache
-from shared.config import require_env, optional_env
+from shared.rate_limiter import configure_shared_backend
+from shared.config import optional_env
 from shared.metrics import (
     fleet_active_alerts,
     fleet_devices_by_status,
@@ -78,6 +80,7 @@ from shared.metrics import (
     pulse_db_pool_free,
 )
 from telemetry_stream import stream_manager
+from notifications.runtime import notification_runtime
 
 # PHASE 43 AUDIT — Background Tasks
 #
@@ -119,19 +122,15 @@ from telemetry_stream import stream_manager
 
 configure_logging("ui_iot")
 
-PG_HOST = optional_env("PG_HOST", "iot-postgres")
-PG_PORT = int(optional_env("PG_PORT", "5432"))
-PG_DB = optional_env("PG_DB", "iotcloud")
-PG_USER = optional_env("PG_USER", "iot")
-PG_PASS = require_env("PG_PASS")
-DATABASE_URL = os.getenv("DATABASE_URL")
-PG_POOL_MIN = int(optional_env("PG_POOL_MIN", "2"))
-PG_POOL_MAX = int(optional_env("PG_POOL_MAX", "10"))
 
 AUTH_CACHE_TTL = int(optional_env("AUTH_CACHE_TTL_SECONDS", "60"))
 BATCH_SIZE = int(optional_env("BATCH_SIZE", "500"))
 FLUSH_INTERVAL_MS = int(optional_env("FLUSH_INTERVAL_MS", "1000"))
 MAX_BUFFER_SIZE = int(optional_env("MAX_BUFFER_SIZE", "5000"))
+MIN_BATCH_SIZE = int(optional_env("MIN_BATCH_SIZE", "50"))
+MAX_BATCH_SIZE = int(optional_env("MAX_BATCH_SIZE", "2000"))
+MIN_FLUSH_INTERVAL_MS = int(optional_env("MIN_FLUSH_INTERVAL_MS", "50"))
+MAX_CONCURRENT_FLUSHES = int(optional_env("MAX_CONCURRENT_FLUSHES", "4"))
 REQUIRE_TOKEN = optional_env("REQUIRE_TOKEN", "1") == "1"
 
 UI_REFRESH_SECONDS = int(optional_env("UI_REFRESH_SECONDS", "5"))
@@ -465,11 +464,6 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
     )
 
 
-async def _init_db_connection(conn: asyncpg.Connection) -> None:
-    # Avoid passing statement_timeout as a startup parameter (PgBouncer rejects it).
-    await conn.execute("SET statement_timeout TO 30000")
-
-
 def _secure_cookies_enabled() -> bool:
     return os.getenv("SECURE_COOKIES", "false").lower() == "true"
 
@@ -538,23 +532,7 @@ def generate_state() -> str:
 async def get_pool():
     global pool
     if pool is None:
-        if DATABASE_URL:
-            pool = await asyncpg.create_pool(
-                dsn=DATABASE_URL,
-                min_size=PG_POOL_MIN,
-                max_size=PG_POOL_MAX,
-                command_timeout=30,
-                init=_init_db_connection,
-            )
-        else:
-            pool = await asyncpg.create_pool(
-                host=PG_HOST, port=PG_PORT, database=PG_DB,
-                user=PG_USER, password=PG_PASS,
-                min_size=PG_POOL_MIN,
-                max_size=PG_POOL_MAX,
-                command_timeout=30,
-                init=_init_db_connection,
-            )
+        pool = await pool_manager.get("interactive")
     return pool
 
 
@@ -576,11 +554,17 @@ async def startup():
         batch_size=BATCH_SIZE,
         flush_interval_ms=FLUSH_INTERVAL_MS,
         max_buffer_size=MAX_BUFFER_SIZE,
+        max_concurrent_flushes=MAX_CONCURRENT_FLUSHES,
+        min_batch_size=MIN_BATCH_SIZE,
+        max_batch_size=MAX_BATCH_SIZE,
+        min_flush_interval_ms=MIN_FLUSH_INTERVAL_MS,
     )
     await app.state.batch_writer.start()
     app.state.audit = init_audit_logger(pool, "ui_api")
     await app.state.audit.start()
     app.state.rate_buckets = {}
+    if configure_shared_backend(pool):
+        logger.info("Ingest rate limits use the shared Postgres backend")
     app.state.max_payload_bytes = 8192
     app.state.rps = 5.0
     app.state.burst = 20.0
@@ -618,8 +602,9 @@ async def startup():
         logger.warning("JWKS cache startup failed", exc_info=True)
 
     await setup_ws_listener()
-    # Start telemetry stream manager for real-time export
-    stream_manager.start(asyncio.get_running_loop())
+    # Start telemetry stream manager for real-time export (consumes telemetry.* from NATS)
+    await stream_manager.start(app.state.nats_client)
+    await notification_runtime.start()
 
     # Phase 153: carrier usage sync background worker
     try:
@@ -633,6 +618,14 @@ async def shutdown():
         await app.state.batch_writer.stop()
     if hasattr(app.state, "audit"):
         await app.state.audit.stop()
+    try:
+        await stream_manager.stop()
+    except Exception:
+        logger.warning("Failed to stop telemetry stream manager", exc_info=True)
+    try:
+        await notification_runtime.stop()
+    except Exception:
+        logger.warning("Failed to stop notification runtime", exc_info=True)
     try:
         nats_client = getattr(app.state, "nats_client", None)
         if nats_client:
@@ -654,10 +647,6 @@ async def shutdown():
         await shutdown_ws_listener()
     except Exception:
         logger.warning("Failed to shutdown websocket listener", exc_info=True)
-    try:
-        stream_manager.stop()
-    except Exception:
-        logger.warning("Failed to stop telemetry stream manager", exc_info=True)
     for task in background_tasks:
         task.cancel()
     for task in background_tasks:
@@ -665,6 +654,10 @@ async def shutdown():
             await task
         except asyncio.CancelledError:
             pass
+    try:
+        await pool_manager.close()
+    except Exception:
+        logger.warning("Failed to close database pools", exc_info=True)
 
 @app.get("/api/v1/health")
 async def api_v1_health():
@@ -0,0 +1,164 @@
+"""
+Source selection for bucketed telemetry analytics.
+
+A query is split at a boundary aligned to its bucket size. Buckets before
+the boundary are read from the coarsest pre-aggregated tier that tiles the
+bucket: min/max/sum/count rollups, or quantile sketches for p95. Buckets
+from the boundary on are computed from raw telemetry, so the newest points
+are exact even though the tiers trail real time. The two halves are joined
+with UNION ALL. Shapes no tier can answer run entirely on raw rows.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from db.telemetry_queries import (
+    ROLLUP_TIERS,
+    SKETCH_TIERS,
+    RollupTier,
+    metric_bucket_sql,
+    select_rollup_tier,
+)
+
+# time_bucket() aligns sub-month buckets to this origin by default.
+TIME_BUCKET_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
+
+RAW_AGGREGATION_SQL: dict[str, str] = {
+    **{key: metric_bucket_sql(None)[key] for key in ("avg", "min", "max", "sum", "count")},
+    "p95": "percentile_cont(0.95) WITHIN GROUP (ORDER BY (metrics->>$2)::numeric)",
+}
+
+
+@dataclass(frozen=True)
+class AnalyticsPlan:
+    """Where each part of an analytics query reads from.
+
+    ``tier`` is None for a raw-only plan. Otherwise buckets starting before
+    ``boundary`` come from ``tier`` and the rest from raw telemetry.
+    """
+
+    aggregation: str
+    tier: Optional[RollupTier] = None
+    boundary: Optional[datetime] = None
+
+
+def floor_to_bucket(ts: datetime, bucket: timedelta) -> datetime:
+    """Start of the time_bucket() bucket containing ``ts``."""
+    return ts - ((ts - TIME_BUCKET_ORIGIN) % bucket)
+
+
+def plan_analytics_query(
+    aggregation: str,
+    lookback: Optional[timedelta],
+    bucket: Optional[timedelta],
+    group_by: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> AnalyticsPlan:
+    """Choose the cheapest sources for one analytics request."""
+    if aggregation not in RAW_AGGREGATION_SQL:
+        raise ValueError(f"Unsupported aggregation: {aggregation}")
+    # Tiers are keyed by device; site grouping needs the raw site_id column.
+    if group_by == "site":
+        return AnalyticsPlan(aggregation)
+
+    tiers = SKETCH_TIERS if aggregation == "p95" else ROLLUP_TIERS
+    tier = select_rollup_tier(lookback, bucket, tiers)
+    if tier is None:
+        return AnalyticsPlan(aggregation)
+
+    now = now or datetime.now(timezone.utc)
+    boundary = floor_to_bucket(now - tier.lag, bucket)
+    if boundary <= now - lookback:
+        return AnalyticsPlan(aggregation)
+    return AnalyticsPlan(aggregation, tier=tier, boundary=boundary)
+
+
+def _group_by(grouped: bool, *extra: str) -> str:
+    return ", ".join((["label"] if grouped else []) + ["bucket", *extra])
+
+
+def _raw_select(plan: AnalyticsPlan, label_expr: str, grouped: bool, where: str) -> str:
+    return f"""
+        SELECT
+            {label_expr} AS label,
+            time_bucket($1::interval, time) AS bucket,
+            {RAW_AGGREGATION_SQL[plan.aggregation]} AS agg_value
+        FROM telemetry
+        WHERE {where} AND metrics ? $2
+        GROUP BY {_group_by(grouped)}
+    """
+
+
+def _rollup_select(plan: AnalyticsPlan, label_expr: str, grouped: bool, where: str) -> str:
+    sql = metric_bucket_sql(plan.tier)
+    return f"""
+        SELECT
+            {label_expr} AS label,
+            time_bucket($1::interval, time) AS bucket,
+            {sql[plan.aggregation]} AS agg_value
+        FROM {sql["source"]}
+        WHERE {where} AND {sql["metric_filter"]}
+        GROUP BY {_group_by(grouped)}
+    """
+
+
+def _sketch_select(plan: AnalyticsPlan, label_expr: str, grouped: bool, where: str) -> str:
+    # Merge bins per (label, bucket), then take the first bin whose running
+    # count reaches 95% of the total.
+    return f"""
+        WITH bins AS (
+            SELECT
+                {label_expr} AS label,
+                time_bucket($1::interval, time) AS bucket,
+                bin,
+                SUM(bin_count) AS n
+            FROM {plan.tier.relation}
+            WHERE {where} AND metric_key = $2
+            GROUP BY {_group_by(grouped, "bin")}
+        ),
+        ranked AS (
+            SELECT
+                label,
+                bucket,
+                bin,
+                SUM(n) OVER (PARTITION BY label, bucket ORDER BY bin) AS running,
+                SUM(n) OVER (PARTITION BY label, bucket) AS total
+            FROM bins
+        )
+        SELECT DISTINCT ON (label, bucket)
+            label,
+            bucket,
+            telemetry_sketch_value(bin) AS agg_value
+        FROM ranked
+        WHERE running >= 0.95 * total
+        ORDER BY label, bucket, bin
+    """
+
+
+def build_analytics_sql(
+    plan: AnalyticsPlan,
+    label_expr: str,
+    grouped: bool,
+    conditions: list[str],
+    boundary_param: Optional[str] = None,
+) -> str:
+    """Render the query for ``plan``.
+
+    Parameters follow the analytics route: $1 bucket interval, $2 metric key;
+    ``conditions`` hold the remaining tenant/time/device filters, which apply
+    to every source. ``boundary_param`` is required when the plan uses a tier.
+    """
+    where = " AND ".join(conditions)
+    if plan.tier is None:
+        return _raw_select(plan, label_expr, grouped, where) + "\n        ORDER BY label, bucket ASC"
+
+    if boundary_param is None:
+        raise ValueError("boundary_param is required for tiered plans")
+    tier_select = _sketch_select if plan.aggregation == "p95" else _rollup_select
+    return f"""
+        ({tier_select(plan, label_expr, grouped, f"{where} AND time < {boundary_param}")})
+        UNION ALL
+        ({_raw_select(plan, label_expr, grouped, f"{where} AND time >= {boundary_param}")})
+        ORDER BY label, bucket ASC
+    """
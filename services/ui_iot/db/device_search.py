@@ -0,0 +1,142 @@
+"""
+Ranked device search over device_registry.search_document (migration 128).
+
+A device matches when the query is a substring of its search document
+(LIKE, served by the trigram GIN index) or, for queries of at least
+MIN_FUZZY_LENGTH characters, a fuzzy word match (pg_trgm ``<%``). Results
+rank exact device_id hits first, then device_id prefixes, then substring
+hits, then by trigram word similarity.
+
+Results are kept for a few seconds per (scope, query) so the repeated
+keystrokes of a typeahead box do not each reach the database.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import asyncpg
+
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("DEVICE_SEARCH_CACHE_TTL_SECONDS", "10"))
+SEARCH_CACHE_MAX_ENTRIES = 2048
+MIN_FUZZY_LENGTH = 3
+
+
+def normalize_query(q: str) -> str:
+    """Lower-case and collapse whitespace, matching the search document."""
+    return " ".join(q.lower().split())
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input matches literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_document_pattern(q: str) -> str:
+    """LIKE pattern for a substring match against search_document."""
+    return f"%{escape_like(normalize_query(q))}%"
+
+
+class SearchCache:
+    """Small LRU of search results with a fixed time-to-live."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+
+    def get(self, key: tuple) -> list | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return results
+
+    def put(self, key: tuple, results: list) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_search_cache = SearchCache()
+
+
+async def search_devices(
+    conn: asyncpg.Connection,
+    q: str,
+    tenant_id: str | None = None,
+    limit: int = 20,
+    include_decommissioned: bool = False,
+    use_cache: bool = True,
+) -> List[Dict[str, Any]]:
+    """Ranked device matches for ``q``.
+
+    ``tenant_id=None`` searches across tenants and is only meaningful on an
+    operator connection; tenant connections are also limited by RLS.
+    """
+    query = normalize_query(q)
+    if not query:
+        return []
+    cache_key = (tenant_id, query, limit, include_decommissioned)
+    if use_cache:
+        cached = _search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    params: list[Any] = [query, f"{escape_like(query)}%", f"%{escape_like(query)}%"]
+    match = "dr.search_document LIKE $3"
+    if len(query) >= MIN_FUZZY_LENGTH:
+        match = f"({match} OR $1 <% dr.search_document)"
+    conditions = [match]
+    if tenant_id:
+        params.append(tenant_id)
+        conditions.append(f"dr.tenant_id = ${len(params)}")
+    if not include_decommissioned:
+        conditions.append("dr.decommissioned_at IS NULL")
+    params.append(limit)
+
+    rows = await conn.fetch(
+        f"""
+        SELECT dr.tenant_id,
+               dr.device_id,
+               dr.site_id,
+               dr.model,
+               dr.manufacturer,
+               dr.serial_number,
+               COALESCE(ds.status, 'OFFLINE') AS status,
+               ds.last_seen_at,
+               CASE
+                   WHEN lower(dr.device_id) = $1 THEN 3
+                   WHEN lower(dr.device_id) LIKE $2 THEN 2
+                   WHEN dr.search_document LIKE $3 THEN 1
+                   ELSE 0
+               END AS match_rank,
+               word_similarity($1, dr.search_document) AS score
+        FROM device_registry dr
+        LEFT JOIN device_state ds
+          ON ds.tenant_id = dr.tenant_id AND ds.device_id = dr.device_id
+        WHERE {" AND ".join(conditions)}
+        ORDER BY match_rank DESC, score DESC, dr.tenant_id, dr.device_id
+        LIMIT ${len(params)}
+        """,
+        *params,
+    )
+    results = [dict(r) for r in rows]
+    if use_cache:
+        _search_cache.put(cache_key, results)
+    return results
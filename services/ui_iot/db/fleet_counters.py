@@ -0,0 +1,62 @@
+"""
+Per-tenant fleet counters (migration 129).
+
+fleet_counters is maintained by triggers on device_state, device_registry
+and fleet_alert, and recounted periodically by ops_worker, so fleet-level
+summaries are a primary-key lookup instead of a GROUP BY over the fleet.
+"""
+
+from typing import Any, Dict
+
+import asyncpg
+
+COUNTER_FIELDS = (
+    "devices_total",
+    "devices_online",
+    "devices_stale",
+    "devices_offline",
+    "registered_total",
+    "registered_active",
+    "active_online",
+    "active_stale",
+    "alerts_open",
+    "alerts_acknowledged",
+    "alerts_critical_active",
+    "alerts_no_telemetry_open",
+)
+
+_SELECT_COUNTERS = f"""
+    SELECT tenant_id, {", ".join(COUNTER_FIELDS)}, last_activity, updated_at, reconciled_at
+    FROM fleet_counters
+"""
+
+
+def empty_counters(tenant_id: str) -> Dict[str, Any]:
+    """Counters for a tenant with no row yet (no devices or alerts)."""
+    counters: Dict[str, Any] = {field: 0 for field in COUNTER_FIELDS}
+    counters.update(tenant_id=tenant_id, last_activity=None, updated_at=None, reconciled_at=None)
+    return counters
+
+
+async def fetch_fleet_counters(conn: asyncpg.Connection, tenant_id: str) -> Dict[str, Any]:
+    """Counters for one tenant."""
+    row = await conn.fetchrow(f"{_SELECT_COUNTERS} WHERE tenant_id = $1", tenant_id)
+    if row is None:
+        return empty_counters(tenant_id)
+    return dict(row)
+
+
+def status_summary(counters: Dict[str, Any]) -> Dict[str, int]:
+    """ONLINE/STALE/OFFLINE/total for devices whose registry status is ACTIVE.
+
+    Devices registered but without a device_state row yet count as OFFLINE.
+    """
+    online = int(counters["active_online"])
+    stale = int(counters["active_stale"])
+    total = max(int(counters["registered_active"]), online + stale)
+    return {
+        "ONLINE": online,
+        "STALE": stale,
+        "OFFLINE": total - online - stale,
+        "total": total,
+    }
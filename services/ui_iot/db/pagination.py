@@ -0,0 +1,102 @@
+"""
+Keyset pagination helpers for list endpoints.
+
+A page token is the sort key of the last row on the previous page, encoded
+as URL-safe base64 JSON. The next page starts strictly after it, so deep
+pages cost the same as the first one instead of scanning past OFFSET rows.
+
+Counts can be exact (COUNT(*)) or estimated from the planner's row
+estimate, which is O(1) regardless of tenant size.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Literal, Sequence
+
+import asyncpg
+
+CountMode = Literal["exact", "estimate"]
+
+_INT8_MIN = -(2**63)
+_INT8_MAX = 2**63 - 1
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode sort-key values (str, int, float, datetime) as a page token."""
+    payload = [{"ts": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, types: Sequence[type]) -> list[Any]:
+    """Decode a page token whose values must match ``types`` position by position.
+
+    Raises ValueError if the token is malformed or a value has the wrong type,
+    so a tampered token is a 400 rather than a database error.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise ValueError("Invalid cursor")
+    return [_decode_value(value, expected) for value, expected in zip(payload, types)]
+
+
+def _decode_value(value: Any, expected: type) -> Any:
+    if expected is datetime:
+        if not isinstance(value, dict) or set(value) != {"ts"} or not isinstance(value["ts"], str):
+            raise ValueError("Invalid cursor")
+        try:
+            return datetime.fromisoformat(value["ts"])
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+    if expected is int:
+        # bool is an int subclass; bigint bounds keep asyncpg from overflowing.
+        if isinstance(value, bool) or not isinstance(value, int) or not _INT8_MIN <= value <= _INT8_MAX:
+            raise ValueError("Invalid cursor")
+        return value
+    if not isinstance(value, expected):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def keyset_predicate(columns: Sequence[str], first_param: int, descending: bool = False) -> str:
+    """Row comparison selecting rows after the cursor in (columns) order.
+
+    All columns must share one sort direction and be NOT NULL.
+    """
+    params = ", ".join(f"${first_param + i}" for i in range(len(columns)))
+    op = "<" if descending else ">"
+    return f"({', '.join(columns)}) {op} ({params})"
+
+
+def next_cursor(rows: list, limit: int, key_fields: Sequence[str]) -> str | None:
+    """Token for the page after ``rows`` (fetched with LIMIT limit + 1)."""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(*(last[field] for field in key_fields))
+
+
+async def estimate_count(conn: asyncpg.Connection, query: str, *args: Any) -> int:
+    """Planner row estimate for ``query`` without executing it."""
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *args)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(
+    conn: asyncpg.Connection,
+    from_where_sql: str,
+    *args: Any,
+    mode: CountMode = "exact",
+) -> int:
+    """Count rows matching ``FROM ... WHERE ...`` exactly or by estimate."""
+    if mode == "estimate":
+        return await estimate_count(conn, f"SELECT 1 {from_where_sql}", *args)
+    return int(await conn.fetchval(f"SELECT COUNT(*) {from_where_sql}", *args) or 0)
@@ -4,6 +4,8 @@ import logging
 
 import asyncpg
 
+from shared.db_context import set_db_context
+
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
@@ -21,10 +23,8 @@ async def tenant_connection(pool: asyncpg.Pool, tenant_id: str) -> AsyncGenerato
 
     async with pool.acquire() as conn:
         async with conn.transaction():
-            # Set role to pulse_app (subject to RLS)
-            await conn.execute("SET LOCAL ROLE pulse_app")
-            # Set tenant context for RLS policies
-            await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+            # Role pulse_app (subject to RLS) and tenant context in one round trip
+            await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
             yield conn
             # Connection returned to pool; SET LOCAL resets automatically
 
@@ -44,7 +44,7 @@ async def operator_read_connection(pool: asyncpg.Pool) -> AsyncGenerator[asyncpg
     """
     async with pool.acquire() as conn:
         async with conn.transaction():
-            await conn.execute("SET LOCAL ROLE pulse_operator_read")
+            await set_db_context(conn, role="pulse_operator_read")
             yield conn
 
 
@@ -55,7 +55,7 @@ async def operator_write_connection(pool: asyncpg.Pool) -> AsyncGenerator[asyncp
     """
     async with pool.acquire() as conn:
         async with conn.transaction():
-            await conn.execute("SET LOCAL ROLE pulse_operator_write")
+            await set_db_context(conn, role="pulse_operator_write")
             yield conn
 
 
@@ -66,5 +66,5 @@ async def operator_connection(pool: asyncpg.Pool) -> AsyncGenerator[asyncpg.Conn
     """
     async with pool.acquire() as conn:
         async with conn.transaction():
-            await conn.execute("SET LOCAL ROLE pulse_operator")
+            await set_db_context(conn, role="pulse_operator")
             yield conn
@@ -0,0 +1,197 @@
+"""
+One asyncpg pool per ui_iot process, shared by every route and background task.
+
+Callers ask for a workload class instead of creating their own pool:
+
+- ``interactive``  customer/operator API requests (the default)
+- ``analytics``    heavy read-only operator queries; served by the read
+                   replica when PG_REPLICA_URL is set
+- ``background``   in-process collectors and periodic jobs
+- ``streaming``    long-lived consumers (WebSocket fan-out, exports)
+
+Each class has a concurrency budget (PG_BUDGET_<CLASS>) enforced with a
+semaphore in front of the shared pool, so a burst of analytics or
+background work queues on its own budget instead of taking every
+connection from interactive requests. Budgets may overlap; the pool size
+(PG_POOL_MAX) is the hard cap.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import asyncpg
+
+from shared.config import require_env
+from shared.metrics import (
+    db_workload_acquire_seconds,
+    db_workload_budget,
+    db_workload_in_use,
+    db_workload_waiting,
+)
+
+WORKLOAD_CLASSES = ("interactive", "analytics", "background", "streaming")
+READ_ONLY_WORKLOADS = ("analytics",)
+
+
+def _default_budgets(pool_max: int) -> dict[str, int]:
+    return {
+        "interactive": pool_max,
+        "analytics": max(1, pool_max // 2),
+        "background": max(1, pool_max // 4),
+        "streaming": max(1, pool_max // 4),
+    }
+
+
+def _connect_kwargs(dsn: str | None) -> dict[str, Any]:
+    if dsn:
+        return {"dsn": dsn}
+    return {
+        "host": os.getenv("PG_HOST", "iot-postgres"),
+        "port": int(os.getenv("PG_PORT", "5432")),
+        "database": os.getenv("PG_DB", "iotcloud"),
+        "user": os.getenv("PG_USER", "iot"),
+        "password": require_env("PG_PASS"),
+    }
+
+
+async def _init_db_connection(conn: asyncpg.Connection) -> None:
+    # Avoid passing statement_timeout as a startup parameter (PgBouncer rejects it).
+    await conn.execute("SET statement_timeout TO 30000")
+
+
+class WorkloadPool:
+    """Pool facade that holds one workload class to its concurrency budget.
+
+    ``acquire()`` matches ``asyncpg.Pool.acquire()`` as a context manager;
+    other attributes are delegated to the underlying pool.
+    """
+
+    def __init__(self, name: str, pool: asyncpg.Pool, budget: int):
+        self.name = name
+        self.budget = budget
+        self._pool = pool
+        self._slots = asyncio.Semaphore(budget)
+        self.in_use = 0
+        self.waiting = 0
+        db_workload_budget.labels(workload=name).set(budget)
+
+    @asynccontextmanager
+    async def acquire(self, *, timeout: float | None = None) -> AsyncIterator[asyncpg.Connection]:
+        started = time.perf_counter()
+        self.waiting += 1
+        db_workload_waiting.labels(workload=self.name).set(self.waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+            db_workload_waiting.labels(workload=self.name).set(self.waiting)
+        try:
+            async with self._pool.acquire(timeout=timeout) as conn:
+                db_workload_acquire_seconds.labels(workload=self.name).observe(
+                    time.perf_counter() - started
+                )
+                self.in_use += 1
+                db_workload_in_use.labels(workload=self.name).set(self.in_use)
+                try:
+                    yield conn
+                finally:
+                    self.in_use -= 1
+                    db_workload_in_use.labels(workload=self.name).set(self.in_use)
+        finally:
+            self._slots.release()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool, name)
+
+
+class PoolManager:
+    """Lazily creates the primary (and optional replica) pool and hands out workload views."""
+
+    def __init__(
+        self,
+        dsn: str | None = None,
+        replica_dsn: str | None = None,
+        min_size: int = 2,
+        max_size: int = 10,
+        budgets: dict[str, int] | None = None,
+    ):
+        self.dsn = dsn
+        self.replica_dsn = replica_dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.budgets = {**_default_budgets(max_size), **(budgets or {})}
+        self._primary: asyncpg.Pool | None = None
+        self._replica: asyncpg.Pool | None = None
+        self._workloads: dict[str, WorkloadPool] = {}
+        self._lock: asyncio.Lock | None = None
+
+    @classmethod
+    def from_env(cls) -> "PoolManager":
+        max_size = int(os.getenv("PG_POOL_MAX", "10"))
+        budgets = {
+            name: int(os.environ[f"PG_BUDGET_{name.upper()}"])
+            for name in WORKLOAD_CLASSES
+            if os.getenv(f"PG_BUDGET_{name.upper()}")
+        }
+        return cls(
+            dsn=os.getenv("DATABASE_URL") or None,
+            replica_dsn=os.getenv("PG_REPLICA_URL") or None,
+            min_size=int(os.getenv("PG_POOL_MIN", "2")),
+            max_size=max_size,
+            budgets=budgets,
+        )
+
+    async def _create_pool(self, dsn: str | None, min_size: int, max_size: int) -> asyncpg.Pool:
+        return await asyncpg.create_pool(
+            **_connect_kwargs(dsn),
+            min_size=min_size,
+            max_size=max_size,
+            command_timeout=30,
+            init=_init_db_connection,
+        )
+
+    async def get(self, workload: str = "interactive") -> WorkloadPool:
+        """Pool view for ``workload``, creating the underlying pools on first use."""
+        if workload not in WORKLOAD_CLASSES:
+            raise ValueError(f"Unknown workload class: {workload}")
+        view = self._workloads.get(workload)
+        if view is not None:
+            return view
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            view = self._workloads.get(workload)
+            if view is not None:
+                return view
+            if self._primary is None:
+                self._primary = await self._create_pool(self.dsn, self.min_size, self.max_size)
+            pool = self._primary
+            if workload in READ_ONLY_WORKLOADS and self.replica_dsn:
+                if self._replica is None:
+                    self._replica = await self._create_pool(
+                        self.replica_dsn, 1, self.budgets[workload]
+                    )
+                pool = self._replica
+            view = self._workloads[workload] = WorkloadPool(workload, pool, self.budgets[workload])
+            return view
+
+    async def close(self) -> None:
+        for pool in (self._replica, self._primary):
+            if pool is not None:
+                await pool.close()
+        self._primary = None
+        self._replica = None
+        self._workloads.clear()
+
+
+pool_manager = PoolManager.from_env()
+
+
+async def get_pool(workload: str = "interactive") -> WorkloadPool:
+    """Shared pool view for a workload class."""
+    return await pool_manager.get(workload)
@@ -1,9 +1,14 @@
+from datetime import datetime
 from typing import Any, Dict, List
 import json
 import uuid
 
 import asyncpg
 
+from db.device_search import search_document_pattern
+from db.fleet_counters import fetch_fleet_counters, status_summary
+from db.pagination import CountMode, count_rows, decode_cursor, keyset_predicate, next_cursor
+
 
 def _require_tenant(tenant_id: str) -> None:
     if not tenant_id or not tenant_id.strip():
@@ -20,40 +25,68 @@ def _require_integration(integration_id: str) -> None:
         raise ValueError("integration_id is required")
 
 
+OPERATOR_DEVICE_SORT_KEY = ("tenant_id", "site_id", "device_id")
+OPERATOR_DEVICE_CURSOR_TYPES = (str, str, str)
+ALERT_LIST_SORT_KEY = ("created_at", "alert_id")
+ALERT_LIST_CURSOR_TYPES = (datetime, int)
+
+_OPERATOR_DEVICE_COLUMNS = """
+               ds.tenant_id, ds.device_id, ds.site_id, ds.status, ds.last_seen_at,
+               ds.state->>'battery_pct' AS battery_pct,
+               ds.state->>'temp_c' AS temp_c,
+               ds.state->>'rssi_dbm' AS rssi_dbm,
+               ds.state->>'snr_db' AS snr_db,
+               dr.subscription_id,
+               dr.template_id,
+               tpl.name AS template_name"""
+
+
 async def fetch_devices(
     conn: asyncpg.Connection,
     tenant_id: str,
     limit: int = 100,
     offset: int = 0,
+    cursor: str | None = None,
 ) -> List[Dict[str, Any]]:
+    """Devices of one tenant ordered by (site_id, device_id).
+
+    ``cursor`` is an OPERATOR_DEVICE_SORT_KEY token and replaces ``offset``.
+    """
     _require_tenant(tenant_id)
+    params: list[Any] = [tenant_id]
+    where = "ds.tenant_id = $1"
+    if cursor:
+        _, site_id, device_id = decode_cursor(cursor, OPERATOR_DEVICE_CURSOR_TYPES)
+        where += " AND " + keyset_predicate(["ds.site_id", "ds.device_id"], 2)
+        params.extend([site_id, device_id])
+        offset = 0
     rows = await conn.fetch(
-        """
-        SELECT ds.tenant_id, ds.device_id, ds.site_id, ds.status, ds.last_seen_at,
-               ds.state->>'battery_pct' AS battery_pct,
-               ds.state->>'temp_c' AS temp_c,
-               ds.state->>'rssi_dbm' AS rssi_dbm,
-               ds.state->>'snr_db' AS snr_db,
-               dr.subscription_id,
-               dr.latitude, dr.longitude, dr.address, dr.location_source,
-               dr.mac_address, dr.imei, dr.iccid, dr.serial_number,
-               dr.model, dr.manufacturer, dr.hw_revision, dr.fw_version, dr.notes,
-               COALESCE(
-                   (
-                       SELECT array_agg(dt.tag ORDER BY dt.tag)
-                       FROM device_tags dt
-                       WHERE dt.tenant_id = ds.tenant_id AND dt.device_id = ds.device_id
-                   ),
-                   ARRAY[]::text[]
-               ) AS tags
-        FROM device_state ds
-        LEFT JOIN device_registry dr
-          ON dr.tenant_id = ds.tenant_id AND dr.device_id = ds.device_id
-        WHERE ds.tenant_id = $1
-        ORDER BY ds.site_id, ds.device_id
-        LIMIT $2 OFFSET $3
+        f"""
+        WITH page AS (
+            SELECT {_OPERATOR_DEVICE_COLUMNS},
+                   dr.latitude, dr.longitude, dr.address, dr.location_source,
+                   dr.mac_address, dr.imei, dr.iccid, dr.serial_number,
+                   dr.model, dr.manufacturer, dr.hw_revision, dr.fw_version, dr.notes
+            FROM device_state ds
+            LEFT JOIN device_registry dr
+              ON dr.tenant_id = ds.tenant_id AND dr.device_id = ds.device_id
+            LEFT JOIN device_templates tpl ON tpl.id = dr.template_id
+            WHERE {where}
+            ORDER BY ds.site_id, ds.device_id
+            LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}
+        ),
+        page_tags AS (
+            SELECT dt.device_id, array_agg(dt.tag ORDER BY dt.tag) AS tags
+            FROM device_tags dt
+            JOIN page ON dt.tenant_id = page.tenant_id AND dt.device_id = page.device_id
+            GROUP BY dt.device_id
+        )
+        SELECT page.*, COALESCE(page_tags.tags, ARRAY[]::text[]) AS tags
+        FROM page
+        LEFT JOIN page_tags ON page_tags.device_id = page.device_id
+        ORDER BY page.site_id, page.device_id
         """,
-        tenant_id,
+        *params,
         limit,
         offset,
     )
@@ -148,19 +181,24 @@ async def fetch_alerts(
     tenant_id: str,
     status: str = "OPEN",
     limit: int = 100,
+    cursor: str | None = None,
 ) -> List[Dict[str, Any]]:
     _require_tenant(tenant_id)
+    params: list[Any] = [tenant_id, status]
+    where = "tenant_id = $1 AND status = $2"
+    if cursor:
+        where += " AND " + keyset_predicate(["created_at", "id"], 3, descending=True)
+        params.extend(decode_cursor(cursor, ALERT_LIST_CURSOR_TYPES))
     rows = await conn.fetch(
-        """
+        f"""
         SELECT id AS alert_id, tenant_id, device_id, site_id, alert_type,
                severity, confidence, summary, status, created_at
         FROM fleet_alert
-        WHERE tenant_id = $1 AND status = $2
-        ORDER BY created_at DESC
-        LIMIT $3
+        WHERE {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ${len(params) + 1}
         """,
-        tenant_id,
-        status,
+        *params,
         limit,
     )
     return [dict(r) for r in rows]
@@ -595,21 +633,46 @@ async def fetch_all_devices(
     conn: asyncpg.Connection,
     limit: int = 100,
     offset: int = 0,
+    cursor: str | None = None,
+    tenant_id: str | None = None,
+    template_id: int | None = None,
+    q: str | None = None,
 ) -> List[Dict[str, Any]]:
+    """Devices across tenants ordered by OPERATOR_DEVICE_SORT_KEY.
+
+    ``cursor`` replaces ``offset`` for keyset pagination. ``q`` is a
+    substring match on the device search document.
+    """
+    conditions: list[str] = []
+    params: list[Any] = []
+    if tenant_id:
+        params.append(tenant_id)
+        conditions.append(f"ds.tenant_id = ${len(params)}")
+    if template_id is not None:
+        params.append(template_id)
+        conditions.append(f"dr.template_id = ${len(params)}")
+    if q:
+        params.append(search_document_pattern(q))
+        conditions.append(f"dr.search_document LIKE ${len(params)}")
+    if cursor:
+        conditions.append(
+            keyset_predicate(["ds.tenant_id", "ds.site_id", "ds.device_id"], len(params) + 1)
+        )
+        params.extend(decode_cursor(cursor, OPERATOR_DEVICE_CURSOR_TYPES))
+        offset = 0
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
     rows = await conn.fetch(
-        """
-        SELECT ds.tenant_id, ds.device_id, ds.site_id, ds.status, ds.last_seen_at,
-               state->>'battery_pct' AS battery_pct,
-               state->>'temp_c' AS temp_c,
-               state->>'rssi_dbm' AS rssi_dbm,
-               state->>'snr_db' AS snr_db,
-               dr.subscription_id
+        f"""
+        SELECT {_OPERATOR_DEVICE_COLUMNS}
         FROM device_state ds
         LEFT JOIN device_registry dr
           ON dr.tenant_id = ds.tenant_id AND dr.device_id = ds.device_id
+        LEFT JOIN device_templates tpl ON tpl.id = dr.template_id
+        {where}
         ORDER BY ds.tenant_id, ds.site_id, ds.device_id
-        LIMIT $1 OFFSET $2
+        LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}
         """,
+        *params,
         limit,
         offset,
     )
@@ -620,17 +683,23 @@ async def fetch_all_alerts(
     conn: asyncpg.Connection,
     status: str = "OPEN",
     limit: int = 100,
+    cursor: str | None = None,
 ) -> List[Dict[str, Any]]:
+    params: list[Any] = [status]
+    where = "status = $1"
+    if cursor:
+        where += " AND " + keyset_predicate(["created_at", "id"], 2, descending=True)
+        params.extend(decode_cursor(cursor, ALERT_LIST_CURSOR_TYPES))
     rows = await conn.fetch(
-        """
+        f"""
         SELECT id AS alert_id, tenant_id, device_id, site_id, alert_type,
                severity, confidence, summary, status, created_at
         FROM fleet_alert
-        WHERE status = $1
-        ORDER BY created_at DESC
-        LIMIT $2
+        WHERE {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ${len(params) + 1}
         """,
-        status,
+        *params,
         limit,
     )
     return [dict(r) for r in rows]
@@ -1014,6 +1083,31 @@ async def delete_alert_rule(
     return result.split(" ")[-1] != "0"
 
 
+_DEVICE_LIST_COLUMNS = """
+                   dr.tenant_id,
+                   dr.device_id,
+                   dr.site_id,
+                   COALESCE(ds.status, 'OFFLINE') AS status,
+                   ds.last_seen_at,
+                   ds.last_heartbeat_at,
+                   ds.last_telemetry_at,
+                   COALESCE(ds.state, '{}'::jsonb) AS state,
+                   dr.latitude, dr.longitude, dr.address, dr.location_source,
+                   dr.mac_address, dr.imei, dr.iccid, dr.serial_number,
+                   dr.model, dr.manufacturer, dr.hw_revision, dr.fw_version, dr.notes,
+                   dr.template_id"""
+
+# Added by migration 102.
+_DEVICE_LIST_EXTENDED_COLUMNS = """,
+                   dr.chipset, dr.modem_model, dr.board_revision, dr.meid,
+                   dr.bootloader_version, dr.modem_fw_version,
+                   dr.deployment_date, dr.batch_id, dr.installation_notes,
+                   dr.sensor_limit"""
+
+DEVICE_LIST_SORT_KEY = ("site_id", "device_id")
+DEVICE_LIST_CURSOR_TYPES = (str, str)
+
+
 async def fetch_devices_v2(
     conn: asyncpg.Connection,
     tenant_id: str,
@@ -1024,8 +1118,17 @@ async def fetch_devices_v2(
     q: str | None = None,
     site_id: str | None = None,
     include_decommissioned: bool = False,
+    template_id: int | None = None,
+    cursor: str | None = None,
+    count_mode: CountMode = "exact",
 ) -> Dict[str, Any]:
-    """Fetch devices with full state JSONB (all dynamic metrics)."""
+    """Fetch devices with full state JSONB (all dynamic metrics).
+
+    Pages are ordered by (site_id, device_id). Pass the returned
+    ``next_cursor`` as ``cursor`` for keyset pagination; ``offset`` is only
+    applied when no cursor is given. Tags, sensor counts and template names
+    are aggregated for the page rows only.
+    """
     _require_tenant(tenant_id)
     params: list[Any] = [tenant_id]
     where_clauses = ["dr.tenant_id = $1"]
@@ -1041,28 +1144,22 @@ async def fetch_devices_v2(
 
     if tags:
         where_clauses.append(
-            f"""(
-                SELECT COUNT(DISTINCT dt.tag)
+            f"""dr.device_id IN (
+                SELECT dt.device_id
                 FROM device_tags dt
-                WHERE dt.tenant_id = dr.tenant_id
-                  AND dt.device_id = dr.device_id
+                WHERE dt.tenant_id = $1
                   AND dt.tag = ANY(${idx}::text[])
-            ) = {len(tags)}"""
+                GROUP BY dt.device_id
+                HAVING COUNT(DISTINCT dt.tag) = {len(tags)}
+            )"""
         )
         params.append(tags)
         idx += 1
 
     if q:
-        where_clauses.append(
-            f"""(
-                dr.device_id ILIKE ${idx}
-                OR dr.model ILIKE ${idx}
-                OR dr.serial_number ILIKE ${idx}
-                OR dr.site_id ILIKE ${idx}
-                OR dr.address ILIKE ${idx}
-            )"""
-        )
-        params.append(f"%{q}%")
+        # Trigram-indexed substring match (migration 128).
+        where_clauses.append(f"dr.search_document LIKE ${idx}")
+        params.append(search_document_pattern(q))
         idx += 1
 
     if site_id:
@@ -1070,134 +1167,78 @@ async def fetch_devices_v2(
         params.append(site_id)
         idx += 1
 
-    where_sql = " AND ".join(where_clauses)
-    total_count = await conn.fetchval(
-        f"""
-        SELECT COUNT(*)
+    if template_id is not None:
+        where_clauses.append(f"dr.template_id = ${idx}")
+        params.append(template_id)
+        idx += 1
+
+    from_sql = f"""
         FROM device_registry dr
         LEFT JOIN device_state ds
           ON ds.tenant_id = dr.tenant_id AND ds.device_id = dr.device_id
-        WHERE {where_sql}
-        """,
-        *params,
-    )
+        WHERE {" AND ".join(where_clauses)}
+    """
+    total_count = await count_rows(conn, from_sql, *params, mode=count_mode)
+
+    page_params = list(params)
+    page_from_sql = from_sql
+    if cursor:
+        page_from_sql += " AND " + keyset_predicate(["dr.site_id", "dr.device_id"], idx)
+        page_params.extend(decode_cursor(cursor, DEVICE_LIST_CURSOR_TYPES))
+        idx += len(DEVICE_LIST_SORT_KEY)
+        offset = 0
+    page_params.extend([limit + 1, offset])
+
+    def _sql(columns: str) -> str:
+        return f"""
+            WITH page AS (
+                SELECT {columns}
+                {page_from_sql}
+                ORDER BY dr.site_id, dr.device_id
+                LIMIT ${idx} OFFSET ${idx + 1}
+            ),
+            page_tags AS (
+                SELECT dt.device_id, array_agg(dt.tag ORDER BY dt.tag) AS tags
+                FROM device_tags dt
+                JOIN page ON dt.tenant_id = page.tenant_id AND dt.device_id = page.device_id
+                GROUP BY dt.device_id
+            ),
+            page_sensors AS (
+                SELECT s.device_id, COUNT(*) AS sensor_count
+                FROM device_sensors s
+                JOIN page ON s.tenant_id = page.tenant_id AND s.device_id = page.device_id
+                WHERE s.status = 'active'
+                GROUP BY s.device_id
+            )
+            SELECT page.*,
+                   tpl.name AS template_name,
+                   COALESCE(page_sensors.sensor_count, 0) AS sensor_count,
+                   COALESCE(page_tags.tags, ARRAY[]::text[]) AS tags
+            FROM page
+            LEFT JOIN page_tags ON page_tags.device_id = page.device_id
+            LEFT JOIN page_sensors ON page_sensors.device_id = page.device_id
+            LEFT JOIN device_templates tpl ON tpl.id = page.template_id
+            ORDER BY page.site_id, page.device_id
+        """
 
     try:
         rows = await conn.fetch(
-            f"""
-            SELECT dr.tenant_id,
-                   dr.device_id,
-                   dr.site_id,
-                   COALESCE(ds.status, 'OFFLINE') AS status,
-                   ds.last_seen_at,
-                   ds.last_heartbeat_at,
-                   ds.last_telemetry_at,
-                   COALESCE(ds.state, '{{}}'::jsonb) AS state,
-                   dr.latitude, dr.longitude, dr.address, dr.location_source,
-                   dr.mac_address, dr.imei, dr.iccid, dr.serial_number,
-                   dr.model, dr.manufacturer, dr.hw_revision, dr.fw_version, dr.notes,
-                   dr.chipset, dr.modem_model, dr.board_revision, dr.meid,
-                   dr.bootloader_version, dr.modem_fw_version,
-                   dr.deployment_date, dr.batch_id, dr.installation_notes,
-                   dr.sensor_limit,
-                   CASE
-                       WHEN to_regclass('public.sensors') IS NULL THEN 0
-                       ELSE (
-                           SELECT COUNT(*)
-                           FROM sensors s
-                           WHERE s.tenant_id = dr.tenant_id
-                             AND s.device_id = dr.device_id
-                       )
-                   END AS sensor_count,
-                   COALESCE(
-                       (
-                           SELECT array_agg(dt.tag ORDER BY dt.tag)
-                           FROM device_tags dt
-                           WHERE dt.tenant_id = dr.tenant_id AND dt.device_id = dr.device_id
-                       ),
-                       ARRAY[]::text[]
-                   ) AS tags
-            FROM device_registry dr
-            LEFT JOIN device_state ds
-              ON ds.tenant_id = dr.tenant_id AND ds.device_id = dr.device_id
-            WHERE {where_sql}
-            ORDER BY dr.site_id, dr.device_id
-            LIMIT ${idx} OFFSET ${idx + 1}
-            """,
-            *params,
-            limit,
-            offset,
+            _sql(_DEVICE_LIST_COLUMNS + _DEVICE_LIST_EXTENDED_COLUMNS), *page_params
         )
     except asyncpg.UndefinedColumnError:
         # Graceful degradation if migration 102 hasn't been applied yet.
-        rows = await conn.fetch(
-            f"""
-            SELECT dr.tenant_id,
-                   dr.device_id,
-                   dr.site_id,
-                   COALESCE(ds.status, 'OFFLINE') AS status,
-                   ds.last_seen_at,
-                   ds.last_heartbeat_at,
-                   ds.last_telemetry_at,
-                   COALESCE(ds.state, '{{}}'::jsonb) AS state,
-                   dr.latitude, dr.longitude, dr.address, dr.location_source,
-                   dr.mac_address, dr.imei, dr.iccid, dr.serial_number,
-                   dr.model, dr.manufacturer, dr.hw_revision, dr.fw_version, dr.notes,
-                   CASE
-                       WHEN to_regclass('public.sensors') IS NULL THEN 0
-                       ELSE (
-                           SELECT COUNT(*)
-                           FROM sensors s
-                           WHERE s.tenant_id = dr.tenant_id
-                             AND s.device_id = dr.device_id
-                       )
-                   END AS sensor_count,
-                   COALESCE(
-                       (
-                           SELECT array_agg(dt.tag ORDER BY dt.tag)
-                           FROM device_tags dt
-                           WHERE dt.tenant_id = dr.tenant_id AND dt.device_id = dr.device_id
-                       ),
-                       ARRAY[]::text[]
-                   ) AS tags
-            FROM device_registry dr
-            LEFT JOIN device_state ds
-              ON ds.tenant_id = dr.tenant_id AND ds.device_id = dr.device_id
-            WHERE {where_sql}
-            ORDER BY dr.site_id, dr.device_id
-            LIMIT ${idx} OFFSET ${idx + 1}
-            """,
-            *params,
-            limit,
-            offset,
-        )
-    return {"devices": [dict(r) for r in rows], "total": int(total_count or 0)}
+        rows = await conn.fetch(_sql(_DEVICE_LIST_COLUMNS), *page_params)
+    return {
+        "devices": [dict(r) for r in rows[:limit]],
+        "total": total_count,
+        "next_cursor": next_cursor(rows, limit, DEVICE_LIST_SORT_KEY),
+    }
 
 
 async def fetch_fleet_summary(conn: asyncpg.Connection, tenant_id: str) -> Dict[str, int]:
     """Returns counts of devices by status for the fleet summary widget."""
     _require_tenant(tenant_id)
-    rows = await conn.fetch(
-        """
-        SELECT
-            COALESCE(ds.status, 'OFFLINE') AS status,
-            COUNT(*) AS count
-        FROM device_registry dr
-        LEFT JOIN device_state ds
-          ON ds.tenant_id = dr.tenant_id AND ds.device_id = dr.device_id
-        WHERE dr.tenant_id = $1
-          AND dr.status = 'ACTIVE'
-        GROUP BY COALESCE(ds.status, 'OFFLINE')
-        """,
-        tenant_id,
-    )
-    summary: Dict[str, int] = {"ONLINE": 0, "STALE": 0, "OFFLINE": 0}
-    for row in rows:
-        status = row["status"]
-        if status in summary:
-            summary[status] = int(row["count"])
-    summary["total"] = summary["ONLINE"] + summary["STALE"] + summary["OFFLINE"]
-    return summary
+    return status_summary(await fetch_fleet_counters(conn, tenant_id))
 
 
 async def fetch_device_v2(
@@ -1278,8 +1319,13 @@ async def fetch_alerts_v2(
     alert_type: str | None = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: str | None = None,
 ) -> List[Dict[str, Any]]:
-    """Fetch alerts with full details JSONB and all columns."""
+    """Fetch alerts with full details JSONB and all columns.
+
+    Ordered by (created_at, id) descending; ``cursor`` (an
+    ALERT_LIST_SORT_KEY token) replaces ``offset``.
+    """
     _require_tenant(tenant_id)
     params: list[Any] = [tenant_id, status]
     where_clauses = ["tenant_id = $1", "status = $2"]
@@ -1290,6 +1336,12 @@ async def fetch_alerts_v2(
         params.append(alert_type)
         idx += 1
 
+    if cursor:
+        where_clauses.append(keyset_predicate(["created_at", "id"], idx, descending=True))
+        params.extend(decode_cursor(cursor, ALERT_LIST_CURSOR_TYPES))
+        idx += len(ALERT_LIST_SORT_KEY)
+        offset = 0
+
     where_sql = " AND ".join(where_clauses)
 
     rows = await conn.fetch(
@@ -1299,7 +1351,7 @@ async def fetch_alerts_v2(
                status, created_at, closed_at
         FROM fleet_alert
         WHERE {where_sql}
-        ORDER BY created_at DESC
+        ORDER BY created_at DESC, id DESC
         LIMIT ${idx} OFFSET ${idx + 1}
         """,
         *params,
@@ -5,6 +5,9 @@ Replaces InfluxDB queries.
 
 import json
 import logging
+import os
+import re
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -13,6 +16,98 @@ import asyncpg
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class RollupTier:
+    """One pre-aggregated telemetry tier (see migrations 122 and 123).
+
+    ``lag`` bounds how far the tier trails real time: every row older than
+    ``now() - lag`` has been folded into it.
+    """
+
+    width: timedelta
+    relation: str
+    lag: timedelta = timedelta(minutes=2)
+
+
+# Coarsest first: select_rollup_tier returns the first tier that fits.
+# The 1h/1d rollups are real-time continuous aggregates over the 1m tier,
+# so they share its lag.
+ROLLUP_TIERS: tuple[RollupTier, ...] = (
+    RollupTier(timedelta(days=1), "telemetry_rollup_1d"),
+    RollupTier(timedelta(hours=1), "telemetry_rollup_1h"),
+    RollupTier(timedelta(minutes=1), "telemetry_rollup_1m"),
+)
+
+# Quantile sketches are rebuilt per completed hour every 15 minutes.
+SKETCH_TIERS: tuple[RollupTier, ...] = (
+    RollupTier(timedelta(days=1), "telemetry_sketch_1d", lag=timedelta(minutes=30)),
+    RollupTier(timedelta(hours=1), "telemetry_sketch_1h", lag=timedelta(minutes=30)),
+)
+
+# Ranges up to this long read raw telemetry: they are cheap to scan and the
+# 1m tier trails real time by up to a minute.
+ROLLUP_MIN_LOOKBACK = timedelta(
+    minutes=int(os.getenv("TELEMETRY_ROLLUP_MIN_LOOKBACK_MINUTES", "60"))
+)
+
+_INTERVAL_RE = re.compile(r"^\s*(\d+)\s*(second|minute|hour|day|week)s?\s*$", re.IGNORECASE)
+
+
+def parse_interval(value: str) -> Optional[timedelta]:
+    """Parse simple Postgres interval strings such as '5 minutes' or '1 hour'."""
+    match = _INTERVAL_RE.match(value or "")
+    if not match:
+        return None
+    amount, unit = int(match.group(1)), match.group(2).lower()
+    return timedelta(**{f"{unit}s": amount})
+
+
+def select_rollup_tier(
+    lookback: Optional[timedelta],
+    bucket: Optional[timedelta],
+    tiers: tuple[RollupTier, ...] = ROLLUP_TIERS,
+) -> Optional[RollupTier]:
+    """Pick the coarsest tier whose buckets tile the requested bucket.
+
+    Returns None when the query should read raw telemetry instead.
+    """
+    if bucket is None or lookback is None or lookback <= ROLLUP_MIN_LOOKBACK:
+        return None
+    for tier in tiers:
+        if bucket >= tier.width and bucket % tier.width == timedelta(0):
+            return tier
+    return None
+
+
+def metric_bucket_sql(tier: Optional[RollupTier], metric_param: str = "$2") -> dict[str, str]:
+    """SQL fragments for bucketed aggregates of one metric from raw telemetry or a rollup tier.
+
+    Every source exposes a ``time`` column, so time filters and time_bucket
+    calls are the same either way; only the relation, the metric predicate
+    and the aggregate expressions change.
+    """
+    if tier is None:
+        value = f"(metrics->>{metric_param})::numeric"
+        return {
+            "source": "telemetry",
+            "metric_filter": f"metrics ? {metric_param}",
+            "avg": f"AVG({value})",
+            "min": f"MIN({value})",
+            "max": f"MAX({value})",
+            "sum": f"SUM({value})",
+            "count": "COUNT(*)",
+        }
+    return {
+        "source": tier.relation,
+        "metric_filter": f"metric_key = {metric_param}",
+        "avg": "SUM(sum_value) / NULLIF(SUM(sample_count), 0)",
+        "min": "MIN(min_value)",
+        "max": "MAX(max_value)",
+        "sum": "SUM(sum_value)",
+        "count": "SUM(sample_count)::bigint",
+    }
+
+
 def _coerce_metrics(value) -> dict:
     if isinstance(value, dict):
         return value
@@ -108,6 +203,44 @@ async def fetch_device_telemetry_latest(
     }
 
 
+async def fetch_devices_telemetry_latest(
+    conn: asyncpg.Connection,
+    tenant_id: str,
+    device_ids: list[str],
+) -> dict[str, dict]:
+    """Fetch the most recent telemetry for several devices in one round trip.
+
+    Returns {device_id: {timestamp, metrics, seq}}; devices with no telemetry are omitted.
+    """
+    if not device_ids:
+        return {}
+
+    rows = await conn.fetch(
+        """
+        SELECT d.device_id, t.time, t.metrics, t.seq
+        FROM unnest($2::text[]) AS d(device_id)
+        CROSS JOIN LATERAL (
+            SELECT time, metrics, seq
+            FROM telemetry
+            WHERE tenant_id = $1 AND device_id = d.device_id
+            ORDER BY time DESC
+            LIMIT 1
+        ) t
+        """,
+        tenant_id,
+        list(device_ids),
+    )
+
+    return {
+        row["device_id"]: {
+            "timestamp": row["time"].isoformat(),
+            "metrics": _coerce_metrics(row["metrics"]),
+            "seq": row["seq"],
+        }
+        for row in rows
+    }
+
+
 async def fetch_device_events(
     conn: asyncpg.Connection,
     tenant_id: str,
@@ -233,26 +366,28 @@ async def fetch_telemetry_time_series(
 ) -> list[dict]:
     """
     Get time-bucketed telemetry for charting.
-    Uses TimescaleDB time_bucket for efficient aggregation.
+    Reads the coarsest rollup tier that fits the bucket, raw telemetry otherwise.
     """
+    bucket = timedelta(minutes=bucket_minutes)
+    sql = metric_bucket_sql(select_rollup_tier(timedelta(hours=hours), bucket))
     if device_id:
         rows = await conn.fetch(
-            """
+            f"""
             SELECT
                 time_bucket($1::interval, time) as bucket,
-                AVG((metrics->>$2)::numeric) as avg_value,
-                MIN((metrics->>$2)::numeric) as min_value,
-                MAX((metrics->>$2)::numeric) as max_value,
-                COUNT(*) as sample_count
-            FROM telemetry
+                {sql["avg"]} as avg_value,
+                {sql["min"]} as min_value,
+                {sql["max"]} as max_value,
+                {sql["count"]} as sample_count
+            FROM {sql["source"]}
             WHERE tenant_id = $3
               AND device_id = $4
               AND time > now() - make_interval(hours => $5)
-              AND metrics ? $2
+              AND {sql["metric_filter"]}
             GROUP BY bucket
             ORDER BY bucket ASC
             """,
-            timedelta(minutes=bucket_minutes),
+            bucket,
             metric_key,
             tenant_id,
             device_id,
@@ -260,22 +395,22 @@ async def fetch_telemetry_time_series(
         )
     else:
         rows = await conn.fetch(
-            """
+            f"""
             SELECT
                 time_bucket($1::interval, time) as bucket,
-                AVG((metrics->>$2)::numeric) as avg_value,
-                MIN((metrics->>$2)::numeric) as min_value,
-                MAX((metrics->>$2)::numeric) as max_value,
-                COUNT(*) as sample_count,
+                {sql["avg"]} as avg_value,
+                {sql["min"]} as min_value,
+                {sql["max"]} as max_value,
+                {sql["count"]} as sample_count,
                 COUNT(DISTINCT device_id) as device_count
-            FROM telemetry
+            FROM {sql["source"]}
             WHERE tenant_id = $3
               AND time > now() - make_interval(hours => $4)
-              AND metrics ? $2
+              AND {sql["metric_filter"]}
             GROUP BY bucket
             ORDER BY bucket ASC
             """,
-            timedelta(minutes=bucket_minutes),
+            bucket,
             metric_key,
             tenant_id,
             hours,
@@ -284,9 +419,9 @@ async def fetch_telemetry_time_series(
     return [
         {
             "time": row["bucket"].isoformat(),
-            "avg": float(row["avg_value"]) if row["avg_value"] else None,
-            "min": float(row["min_value"]) if row["min_value"] else None,
-            "max": float(row["max_value"]) if row["max_value"] else None,
+            "avg": float(row["avg_value"]) if row["avg_value"] is not None else None,
+            "min": float(row["min_value"]) if row["min_value"] is not None else None,
+            "max": float(row["max_value"]) if row["max_value"] is not None else None,
             "samples": row["sample_count"],
         }
         for row in rows
@@ -1,4 +1,3 @@
-import os
 import asyncio
 import logging
 import time
@@ -6,8 +5,8 @@ from datetime import datetime, timezone
 from typing import Optional
 
 import httpx
-import asyncpg
-from shared.config import require_env, optional_env
+from db.pool_manager import WorkloadPool, pool_manager
+from shared.config import optional_env
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +14,7 @@ logger = logging.getLogger(__name__)
 COLLECTION_INTERVAL = int(optional_env("METRICS_COLLECTION_INTERVAL", "5"))
 
 # PostgreSQL config
-PG_HOST = optional_env("PG_HOST", "iot-postgres")
-PG_PORT = int(optional_env("PG_PORT", "5432"))
 PG_DB = optional_env("PG_DB", "iotcloud")
-PG_USER = optional_env("PG_USER", "iot")
-PG_PASS = require_env("PG_PASS")
-DATABASE_URL = os.getenv("DATABASE_URL")
-PG_POOL_MIN = int(optional_env("PG_POOL_MIN", "2"))
-PG_POOL_MAX = int(optional_env("PG_POOL_MAX", "10"))
 
 # Service URLs
 INGEST_URL = optional_env("INGEST_HEALTH_URL", "http://iot-ingest:8080")
@@ -35,31 +27,14 @@ class MetricsCollector:
     def __init__(self):
         self._running = False
         self._task: Optional[asyncio.Task] = None
-        self._pool: Optional[asyncpg.Pool] = None
+        self._pool: Optional[WorkloadPool] = None
 
     async def start(self):
         """Start the background collection loop."""
         if self._running:
             return
         self._running = True
-        if DATABASE_URL:
-            self._pool = await asyncpg.create_pool(
-                dsn=DATABASE_URL,
-                min_size=PG_POOL_MIN,
-                max_size=PG_POOL_MAX,
-                command_timeout=30,
-            )
-        else:
-            self._pool = await asyncpg.create_pool(
-                host=PG_HOST,
-                port=PG_PORT,
-                database=PG_DB,
-                user=PG_USER,
-                password=PG_PASS,
-                min_size=PG_POOL_MIN,
-                max_size=PG_POOL_MAX,
-                command_timeout=30,
-            )
+        self._pool = await pool_manager.get("background")
         self._task = asyncio.create_task(self._collection_loop())
         logger.info("Metrics collector started (interval=%ds)", COLLECTION_INTERVAL)
 
@@ -72,8 +47,7 @@ class MetricsCollector:
                 await self._task
             except asyncio.CancelledError:
                 pass
-        if self._pool:
-            await self._pool.close()
+        self._pool = None
         logger.info("Metrics collector stopped")
 
     async def _collection_loop(self):
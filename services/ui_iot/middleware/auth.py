@@ -1,7 +1,8 @@
+import hashlib
 import os
 import time
 import logging
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 from jose import jwk, jwt
 from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
@@ -9,7 +10,7 @@ from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from shared.jwks_cache import get_jwks_cache, init_jwks_cache
 from shared.audit import get_audit_logger
-from shared.metrics import pulse_auth_failures_total
+from shared.metrics import pulse_auth_failures_total, pulse_auth_token_cache_total
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +33,17 @@ KEYCLOAK_JWKS_URI = os.getenv(
 AUTH_RATE_LIMIT = 100
 AUTH_RATE_WINDOW = 60
 _auth_attempts: dict[str, list[float]] = defaultdict(list)
+
+# Verified claims keyed by sha256(token), held until the token's exp. RS256
+# verification dominates request CPU under dashboard polling, and the same
+# token is presented many times per minute. Both caches are dropped whenever
+# the JWKS key set changes, so a rotated-out key stops validating at once.
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CLAIMS_CACHE_MAX", "10000"))
+_verified_claims: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+_jwk_objects: dict[str, object] = {}
+_keyset_fingerprint: frozenset | None = None
+
+
 def _get_or_init_cache():
     cache = get_jwks_cache()
     if cache is None:
@@ -88,8 +100,64 @@ def check_auth_rate_limit(client_ip: str) -> bool:
     return True
 
 
+def _sync_keyset(jwks: dict) -> None:
+    global _keyset_fingerprint
+    fingerprint = frozenset(
+        (key.get("kid"), key.get("n") or key.get("x")) for key in jwks.get("keys", [])
+    )
+    if fingerprint != _keyset_fingerprint:
+        clear_token_cache()
+        _keyset_fingerprint = fingerprint
+
+
+def clear_token_cache() -> None:
+    """Drop cached verified claims and constructed signing keys."""
+    _verified_claims.clear()
+    _jwk_objects.clear()
+
+
+def _cached_claims(token_hash: bytes) -> dict | None:
+    entry = _verified_claims.get(token_hash)
+    if entry is None:
+        return None
+    expires_at, claims = entry
+    if time.time() >= expires_at:
+        _verified_claims.pop(token_hash, None)
+        return None
+    _verified_claims.move_to_end(token_hash)
+    return dict(claims)
+
+
+def _store_claims(token_hash: bytes, claims: dict) -> None:
+    exp = claims.get("exp")
+    if TOKEN_CACHE_MAX_ENTRIES <= 0 or not isinstance(exp, (int, float)):
+        return
+    _verified_claims[token_hash] = (float(exp), dict(claims))
+    _verified_claims.move_to_end(token_hash)
+    while len(_verified_claims) > TOKEN_CACHE_MAX_ENTRIES:
+        _verified_claims.popitem(last=False)
+
+
+def _construct_key(signing_key: dict):
+    kid = signing_key.get("kid")
+    key = _jwk_objects.get(kid) if kid else None
+    if key is None:
+        key = jwk.construct(signing_key)
+        if kid:
+            _jwk_objects[kid] = key
+    return key
+
+
 async def validate_token(token: str) -> dict:
     jwks = await get_jwks()
+    _sync_keyset(jwks)
+    token_hash = hashlib.sha256(token.encode()).digest()
+    claims = _cached_claims(token_hash)
+    if claims is not None:
+        pulse_auth_token_cache_total.labels(result="hit").inc()
+        return claims
+    pulse_auth_token_cache_total.labels(result="miss").inc()
+
     try:
         signing_key = get_signing_key(token, jwks)
     except HTTPException as exc:
@@ -97,6 +165,7 @@ async def validate_token(token: str) -> dict:
             cache = _get_or_init_cache()
             try:
                 keys = await cache.force_refresh()
+                _sync_keyset({"keys": keys})
                 signing_key = get_signing_key(token, {"keys": keys})
             except HTTPException:
                 raise
@@ -108,8 +177,8 @@ async def validate_token(token: str) -> dict:
     issuer = f"{KEYCLOAK_PUBLIC_URL}/realms/{KEYCLOAK_REALM}"
 
     try:
-        key = jwk.construct(signing_key)
-        return jwt.decode(
+        key = _construct_key(signing_key)
+        claims = jwt.decode(
             token,
             key,
             algorithms=["RS256"],
@@ -125,6 +194,8 @@ async def validate_token(token: str) -> dict:
     except Exception:
         logger.exception("Unexpected error validating token")
         raise HTTPException(status_code=401, detail="Invalid token")
+    _store_claims(token_hash, claims)
+    return claims
 
 
 class JWTBearer(HTTPBearer):
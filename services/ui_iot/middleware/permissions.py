@@ -6,6 +6,7 @@ from fastapi import Depends, HTTPException
 from starlette.requests import Request
 
 from middleware.tenant import get_tenant_id, get_user, get_user_roles, inject_tenant_context, is_operator
+from shared.db_context import set_db_context
 
 
 permissions_context: ContextVar[set[str]] = ContextVar("permissions_context", default=set())
@@ -15,8 +16,7 @@ async def load_user_permissions(pool, tenant_id: str, user_id: str) -> set[str]:
     """Load the union of permission actions across all assigned roles."""
     async with pool.acquire() as conn:
         async with conn.transaction():
-            await conn.execute("SET LOCAL ROLE pulse_app")
-            await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+            await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
             rows = await conn.fetch(
                 """
                 SELECT DISTINCT p.action
@@ -38,8 +38,7 @@ async def bootstrap_user_roles(pool, tenant_id: str, user_id: str, realm_roles:
     """
     async with pool.acquire() as conn:
         async with conn.transaction():
-            await conn.execute("SET LOCAL ROLE pulse_app")
-            await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+            await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
 
             count = await conn.fetchval(
                 "SELECT COUNT(*) FROM user_role_assignments WHERE tenant_id = $1 AND user_id = $2",
@@ -55,7 +54,7 @@ async def bootstrap_user_roles(pool, tenant_id: str, user_id: str, realm_roles:
                 return set()
 
             # Find the system role (tenant_id IS NULL). Use operator role to bypass RLS.
-            await conn.execute("SET LOCAL ROLE pulse_operator")
+            await set_db_context(conn, role="pulse_operator")
             role_row = await conn.fetchrow(
                 "SELECT id FROM roles WHERE name = $1 AND is_system = true AND tenant_id IS NULL",
                 role_name,
@@ -66,8 +65,7 @@ async def bootstrap_user_roles(pool, tenant_id: str, user_id: str, realm_roles:
             role_id = role_row["id"]
 
             # Switch back to pulse_app for the insert (RLS scoped).
-            await conn.execute("SET LOCAL ROLE pulse_app")
-            await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+            await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
             await conn.execute(
                 """
                 INSERT INTO user_role_assignments (tenant_id, user_id, role_id, assigned_by)
@@ -0,0 +1,305 @@
+"""
+Notification sender runtime - per-channel-type worker pools with batched sends.
+
+Each channel type gets its own bounded queue and worker pool, so a slow
+PagerDuty or SMTP endpoint cannot hold up Slack or webhook delivery. Workers
+linger briefly to collect a batch and group it by destination:
+
+    slack / teams   one digest post per webhook URL
+    pagerduty       one event per dedup key, over a shared HTTP client
+    mqtt            one pooled broker connection, all publishes in one executor hop
+    snmp            one shared SnmpEngine, traps sent concurrently
+    webhook / email one send per alert (signing, retries and recipients are per alert)
+
+``notification_runtime`` is the process-wide instance; ui_iot starts and
+stops it with the app.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+import httpx
+
+from notifications.senders import (
+    MQTTPublisherPool,
+    mqtt_credentials_digest,
+    send_email,
+    send_pagerduty_batch,
+    send_slack_digest,
+    send_snmp,
+    send_teams_digest,
+    send_webhook,
+    smtp_config_from_channel,
+)
+from shared.config import optional_env
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LaneConfig:
+    workers: int
+    queue_size: int = 1000
+    max_batch: int = 1
+    linger_ms: int = 0
+
+
+def _lane_config(channel_type: str, workers: int, max_batch: int = 1, linger_ms: int = 0) -> LaneConfig:
+    prefix = f"NOTIFY_{channel_type.upper()}"
+    return LaneConfig(
+        workers=int(optional_env(f"{prefix}_WORKERS", str(workers))),
+        queue_size=int(optional_env(f"{prefix}_QUEUE_SIZE", "1000")),
+        max_batch=int(optional_env(f"{prefix}_MAX_BATCH", str(max_batch))),
+        linger_ms=int(optional_env(f"{prefix}_LINGER_MS", str(linger_ms))),
+    )
+
+
+DEFAULT_LANES = {
+    "slack": _lane_config("slack", workers=2, max_batch=20, linger_ms=500),
+    "teams": _lane_config("teams", workers=2, max_batch=20, linger_ms=500),
+    "pagerduty": _lane_config("pagerduty", workers=4, max_batch=50, linger_ms=250),
+    "webhook": _lane_config("webhook", workers=8),
+    "email": _lane_config("email", workers=2),
+    "mqtt": _lane_config("mqtt", workers=2, max_batch=100, linger_ms=50),
+    "snmp": _lane_config("snmp", workers=2, max_batch=50, linger_ms=50),
+}
+CHANNEL_ALIASES = {"http": "webhook"}
+
+
+@dataclass(eq=False)
+class _Delivery:
+    config: dict
+    alert: dict
+    future: asyncio.Future
+
+
+BatchSender = Callable[[dict, list[dict]], Awaitable[list[dict]]]
+
+
+class ChannelLane:
+    """Bounded queue plus worker pool for one channel type."""
+
+    def __init__(
+        self,
+        channel_type: str,
+        config: LaneConfig,
+        send_batch: BatchSender,
+        batch_key: Callable[[dict], Hashable],
+    ):
+        self.channel_type = channel_type
+        self.config = config
+        self._send_batch = send_batch
+        self._batch_key = batch_key
+        self._queue: asyncio.Queue[_Delivery] = asyncio.Queue(maxsize=config.queue_size)
+        self._workers: list[asyncio.Task] = []
+        # Deliveries taken off the queue by a worker and not yet resolved.
+        self._in_flight: set[_Delivery] = set()
+
+    def start(self) -> None:
+        for i in range(self.config.workers):
+            self._workers.append(
+                asyncio.create_task(self._worker(), name=f"notify_{self.channel_type}_{i}")
+            )
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        unresolved = list(self._in_flight)
+        self._in_flight.clear()
+        while not self._queue.empty():
+            unresolved.append(self._queue.get_nowait())
+        for delivery in unresolved:
+            if not delivery.future.done():
+                delivery.future.set_exception(RuntimeError("notification runtime stopped"))
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def submit(self, config: dict, alert: dict) -> dict:
+        """Queue one alert and wait for its delivery result (backpressure when full)."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Delivery(config=config, alert=alert, future=future))
+        return await future
+
+    async def _collect(self) -> list[_Delivery]:
+        batch = [await self._queue.get()]
+        self._in_flight.add(batch[0])
+        if self.config.max_batch <= 1:
+            return batch
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.linger_ms / 1000
+        while len(batch) < self.config.max_batch:
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            self._in_flight.add(batch[-1])
+        return batch
+
+    async def _deliver_group(self, group: list[_Delivery]) -> None:
+        try:
+            results = await self._send_batch(group[0].config, [d.alert for d in group])
+        except Exception as exc:
+            logger.warning(
+                "notification_batch_failed",
+                extra={"channel_type": self.channel_type, "size": len(group), "error": str(exc)},
+            )
+            results = [{"success": False, "error": str(exc)} for _ in group]
+        if len(results) < len(group):
+            logger.warning(
+                "notification_batch_short_results",
+                extra={"channel_type": self.channel_type, "size": len(group), "results": len(results)},
+            )
+            missing = {"success": False, "error": "sender returned no result for this alert"}
+            results = list(results) + [dict(missing) for _ in range(len(group) - len(results))]
+        for delivery, result in zip(group, results):
+            if not delivery.future.done():
+                delivery.future.set_result(result)
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._collect()
+            groups: dict[Hashable, list[_Delivery]] = {}
+            for delivery in batch:
+                try:
+                    key = self._batch_key(delivery.config)
+                except Exception:
+                    key = id(delivery)
+                groups.setdefault(key, []).append(delivery)
+            await asyncio.gather(*(self._deliver_group(group) for group in groups.values()))
+            self._in_flight.difference_update(batch)
+
+
+class NotificationSenderRuntime:
+    """Routes alerts to per-channel-type lanes and owns pooled sender resources."""
+
+    def __init__(self, lanes: dict[str, LaneConfig] | None = None):
+        self._lane_configs = lanes or DEFAULT_LANES
+        self._lanes: dict[str, ChannelLane] = {}
+        self._http: httpx.AsyncClient | None = None
+        self._mqtt_pool: MQTTPublisherPool | None = None
+        self._snmp_engine: Any = None
+
+    async def start(self) -> None:
+        if self._lanes:
+            return
+        self._http = httpx.AsyncClient(timeout=8.0)
+        self._mqtt_pool = MQTTPublisherPool()
+        senders = {
+            "slack": (self._send_slack, lambda cfg: cfg["webhook_url"]),
+            "teams": (self._send_teams, lambda cfg: cfg["webhook_url"]),
+            "pagerduty": (self._send_pagerduty, lambda cfg: cfg["integration_key"]),
+            "webhook": (self._send_webhook, id),
+            "email": (self._send_email, id),
+            "mqtt": (
+                self._send_mqtt,
+                lambda cfg: (cfg.get("broker_host"), cfg.get("broker_port"), cfg.get("username"),
+                             mqtt_credentials_digest(cfg.get("username"), cfg.get("password")),
+                             cfg.get("topic"), cfg.get("qos"), cfg.get("retain")),
+            ),
+            "snmp": (self._send_snmp, lambda cfg: tuple(sorted((k, str(v)) for k, v in cfg.items()))),
+        }
+        for channel_type, lane_config in self._lane_configs.items():
+            send_batch, batch_key = senders[channel_type]
+            lane = ChannelLane(channel_type, lane_config, send_batch, batch_key)
+            lane.start()
+            self._lanes[channel_type] = lane
+        logger.info("notification_runtime_started", extra={"lanes": sorted(self._lanes)})
+
+    async def stop(self) -> None:
+        for lane in self._lanes.values():
+            await lane.stop()
+        self._lanes = {}
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._mqtt_pool is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._mqtt_pool.close)
+            self._mqtt_pool = None
+
+    def queue_depths(self) -> dict[str, int]:
+        return {channel_type: lane.depth for channel_type, lane in self._lanes.items()}
+
+    async def send(self, channel_type: str, config: dict, alert: dict) -> dict:
+        """Deliver one alert through its channel type's lane; returns the sender result."""
+        if not self._lanes:
+            raise RuntimeError("notification runtime is not running")
+        channel_type = CHANNEL_ALIASES.get(channel_type, channel_type)
+        lane = self._lanes.get(channel_type)
+        if lane is None:
+            raise ValueError(f"Unsupported channel type: {channel_type}")
+        return await lane.submit(config, alert)
+
+    async def _send_slack(self, config: dict, alerts: list[dict]) -> list[dict]:
+        result = await send_slack_digest(config["webhook_url"], alerts, client=self._http)
+        return [dict(result) for _ in alerts]
+
+    async def _send_teams(self, config: dict, alerts: list[dict]) -> list[dict]:
+        result = await send_teams_digest(config["webhook_url"], alerts, client=self._http)
+        return [dict(result) for _ in alerts]
+
+    async def _send_pagerduty(self, config: dict, alerts: list[dict]) -> list[dict]:
+        return await send_pagerduty_batch(config["integration_key"], alerts, client=self._http)
+
+    async def _send_webhook(self, config: dict, alerts: list[dict]) -> list[dict]:
+        return [
+            await send_webhook(
+                url=config["url"],
+                method=config.get("method", "POST"),
+                headers=config.get("headers", {}),
+                secret=config.get("secret"),
+                alert=alert,
+                channel_id=config.get("channel_id"),
+                tenant_id=alert.get("tenant_id"),
+            )
+            for alert in alerts
+        ]
+
+    async def _send_email(self, config: dict, alerts: list[dict]) -> list[dict]:
+        results = []
+        for alert in alerts:
+            try:
+                await send_email(
+                    smtp_config=smtp_config_from_channel(config),
+                    recipients=config.get("recipients", {}),
+                    alert=alert,
+                    template=config.get("template"),
+                )
+                results.append({"success": True})
+            except Exception as exc:
+                results.append({"success": False, "error": str(exc)})
+        return results
+
+    async def _send_mqtt(self, config: dict, alerts: list[dict]) -> list[dict]:
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._mqtt_pool.publish_many_blocking, config, alerts
+        )
+        return [{"success": True} for _ in alerts]
+
+    async def _send_snmp(self, config: dict, alerts: list[dict]) -> list[dict]:
+        if self._snmp_engine is None:
+            from pysnmp.hlapi.v3arch.asyncio import SnmpEngine
+
+            self._snmp_engine = SnmpEngine()
+        outcomes = await asyncio.gather(
+            *(send_snmp(config, alert, snmp_engine=self._snmp_engine) for alert in alerts),
+            return_exceptions=True,
+        )
+        return [
+            {"success": False, "error": str(outcome)} if isinstance(outcome, Exception) else {"success": True}
+            for outcome in outcomes
+        ]
+
+
+notification_runtime = NotificationSenderRuntime()
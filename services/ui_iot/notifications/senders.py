@@ -3,6 +3,7 @@ import hashlib
 import hmac
 import json
 import logging
+import threading
 import time
 
 import httpx
@@ -48,35 +49,67 @@ def pd_severity(severity: int) -> str:
     return "info"
 
 
-async def send_slack(webhook_url: str, alert: dict) -> dict:
+def _slack_attachment(alert: dict) -> dict:
+    return {
+        "color": severity_color(int(alert.get("severity", 0))),
+        "fields": [
+            {"title": "Summary", "value": alert.get("summary", "—"), "short": False},
+            {"title": "Time", "value": str(alert.get("created_at", "—")), "short": True},
+        ],
+    }
+
+
+def _slack_title(alert: dict) -> str:
+    return f"*[{severity_label(int(alert.get('severity', 0)))}]* {alert.get('device_id', '-') } — {alert.get('alert_type', '-')}"
+
+
+async def _post_json(url: str, payload: dict, client: httpx.AsyncClient | None) -> httpx.Response:
+    if client is not None:
+        return await client.post(url, json=payload)
+    async with httpx.AsyncClient(timeout=8.0) as own_client:
+        return await own_client.post(url, json=payload)
+
+
+async def send_slack(webhook_url: str, alert: dict, client: httpx.AsyncClient | None = None) -> dict:
     """Send alert notification to Slack."""
     payload = {
-        "text": f"*[{severity_label(int(alert.get('severity', 0)))}]* {alert.get('device_id', '-') } — {alert.get('alert_type', '-')}",
-        "attachments": [
-            {
-                "color": severity_color(int(alert.get("severity", 0))),
-                "fields": [
-                    {"title": "Summary", "value": alert.get("summary", "—"), "short": False},
-                    {"title": "Time", "value": str(alert.get("created_at", "—")), "short": True},
-                ],
-            }
-        ],
+        "text": _slack_title(alert),
+        "attachments": [_slack_attachment(alert)],
     }
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            response = await client.post(webhook_url, json=payload)
+        response = await _post_json(webhook_url, payload, client)
         return {"success": 200 <= response.status_code < 300, "status_code": response.status_code}
     except Exception as exc:
         logger.warning("Slack delivery failed: %s", exc)
         return {"success": False, "error": str(exc)}
 
 
-async def send_pagerduty(integration_key: str, alert: dict) -> dict:
+async def send_slack_digest(webhook_url: str, alerts: list[dict], client: httpx.AsyncClient | None = None) -> dict:
+    """Send several alerts to one Slack webhook as a single digest post."""
+    if len(alerts) == 1:
+        return await send_slack(webhook_url, alerts[0], client=client)
+    payload = {
+        "text": f"*{len(alerts)} alerts*\n" + "\n".join(_slack_title(alert) for alert in alerts),
+        "attachments": [_slack_attachment(alert) for alert in alerts],
+    }
+    try:
+        response = await _post_json(webhook_url, payload, client)
+        return {"success": 200 <= response.status_code < 300, "status_code": response.status_code}
+    except Exception as exc:
+        logger.warning("Slack digest delivery failed: %s", exc)
+        return {"success": False, "error": str(exc)}
+
+
+def _pagerduty_dedup_key(alert: dict) -> str:
+    return f"alert-{alert.get('alert_id')}"
+
+
+async def send_pagerduty(integration_key: str, alert: dict, client: httpx.AsyncClient | None = None) -> dict:
     """Send alert notification to PagerDuty."""
     payload = {
         "routing_key": integration_key,
         "event_action": "trigger",
-        "dedup_key": f"alert-{alert.get('alert_id')}",
+        "dedup_key": _pagerduty_dedup_key(alert),
         "payload": {
             "summary": f"{alert.get('alert_type', 'ALERT')} on {alert.get('device_id', '-')}",
             "severity": pd_severity(int(alert.get("severity", 0))),
@@ -85,37 +118,79 @@ async def send_pagerduty(integration_key: str, alert: dict) -> dict:
         },
     }
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            response = await client.post("https://events.pagerduty.com/v2/enqueue", json=payload)
+        response = await _post_json("https://events.pagerduty.com/v2/enqueue", payload, client)
         return {"success": 200 <= response.status_code < 300, "status_code": response.status_code}
     except Exception as exc:
         logger.warning("PagerDuty delivery failed: %s", exc)
         return {"success": False, "error": str(exc)}
 
 
-async def send_teams(webhook_url: str, alert: dict) -> dict:
+async def send_pagerduty_batch(
+    integration_key: str,
+    alerts: list[dict],
+    client: httpx.AsyncClient | None = None,
+) -> list[dict]:
+    """Send alerts to PagerDuty, one event per dedup key.
+
+    The Events API has no batch endpoint, so alerts that share a dedup key
+    within the batch collapse to the latest one; each alert gets the result
+    of the event that covered it.
+    """
+    latest: dict[str, dict] = {}
+    for alert in alerts:
+        latest[_pagerduty_dedup_key(alert)] = alert
+    keys = list(latest)
+    results = await asyncio.gather(
+        *(send_pagerduty(integration_key, latest[key], client=client) for key in keys)
+    )
+    by_key = dict(zip(keys, results))
+    return [by_key[_pagerduty_dedup_key(alert)] for alert in alerts]
+
+
+def _teams_section(alert: dict) -> dict:
+    return {
+        "activityTitle": alert.get("device_id", "-"),
+        "activityText": alert.get("summary", ""),
+    }
+
+
+async def send_teams(webhook_url: str, alert: dict, client: httpx.AsyncClient | None = None) -> dict:
     """Send alert notification to Microsoft Teams."""
     payload = {
         "@type": "MessageCard",
         "@context": "http://schema.org/extensions",
         "themeColor": severity_color(int(alert.get("severity", 0))).replace("#", ""),
         "summary": f"Alert: {alert.get('alert_type', 'UNKNOWN')}",
-        "sections": [
-            {
-                "activityTitle": alert.get("device_id", "-"),
-                "activityText": alert.get("summary", ""),
-            }
-        ],
+        "sections": [_teams_section(alert)],
     }
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            response = await client.post(webhook_url, json=payload)
+        response = await _post_json(webhook_url, payload, client)
         return {"success": 200 <= response.status_code < 300, "status_code": response.status_code}
     except Exception as exc:
         logger.warning("Teams delivery failed: %s", exc)
         return {"success": False, "error": str(exc)}
 
 
+async def send_teams_digest(webhook_url: str, alerts: list[dict], client: httpx.AsyncClient | None = None) -> dict:
+    """Send several alerts to one Teams webhook as a single MessageCard."""
+    if len(alerts) == 1:
+        return await send_teams(webhook_url, alerts[0], client=client)
+    top = max(int(alert.get("severity", 0)) for alert in alerts)
+    payload = {
+        "@type": "MessageCard",
+        "@context": "http://schema.org/extensions",
+        "themeColor": severity_color(top).replace("#", ""),
+        "summary": f"{len(alerts)} alerts",
+        "sections": [_teams_section(alert) for alert in alerts],
+    }
+    try:
+        response = await _post_json(webhook_url, payload, client)
+        return {"success": 200 <= response.status_code < 300, "status_code": response.status_code}
+    except Exception as exc:
+        logger.warning("Teams digest delivery failed: %s", exc)
+        return {"success": False, "error": str(exc)}
+
+
 def compute_webhook_signature(body: bytes, secret: str) -> str:
     """Compute HMAC-SHA256 signature for webhook payload.
 
@@ -302,6 +377,21 @@ async def send_webhook(
 
 # --- Email sender ---
 
+def smtp_config_from_channel(cfg: dict) -> dict:
+    """Map an email channel's stored config to the keys send_email expects."""
+    smtp_raw = cfg.get("smtp", {})
+    if isinstance(smtp_raw, str):
+        smtp_raw = json.loads(smtp_raw)
+    return {
+        "smtp_host": smtp_raw.get("host") or smtp_raw.get("smtp_host", ""),
+        "smtp_port": smtp_raw.get("port") or smtp_raw.get("smtp_port", 587),
+        "smtp_user": smtp_raw.get("username") or smtp_raw.get("smtp_user", ""),
+        "smtp_password": smtp_raw.get("password") or smtp_raw.get("smtp_password", ""),
+        "smtp_tls": smtp_raw.get("use_tls") if "use_tls" in smtp_raw else smtp_raw.get("smtp_tls", True),
+        "from_address": smtp_raw.get("from_address") or smtp_raw.get("username") or smtp_raw.get("smtp_user", ""),
+    }
+
+
 async def send_email(
     smtp_config: dict,
     recipients: dict,
@@ -410,6 +500,7 @@ async def send_email(
 async def send_snmp(
     snmp_config: dict,
     alert: dict,
+    snmp_engine=None,
 ) -> None:
     """Send an SNMP trap for an alert.
 
@@ -420,6 +511,7 @@ async def send_snmp(
             username, auth_password, priv_password (for v3),
             oid_prefix (default "1.3.6.1.4.1.99999")
         alert: standard alert payload dict
+        snmp_engine: optional SnmpEngine to reuse across traps
     """
     try:
         from pysnmp.hlapi.v3arch.asyncio import (
@@ -506,7 +598,8 @@ async def send_snmp(
         ObjectType(ObjectIdentity(f"{oid_prefix}.1.6.0"), OctetString(triggered_at)),
     ]
 
-    snmp_engine = SnmpEngine()
+    if snmp_engine is None:
+        snmp_engine = SnmpEngine()
     error_indication, error_status, error_index, _var_binds_out = await sendNotification(
         snmp_engine,
         auth_data,
@@ -525,6 +618,40 @@ async def send_snmp(
 
 # --- MQTT alert sender ---
 
+def _resolve_mqtt_topic(topic: str, alert: dict) -> str:
+    replacements = {
+        "tenant_id": alert.get("tenant_id"),
+        "severity": alert.get("severity"),
+        "site_id": alert.get("site_id"),
+        "device_id": alert.get("device_id"),
+        "alert_id": alert.get("alert_id"),
+        "alert_type": alert.get("alert_type"),
+    }
+    resolved_topic = topic
+    for key, value in replacements.items():
+        if value is not None:
+            resolved_topic = resolved_topic.replace(f"{{{key}}}", str(value))
+    return resolved_topic
+
+
+def _mqtt_settings(mqtt_config: dict) -> dict:
+    broker_host = mqtt_config.get("broker_host")
+    if not broker_host:
+        raise ValueError("broker_host is required")
+    topic = mqtt_config.get("topic")
+    if not topic:
+        raise ValueError("topic is required")
+    return {
+        "broker_host": broker_host,
+        "broker_port": int(mqtt_config.get("broker_port", 1883)),
+        "topic": topic,
+        "qos": int(mqtt_config.get("qos", 1)),
+        "retain": bool(mqtt_config.get("retain", False)),
+        "username": mqtt_config.get("username"),
+        "password": mqtt_config.get("password"),
+    }
+
+
 async def send_mqtt_alert(
     mqtt_config: dict,
     alert: dict,
@@ -544,41 +671,116 @@ async def send_mqtt_alert(
     except ImportError:
         raise RuntimeError("paho-mqtt not installed -- MQTT delivery unavailable")
 
-    import asyncio
-
-    broker_host = mqtt_config.get("broker_host")
-    if not broker_host:
-        raise ValueError("broker_host is required")
-    broker_port = int(mqtt_config.get("broker_port", 1883))
-    topic = mqtt_config.get("topic")
-    if not topic:
-        raise ValueError("topic is required")
-    qos = int(mqtt_config.get("qos", 1))
-    retain = bool(mqtt_config.get("retain", False))
-    username = mqtt_config.get("username")
-    password = mqtt_config.get("password")
-
-    replacements = {
-        "tenant_id": alert.get("tenant_id"),
-        "severity": alert.get("severity"),
-        "site_id": alert.get("site_id"),
-        "device_id": alert.get("device_id"),
-        "alert_id": alert.get("alert_id"),
-        "alert_type": alert.get("alert_type"),
-    }
-    resolved_topic = topic
-    for key, value in replacements.items():
-        if value is not None:
-            resolved_topic = resolved_topic.replace(f"{{{key}}}", str(value))
-
+    settings = _mqtt_settings(mqtt_config)
+    resolved_topic = _resolve_mqtt_topic(settings["topic"], alert)
     payload_json = json.dumps(alert)
 
     def _publish_blocking() -> None:
         client = paho_mqtt.Client()
-        if username and password:
-            client.username_pw_set(username, password)
-        client.connect(broker_host, broker_port, keepalive=10)
-        client.publish(resolved_topic, payload_json, qos=qos, retain=retain)
+        if settings["username"] and settings["password"]:
+            client.username_pw_set(settings["username"], settings["password"])
+        client.connect(settings["broker_host"], settings["broker_port"], keepalive=10)
+        client.publish(resolved_topic, payload_json, qos=settings["qos"], retain=settings["retain"])
         client.disconnect()
 
     await asyncio.get_running_loop().run_in_executor(None, _publish_blocking)
+
+
+def mqtt_credentials_digest(username: str | None, password: str | None) -> str:
+    """Short digest of MQTT credentials, for pool keys that must change on rotation."""
+    return hashlib.sha256(f"{username or ''}\0{password or ''}".encode()).hexdigest()[:16]
+
+
+class _PooledMQTTConnection:
+    __slots__ = ("lock", "connected", "client")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connected = threading.Event()
+        self.client = None
+
+
+class MQTTPublisherPool:
+    """Keeps one connected paho client per broker/credentials for alert publishing.
+
+    A client is only handed out after the broker's CONNACK (on_connect), so
+    a worker never closes or publishes on a connection that is still being
+    established. Callers for the same broker/credentials serialize on the
+    entry's lock while a connect is in progress. The key includes a digest
+    of the password, so rotated credentials get a fresh session.
+    """
+
+    def __init__(self, publish_timeout: float = 10.0, connect_timeout: float = 10.0):
+        self.publish_timeout = publish_timeout
+        self.connect_timeout = connect_timeout
+        self._clients: dict[tuple, _PooledMQTTConnection] = {}
+        self._lock = threading.Lock()
+
+    def _client_for(self, settings: dict):
+        import paho.mqtt.client as paho_mqtt
+
+        key = (
+            settings["broker_host"],
+            settings["broker_port"],
+            settings["username"],
+            mqtt_credentials_digest(settings["username"], settings["password"]),
+        )
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = self._clients[key] = _PooledMQTTConnection()
+        with entry.lock:
+            # paho reconnects on its own after a drop; give it a chance first.
+            if entry.client is not None and entry.connected.wait(self.connect_timeout):
+                return entry.client
+            if entry.client is not None:
+                self._close(entry.client)
+                entry.client = None
+            entry.connected.clear()
+            client = paho_mqtt.Client()
+            client.on_connect = lambda _c, _u, _f, rc: entry.connected.set() if rc == 0 else None
+            client.on_disconnect = lambda _c, _u, _rc: entry.connected.clear()
+            if settings["username"] and settings["password"]:
+                client.username_pw_set(settings["username"], settings["password"])
+            client.connect(settings["broker_host"], settings["broker_port"], keepalive=60)
+            client.loop_start()
+            if not entry.connected.wait(self.connect_timeout):
+                self._close(client)
+                raise RuntimeError("MQTT broker did not acknowledge the connection")
+            entry.client = client
+            return client
+
+    def publish_many_blocking(self, mqtt_config: dict, alerts: list[dict]) -> None:
+        """Publish alerts over a pooled connection and wait for broker acknowledgement."""
+        settings = _mqtt_settings(mqtt_config)
+        client = self._client_for(settings)
+        infos = [
+            client.publish(
+                _resolve_mqtt_topic(settings["topic"], alert),
+                json.dumps(alert),
+                qos=settings["qos"],
+                retain=settings["retain"],
+            )
+            for alert in alerts
+        ]
+        for info in infos:
+            info.wait_for_publish(timeout=self.publish_timeout)
+            if not info.is_published() and settings["qos"] > 0:
+                raise RuntimeError(f"MQTT publish not acknowledged (rc={info.rc})")
+
+    @staticmethod
+    def _close(client) -> None:
+        try:
+            client.loop_stop()
+            client.disconnect()
+        except Exception:
+            logger.debug("MQTT pooled client close failed", exc_info=True)
+
+    def close(self) -> None:
+        with self._lock:
+            entries, self._clients = list(self._clients.values()), {}
+        for entry in entries:
+            with entry.lock:
+                if entry.client is not None:
+                    self._close(entry.client)
+                    entry.client = None
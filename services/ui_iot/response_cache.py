@@ -0,0 +1,97 @@
+"""
+TTL response cache with single-flight coalescing for read-only endpoints.
+
+Operator dashboards (NOC / TV mode) poll the same platform-wide endpoints
+from many screens at once. A cached value is served until it expires, and
+concurrent misses for one key share a single computation, so N identical
+requests cost one database round trip.
+
+The computation runs as its own task: a client disconnecting mid-request
+does not cancel the work that other waiters are sharing. Failures are
+propagated to every waiter and never cached.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from shared.config import optional_env
+from shared.metrics import response_cache_requests_total
+
+OPERATOR_CACHE_TTL_SECONDS = float(optional_env("OPERATOR_CACHE_TTL_SECONDS", "5"))
+RESPONSE_CACHE_MAX_ENTRIES = 512
+
+
+class ResponseCache:
+    """Per-key TTL cache whose misses are computed at most once at a time."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    def _lookup(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return the cached value for ``key``, computing it once if missing."""
+        hit, value = self._lookup(key)
+        if hit:
+            response_cache_requests_total.labels(cache=self.name, result="hit").inc()
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            response_cache_requests_total.labels(cache=self.name, result="coalesced").inc()
+        else:
+            response_cache_requests_total.labels(cache=self.name, result="miss").inc()
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            self._store(key, task.result())
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drop one cached key, or every key when ``key`` is None."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+operator_response_cache = ResponseCache("operator", OPERATOR_CACHE_TTL_SECONDS)
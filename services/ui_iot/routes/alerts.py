@@ -4,6 +4,8 @@ from routes.customer import *  # noqa: F401,F403
 from routes.customer import _normalize_optional_ids
 from routes.customer import _with_rule_conditions
 from middleware.permissions import require_permission
+from db.pagination import count_rows, decode_cursor, keyset_predicate, next_cursor
+from db.queries import ALERT_LIST_CURSOR_TYPES, ALERT_LIST_SORT_KEY
 from schemas.responses import AlertDetailResponse, AlertListResponse
 from middleware.entitlements import check_alert_rule_limit
 
@@ -82,22 +84,38 @@ async def list_alerts(
     status: str = Query("OPEN"),  # OPEN | ACKNOWLEDGED | CLOSED | ALL
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    count: Literal["exact", "estimate"] = Query("exact"),
     pool=Depends(get_db_pool),
 ):
     """List alerts for the authenticated tenant.
 
     Filter by status: OPEN, ACKNOWLEDGED, CLOSED, or ALL.
     Returns paginated results sorted by creation time (newest first).
+    Follow ``next_cursor`` for deep pages; ``count=estimate`` returns a
+    planner estimate as total.
     """
     valid = {"OPEN", "ACKNOWLEDGED", "CLOSED", "ALL"}
     status_filter = status.upper()
     if status_filter not in valid:
         raise HTTPException(status_code=400, detail="Invalid status")
+    cursor_values = []
+    if cursor:
+        try:
+            cursor_values = decode_cursor(cursor, ALERT_LIST_CURSOR_TYPES)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = 0
 
     tenant_id = get_tenant_id()
     try:
         where = "tenant_id = $1" if status_filter == "ALL" else "tenant_id = $1 AND status = $2"
         params = [tenant_id] if status_filter == "ALL" else [tenant_id, status_filter]
+        page_where = where
+        if cursor_values:
+            page_where += " AND " + keyset_predicate(
+                ["created_at", "id"], len(params) + 1, descending=True
+            )
         async with tenant_connection(pool, tenant_id) as conn:
             rows = await conn.fetch(
                 f"""
@@ -107,27 +125,27 @@ async def list_alerts(
                        escalation_level, escalated_at,
                        trigger_count, last_triggered_at, rule_id
                 FROM fleet_alert
-                WHERE {where}
-                ORDER BY created_at DESC
-                LIMIT {limit} OFFSET {offset}
+                WHERE {page_where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT {limit + 1} OFFSET {offset}
                 """,
                 *params,
+                *cursor_values,
             )
-            total = await conn.fetchval(
-                f"SELECT COUNT(*) FROM fleet_alert WHERE {where}",
-                *params,
-            )
+            total = await count_rows(conn, f"FROM fleet_alert WHERE {where}", *params, mode=count)
     except Exception:
         logger.exception("Failed to fetch tenant alerts")
         raise HTTPException(status_code=500, detail="Internal server error")
 
     return {
         "tenant_id": tenant_id,
-        "alerts": [dict(r) for r in rows],
-        "total": int(total or 0),
+        "alerts": [dict(r) for r in rows[:limit]],
+        "total": total,
         "status_filter": status_filter,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor(rows, limit, ALERT_LIST_SORT_KEY),
+        "total_is_estimate": count == "estimate",
     }
 
 
@@ -1,7 +1,5 @@
 """Ad-hoc telemetry analytics -- query builder, aggregation, CSV export."""
 
-import csv
-import io
 from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -11,7 +9,10 @@ from pydantic import BaseModel, Field
 from middleware.auth import JWTBearer
 from middleware.tenant import inject_tenant_context, get_tenant_id, require_customer
 from db.pool import tenant_connection
+from db.analytics_planner import build_analytics_sql, plan_analytics_query
+from db.telemetry_queries import parse_interval
 from dependencies import get_db_pool
+from shared.export_stream import aiter_rows, csv_chunks
 from shared.logging import get_logger
 
 logger = get_logger("pulse.analytics")
@@ -67,28 +68,19 @@ TIME_RANGE_MAP: dict[str, tuple[str, str]] = {
     "30d": ("30 days", "6 hours"),
 }
 
-AGGREGATION_SQL: dict[str, str] = {
-    "avg": "AVG((metrics->>$2)::numeric)",
-    "min": "MIN((metrics->>$2)::numeric)",
-    "max": "MAX((metrics->>$2)::numeric)",
-    "sum": "SUM((metrics->>$2)::numeric)",
-    "count": "COUNT(*)",
-    "p95": "percentile_cont(0.95) WITHIN GROUP (ORDER BY (metrics->>$2)::numeric)",
-}
-
 
 @router.get("/metrics")
 async def list_available_metrics(pool=Depends(get_db_pool)):
-    """Return distinct metric names from recent telemetry for this tenant."""
+    """Return metric names seen for this tenant in the last 7 days (from the metric catalog)."""
     tenant_id = get_tenant_id()
     try:
         async with tenant_connection(pool, tenant_id) as conn:
             rows = await conn.fetch(
                 """
-                SELECT DISTINCT k AS metric_name
-                FROM telemetry, LATERAL jsonb_object_keys(metrics) AS k
+                SELECT DISTINCT metric_key AS metric_name
+                FROM telemetry_metric_catalog
                 WHERE tenant_id = $1
-                  AND time > now() - interval '7 days'
+                  AND last_seen > now() - interval '7 days'
                 ORDER BY metric_name
                 """,
                 tenant_id,
@@ -102,20 +94,25 @@ async def list_available_metrics(pool=Depends(get_db_pool)):
 
 @router.post("/query", response_model=AnalyticsQueryResponse)
 async def run_analytics_query(body: AnalyticsQueryRequest, pool=Depends(get_db_pool)):
-    """Execute an ad-hoc analytics query with time_bucket aggregation."""
+    """Execute an ad-hoc analytics query on the cheapest sources for its range (see db.analytics_planner)."""
     tenant_id = get_tenant_id()
 
     lookback, default_bucket = TIME_RANGE_MAP.get(body.time_range, TIME_RANGE_MAP["24h"])
     bucket = body.bucket_size or default_bucket
 
-    agg_expr = AGGREGATION_SQL.get(body.aggregation)
-    if not agg_expr:
+    try:
+        plan = plan_analytics_query(
+            body.aggregation,
+            parse_interval(lookback),
+            parse_interval(bucket),
+            group_by=body.group_by,
+        )
+    except ValueError:
         raise HTTPException(status_code=400, detail="Invalid aggregation")
 
     conditions = [
         "tenant_id = $3",
         "time > now() - $4::interval",
-        "metrics ? $2",
     ]
     params: list = [bucket, body.metric, tenant_id, lookback]
     param_idx = 5
@@ -135,43 +132,26 @@ async def run_analytics_query(body: AnalyticsQueryRequest, pool=Depends(get_db_p
         params.append(body.group_id)
         param_idx += 1
 
-    where_clause = " AND ".join(conditions)
-
-    if body.group_by == "device":
-        group_col = "device_id"
-        label_expr = "device_id"
-    elif body.group_by == "site":
-        group_col = "site_id"
+    if body.group_by == "site":
         label_expr = "COALESCE(site_id, 'unknown')"
-    elif body.group_by == "group":
-        group_col = "device_id"
+    elif body.group_by in ("device", "group"):
         label_expr = "device_id"
     else:
-        group_col = None
         label_expr = "'all'"
 
-    if group_col:
-        query = f"""
-            SELECT
-                {label_expr} AS label,
-                time_bucket($1::interval, time) AS bucket,
-                {agg_expr} AS agg_value
-            FROM telemetry
-            WHERE {where_clause}
-            GROUP BY label, bucket
-            ORDER BY label, bucket ASC
-        """
-    else:
-        query = f"""
-            SELECT
-                {label_expr} AS label,
-                time_bucket($1::interval, time) AS bucket,
-                {agg_expr} AS agg_value
-            FROM telemetry
-            WHERE {where_clause}
-            GROUP BY bucket
-            ORDER BY bucket ASC
-        """
+    boundary_param = None
+    if plan.boundary is not None:
+        boundary_param = f"${param_idx}"
+        params.append(plan.boundary)
+        param_idx += 1
+
+    query = build_analytics_sql(
+        plan,
+        label_expr,
+        grouped=body.group_by is not None,
+        conditions=conditions,
+        boundary_param=boundary_param,
+    )
 
     try:
         async with tenant_connection(pool, tenant_id) as conn:
@@ -234,19 +214,15 @@ async def export_analytics_csv(
     )
     result = await run_analytics_query(body, pool)
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["label", "time", "value"])
-
-    for s in result.series:
-        for point in s.points:
-            writer.writerow([s.label, point.time, point.value if point.value is not None else ""])
-
-    output.seek(0)
+    rows = (
+        [series.label, point.time, point.value]
+        for series in result.series
+        for point in series.points
+    )
     filename = f"analytics_{metric}_{aggregation}_{time_range}.csv"
 
     return StreamingResponse(
-        iter([output.getvalue()]),
+        csv_chunks(["label", "time", "value"], aiter_rows(rows)),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -6,17 +6,15 @@ import secrets
 import time
 
 from fastapi import APIRouter, HTTPException
-from fastapi.encoders import jsonable_encoder
 from starlette.requests import Request
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
 import asyncpg
 
+from db.pool_manager import get_pool as get_shared_pool
 from middleware.auth import validate_token
 from ws_manager import manager as ws_manager
-from db.pool import tenant_connection
-from db.queries import fetch_alerts
-from db.telemetry_queries import fetch_device_telemetry_latest
+from ws_hub import WSFanoutHub, fetch_fleet_summary_for_tenant  # noqa: F401
 from shared.config import require_env, optional_env
 
 logger = logging.getLogger(__name__)
@@ -30,61 +28,26 @@ PG_PASS = require_env("PG_PASS")
 WS_KEEPALIVE_SECONDS = float(optional_env("WS_KEEPALIVE_SECONDS", "10"))
 
 
-pool: asyncpg.Pool | None = None
-_ws_notify_event = asyncio.Event()
 _ws_listener_conn: asyncpg.Connection | None = None
 
 
-async def get_pool() -> asyncpg.Pool:
-    global pool
-    if pool is None:
-        pool = await asyncpg.create_pool(
-            host=PG_HOST, port=PG_PORT, database=PG_DB,
-            user=PG_USER, password=PG_PASS,
-            min_size=1, max_size=5,
-        )
-    return pool
+async def get_pool():
+    """WebSocket fan-out queries run on the streaming workload."""
+    return await get_shared_pool("streaming")
+
+
+ws_hub = WSFanoutHub(ws_manager, get_pool, refresh_seconds=WS_KEEPALIVE_SECONDS)
 
 
 def on_ws_notify(conn, pid, channel, payload):
-    """Called on device_state_changed/new_fleet_alert notifications."""
-    _ws_notify_event.set()
-
-
-async def fetch_fleet_summary_for_tenant(conn, tenant_id: str) -> dict:
-    """Fetch fleet summary payload for websocket fleet subscribers."""
-    device_rows = await conn.fetch(
-        """
-        SELECT status, COUNT(*) AS cnt
-        FROM device_state
-        WHERE tenant_id = $1
-        GROUP BY status
-        """,
-        tenant_id,
-    )
-    alert_count = await conn.fetchval(
-        """
-        SELECT COUNT(*)
-        FROM fleet_alert
-        WHERE tenant_id = $1
-          AND status IN ('OPEN', 'ACKNOWLEDGED')
-        """,
-        tenant_id,
-    )
-    counts = {row["status"]: row["cnt"] for row in device_rows}
-    total = int(sum(counts.values()))
-    return {
-        "ONLINE": int(counts.get("ONLINE", 0)),
-        "STALE": int(counts.get("STALE", 0)),
-        "OFFLINE": int(counts.get("OFFLINE", 0)),
-        "total": total,
-        "active_alerts": int(alert_count or 0),
-    }
+    """Called on device_state_changed/new_fleet_alert notifications (payload: tenant_id)."""
+    ws_hub.mark_dirty(payload or None)
 
 
 async def setup_ws_listener() -> None:
-    """Create shared LISTEN connection used to wake websocket push loops."""
+    """Start the fan-out hub and the shared LISTEN connection that wakes it."""
     global _ws_listener_conn
+    ws_hub.start()
     if _ws_listener_conn is not None:
         return
     try:
@@ -105,6 +68,7 @@ async def setup_ws_listener() -> None:
 
 async def shutdown_ws_listener() -> None:
     global _ws_listener_conn
+    await ws_hub.stop()
     if _ws_listener_conn is not None:
         await _ws_listener_conn.close()
         _ws_listener_conn = None
@@ -162,70 +126,17 @@ async def get_ws_ticket(request: Request):
     return {"ticket": create_ws_ticket(user_context)}
 
 
-async def _ws_push_loop(conn):
-    """Background task that polls DB and pushes data to a WebSocket connection.
+async def _ws_send_loop(conn):
+    """Drain the connection's send queue of pre-serialized hub frames.
 
-    Runs until the connection closes or an error occurs.
+    Runs until the connection closes or a send fails.
     """
     while True:
+        frame = await conn.send_queue.get()
         try:
-            try:
-                await asyncio.wait_for(_ws_notify_event.wait(), timeout=WS_KEEPALIVE_SECONDS)
-            except asyncio.TimeoutError:
-                pass
-            _ws_notify_event.clear()
-
-            # Push telemetry for subscribed devices
-            if conn.device_subscriptions:
-                try:
-                    p = await get_pool()
-                    async with tenant_connection(p, conn.tenant_id) as db_conn:
-                        for device_id in list(conn.device_subscriptions):
-                            try:
-                                latest = await fetch_device_telemetry_latest(
-                                    db_conn, conn.tenant_id, device_id
-                                )
-                                if latest:
-                                    await conn.websocket.send_json({
-                                        "type": "telemetry",
-                                        "device_id": device_id,
-                                        "data": latest,
-                                    })
-                            except Exception:
-                                logger.debug("[ws] telemetry push failed for %s", device_id)
-                except Exception:
-                    logger.debug("[ws] telemetry push failed")
-
-            # Push alerts
-            if conn.alert_subscription:
-                try:
-                    p = await get_pool()
-                    async with tenant_connection(p, conn.tenant_id) as db_conn:
-                        alerts = await fetch_alerts(db_conn, conn.tenant_id, status="OPEN", limit=100)
-                    await conn.websocket.send_json({
-                        "type": "alerts",
-                        "alerts": jsonable_encoder(alerts),
-                    })
-                except Exception:
-                    logger.debug("[ws] alert push failed")
-
-            # Push fleet summary
-            if conn.fleet_subscription:
-                try:
-                    p = await get_pool()
-                    async with tenant_connection(p, conn.tenant_id) as db_conn:
-                        summary = await fetch_fleet_summary_for_tenant(db_conn, conn.tenant_id)
-                    await conn.websocket.send_json({
-                        "type": "fleet_summary",
-                        "data": summary,
-                    })
-                except Exception:
-                    logger.debug("[ws] fleet summary push failed")
-
-        except asyncio.CancelledError:
-            raise
+            await conn.websocket.send_text(frame)
         except Exception:
-            logger.exception("[ws] push loop error, closing")
+            logger.debug("[ws] send failed, closing sender")
             break
 
 
@@ -290,7 +201,7 @@ async def websocket_endpoint(
 
     conn = await ws_manager.connect(websocket, tenant_id, payload)
 
-    push_task = asyncio.create_task(_ws_push_loop(conn))
+    push_task = asyncio.create_task(_ws_send_loop(conn))
 
     try:
         while True:
@@ -303,6 +214,7 @@ async def websocket_endpoint(
                     device_id = data.get("device_id")
                     if device_id:
                         ws_manager.subscribe_device(conn, device_id)
+                        ws_hub.mark_dirty(conn.tenant_id)
                         await websocket.send_json({
                             "type": "subscribed",
                             "channel": "device",
@@ -315,12 +227,14 @@ async def websocket_endpoint(
                         })
                 elif sub_type == "alerts":
                     ws_manager.subscribe_alerts(conn)
+                    ws_hub.mark_dirty(conn.tenant_id)
                     await websocket.send_json({
                         "type": "subscribed",
                         "channel": "alerts",
                     })
                 elif sub_type == "fleet":
                     ws_manager.subscribe_fleet(conn)
+                    ws_hub.mark_dirty(conn.tenant_id)
                     await websocket.send_json({
                         "type": "subscribed",
                         "channel": "fleet",
@@ -5,11 +5,26 @@ from routes.customer import _normalize_optional_ids
 from routes.customer import _normalize_tags
 from routes.customer import DeviceUpdate as _CustomerDeviceUpdate
 from middleware.permissions import require_permission
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 from fastapi import Query, Response as FastAPIResponse
 import asyncpg
 from datetime import timedelta
-
+from db.device_search import search_devices
+from db.fleet_counters import fetch_fleet_counters
+from db.pagination import decode_cursor
+from db.queries import DEVICE_LIST_CURSOR_TYPES
+from db.telemetry_queries import metric_bucket_sql, select_rollup_tier
+from shared.downsample import chart_bucket, format_interval
+from shared.export_stream import (
+    TELEMETRY_BASE_COLUMNS,
+    csv_chunks,
+    gzip_chunks,
+    iter_cursor,
+    map_rows,
+    ndjson_chunks,
+    telemetry_csv_row,
+    telemetry_row,
+)
 from shared.logging import get_logger
 from shared.twin import compute_delta, compute_structured_delta, sync_status
 from schemas.responses import DeviceDetailResponse, DeviceListResponse, FleetHealthResponse
@@ -927,26 +942,25 @@ async def get_fleet_uptime_summary(pool=Depends(get_db_pool)):
     range_start = datetime.now(timezone.utc) - timedelta(seconds=range_seconds)
     try:
         async with tenant_connection(pool, tenant_id) as conn:
-            counts = await conn.fetchrow(
-                """
-                WITH open_gap AS (
-                    SELECT DISTINCT device_id
-                    FROM fleet_alert
-                    WHERE tenant_id = $1
-                      AND alert_type = 'NO_TELEMETRY'
-                      AND status = 'OPEN'
+            counters = await fetch_fleet_counters(conn, tenant_id)
+            # Distinct registered devices with an open NO_TELEMETRY alert. The
+            # counter holds alerts, not devices, so it only short-circuits the
+            # common no-gaps case.
+            offline = 0
+            if counters["alerts_no_telemetry_open"]:
+                offline = await conn.fetchval(
+                    """
+                    SELECT COUNT(DISTINCT fa.device_id)
+                    FROM fleet_alert fa
+                    JOIN device_registry dr
+                      ON dr.tenant_id = fa.tenant_id AND dr.device_id = fa.device_id
+                    WHERE fa.tenant_id = $1
+                      AND fa.alert_type = 'NO_TELEMETRY'
+                      AND fa.status = 'OPEN'
+                    """,
+                    tenant_id,
                 )
-                SELECT
-                    COUNT(*) AS total_devices,
-                    COUNT(*) FILTER (WHERE og.device_id IS NULL) AS online,
-                    COUNT(*) FILTER (WHERE og.device_id IS NOT NULL) AS offline
-                FROM device_registry dr
-                LEFT JOIN open_gap og
-                  ON og.device_id = dr.device_id
-                WHERE dr.tenant_id = $1
-                """,
-                tenant_id,
-            )
+                offline = int(offline or 0)
             avg_row = await conn.fetchrow(
                 """
                 WITH device_offline AS (
@@ -980,10 +994,11 @@ async def get_fleet_uptime_summary(pool=Depends(get_db_pool)):
         logger.exception("Failed to compute fleet uptime summary")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+    total_devices = int(counters["registered_total"])
     return {
-        "total_devices": int(counts["total_devices"] or 0),
-        "online": int(counts["online"] or 0),
-        "offline": int(counts["offline"] or 0),
+        "total_devices": total_devices,
+        "online": total_devices - offline,
+        "offline": offline,
         "avg_uptime_pct": round(float(avg_row["avg_uptime_pct"] or 100), 1),
         "as_of": datetime.now(timezone.utc).isoformat(),
     }
@@ -996,6 +1011,8 @@ async def list_devices(
     response: Response,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    count: Literal["exact", "estimate"] = Query("exact"),
     status: str | None = Query(None),
     search: str | None = Query(None, max_length=200),
     tags: str | None = Query(None),
@@ -1009,7 +1026,8 @@ async def list_devices(
     """List all devices for the authenticated tenant.
 
     Supports filtering by status, tags, site, and free-text search.
-    Returns paginated results with subscription info.
+    Returns paginated results with subscription info. Follow ``next_cursor``
+    for deep pages; ``count=estimate`` returns a planner estimate as total.
     """
     if status is not None and status.upper() not in VALID_DEVICE_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status value")
@@ -1019,132 +1037,32 @@ async def list_devices(
         tag_list = list(dict.fromkeys((tag_list or []) + [tag.strip()]))
     if search and not q:
         q = search
+    if cursor:
+        try:
+            decode_cursor(cursor, DEVICE_LIST_CURSOR_TYPES)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
 
     tenant_id = get_tenant_id()
     try:
         p = pool
         async with tenant_connection(p, tenant_id) as conn:
-            if template_id is None:
-                result = await fetch_devices_v2(
-                    conn,
-                    tenant_id,
-                    limit=limit,
-                    offset=offset,
-                    status=status,
-                    tags=tag_list,
-                    q=q,
-                    site_id=site_id,
-                    include_decommissioned=include_decommissioned,
-                )
-                devices = result["devices"]
-                total = int(result["total"] or 0)
-            else:
-                # Phase 169: apply template_id filter directly in SQL (fetch_devices_v2 does not support it).
-                params: list[Any] = [tenant_id]
-                where_clauses = ["dr.tenant_id = $1"]
-                idx = 2
-
-                if not include_decommissioned:
-                    where_clauses.append("dr.decommissioned_at IS NULL")
-                if status:
-                    where_clauses.append(f"COALESCE(ds.status, 'OFFLINE') = ${idx}")
-                    params.append(status)
-                    idx += 1
-                if tag_list:
-                    where_clauses.append(
-                        f"""(
-                            SELECT COUNT(DISTINCT dt.tag)
-                            FROM device_tags dt
-                            WHERE dt.tenant_id = dr.tenant_id
-                              AND dt.device_id = dr.device_id
-                              AND dt.tag = ANY(${idx}::text[])
-                        ) = {len(tag_list)}"""
-                    )
-                    params.append(tag_list)
-                    idx += 1
-                if q:
-                    where_clauses.append(
-                        f"""(
-                            dr.device_id ILIKE ${idx}
-                            OR dr.model ILIKE ${idx}
-                            OR dr.serial_number ILIKE ${idx}
-                            OR dr.site_id ILIKE ${idx}
-                            OR dr.address ILIKE ${idx}
-                        )"""
-                    )
-                    params.append(f"%{q}%")
-                    idx += 1
-                if site_id:
-                    where_clauses.append(f"dr.site_id = ${idx}")
-                    params.append(site_id)
-                    idx += 1
-
-                where_clauses.append(f"dr.template_id = ${idx}")
-                params.append(template_id)
-                idx += 1
-
-                where_sql = " AND ".join(where_clauses)
-                total = await conn.fetchval(
-                    f"""
-                    SELECT COUNT(*)
-                    FROM device_registry dr
-                    LEFT JOIN device_state ds
-                      ON ds.tenant_id = dr.tenant_id AND ds.device_id = dr.device_id
-                    WHERE {where_sql}
-                    """,
-                    *params,
-                )
-                rows = await conn.fetch(
-                    f"""
-                    SELECT dr.tenant_id,
-                           dr.device_id,
-                           dr.site_id,
-                           COALESCE(ds.status, 'OFFLINE') AS status,
-                           ds.last_seen_at,
-                           ds.last_heartbeat_at,
-                           ds.last_telemetry_at,
-                           COALESCE(ds.state, '{{}}'::jsonb) AS state,
-                           dr.latitude, dr.longitude, dr.address, dr.location_source,
-                           dr.mac_address, dr.imei, dr.iccid, dr.serial_number,
-                           dr.model, dr.manufacturer, dr.hw_revision, dr.fw_version, dr.notes,
-                           dr.chipset, dr.modem_model, dr.board_revision, dr.meid,
-                           dr.bootloader_version, dr.modem_fw_version,
-                           dr.deployment_date, dr.batch_id, dr.installation_notes,
-                           dr.sensor_limit,
-                           dr.template_id,
-                           dt.name AS template_name,
-                           CASE
-                               WHEN to_regclass('public.device_sensors') IS NULL THEN 0
-                               ELSE (
-                                   SELECT COUNT(*)
-                                   FROM device_sensors s
-                                   WHERE s.tenant_id = dr.tenant_id
-                                     AND s.device_id = dr.device_id
-                                     AND s.status = 'active'
-                               )
-                           END AS sensor_count,
-                           COALESCE(
-                               (
-                                   SELECT array_agg(dtag.tag ORDER BY dtag.tag)
-                                   FROM device_tags dtag
-                                   WHERE dtag.tenant_id = dr.tenant_id AND dtag.device_id = dr.device_id
-                               ),
-                               ARRAY[]::text[]
-                           ) AS tags
-                    FROM device_registry dr
-                    LEFT JOIN device_state ds
-                      ON ds.tenant_id = dr.tenant_id AND ds.device_id = dr.device_id
-                    LEFT JOIN device_templates dt ON dt.id = dr.template_id
-                    WHERE {where_sql}
-                    ORDER BY dr.site_id, dr.device_id
-                    LIMIT ${idx} OFFSET ${idx + 1}
-                    """,
-                    *params,
-                    limit,
-                    offset,
-                )
-                devices = [dict(r) for r in rows]
-                total = int(total or 0)
+            result = await fetch_devices_v2(
+                conn,
+                tenant_id,
+                limit=limit,
+                offset=offset,
+                status=status,
+                tags=tag_list,
+                q=q,
+                site_id=site_id,
+                include_decommissioned=include_decommissioned,
+                template_id=template_id,
+                cursor=cursor,
+                count_mode=count,
+            )
+            devices = result["devices"]
+            total = int(result["total"] or 0)
 
             if devices:
                 device_ids = [device["device_id"] for device in devices]
@@ -1178,46 +1096,6 @@ async def list_devices(
                         device["subscription_id"] = subscription["subscription_id"]
                         device["subscription_type"] = None
                         device["subscription_status"] = subscription["subscription_status"]
-
-                # Phase 169: include template_name in list response (and ensure template_id is present).
-                if template_id is None:
-                    trows = await conn.fetch(
-                        """
-                        SELECT dr.device_id, dr.template_id, dt.name AS template_name
-                        FROM device_registry dr
-                        LEFT JOIN device_templates dt ON dt.id = dr.template_id
-                        WHERE dr.tenant_id = $1 AND dr.device_id = ANY($2::text[])
-                        """,
-                        tenant_id,
-                        device_ids,
-                    )
-                    tmap = {r["device_id"]: dict(r) for r in trows}
-                    for device in devices:
-                        t = tmap.get(device["device_id"]) or {}
-                        device["template_id"] = t.get("template_id")
-                        device["template_name"] = t.get("template_name")
-
-                    # Prefer sensor_count from device_sensors when available.
-                    try:
-                        sc_rows = await conn.fetch(
-                            """
-                            SELECT device_id, COUNT(*) AS sensor_count
-                            FROM device_sensors
-                            WHERE tenant_id = $1
-                              AND device_id = ANY($2::text[])
-                              AND status = 'active'
-                            GROUP BY device_id
-                            """,
-                            tenant_id,
-                            device_ids,
-                        )
-                        sc_map = {r["device_id"]: int(r["sensor_count"] or 0) for r in sc_rows}
-                        for device in devices:
-                            if device["device_id"] in sc_map:
-                                device["sensor_count"] = sc_map[device["device_id"]]
-                    except Exception:
-                        # If migrations aren't applied yet, keep existing count.
-                        pass
     except Exception:
         logger.exception("Failed to fetch tenant devices")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1228,6 +1106,8 @@ async def list_devices(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": result.get("next_cursor"),
+        "total_is_estimate": count == "estimate",
     }
 
 
@@ -1327,6 +1207,31 @@ async def change_device_plan(
     return {"device_id": device_id, "plan_id": data.plan_id, "status": "ok"}
 
 
+@router.get("/devices/search")
+async def search_tenant_devices(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    include_decommissioned: bool = Query(False),
+    pool=Depends(get_db_pool),
+):
+    """Ranked prefix/substring/fuzzy device search for typeahead boxes."""
+    tenant_id = get_tenant_id()
+    try:
+        async with tenant_connection(pool, tenant_id) as conn:
+            results = await search_devices(
+                conn,
+                q,
+                tenant_id=tenant_id,
+                limit=limit,
+                include_decommissioned=include_decommissioned,
+            )
+    except Exception:
+        logger.exception("Failed to search tenant devices")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    return {"tenant_id": tenant_id, "query": q, "results": results}
+
+
 @router.get("/devices/summary")
 async def get_fleet_summary(pool=Depends(get_db_pool)):
     """Fleet status summary: counts of ONLINE/STALE/OFFLINE devices."""
@@ -1702,6 +1607,9 @@ async def get_telemetry_history(
     device_id: str,
     metric: str = Query(...),
     range: str = Query("24h"),
+    max_points: int | None = Query(
+        None, ge=10, le=5000, description="Widen buckets so at most this many points are returned"
+    ),
     pool=Depends(get_db_pool),
 ):
     if range not in VALID_TELEMETRY_RANGES:
@@ -1726,6 +1634,10 @@ async def get_telemetry_history(
         "7d": timedelta(hours=1),
         "30d": timedelta(hours=6),
     }[range]
+    if max_points:
+        bucket_delta = chart_bucket(lookback_delta, bucket_delta, max_points)
+        bucket = format_interval(bucket_delta)
+    sql = metric_bucket_sql(select_rollup_tier(lookback_delta, bucket_delta))
 
     async with tenant_connection(pool, tenant_id) as conn:
         sensor = await conn.fetchrow(
@@ -1739,18 +1651,18 @@ async def get_telemetry_history(
             metric,
         )
         rows = await conn.fetch(
-            """
+            f"""
             SELECT
                 time_bucket($1::interval, time) AS bucket,
-                AVG((metrics->>$2)::numeric) AS avg_val,
-                MIN((metrics->>$2)::numeric) AS min_val,
-                MAX((metrics->>$2)::numeric) AS max_val,
-                COUNT(*) AS sample_count
-            FROM telemetry
+                {sql["avg"]} AS avg_val,
+                {sql["min"]} AS min_val,
+                {sql["max"]} AS max_val,
+                {sql["count"]} AS sample_count
+            FROM {sql["source"]}
             WHERE tenant_id = $3
               AND device_id = $4
               AND time > now() - $5::interval
-              AND metrics ? $2
+              AND {sql["metric_filter"]}
             GROUP BY bucket
             ORDER BY bucket ASC
             """,
@@ -1788,15 +1700,23 @@ async def list_device_telemetry_metrics(
     device_id: str,
     pool=Depends(get_db_pool),
 ):
-    """List available metrics for telemetry charts — sourced from device_sensors."""
+    """List the device's active sensors, with value type and last_seen from the metric catalog.
+
+    Unregistered and over-limit keys that only exist in the catalog are not listed.
+    """
     tenant_id = get_tenant_id()
     async with tenant_connection(pool, tenant_id) as conn:
         rows = await conn.fetch(
             """
-            SELECT metric_key, display_name, unit, min_range, max_range, precision_digits
-            FROM device_sensors
-            WHERE tenant_id = $1 AND device_id = $2 AND status = 'active'
-            ORDER BY metric_key
+            SELECT s.metric_key, c.value_type, c.last_seen,
+                   s.display_name, s.unit, s.min_range, s.max_range, s.precision_digits
+            FROM device_sensors s
+            LEFT JOIN telemetry_metric_catalog c
+              ON c.tenant_id = s.tenant_id
+             AND c.device_id = s.device_id
+             AND c.metric_key = s.metric_key
+            WHERE s.tenant_id = $1 AND s.device_id = $2 AND s.status = 'active'
+            ORDER BY s.metric_key
             """,
             tenant_id,
             device_id,
@@ -1806,7 +1726,9 @@ async def list_device_telemetry_metrics(
         "metrics": [
             {
                 "metric_key": r["metric_key"],
-                "display_name": r["display_name"],
+                "display_name": r["display_name"] or r["metric_key"],
+                "value_type": r["value_type"],
+                "last_seen": r["last_seen"].isoformat() if r["last_seen"] else None,
                 "unit": r["unit"],
                 "min_range": float(r["min_range"]) if r["min_range"] is not None else None,
                 "max_range": float(r["max_range"]) if r["max_range"] is not None else None,
@@ -1824,9 +1746,12 @@ async def export_telemetry_csv(
     request: Request,
     device_id: str,
     range: str = Query("24h"),
-    limit: int = Query(5000, ge=1, le=10000),
+    limit: int = Query(5000, ge=1, le=100000),
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    compress: bool = Query(False, description="gzip the response body"),
     pool=Depends(get_db_pool),
 ):
+    """Stream a device's raw telemetry as CSV (metrics pivoted to columns) or NDJSON."""
     if range not in EXPORT_RANGES:
         raise HTTPException(
             status_code=400,
@@ -1841,53 +1766,61 @@ async def export_telemetry_csv(
         "7d": timedelta(days=7),
         "30d": timedelta(days=30),
     }[range]
-    async with tenant_connection(pool, tenant_id) as conn:
-        rows = await conn.fetch(
-            """
-            SELECT time, device_id, site_id, seq, metrics
-            FROM telemetry
-            WHERE tenant_id = $1
-              AND device_id = $2
-              AND time > now() - $3::interval
-            ORDER BY time ASC
-            LIMIT $4
-            """,
-            tenant_id,
-            device_id,
-            lookback_delta,
-            limit,
-        )
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    if not rows:
-        writer.writerow(["time", "device_id", "site_id", "seq"])
-    else:
-        metric_keys = sorted(
-            {
-                key
-                for row in rows
-                for key in ((row["metrics"] or {}).keys())
-            }
-        )
-        headers = ["time", "device_id", "site_id", "seq", *metric_keys]
-        writer.writerow(headers)
-        for row in rows:
-            metrics = row["metrics"] or {}
-            writer.writerow(
-                [
-                    row["time"].isoformat(),
-                    row["device_id"],
-                    row["site_id"] or "",
-                    row["seq"],
-                    *[metrics.get(k, "") for k in metric_keys],
-                ]
-            )
-    output.seek(0)
-    filename = f"{device_id}_telemetry_{range}.csv"
+    async def _body():
+        # The connection (and its transaction, which the cursor needs) lives
+        # as long as the response is streaming.
+        async with tenant_connection(pool, tenant_id) as conn:
+            rows = iter_cursor(
+                conn,
+                """
+                SELECT time, device_id, site_id, seq, metrics
+                FROM telemetry
+                WHERE tenant_id = $1
+                  AND device_id = $2
+                  AND time > now() - $3::interval
+                ORDER BY time ASC
+                LIMIT $4
+                """,
+                tenant_id,
+                device_id,
+                lookback_delta,
+                limit,
+            )
+            if format == "ndjson":
+                chunks = ndjson_chunks(map_rows(rows, telemetry_row))
+            else:
+                # Columns are the keys seen in the requested range. Ingest only
+                # refreshes last_seen every few minutes, hence the margin.
+                key_rows = await conn.fetch(
+                    """
+                    SELECT metric_key
+                    FROM telemetry_metric_catalog
+                    WHERE tenant_id = $1 AND device_id = $2
+                      AND last_seen >= now() - $3::interval - interval '10 minutes'
+                    ORDER BY metric_key
+                    """,
+                    tenant_id,
+                    device_id,
+                    lookback_delta,
+                )
+                metric_keys = [r["metric_key"] for r in key_rows]
+                chunks = csv_chunks(
+                    [*TELEMETRY_BASE_COLUMNS, *metric_keys],
+                    map_rows(rows, lambda r: telemetry_csv_row(r, metric_keys)),
+                )
+            if compress:
+                chunks = gzip_chunks(chunks)
+            async for chunk in chunks:
+                yield chunk
+
+    filename = f"{device_id}_telemetry_{range}.{format}" + (".gz" if compress else "")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if compress:
+        media_type = "application/gzip"
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
+        _body(),
+        media_type=media_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
@@ -3291,40 +3224,26 @@ async def get_fleet_health(
     tenant_id = get_tenant_id()
     try:
         async with tenant_connection(pool, tenant_id) as conn:
-            # Total active devices
-            total_devices = await conn.fetchval(
-                """
-                SELECT COUNT(*)
-                FROM device_registry
-                WHERE tenant_id = $1 AND status = 'ACTIVE'
-                """,
-                tenant_id,
-            )
-            total_devices = int(total_devices or 0)
-
-            # Online devices (have recent heartbeat in device_state)
-            online_devices = await conn.fetchval(
-                """
-                SELECT COUNT(*)
-                FROM device_state
-                WHERE tenant_id = $1 AND status = 'ONLINE'
-                """,
-                tenant_id,
-            )
-            online_devices = int(online_devices or 0)
-
-            # Distinct devices with at least one OPEN critical alert (severity >= 5)
-            critical_alert_devices = await conn.fetchval(
-                """
-                SELECT COUNT(DISTINCT device_id)
-                FROM fleet_alert
-                WHERE tenant_id = $1
-                  AND status IN ('OPEN', 'ACKNOWLEDGED')
-                  AND severity >= 5
-                """,
-                tenant_id,
-            )
-            critical_alert_devices = int(critical_alert_devices or 0)
+            counters = await fetch_fleet_counters(conn, tenant_id)
+            total_devices = int(counters["registered_active"])
+            online_devices = int(counters["devices_online"])
+
+            # Distinct devices with at least one OPEN critical alert (severity >= 5).
+            # The counter holds alerts, not devices, so it only short-circuits
+            # the common no-critical-alerts case.
+            critical_alert_devices = 0
+            if counters["alerts_critical_active"]:
+                critical_alert_devices = await conn.fetchval(
+                    """
+                    SELECT COUNT(DISTINCT device_id)
+                    FROM fleet_alert
+                    WHERE tenant_id = $1
+                      AND status IN ('OPEN', 'ACKNOWLEDGED')
+                      AND severity >= 5
+                    """,
+                    tenant_id,
+                )
+                critical_alert_devices = int(critical_alert_devices or 0)
 
     except Exception:
         logger.exception("Failed to compute fleet health score")
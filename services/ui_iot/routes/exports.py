@@ -338,6 +338,7 @@ async def get_audit_log(
 # ------ NEW ASYNC EXPORT ENDPOINTS ------
 
 VALID_TIME_RANGES = {"1h", "6h", "24h", "7d", "30d", "90d"}
+COLUMNAR_FORMATS = {"parquet", "arrow"}
 
 
 @router.post("/exports", status_code=202, response_model=ExportCreateResponse)
@@ -355,7 +356,9 @@ async def create_export(
     - alerts: Alert history matching filters
     - telemetry: Raw telemetry data matching filters
 
-    Supported formats: csv, json
+    Supported formats: csv, json, ndjson (optionally gzip-compressed), and
+    for telemetry the columnar parquet and arrow (IPC file) formats, with one
+    typed column per metric.
     """
     tenant_id = get_tenant_id()
     user = get_user()
@@ -366,6 +369,17 @@ async def create_export(
             status_code=400,
             detail=f"Invalid time_range. Must be one of: {sorted(VALID_TIME_RANGES)}",
         )
+    if body.format in COLUMNAR_FORMATS:
+        if body.export_type != "telemetry":
+            raise HTTPException(
+                status_code=400,
+                detail=f"{body.format} format is only available for telemetry exports",
+            )
+        if body.compression != "none":
+            raise HTTPException(
+                status_code=400,
+                detail=f"{body.format} exports are compressed internally; use compression 'none'",
+            )
 
     # Estimate row count for user feedback
     estimated_rows = None
@@ -407,13 +421,14 @@ async def create_export(
         await conn.execute(
             """
             INSERT INTO export_jobs
-                (id, tenant_id, export_type, format, filters, status, created_by)
-            VALUES ($1, $2, $3, $4, $5::jsonb, 'PENDING', $6)
+                (id, tenant_id, export_type, format, compression, filters, status, created_by)
+            VALUES ($1, $2, $3, $4, $5, $6::jsonb, 'PENDING', $7)
             """,
             export_id,
             tenant_id,
             body.export_type,
             body.format,
+            body.compression,
             json.dumps(body.filters.model_dump(exclude_none=True)),
             user.get("sub") if user else None,
         )
@@ -448,7 +463,7 @@ async def list_exports(
     async with tenant_connection(pool, tenant_id) as conn:
         rows = await conn.fetch(
             """
-            SELECT id, tenant_id, export_type, format, filters, status,
+            SELECT id, tenant_id, export_type, format, compression, filters, status,
                    file_size_bytes, row_count, error, callback_url,
                    created_at, started_at, completed_at, expires_at
             FROM export_jobs
@@ -472,6 +487,7 @@ async def list_exports(
             tenant_id=row["tenant_id"],
             export_type=row["export_type"],
             format=row["format"],
+            compression=row["compression"],
             filters=row["filters"] or {},
             status=row["status"],
             file_size_bytes=row["file_size_bytes"],
@@ -509,7 +525,7 @@ async def get_export_status(
     async with tenant_connection(pool, tenant_id) as conn:
         row = await conn.fetchrow(
             """
-            SELECT id, tenant_id, export_type, format, filters, status,
+            SELECT id, tenant_id, export_type, format, compression, filters, status,
                    file_size_bytes, row_count, error, callback_url,
                    created_at, started_at, completed_at, expires_at
             FROM export_jobs
@@ -527,6 +543,7 @@ async def get_export_status(
         tenant_id=row["tenant_id"],
         export_type=row["export_type"],
         format=row["format"],
+        compression=row["compression"],
         filters=row["filters"] or {},
         status=row["status"],
         file_size_bytes=row["file_size_bytes"],
@@ -552,7 +569,9 @@ async def download_export(
     """Download a completed export file.
 
     Returns the export data as a streaming response with chunked transfer encoding.
-    The Content-Type header matches the export format (text/csv or application/json).
+    The Content-Type header matches the export format (text/csv,
+    application/json, application/vnd.apache.parquet or
+    application/vnd.apache.arrow.file).
     """
     tenant_id = get_tenant_id()
     if not validate_uuid(export_id):
@@ -13,6 +13,7 @@ from shared.rate_limiter import get_rate_limiter
 from shared.sampled_logger import get_sampled_logger
 from middleware.auth import JWTBearer
 from shared.ingest_core import IngestResult
+from shared.db_context import set_db_context
 
 logger = logging.getLogger(__name__)
 
@@ -56,8 +57,7 @@ class MetricKeyMapCache:
     async def _load_from_db(self, pool, tenant_id: str, device_id: str) -> dict[str, str]:
         async with pool.acquire() as conn:
             async with conn.transaction():
-                await conn.execute("SET LOCAL ROLE pulse_app")
-                await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+                await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
                 rows = await conn.fetch(
                     """
                     SELECT metric_key_map
@@ -166,8 +166,8 @@ async def ingest_single(
         raise HTTPException(status_code=400, detail="Invalid msg_type. Must be 'telemetry' or 'heartbeat'")
 
     limiter = get_rate_limiter()
-    if limiter and hasattr(limiter, "check_all"):
-        allowed, reason, status = limiter.check_all(tenant_id, device_id, msg_type)
+    if limiter and hasattr(limiter, "check_all_async"):
+        allowed, reason, status = await limiter.check_all_async(tenant_id, device_id, msg_type)
         if not allowed:
             raise HTTPException(status_code=status, detail=reason or "rate limited")
 
@@ -278,6 +278,19 @@ async def ingest_batch(request: Request, batch: BatchRequest):
     rejected = 0
 
     limiter = get_rate_limiter()
+    rate_verdicts: dict[int, tuple] = {}
+    if limiter and hasattr(limiter, "check_many_async"):
+        # One shared-backend round trip for the whole batch, not one per message.
+        checked = [
+            idx for idx, msg in enumerate(batch.messages) if msg.msg_type in ("telemetry", "heartbeat")
+        ]
+        verdicts = await limiter.check_many_async(
+            [
+                (batch.messages[idx].tenant_id, batch.messages[idx].device_id, batch.messages[idx].msg_type)
+                for idx in checked
+            ]
+        )
+        rate_verdicts = dict(zip(checked, verdicts))
 
     for idx, msg in enumerate(batch.messages):
         if msg.msg_type not in ("telemetry", "heartbeat"):
@@ -299,8 +312,8 @@ async def ingest_batch(request: Request, batch: BatchRequest):
                 pool, msg.tenant_id, msg.device_id, payload.get("metrics", {}) or {}
             )
 
-        if limiter and hasattr(limiter, "check_all"):
-            allowed, reason, status = limiter.check_all(msg.tenant_id, msg.device_id, msg.msg_type)
+        if idx in rate_verdicts:
+            allowed, reason, status = rate_verdicts[idx]
             if not allowed:
                 rejected += 1
                 results.append(
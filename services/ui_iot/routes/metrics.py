@@ -21,13 +21,10 @@ async def get_metrics_reference(pool=Depends(get_db_pool)):
         async with tenant_connection(pool, tenant_id) as conn:
             raw_rows = await conn.fetch(
                 """
-                SELECT DISTINCT key AS metric_name
-                FROM telemetry
-                CROSS JOIN LATERAL jsonb_object_keys(metrics) AS key
+                SELECT DISTINCT metric_key AS metric_name
+                FROM telemetry_metric_catalog
                 WHERE tenant_id = $1
-                  AND time > NOW() - INTERVAL '7 days'
-                  AND metrics IS NOT NULL
-                  AND jsonb_typeof(metrics) = 'object'
+                  AND last_seen > NOW() - INTERVAL '7 days'
                 ORDER BY metric_name
                 LIMIT 200
                 """,
@@ -13,15 +13,7 @@ from middleware.tenant import get_tenant_id, inject_tenant_context, require_cust
 from middleware.permissions import require_permission
 from middleware.entitlements import check_notification_channel_limit
 from routes.customer import limiter
-from notifications.senders import (
-    send_email,
-    send_mqtt_alert,
-    send_pagerduty,
-    send_slack,
-    send_snmp,
-    send_teams,
-    send_webhook,
-)
+from notifications.runtime import notification_runtime
 
 logger = logging.getLogger(__name__)
 
@@ -273,53 +265,21 @@ async def test_channel(request: Request, response: Response, channel_id: int, po
     if isinstance(cfg, str):
         cfg = json.loads(cfg)
     try:
-        if ch["channel_type"] == "slack":
-            await send_slack(cfg["webhook_url"], test_alert)
-        elif ch["channel_type"] == "pagerduty":
-            await send_pagerduty(cfg["integration_key"], test_alert)
-        elif ch["channel_type"] == "teams":
-            await send_teams(cfg["webhook_url"], test_alert)
-        elif ch["channel_type"] in ("webhook", "http"):
-            result = await send_webhook(
-                url=cfg["url"],
-                method=cfg.get("method", "POST"),
-                headers=cfg.get("headers", {}),
-                secret=cfg.get("secret"),
-                alert=test_alert,
-                channel_id=str(channel_id),
-                tenant_id=tenant_id,
-            )
-            return {
-                "channel_id": channel_id,
-                "test": True,
-                "delivery": result,
-            }
-        elif ch["channel_type"] == "email":
-            smtp_raw = cfg.get("smtp", {})
-            if isinstance(smtp_raw, str):
-                smtp_raw = json.loads(smtp_raw)
-            # Map channel config keys to send_email expected keys
-            smtp_mapped = {
-                "smtp_host": smtp_raw.get("host") or smtp_raw.get("smtp_host", ""),
-                "smtp_port": smtp_raw.get("port") or smtp_raw.get("smtp_port", 587),
-                "smtp_user": smtp_raw.get("username") or smtp_raw.get("smtp_user", ""),
-                "smtp_password": smtp_raw.get("password") or smtp_raw.get("smtp_password", ""),
-                "smtp_tls": smtp_raw.get("use_tls") if "use_tls" in smtp_raw else smtp_raw.get("smtp_tls", True),
-                "from_address": smtp_raw.get("from_address") or smtp_raw.get("username") or smtp_raw.get("smtp_user", ""),
-            }
-            await send_email(
-                smtp_config=smtp_mapped,
-                recipients=cfg.get("recipients", {}),
-                alert=test_alert,
-                template=cfg.get("template"),
-            )
-        elif ch["channel_type"] == "snmp":
-            await send_snmp(snmp_config=cfg, alert=test_alert)
-        elif ch["channel_type"] == "mqtt":
-            await send_mqtt_alert(mqtt_config=cfg, alert=test_alert)
-        return {"status": "ok", "message": "Test notification sent successfully"}
+        result = await notification_runtime.send(
+            ch["channel_type"], {**cfg, "channel_id": str(channel_id)}, test_alert
+        )
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Test send failed: {str(exc)}")
+    if ch["channel_type"] in ("webhook", "http"):
+        return {
+            "channel_id": channel_id,
+            "test": True,
+            "delivery": result,
+        }
+    if not result.get("success"):
+        error = result.get("error") or f"status {result.get('status_code')}"
+        raise HTTPException(status_code=502, detail=f"Test send failed: {error}")
+    return {"status": "ok", "message": "Test notification sent successfully"}
 
 
 @router.get("/notification-routing-rules")
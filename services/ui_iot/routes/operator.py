@@ -10,7 +10,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Form
 from fastapi import Response
 from starlette.requests import Request
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Literal, Optional
 
 from middleware.auth import JWTBearer
 from middleware.tenant import (
@@ -19,7 +19,13 @@ from middleware.tenant import (
     require_operator,
     require_operator_admin,
 )
+from db.device_search import search_devices, search_document_pattern
+from db.pagination import count_rows, decode_cursor, next_cursor
 from db.queries import (
+    ALERT_LIST_CURSOR_TYPES,
+    ALERT_LIST_SORT_KEY,
+    OPERATOR_DEVICE_CURSOR_TYPES,
+    OPERATOR_DEVICE_SORT_KEY,
     fetch_alerts,
     fetch_all_alerts,
     fetch_all_devices,
@@ -33,6 +39,7 @@ from db.queries import (
 from db.telemetry_queries import fetch_device_telemetry, fetch_device_events
 from db.audit import log_operator_access, fetch_operator_audit_log
 from db.pool import operator_connection
+from db.pool_manager import get_pool as get_shared_pool
 from dependencies import get_db_pool
 from routes.templates import (
     TemplateCreate,
@@ -44,20 +51,9 @@ from routes.templates import (
     TemplateSlotCreate,
     TemplateSlotUpdate,
 )
-from shared.config import require_env, optional_env
 
 logger = logging.getLogger(__name__)
 
-PG_HOST = optional_env("PG_HOST", "iot-postgres")
-PG_PORT = int(optional_env("PG_PORT", "5432"))
-PG_DB = optional_env("PG_DB", "iotcloud")
-PG_USER = optional_env("PG_USER", "iot")
-PG_PASS = require_env("PG_PASS")
-PG_POOL_MIN = int(optional_env("PG_POOL_MIN", "2"))
-PG_POOL_MAX = int(optional_env("PG_POOL_MAX", "10"))
-
-pool: asyncpg.Pool | None = None
-
 
 class TenantCreate(BaseModel):
     tenant_id: str  # Must be URL-safe, lowercase
@@ -163,19 +159,8 @@ class DeviceSubscriptionAssign(BaseModel):
 
 
 
-async def get_pool() -> asyncpg.Pool:
-    global pool
-    if pool is None:
-        pool = await asyncpg.create_pool(
-            host=PG_HOST,
-            port=PG_PORT,
-            database=PG_DB,
-            user=PG_USER,
-            password=PG_PASS,
-            min_size=PG_POOL_MIN,
-            max_size=PG_POOL_MAX,
-        )
-    return pool
+async def get_pool():
+    return await get_shared_pool("interactive")
 
 
 def get_request_metadata(request: Request) -> tuple[str | None, str | None]:
@@ -832,26 +817,18 @@ async def get_all_tenants_stats(request: Request):
                 t.name,
                 t.status,
                 t.created_at,
-                COALESCE(d.device_count, 0) AS device_count,
-                COALESCE(d.online_count, 0) AS online_count,
-                COALESCE(a.open_alerts, 0) AS open_alerts,
+                COALESCE(fc.devices_total, 0) AS device_count,
+                COALESCE(fc.devices_online, 0) AS online_count,
+                COALESCE(fc.alerts_open, 0) AS open_alerts,
                 d.last_activity
             FROM tenants t
+            LEFT JOIN fleet_counters fc ON fc.tenant_id = t.tenant_id
+            -- fleet_counters.last_activity is only refreshed by reconciliation.
             LEFT JOIN (
-                SELECT
-                    tenant_id,
-                    COUNT(*) AS device_count,
-                    COUNT(*) FILTER (WHERE status = 'ONLINE') AS online_count,
-                    MAX(last_seen_at) AS last_activity
+                SELECT tenant_id, MAX(last_seen_at) AS last_activity
                 FROM device_state
                 GROUP BY tenant_id
             ) d ON d.tenant_id = t.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) AS open_alerts
-                FROM fleet_alert
-                WHERE status = 'OPEN'
-                GROUP BY tenant_id
-            ) a ON a.tenant_id = t.tenant_id
             WHERE t.status != 'DELETED'
             ORDER BY t.created_at DESC
             """
@@ -2342,7 +2319,15 @@ async def list_devices(
     template_id: int | None = Query(default=None),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    count: Literal["exact", "estimate"] = Query("exact"),
+    q: str | None = Query(None, max_length=100, description="Substring match on device identity"),
 ):
+    if cursor:
+        try:
+            decode_cursor(cursor, OPERATOR_DEVICE_CURSOR_TYPES)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     user = get_user()
     ip, user_agent = get_request_metadata(request)
     try:
@@ -2358,90 +2343,46 @@ async def list_devices(
                 rls_bypassed=True,
             )
         async with operator_connection(p) as conn:
+            conditions: list[str] = []
+            params: list = []
+            if tenant_filter:
+                params.append(tenant_filter)
+                conditions.append(f"ds.tenant_id = ${len(params)}")
             if template_id is not None:
-                conditions: list[str] = []
-                params: list = []
-                idx = 1
-
-                if tenant_filter:
-                    conditions.append(f"ds.tenant_id = ${idx}")
-                    params.append(tenant_filter)
-                    idx += 1
-
-                conditions.append(f"dr.template_id = ${idx}")
                 params.append(template_id)
-                idx += 1
-
-                where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+                conditions.append(f"dr.template_id = ${len(params)}")
+            if q:
+                params.append(search_document_pattern(q))
+                conditions.append(f"dr.search_document LIKE ${len(params)}")
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            total = await count_rows(
+                conn,
+                f"""
+                FROM device_state ds
+                LEFT JOIN device_registry dr
+                  ON dr.tenant_id = ds.tenant_id AND dr.device_id = ds.device_id
+                {where}
+                """,
+                *params,
+                mode=count,
+            )
 
-                total = await conn.fetchval(
-                    f"""
-                    SELECT COUNT(*)
-                    FROM device_state ds
-                    LEFT JOIN device_registry dr
-                      ON dr.tenant_id = ds.tenant_id AND dr.device_id = ds.device_id
-                    {where}
-                    """,
-                    *params,
+            # One extra row tells whether another page follows.
+            if tenant_filter and template_id is None and not q:
+                rows = await fetch_devices(
+                    conn, tenant_filter, limit=limit + 1, offset=offset, cursor=cursor
                 )
-                rows = await conn.fetch(
-                    f"""
-                    SELECT ds.tenant_id, ds.device_id, ds.site_id, ds.status, ds.last_seen_at,
-                           state->>'battery_pct' AS battery_pct,
-                           state->>'temp_c' AS temp_c,
-                           state->>'rssi_dbm' AS rssi_dbm,
-                           state->>'snr_db' AS snr_db,
-                           dr.subscription_id,
-                           dr.template_id,
-                           dt.name AS template_name
-                    FROM device_state ds
-                    LEFT JOIN device_registry dr
-                      ON dr.tenant_id = ds.tenant_id AND dr.device_id = ds.device_id
-                    LEFT JOIN device_templates dt
-                      ON dt.id = dr.template_id
-                    {where}
-                    ORDER BY ds.tenant_id, ds.site_id, ds.device_id
-                    LIMIT ${idx} OFFSET ${idx + 1}
-                    """,
-                    *params,
-                    limit,
-                    offset,
-                )
-                devices = [dict(r) for r in rows]
             else:
-                if tenant_filter:
-                    devices = await fetch_devices(conn, tenant_filter, limit=limit, offset=offset)
-                    total = await conn.fetchval(
-                        "SELECT COUNT(*) FROM device_state WHERE tenant_id = $1",
-                        tenant_filter,
-                    )
-                else:
-                    devices = await fetch_all_devices(conn, limit=limit, offset=offset)
-                    total = await conn.fetchval("SELECT COUNT(*) FROM device_state")
-
-                if devices:
-                    tenant_ids = [d["tenant_id"] for d in devices]
-                    device_ids = [d["device_id"] for d in devices]
-                    trows = await conn.fetch(
-                        """
-                        SELECT
-                            dr.tenant_id,
-                            dr.device_id,
-                            dr.template_id,
-                            dt.name AS template_name
-                        FROM device_registry dr
-                        LEFT JOIN device_templates dt ON dt.id = dr.template_id
-                        JOIN unnest($1::text[], $2::text[]) AS u(tenant_id, device_id)
-                          ON u.tenant_id = dr.tenant_id AND u.device_id = dr.device_id
-                        """,
-                        tenant_ids,
-                        device_ids,
-                    )
-                    tmap = {(r["tenant_id"], r["device_id"]): dict(r) for r in trows}
-                    for d in devices:
-                        t = tmap.get((d.get("tenant_id"), d.get("device_id"))) or {}
-                        d["template_id"] = t.get("template_id")
-                        d["template_name"] = t.get("template_name")
+                rows = await fetch_all_devices(
+                    conn,
+                    limit=limit + 1,
+                    offset=offset,
+                    cursor=cursor,
+                    tenant_id=tenant_filter,
+                    template_id=template_id,
+                    q=q,
+                )
+            devices = rows[:limit]
     except Exception:
         logger.exception("Failed to fetch operator devices")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -2452,9 +2393,49 @@ async def list_devices(
         "limit": limit,
         "offset": offset,
         "total": total or 0,
+        "total_is_estimate": count == "estimate",
+        "next_cursor": next_cursor(rows, limit, OPERATOR_DEVICE_SORT_KEY),
     }
 
 
+@router.get("/devices/search")
+async def search_all_devices(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    tenant_filter: str | None = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    include_decommissioned: bool = Query(False),
+):
+    """Ranked cross-tenant device search for the operator inventory."""
+    user = get_user()
+    ip, user_agent = get_request_metadata(request)
+    try:
+        p = await get_pool()
+        async with p.acquire() as conn:
+            await log_operator_access(
+                conn,
+                user_id=user["sub"],
+                action="search_devices",
+                tenant_filter=tenant_filter,
+                ip_address=ip,
+                user_agent=user_agent,
+                rls_bypassed=True,
+            )
+        async with operator_connection(p) as conn:
+            results = await search_devices(
+                conn,
+                q,
+                tenant_id=tenant_filter,
+                limit=limit,
+                include_decommissioned=include_decommissioned,
+            )
+    except Exception:
+        logger.exception("Failed to search operator devices")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    return {"query": q, "tenant_filter": tenant_filter, "results": results}
+
+
 @router.get("/tenants/{tenant_id}/devices")
 async def list_tenant_devices(
     request: Request,
@@ -2775,7 +2756,13 @@ async def list_alerts(
     tenant_filter: str | None = Query(None),
     status: str = Query("OPEN"),
     limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
 ):
+    if cursor:
+        try:
+            decode_cursor(cursor, ALERT_LIST_CURSOR_TYPES)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     user = get_user()
     ip, user_agent = get_request_metadata(request)
     try:
@@ -2792,14 +2779,22 @@ async def list_alerts(
             )
         async with operator_connection(p) as conn:
             if tenant_filter:
-                alerts = await fetch_alerts(conn, tenant_filter, status=status, limit=limit)
+                rows = await fetch_alerts(
+                    conn, tenant_filter, status=status, limit=limit + 1, cursor=cursor
+                )
             else:
-                alerts = await fetch_all_alerts(conn, status=status, limit=limit)
+                rows = await fetch_all_alerts(conn, status=status, limit=limit + 1, cursor=cursor)
     except Exception:
         logger.exception("Failed to fetch operator alerts")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-    return {"alerts": alerts, "tenant_filter": tenant_filter, "status": status, "limit": limit}
+    return {
+        "alerts": rows[:limit],
+        "tenant_filter": tenant_filter,
+        "status": status,
+        "limit": limit,
+        "next_cursor": next_cursor(rows, limit, ALERT_LIST_SORT_KEY),
+    }
 
 
 @router.get("/quarantine")
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import time
 import logging
@@ -14,17 +15,14 @@ from starlette.requests import Request
 from middleware.auth import JWTBearer
 from middleware.tenant import inject_tenant_context, require_operator
 from db.pool import operator_connection
-from shared.config import require_env, optional_env
+from db.pool_manager import get_pool as get_shared_pool
+from response_cache import operator_response_cache
+from shared.downsample import lttb
+from shared.config import optional_env
 
 logger = logging.getLogger(__name__)
 
-POSTGRES_HOST = optional_env("PG_HOST", "iot-postgres")
-POSTGRES_PORT = int(optional_env("PG_PORT", "5432"))
 POSTGRES_DB = optional_env("PG_DB", "iotcloud")
-POSTGRES_USER = optional_env("PG_USER", "iot")
-POSTGRES_PASS = require_env("PG_PASS")
-PG_POOL_MIN = int(optional_env("PG_POOL_MIN", "2"))
-PG_POOL_MAX = int(optional_env("PG_POOL_MAX", "10"))
 
 KEYCLOAK_INTERNAL_URL = optional_env("KEYCLOAK_INTERNAL_URL", "http://pulse-keycloak:8080")
 KEYCLOAK_REALM = optional_env("KEYCLOAK_REALM", "pulse")
@@ -42,29 +40,9 @@ router = APIRouter(
     ],
 )
 
-_pool: asyncpg.Pool | None = None
-
-
-async def _init_db_connection(conn: asyncpg.Connection) -> None:
-    # Avoid passing statement_timeout as a startup parameter (PgBouncer rejects it).
-    await conn.execute("SET statement_timeout TO 30000")
-
-
-async def get_pool() -> asyncpg.Pool:
-    global _pool
-    if _pool is None:
-        _pool = await asyncpg.create_pool(
-            host=POSTGRES_HOST,
-            port=POSTGRES_PORT,
-            database=POSTGRES_DB,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASS,
-            min_size=PG_POOL_MIN,
-            max_size=PG_POOL_MAX,
-            command_timeout=30,
-            init=_init_db_connection,
-        )
-    return _pool
+async def get_pool():
+    """Operator system reads run on the analytics workload (replica when configured)."""
+    return await get_shared_pool("analytics")
 
 
 async def check_postgres() -> dict:
@@ -195,6 +173,10 @@ async def calculate_ingest_rate(pool: asyncpg.Pool) -> float:
 
 @router.get("/health")
 async def get_system_health(request: Request):
+    return await operator_response_cache.get_or_compute(("system_health",), _load_system_health)
+
+
+async def _load_system_health() -> dict:
     import asyncio
 
     results = await asyncio.gather(
@@ -249,6 +231,10 @@ async def get_system_metrics(request: Request):
     Get system throughput and latency metrics.
     Aggregates data from service health endpoints and TimescaleDB.
     """
+    return await operator_response_cache.get_or_compute(("system_metrics",), _load_system_metrics)
+
+
+async def _load_system_metrics() -> dict:
     import asyncio
 
     service_metrics = await asyncio.gather(
@@ -290,6 +276,75 @@ async def get_system_metrics(request: Request):
     }
 
 
+async def _fetch_metric_series(
+    metrics: list[str],
+    minutes: int,
+    service: Optional[str],
+    rate: bool,
+    max_points: Optional[int],
+) -> dict[str, list[dict]]:
+    """Time series for several metrics in one query, optionally downsampled.
+
+    With rate=True the derivative (change per second between consecutive
+    points, treating a decrease as a counter reset) is computed in SQL. A
+    metric with fewer than two samples has no derivative and keeps its raw
+    points.
+    """
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            WITH s AS (
+                SELECT
+                    metric_name,
+                    time,
+                    value,
+                    lag(time) OVER w AS prev_time,
+                    lag(value) OVER w AS prev_value
+                FROM system_metrics
+                WHERE metric_name = ANY($1::text[])
+                  AND ($2::text IS NULL OR service = $2)
+                  AND time > now() - ($3::int * interval '1 minute')
+                WINDOW w AS (PARTITION BY metric_name ORDER BY time)
+            )
+            SELECT
+                metric_name,
+                time,
+                value,
+                CASE
+                    WHEN prev_time IS NULL OR time <= prev_time THEN NULL
+                    WHEN value < prev_value THEN value / EXTRACT(EPOCH FROM time - prev_time)::double precision
+                    ELSE (value - prev_value) / EXTRACT(EPOCH FROM time - prev_time)::double precision
+                END AS rate_value,
+                count(*) OVER (PARTITION BY metric_name) AS samples
+            FROM s
+            ORDER BY metric_name, time ASC
+            """,
+            metrics,
+            service,
+            minutes,
+        )
+
+    series: dict[str, list[dict]] = {metric: [] for metric in metrics}
+    for row in rows:
+        value = row["value"]
+        if rate and row["samples"] >= 2:
+            if row["rate_value"] is None:
+                continue
+            value = round(float(row["rate_value"]), 2)
+        series.setdefault(row["metric_name"], []).append({"time": row["time"], "value": value})
+
+    result = {}
+    for metric, points in series.items():
+        if max_points:
+            points = lttb(points, max_points)
+        result[metric] = [
+            {"time": point["time"].isoformat(), "value": point["value"]} for point in points
+        ]
+    return result
+
+
 @router.get("/metrics/history")
 async def get_metrics_history(
     request: Request,
@@ -297,6 +352,9 @@ async def get_metrics_history(
     minutes: int = Query(15, ge=1, le=1440),
     service: Optional[str] = Query(None, description="Filter by service"),
     rate: bool = Query(False, description="Compute rate (derivative) for counter metrics"),
+    max_points: Optional[int] = Query(
+        None, ge=10, le=5000, description="Downsample (LTTB) to at most this many points"
+    ),
 ):
     """Get historical time-series for a metric.
 
@@ -304,85 +362,69 @@ async def get_metrics_history(
     consecutive data points. Use this for cumulative counter metrics like
     messages_written to show actual throughput rates.
     """
-    pool = await get_pool()
-
-    async with pool.acquire() as conn:
-        if service:
-            rows = await conn.fetch(
-                """
-                SELECT time, value
-                FROM system_metrics
-                WHERE metric_name = $1
-                  AND service = $2
-                  AND time > now() - ($3::int * interval '1 minute')
-                ORDER BY time ASC
-                """,
-                metric,
-                service,
-                minutes,
-            )
-        else:
-            rows = await conn.fetch(
-                """
-                SELECT time, value
-                FROM system_metrics
-                WHERE metric_name = $1
-                  AND time > now() - ($2::int * interval '1 minute')
-                ORDER BY time ASC
-                """,
-                metric,
-                minutes,
-            )
+    return await operator_response_cache.get_or_compute(
+        ("metrics_history", metric, minutes, service, rate, max_points),
+        lambda: _load_metrics_history(metric, minutes, service, rate, max_points),
+    )
 
-    if rate and len(rows) >= 2:
-        # Compute rate (derivative) between consecutive points
-        points = []
-        for i in range(1, len(rows)):
-            prev_row = rows[i - 1]
-            curr_row = rows[i]
-
-            time_delta = (curr_row["time"] - prev_row["time"]).total_seconds()
-            if time_delta > 0:
-                value_delta = curr_row["value"] - prev_row["value"]
-                # Handle counter resets (value decreased means service restarted)
-                if value_delta < 0:
-                    value_delta = curr_row["value"]
-                rate_per_sec = round(value_delta / time_delta, 2)
-                points.append({
-                    "time": curr_row["time"].isoformat(),
-                    "value": rate_per_sec,
-                })
-    else:
-        points = [
-            {"time": row["time"].isoformat(), "value": row["value"]}
-            for row in rows
-        ]
 
+async def _load_metrics_history(
+    metric: str,
+    minutes: int,
+    service: Optional[str],
+    rate: bool,
+    max_points: Optional[int],
+) -> dict:
+    series = await _fetch_metric_series([metric], minutes, service, rate, max_points)
     return {
         "metric": metric,
         "service": service,
-        "points": points,
+        "points": series[metric],
         "minutes": minutes,
         "rate": rate,
     }
 
 
+# Batch failures caused by one metric's data (numeric overflow, a value
+# that cannot be converted, ...), worth retrying metric by metric.
+_PER_METRIC_ERRORS = (asyncpg.DataError, ArithmeticError, TypeError, ValueError)
+
+
 @router.get("/metrics/history/batch")
 async def get_metrics_history_batch(
     request: Request,
     metrics: str = Query(..., description="Comma-separated metric names"),
     minutes: int = Query(15, ge=1, le=1440),
+    rate: bool = Query(False, description="Compute rate (derivative) for counter metrics"),
+    max_points: Optional[int] = Query(
+        None, ge=10, le=5000, description="Downsample (LTTB) each metric to at most this many points"
+    ),
 ):
     """
     Get historical data for multiple metrics in one request.
-    More efficient for loading the dashboard.
+    All metrics are read by a single query. If it fails on one metric's
+    data, each metric is retried on its own so the failure only blanks that
+    metric; any other failure is reported for every metric without
+    re-querying.
     """
-    import asyncio
+    metric_list = list(dict.fromkeys(m.strip() for m in metrics.split(",") if m.strip()))
+    try:
+        return await operator_response_cache.get_or_compute(
+            ("metrics_history_batch", tuple(metric_list), minutes, rate, max_points),
+            lambda: _load_metrics_history_batch(metric_list, minutes, rate, max_points),
+        )
+    except _PER_METRIC_ERRORS:
+        logger.warning("Batch metrics history query failed; loading metrics one by one", exc_info=True)
+    except Exception as exc:
+        logger.warning("Batch metrics history query failed", exc_info=True)
+        return {metric: {"points": [], "error": str(exc)} for metric in metric_list}
 
-    metric_list = [m.strip() for m in metrics.split(",")]
     results = await asyncio.gather(
         *[
-            get_metrics_history(request, metric=m, minutes=minutes)
+            operator_response_cache.get_or_compute(
+                ("metrics_history", m, minutes, None, rate, max_points),
+                lambda m=m: _load_metrics_history(m, minutes, None, rate, max_points),
+            )
             for m in metric_list
         ],
         return_exceptions=True,
@@ -398,9 +440,32 @@ async def get_metrics_history_batch(
     return response
 
 
+async def _load_metrics_history_batch(
+    metric_list: list[str],
+    minutes: int,
+    rate: bool,
+    max_points: Optional[int],
+) -> dict:
+    series = await _fetch_metric_series(metric_list, minutes, None, rate, max_points)
+    return {
+        metric: {
+            "metric": metric,
+            "service": None,
+            "points": series[metric],
+            "minutes": minutes,
+            "rate": rate,
+        }
+        for metric in metric_list
+    }
+
+
 @router.get("/metrics/latest")
 async def get_latest_metrics(request: Request):
     """Get most recent value for all metrics."""
+    return await operator_response_cache.get_or_compute(("metrics_latest",), _load_latest_metrics)
+
+
+async def _load_latest_metrics() -> dict:
     pool = await get_pool()
 
     async with pool.acquire() as conn:
@@ -432,8 +497,10 @@ async def get_system_capacity(request: Request):
     Get system capacity and utilization metrics.
     Includes disk usage, database sizes, and connection counts.
     """
-    import asyncio
+    return await operator_response_cache.get_or_compute(("system_capacity",), _load_system_capacity)
+
 
+async def _load_system_capacity() -> dict:
     postgres_stats = await get_postgres_capacity()
     disk_stats = get_disk_capacity()
 
@@ -454,50 +521,74 @@ async def get_system_aggregates(request: Request):
     Get platform-wide aggregate counts.
     Cross-tenant totals for operators to see system-wide state.
     """
+    return await operator_response_cache.get_or_compute(("system_aggregates",), _load_system_aggregates)
+
+
+async def _load_system_aggregates() -> dict:
     pool = await get_pool()
 
+    # One FILTER scan per table instead of a COUNT subquery per figure.
     async with operator_connection(pool) as conn:
         stats = await conn.fetchrow(
             """
-            SELECT
-                (SELECT COUNT(*) FROM tenants WHERE status = 'ACTIVE') AS tenants_active,
-                (SELECT COUNT(*) FROM tenants WHERE status = 'SUSPENDED') AS tenants_suspended,
-                (SELECT COUNT(*) FROM tenants WHERE status = 'DELETED') AS tenants_deleted,
-                (SELECT COUNT(*) FROM tenants) AS tenants_total,
-                (SELECT COUNT(*) FROM device_registry) AS devices_registered,
-                (SELECT COUNT(*) FROM device_registry WHERE status = 'ACTIVE') AS devices_active,
-                (SELECT COUNT(*) FROM device_registry WHERE status = 'REVOKED') AS devices_revoked,
-                (SELECT COUNT(*) FROM device_state WHERE status = 'ONLINE') AS devices_online,
-                (SELECT COUNT(*) FROM device_state WHERE status = 'STALE') AS devices_stale,
-                (SELECT COUNT(*) FROM device_state WHERE status = 'OFFLINE') AS devices_offline,
-                (SELECT COUNT(*) FROM fleet_alert WHERE status = 'OPEN') AS alerts_open,
-                (SELECT COUNT(*) FROM fleet_alert WHERE status = 'CLOSED') AS alerts_closed,
-                (SELECT COUNT(*) FROM fleet_alert WHERE status = 'ACKNOWLEDGED') AS alerts_acknowledged,
-                (SELECT COUNT(*) FROM fleet_alert
-                 WHERE created_at >= now() - interval '24 hours') AS alerts_24h,
-                (SELECT COUNT(*) FROM fleet_alert
-                 WHERE created_at >= now() - interval '1 hour') AS alerts_1h,
-                (SELECT COUNT(*) FROM integrations) AS integrations_total,
-                (SELECT COUNT(*) FROM integrations WHERE enabled = true) AS integrations_active,
-                (SELECT COUNT(*) FROM integrations WHERE type = 'webhook') AS integrations_webhook,
-                (SELECT COUNT(*) FROM integrations WHERE type = 'email') AS integrations_email,
-                (SELECT COUNT(*) FROM alert_rules) AS rules_total,
-                (SELECT COUNT(*) FROM alert_rules WHERE enabled = true) AS rules_active,
-                (SELECT COUNT(*) FROM delivery_jobs WHERE status = 'PENDING') AS deliveries_pending,
-                (SELECT COUNT(*) FROM delivery_jobs WHERE status = 'COMPLETED') AS deliveries_succeeded,
-                (SELECT COUNT(*) FROM delivery_jobs WHERE status = 'FAILED') AS deliveries_failed,
-                (SELECT COUNT(*) FROM delivery_jobs
-                 WHERE created_at >= now() - interval '24 hours') AS deliveries_24h,
-                (SELECT COUNT(DISTINCT site_id) FROM device_registry) AS sites_total
-            """
-        )
-
-        activity = await conn.fetchrow(
-            """
-            SELECT
-                (SELECT MAX(created_at) FROM fleet_alert) AS last_alert,
-                (SELECT MAX(last_seen_at) FROM device_state) AS last_device_activity,
-                (SELECT MAX(created_at) FROM delivery_jobs) AS last_delivery
+            WITH t AS (
+                SELECT
+                    COUNT(*) FILTER (WHERE status = 'ACTIVE') AS tenants_active,
+                    COUNT(*) FILTER (WHERE status = 'SUSPENDED') AS tenants_suspended,
+                    COUNT(*) FILTER (WHERE status = 'DELETED') AS tenants_deleted,
+                    COUNT(*) AS tenants_total
+                FROM tenants
+            ),
+            dr AS (
+                SELECT
+                    COUNT(*) AS devices_registered,
+                    COUNT(*) FILTER (WHERE status = 'ACTIVE') AS devices_active,
+                    COUNT(*) FILTER (WHERE status = 'REVOKED') AS devices_revoked,
+                    COUNT(DISTINCT site_id) AS sites_total
+                FROM device_registry
+            ),
+            ds AS (
+                SELECT
+                    COUNT(*) FILTER (WHERE status = 'ONLINE') AS devices_online,
+                    COUNT(*) FILTER (WHERE status = 'STALE') AS devices_stale,
+                    COUNT(*) FILTER (WHERE status = 'OFFLINE') AS devices_offline,
+                    MAX(last_seen_at) AS last_device_activity
+                FROM device_state
+            ),
+            fa AS (
+                SELECT
+                    COUNT(*) FILTER (WHERE status = 'OPEN') AS alerts_open,
+                    COUNT(*) FILTER (WHERE status = 'CLOSED') AS alerts_closed,
+                    COUNT(*) FILTER (WHERE status = 'ACKNOWLEDGED') AS alerts_acknowledged,
+                    COUNT(*) FILTER (WHERE created_at >= now() - interval '24 hours') AS alerts_24h,
+                    COUNT(*) FILTER (WHERE created_at >= now() - interval '1 hour') AS alerts_1h,
+                    MAX(created_at) AS last_alert
+                FROM fleet_alert
+            ),
+            i AS (
+                SELECT
+                    COUNT(*) AS integrations_total,
+                    COUNT(*) FILTER (WHERE enabled = true) AS integrations_active,
+                    COUNT(*) FILTER (WHERE type = 'webhook') AS integrations_webhook,
+                    COUNT(*) FILTER (WHERE type = 'email') AS integrations_email
+                FROM integrations
+            ),
+            r AS (
+                SELECT
+                    COUNT(*) AS rules_total,
+                    COUNT(*) FILTER (WHERE enabled = true) AS rules_active
+                FROM alert_rules
+            ),
+            dj AS (
+                SELECT
+                    COUNT(*) FILTER (WHERE status = 'PENDING') AS deliveries_pending,
+                    COUNT(*) FILTER (WHERE status = 'COMPLETED') AS deliveries_succeeded,
+                    COUNT(*) FILTER (WHERE status = 'FAILED') AS deliveries_failed,
+                    COUNT(*) FILTER (WHERE created_at >= now() - interval '24 hours') AS deliveries_24h,
+                    MAX(created_at) AS last_delivery
+                FROM delivery_jobs
+            )
+            SELECT * FROM t, dr, ds, fa, i, r, dj
             """
         )
 
@@ -545,14 +636,14 @@ async def get_system_aggregates(request: Request):
             "total": stats["sites_total"] or 0,
         },
         "last_activity": {
-            "alert": activity["last_alert"].isoformat() + "Z"
-            if activity["last_alert"]
+            "alert": stats["last_alert"].isoformat() + "Z"
+            if stats["last_alert"]
             else None,
-            "device": activity["last_device_activity"].isoformat() + "Z"
-            if activity["last_device_activity"]
+            "device": stats["last_device_activity"].isoformat() + "Z"
+            if stats["last_device_activity"]
             else None,
-            "delivery": activity["last_delivery"].isoformat() + "Z"
-            if activity["last_delivery"]
+            "delivery": stats["last_delivery"].isoformat() + "Z"
+            if stats["last_delivery"]
             else None,
         },
     }
@@ -568,6 +659,13 @@ async def get_system_errors(
     Get recent system errors and failures.
     Aggregates from various error sources across the platform.
     """
+    return await operator_response_cache.get_or_compute(
+        ("system_errors", hours, limit),
+        lambda: _load_system_errors(hours, limit),
+    )
+
+
+async def _load_system_errors(hours: int, limit: int) -> dict:
     pool = await get_pool()
 
     async with operator_connection(pool) as conn:
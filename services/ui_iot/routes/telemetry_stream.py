@@ -1,9 +1,9 @@
 """Streaming telemetry endpoints: WebSocket and SSE."""
 
 import asyncio
-import json
 import logging
 from datetime import datetime, timezone
+from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
@@ -44,6 +44,16 @@ def _extract_tenant_from_token(payload: dict) -> str | None:
     return payload.get("tenant_id")
 
 
+def _delivery_settings(sub) -> dict:
+    """Describe a subscription's delivery mode for client acknowledgements."""
+    return {
+        "mode": sub.mode,
+        "interval_ms": sub.interval_ms,
+        "max_rate": sub.max_rate,
+        "format": sub.frame_format,
+    }
+
+
 def _validate_customer_role(payload: dict) -> bool:
     """Check that the token has a valid customer role."""
     realm_access = payload.get("realm_access", {}) or {}
@@ -58,6 +68,10 @@ async def telemetry_websocket(
     token: str | None = None,
     device_id: str | None = None,
     metric: str | None = None,
+    mode: str = "raw",
+    interval_ms: int | None = None,
+    max_rate: float | None = None,
+    format: str = "json",
 ):
     """WebSocket endpoint for real-time telemetry streaming.
 
@@ -66,6 +80,12 @@ async def telemetry_websocket(
     Query params (initial filters):
         device_id: comma-separated device IDs (optional)
         metric: comma-separated metric names (optional)
+
+    Query params (delivery):
+        mode: raw | sample | conflate (default raw)
+        interval_ms: conflate flush interval
+        max_rate: sample mode cap in events/second
+        format: json | delta (delta requires conflate)
     """
     if not token:
         await websocket.close(code=4001, reason="Missing token parameter")
@@ -94,7 +114,14 @@ async def telemetry_websocket(
             tenant_id=tenant_id,
             device_ids=device_ids,
             metric_names=metric_names,
+            mode=mode,
+            interval_ms=interval_ms,
+            max_rate=max_rate,
+            frame_format=format,
         )
+    except ValueError as exc:
+        await websocket.close(code=4000, reason=str(exc))
+        return
     except ConnectionError as exc:
         await websocket.close(code=4029, reason=str(exc))
         return
@@ -109,6 +136,7 @@ async def telemetry_websocket(
                 "device_ids": list(sub.device_ids),
                 "metric_names": list(sub.metric_names),
             },
+            "delivery": _delivery_settings(sub),
         }
     )
 
@@ -117,8 +145,8 @@ async def telemetry_websocket(
         try:
             while True:
                 try:
-                    event = await asyncio.wait_for(sub.queue.get(), timeout=30.0)
-                    await websocket.send_json(event)
+                    event = await sub.get(timeout=30.0)
+                    await websocket.send_text(event)
                 except asyncio.TimeoutError:
                     await websocket.send_json(
                         {"type": "ping", "ts": datetime.now(timezone.utc).isoformat()}
@@ -159,6 +187,19 @@ async def telemetry_websocket(
                     stream_manager.update_filters(sub, metric_names=list(metrics) if metrics else [])
                     await websocket.send_json({"type": "metrics_updated", "metrics": list(sub.metric_names)})
 
+                elif action == "set_delivery":
+                    try:
+                        sub.configure(
+                            mode=data.get("mode"),
+                            interval_ms=data.get("interval_ms"),
+                            max_rate=data.get("max_rate"),
+                            frame_format=data.get("format"),
+                        )
+                    except (TypeError, ValueError) as exc:
+                        await websocket.send_json({"type": "error", "message": str(exc)})
+                    else:
+                        await websocket.send_json({"type": "delivery_updated", "delivery": _delivery_settings(sub)})
+
                 elif action == "clear_filters":
                     stream_manager.update_filters(sub, device_ids=[], metric_names=[])
                     await websocket.send_json({"type": "filters_cleared"})
@@ -192,6 +233,7 @@ async def telemetry_websocket(
             extra={
                 "tenant_id": tenant_id,
                 "events_sent": sub.event_counter,
+                "events_dropped": sub.events_dropped,
                 "duration_s": int(asyncio.get_event_loop().time() - sub.connected_at),
             },
         )
@@ -202,6 +244,10 @@ async def telemetry_sse(
     request: Request,
     device_id: str | None = Query(None, description="Comma-separated device IDs"),
     metric: str | None = Query(None, description="Comma-separated metric names"),
+    mode: Literal["raw", "sample", "conflate"] = Query("raw"),
+    interval_ms: int | None = Query(None, ge=1, description="Conflate flush interval"),
+    max_rate: float | None = Query(None, gt=0, description="Sample mode events/second cap"),
+    format: Literal["json", "delta"] = Query("json"),
 ):
     """Server-Sent Events endpoint for real-time telemetry streaming."""
     tenant_id = get_tenant_id()
@@ -216,7 +262,13 @@ async def telemetry_sse(
             tenant_id=tenant_id,
             device_ids=device_ids,
             metric_names=metric_names,
+            mode=mode,
+            interval_ms=interval_ms,
+            max_rate=max_rate,
+            frame_format=format,
         )
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
     except ConnectionError as exc:
         raise HTTPException(429, str(exc))
 
@@ -228,9 +280,8 @@ async def telemetry_sse(
                     break
 
                 try:
-                    event = await asyncio.wait_for(sub.queue.get(), timeout=15.0)
+                    data = await sub.get(timeout=15.0)
                     event_id += 1
-                    data = json.dumps(event)
                     yield f"id: {event_id}\ndata: {data}\n\n"
                 except asyncio.TimeoutError:
                     yield f": keepalive {datetime.now(timezone.utc).isoformat()}\n\n"
@@ -238,7 +289,11 @@ async def telemetry_sse(
             stream_manager.unregister(sub)
             logger.info(
                 "telemetry_sse_disconnected",
-                extra={"tenant_id": tenant_id, "events_sent": sub.event_counter},
+                extra={
+                    "tenant_id": tenant_id,
+                    "events_sent": sub.event_counter,
+                    "events_dropped": sub.events_dropped,
+                },
             )
 
     return StreamingResponse(
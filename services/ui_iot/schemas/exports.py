@@ -45,8 +45,16 @@ class ExportCreateRequest(BaseModel):
     )
     format: str = Field(
         default="csv",
-        description="Output format",
-        pattern="^(json|csv)$",
+        description="Output format (parquet and arrow are telemetry-only)",
+        pattern="^(json|csv|ndjson|parquet|arrow)$",
+    )
+    compression: str = Field(
+        default="none",
+        description=(
+            "Compress the export file (gzip adds a .gz suffix; "
+            "parquet/arrow are always zstd-compressed internally)"
+        ),
+        pattern="^(none|gzip)$",
     )
     filters: ExportFilters = Field(
         default_factory=ExportFilters,
@@ -65,6 +73,7 @@ class ExportJobResponse(BaseModel):
     tenant_id: str
     export_type: str
     format: str
+    compression: str = "none"
     filters: dict
     status: str
     file_size_bytes: Optional[int] = None
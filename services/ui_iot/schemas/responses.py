@@ -38,6 +38,8 @@ class DeviceListResponse(BaseModel):
     total: int
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
 
 
 class DeviceDetailResponse(BaseModel):
@@ -73,6 +75,8 @@ class AlertListResponse(BaseModel):
     status_filter: str
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
 
 
 class AlertDetailResponse(BaseModel):
@@ -1,8 +1,18 @@
-"""Manages streaming telemetry connections via MQTT subscription.
+"""Manages streaming telemetry connections via NATS JetStream.
 
-Each connected client (WebSocket or SSE) gets an asyncio.Queue.
-The manager subscribes to MQTT topics for active tenants and distributes
-incoming messages to matching queues.
+Each connected client (WebSocket or SSE) gets a StreamSubscription.
+The manager opens an ephemeral ordered consumer on ``telemetry.<tenant_id>``
+for each tenant with local clients, so a UI replica only receives the tenants
+it is serving and adding replicas does not add load on the MQTT broker.
+Incoming messages are distributed to matching subscriptions according to
+their delivery mode:
+
+    raw       every event, bounded queue (default)
+    sample    every event, capped at max_rate events/second
+    conflate  latest value per device/metric, flushed at most every interval_ms
+
+Conflated subscriptions may use the "delta" frame format, which only carries
+metric values that changed since the previous frame.
 """
 
 from __future__ import annotations
@@ -10,28 +20,34 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-import os
 import threading
 import time
 from dataclasses import dataclass, field
 from typing import Optional
 
-import paho.mqtt.client as mqtt
-from shared.config import require_env, optional_env
+from nats.js.api import DeliverPolicy
+from shared.config import optional_env
 
 logger = logging.getLogger(__name__)
 
-MQTT_HOST = optional_env("MQTT_HOST", "iot-mqtt")
-MQTT_PORT = int(optional_env("MQTT_PORT", "1883"))
-MQTT_USERNAME = os.getenv("MQTT_USERNAME")
-MQTT_PASSWORD = require_env("MQTT_PASSWORD")
+STREAM_SUBJECT_PREFIX = optional_env("STREAM_SUBJECT_PREFIX", "telemetry")
 MAX_CONNECTIONS_PER_TENANT = int(optional_env("MAX_STREAM_CONNECTIONS_PER_TENANT", "10"))
 STREAM_QUEUE_SIZE = int(optional_env("STREAM_QUEUE_SIZE", "100"))
+STREAM_CONFLATE_INTERVAL_MS = int(optional_env("STREAM_CONFLATE_INTERVAL_MS", "500"))
+STREAM_MIN_CONFLATE_INTERVAL_MS = int(optional_env("STREAM_MIN_CONFLATE_INTERVAL_MS", "100"))
+STREAM_SAMPLE_MAX_RATE = float(optional_env("STREAM_SAMPLE_MAX_RATE", "10"))
+
+DELIVERY_MODES = ("raw", "sample", "conflate")
+FRAME_FORMATS = ("json", "delta")
 
 
-@dataclass
+@dataclass(eq=False)
 class StreamSubscription:
-    """Represents a single streaming client's subscription filters."""
+    """Represents a single streaming client's subscription filters and delivery mode.
+
+    Queue items are pre-serialized JSON event strings. Conflated subscriptions
+    bypass the queue and merge events into ``pending`` instead.
+    """
 
     tenant_id: str
     queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=STREAM_QUEUE_SIZE))
@@ -40,168 +56,380 @@ class StreamSubscription:
     metric_names: set = field(default_factory=set)  # empty = all metrics
     connected_at: float = field(default_factory=time.time)
     event_counter: int = 0
+    events_dropped: int = 0
+    mode: str = "raw"
+    interval_ms: int = STREAM_CONFLATE_INTERVAL_MS
+    max_rate: float = STREAM_SAMPLE_MAX_RATE
+    frame_format: str = "json"
+    pending: dict = field(default_factory=dict)  # device_id -> {"timestamp", "metrics"}
+    last_sent: dict = field(default_factory=dict)  # device_id -> metrics (delta format)
+    _pending_event: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _mode_changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _last_flush: float = 0.0
+    _tokens: float = 0.0
+    _tokens_at: float = 0.0
+
+    def configure(
+        self,
+        mode: str | None = None,
+        interval_ms: int | None = None,
+        max_rate: float | None = None,
+        frame_format: str | None = None,
+    ) -> None:
+        """Validate and apply delivery settings. Raises ValueError on bad input.
+
+        Nothing is applied unless every argument is valid.
+        """
+        mode = mode or self.mode
+        frame_format = frame_format or self.frame_format
+        if mode not in DELIVERY_MODES:
+            raise ValueError(f"mode must be one of {', '.join(DELIVERY_MODES)}")
+        if frame_format not in FRAME_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FRAME_FORMATS)}")
+        if frame_format == "delta" and mode != "conflate":
+            raise ValueError("delta format requires conflate mode")
+        if interval_ms is not None:
+            interval_ms = max(int(interval_ms), STREAM_MIN_CONFLATE_INTERVAL_MS)
+        if max_rate is not None:
+            if max_rate <= 0:
+                raise ValueError("max_rate must be positive")
+            max_rate = float(max_rate)
+
+        if interval_ms is not None:
+            self.interval_ms = interval_ms
+        if max_rate is not None:
+            self.max_rate = max_rate
+        if mode != self.mode:
+            # Events buffered under the old mode are not delivered under the new one.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.pending.clear()
+            self.last_sent.clear()
+            self._tokens = self.max_rate
+            self._tokens_at = time.monotonic()
+            self._mode_changed.set()
+        self.mode = mode
+        self.frame_format = frame_format
+        # Wake a getter blocked in conflate mode so it picks up the new mode.
+        self._pending_event.set()
+
+    def offer(self, data: str) -> None:
+        """Queue an encoded event (raw and sample modes), dropping on overflow."""
+        if self.mode == "sample":
+            now = time.monotonic()
+            self._tokens = min(self.max_rate, self._tokens + (now - self._tokens_at) * self.max_rate)
+            self._tokens_at = now
+            if self._tokens < 1.0:
+                self.events_dropped += 1
+                return
+            self._tokens -= 1.0
+        try:
+            self.queue.put_nowait(data)
+            self.event_counter += 1
+        except asyncio.QueueFull:
+            self.events_dropped += 1
+            logger.debug("Stream queue full for tenant=%s, dropping event", self.tenant_id)
+
+    def conflate(self, event: dict) -> None:
+        """Merge an event into the pending snapshot (conflate mode)."""
+        entry = self.pending.get(event["device_id"])
+        if entry is None:
+            self.pending[event["device_id"]] = {
+                "timestamp": event["timestamp"],
+                "metrics": dict(event["metrics"]),
+            }
+        else:
+            entry["timestamp"] = event["timestamp"]
+            entry["metrics"].update(event["metrics"])
+        self._pending_event.set()
+
+    def _take_batch(self) -> Optional[str]:
+        pending, self.pending = self.pending, {}
+        self._pending_event.clear()
+        if self.frame_format == "delta":
+            devices = {}
+            for device_id, entry in pending.items():
+                sent = self.last_sent.setdefault(device_id, {})
+                changed = {k: v for k, v in entry["metrics"].items() if sent.get(k, _MISSING) != v}
+                if changed:
+                    sent.update(changed)
+                    devices[device_id] = {"timestamp": entry["timestamp"], "metrics": changed}
+        else:
+            devices = pending
+        if not devices:
+            return None
+        self.event_counter += 1
+        return json.dumps({"type": "telemetry_batch", "format": self.frame_format, "devices": devices})
+
+    async def get(self, timeout: float) -> str:
+        """Return the next encoded frame. Raises asyncio.TimeoutError when idle.
+
+        A mode change while waiting re-dispatches to the new mode's wait.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            if self.mode == "conflate":
+                frame = await self._get_conflated(remaining)
+            else:
+                frame = await self._get_queued(remaining)
+            if frame is not None:
+                return frame
+
+    async def _get_queued(self, timeout: float) -> Optional[str]:
+        """Wait for a queued event; returns None on a mode change or timeout."""
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        self._mode_changed.clear()
+        getter = asyncio.ensure_future(self.queue.get())
+        changed = asyncio.ensure_future(self._mode_changed.wait())
+        try:
+            await asyncio.wait({getter, changed}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            getter.cancel()
+            changed.cancel()
+        if getter.done() and not getter.cancelled():
+            return getter.result()
+        return None
+
+    async def _get_conflated(self, timeout: float) -> Optional[str]:
+        """Wait for the next conflated batch; returns None on a mode change or empty batch."""
+        loop = asyncio.get_running_loop()
+        await asyncio.wait_for(self._pending_event.wait(), timeout=timeout)
+        if self.mode != "conflate":
+            return None
+        delay = self._last_flush + self.interval_ms / 1000 - loop.time()
+        if delay > 0:
+            # Sleep out the flush interval, but leave early on a mode change.
+            self._mode_changed.clear()
+            try:
+                await asyncio.wait_for(self._mode_changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            if self.mode != "conflate":
+                return None
+        self._last_flush = loop.time()
+        return self._take_batch()
+
+
+_MISSING = object()
+
+
+# Routing-index key for subscriptions without a device filter.
+ALL_DEVICES = None
 
 
 class TelemetryStreamManager:
-    """Manages MQTT subscriptions and distributes messages to streaming clients."""
+    """Manages NATS subscriptions and distributes messages to streaming clients.
+
+    Subscriptions are indexed tenant -> device_id -> subscribers so routing a
+    message only touches the clients interested in it.
+    """
 
     def __init__(self):
-        self._subscriptions: list[StreamSubscription] = []
+        self._by_tenant: dict[str, set[StreamSubscription]] = {}
+        self._index: dict[str, dict[Optional[str], set[StreamSubscription]]] = {}
         self._lock = threading.Lock()
-        self._loop: Optional[asyncio.AbstractEventLoop] = None
-        self._mqtt_client: Optional[mqtt.Client] = None
-        self._subscribed_tenants: set[str] = set()
+        self._nc = None
+        self._js = None
+        self._nats_subs: dict[str, object] = {}
+        self._sync_lock = asyncio.Lock()
+        self._sync_tasks: set[asyncio.Task] = set()
         self._started = False
 
-    def start(self, loop: asyncio.AbstractEventLoop) -> None:
-        """Start the MQTT client for telemetry streaming."""
+    async def start(self, nc) -> None:
+        """Attach to the process's shared NATS connection."""
         if self._started:
             return
-
-        self._loop = loop
-        self._mqtt_client = mqtt.Client(client_id="pulse-stream-manager")
-        if MQTT_USERNAME and MQTT_PASSWORD:
-            self._mqtt_client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
-        self._mqtt_client.on_connect = self._on_connect
-        self._mqtt_client.on_message = self._on_message
-
-        try:
-            self._mqtt_client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
-            self._mqtt_client.loop_start()
-            self._started = True
-            logger.info(
-                "TelemetryStreamManager MQTT connected to %s:%s",
-                MQTT_HOST,
-                MQTT_PORT,
-            )
-        except Exception as exc:
-            logger.warning("TelemetryStreamManager MQTT connect failed: %s", exc)
-
-    def stop(self) -> None:
-        """Stop the MQTT client."""
-        if self._mqtt_client:
-            try:
-                self._mqtt_client.loop_stop()
-            finally:
+        self._nc = nc
+        self._js = nc.jetstream()
+        self._started = True
+        logger.info("TelemetryStreamManager attached to NATS subject %s.*", STREAM_SUBJECT_PREFIX)
+        for tenant_id in list(self._by_tenant):
+            await self._sync_tenant(tenant_id)
+
+    async def stop(self) -> None:
+        """Remove all tenant consumers."""
+        for task in list(self._sync_tasks):
+            task.cancel()
+        async with self._sync_lock:
+            subs, self._nats_subs = self._nats_subs, {}
+            for nats_sub in subs.values():
                 try:
-                    self._mqtt_client.disconnect()
-                finally:
-                    self._started = False
+                    await nats_sub.unsubscribe()
+                except Exception:
+                    logger.debug("TelemetryStreamManager unsubscribe failed", exc_info=True)
+        self._started = False
 
-    def _on_connect(self, client, userdata, flags, rc):
-        """Re-subscribe to topics for all active tenants on reconnect."""
-        logger.info("TelemetryStreamManager MQTT connected, rc=%s", rc)
-        with self._lock:
-            tenants = list(self._subscribed_tenants)
-        for tenant_id in tenants:
-            topic = f"tenant/{tenant_id}/device/+/telemetry"
-            client.subscribe(topic)
-            logger.debug("Re-subscribed to %s", topic)
-
-    def _on_message(self, client, userdata, msg):
-        """Distribute incoming MQTT message to matching subscriber queues."""
+    def _schedule_sync(self, tenant_id: str) -> None:
+        if self._js is None:
+            return
+        task = asyncio.get_running_loop().create_task(self._sync_tenant(tenant_id))
+        self._sync_tasks.add(task)
+        task.add_done_callback(self._sync_tasks.discard)
+
+    async def _sync_tenant(self, tenant_id: str) -> None:
+        """Open or close the tenant's consumer to match whether it has local clients."""
+        async with self._sync_lock:
+            wanted = tenant_id in self._by_tenant
+            current = self._nats_subs.get(tenant_id)
+            subject = f"{STREAM_SUBJECT_PREFIX}.{tenant_id}"
+            if wanted and current is None and self._js is not None:
+                try:
+                    self._nats_subs[tenant_id] = await self._js.subscribe(
+                        subject,
+                        cb=self._on_nats_message,
+                        ordered_consumer=True,
+                        deliver_policy=DeliverPolicy.NEW,
+                    )
+                    logger.info("Subscribed to NATS subject: %s", subject)
+                except Exception as exc:
+                    logger.warning("TelemetryStreamManager subscribe failed for %s: %s", subject, exc)
+            elif not wanted and current is not None:
+                del self._nats_subs[tenant_id]
+                try:
+                    await current.unsubscribe()
+                except Exception:
+                    logger.debug("TelemetryStreamManager unsubscribe failed", exc_info=True)
+                logger.info("Unsubscribed from NATS subject: %s", subject)
+
+    async def _on_nats_message(self, msg) -> None:
+        """Route a telemetry envelope published by the bridge or HTTP ingest."""
+        tenant_id = msg.subject.rpartition(".")[2]
+        if tenant_id not in self._index:
+            return
         try:
-            payload = json.loads(msg.payload.decode("utf-8"))
+            envelope = json.loads(msg.data)
         except (json.JSONDecodeError, UnicodeDecodeError):
             return
-
-        parts = msg.topic.split("/")
-        if len(parts) < 5 or parts[0] != "tenant" or parts[2] != "device":
+        if envelope.get("msg_type") != "telemetry":
             return
+        device_id = envelope.get("device_id")
+        payload = envelope.get("payload")
+        if not device_id or not isinstance(payload, dict):
+            return
+        self._dispatch(tenant_id, device_id, payload, envelope.get("topic"))
 
-        tenant_id = parts[1]
-        device_id = parts[3]
-        msg_type = parts[4]
-        if msg_type != "telemetry":
+    def _dispatch(self, tenant_id: str, device_id: str, payload: dict, topic: Optional[str]) -> None:
+        """Route one telemetry message to interested subscribers."""
+        by_device = self._index.get(tenant_id)
+        if not by_device:
+            return
+        exact = by_device.get(device_id)
+        wildcard = by_device.get(ALL_DEVICES)
+        if not exact and not wildcard:
             return
 
         metrics = payload.get("metrics", {}) or {}
-        ts = payload.get("ts")
-
         event = {
             "type": "telemetry",
             "device_id": device_id,
             "tenant_id": tenant_id,
             "metrics": metrics,
-            "timestamp": ts,
-            "topic": msg.topic,
+            "timestamp": payload.get("ts"),
+            "topic": topic,
         }
 
-        loop = self._loop
-        if loop is None:
-            return
-
-        with self._lock:
-            subs = list(self._subscriptions)
-
-        for sub in subs:
-            if sub.tenant_id != tenant_id:
-                continue
-
-            if sub.device_ids and device_id not in sub.device_ids:
+        # Filter and serialize once per distinct metric filter; None marks "filtered out".
+        filtered: dict[frozenset, Optional[dict]] = {}
+        encoded: dict[frozenset, str] = {}
+        for subs in (exact, wildcard):
+            if not subs:
                 continue
-
-            # Metric filter: include only if at least one requested metric is present
-            if sub.metric_names:
-                filtered_metrics = {k: v for k, v in metrics.items() if k in sub.metric_names}
-                if not filtered_metrics:
+            for sub in subs:
+                key = frozenset(sub.metric_names)
+                if key not in filtered:
+                    filtered[key] = self._filter_event(event, metrics, key)
+                filtered_event = filtered[key]
+                if filtered_event is None:
                     continue
-                event_copy = {**event, "metrics": filtered_metrics}
-            else:
-                event_copy = event
-
-            def _enqueue(s: StreamSubscription = sub, e: dict = event_copy) -> None:
-                try:
-                    s.queue.put_nowait(e)
-                    s.event_counter += 1
-                except asyncio.QueueFull:
-                    logger.debug("Stream queue full for tenant=%s, dropping event", tenant_id)
-
-            # paho-mqtt callbacks run on a separate thread; enqueue on the asyncio loop thread.
-            loop.call_soon_threadsafe(_enqueue)
+                if sub.mode == "conflate":
+                    sub.conflate(filtered_event)
+                    continue
+                if key not in encoded:
+                    encoded[key] = json.dumps(filtered_event)
+                sub.offer(encoded[key])
+
+    @staticmethod
+    def _filter_event(event: dict, metrics: dict, metric_names: frozenset) -> Optional[dict]:
+        if not metric_names:
+            return event
+        # Metric filter: include only if at least one requested metric is present
+        filtered_metrics = {k: v for k, v in metrics.items() if k in metric_names}
+        if not filtered_metrics:
+            return None
+        return {**event, "metrics": filtered_metrics}
+
+    def _index_add(self, sub: StreamSubscription) -> None:
+        by_device = self._index.setdefault(sub.tenant_id, {})
+        for key in sub.device_ids or (ALL_DEVICES,):
+            by_device.setdefault(key, set()).add(sub)
+
+    def _index_remove(self, sub: StreamSubscription) -> None:
+        by_device = self._index.get(sub.tenant_id)
+        if by_device is None:
+            return
+        for key in sub.device_ids or (ALL_DEVICES,):
+            subs = by_device.get(key)
+            if subs is None:
+                continue
+            subs.discard(sub)
+            if not subs:
+                del by_device[key]
+        if not by_device:
+            del self._index[sub.tenant_id]
 
     def register(
         self,
         tenant_id: str,
         device_ids: list[str] | None = None,
         metric_names: list[str] | None = None,
+        mode: str = "raw",
+        interval_ms: int | None = None,
+        max_rate: float | None = None,
+        frame_format: str = "json",
     ) -> StreamSubscription:
-        """Register a new streaming subscription. Returns the subscription object."""
+        """Register a new streaming subscription. Returns the subscription object.
+
+        Raises ValueError for an invalid delivery mode/format and ConnectionError
+        when the tenant is at its connection limit.
+        """
+        sub = StreamSubscription(
+            tenant_id=tenant_id,
+            device_ids=set(device_ids) if device_ids else set(),
+            metric_names=set(metric_names) if metric_names else set(),
+        )
+        sub.configure(mode=mode, interval_ms=interval_ms, max_rate=max_rate, frame_format=frame_format)
+
         with self._lock:
-            tenant_count = sum(1 for s in self._subscriptions if s.tenant_id == tenant_id)
-            if tenant_count >= MAX_CONNECTIONS_PER_TENANT:
+            tenant_subs = self._by_tenant.setdefault(tenant_id, set())
+            if len(tenant_subs) >= MAX_CONNECTIONS_PER_TENANT:
                 raise ConnectionError(
                     f"Max streaming connections ({MAX_CONNECTIONS_PER_TENANT}) reached for tenant"
                 )
+            tenant_subs.add(sub)
+            self._index_add(sub)
 
-            sub = StreamSubscription(
-                tenant_id=tenant_id,
-                device_ids=set(device_ids) if device_ids else set(),
-                metric_names=set(metric_names) if metric_names else set(),
-            )
-            self._subscriptions.append(sub)
-
-        if tenant_id not in self._subscribed_tenants and self._mqtt_client:
-            topic = f"tenant/{tenant_id}/device/+/telemetry"
-            self._mqtt_client.subscribe(topic)
-            self._subscribed_tenants.add(tenant_id)
-            logger.info("Subscribed to MQTT topic: %s", topic)
+        if tenant_id not in self._nats_subs:
+            self._schedule_sync(tenant_id)
 
         return sub
 
     def unregister(self, sub: StreamSubscription) -> None:
         """Remove a streaming subscription."""
         with self._lock:
-            if sub in self._subscriptions:
-                self._subscriptions.remove(sub)
+            tenant_subs = self._by_tenant.get(sub.tenant_id)
+            if tenant_subs is not None and sub in tenant_subs:
+                tenant_subs.discard(sub)
+                self._index_remove(sub)
+                if not tenant_subs:
+                    del self._by_tenant[sub.tenant_id]
 
-            remaining = sum(1 for s in self._subscriptions if s.tenant_id == sub.tenant_id)
-            if remaining == 0 and sub.tenant_id in self._subscribed_tenants:
-                if self._mqtt_client:
-                    topic = f"tenant/{sub.tenant_id}/device/+/telemetry"
-                    self._mqtt_client.unsubscribe(topic)
-                self._subscribed_tenants.discard(sub.tenant_id)
-                logger.info("Unsubscribed from MQTT topic for tenant=%s", sub.tenant_id)
+        if sub.tenant_id not in self._by_tenant:
+            self._schedule_sync(sub.tenant_id)
 
     def update_filters(
         self,
@@ -211,19 +439,24 @@ class TelemetryStreamManager:
     ) -> None:
         """Update subscription filters."""
         with self._lock:
+            registered = sub in self._by_tenant.get(sub.tenant_id, ())
             if device_ids is not None:
+                if registered:
+                    self._index_remove(sub)
                 sub.device_ids = set(device_ids)
+                if registered:
+                    self._index_add(sub)
             if metric_names is not None:
                 sub.metric_names = set(metric_names)
 
     @property
     def connection_count(self) -> int:
         with self._lock:
-            return len(self._subscriptions)
+            return sum(len(subs) for subs in self._by_tenant.values())
 
     def tenant_connection_count(self, tenant_id: str) -> int:
         with self._lock:
-            return sum(1 for s in self._subscriptions if s.tenant_id == tenant_id)
+            return len(self._by_tenant.get(tenant_id, ()))
 
 
 # Singleton instance
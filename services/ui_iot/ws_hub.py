@@ -0,0 +1,158 @@
+"""Shared fan-out hub for /api/v2/ws push updates.
+
+LISTEN notifications mark tenants dirty. The hub then computes each
+(tenant, topic) payload once on a single tenant connection, serializes it
+once, and hands the same frame to every subscribed WebSocket through that
+connection's bounded send queue. DB load scales with the number of active
+tenants instead of the number of open dashboards.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+from fastapi.encoders import jsonable_encoder
+
+from db.fleet_counters import fetch_fleet_counters
+from db.pool import tenant_connection
+from db.queries import fetch_alerts
+from db.telemetry_queries import fetch_devices_telemetry_latest
+from shared.metrics import ws_fanout_refresh_seconds
+from ws_manager import ConnectionManager, WSConnection
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_fleet_summary_for_tenant(conn, tenant_id: str) -> dict:
+    """Fetch fleet summary payload for websocket fleet subscribers."""
+    counters = await fetch_fleet_counters(conn, tenant_id)
+    return {
+        "ONLINE": int(counters["devices_online"]),
+        "STALE": int(counters["devices_stale"]),
+        "OFFLINE": int(counters["devices_offline"]),
+        "total": int(counters["devices_total"]),
+        "active_alerts": int(counters["alerts_open"]) + int(counters["alerts_acknowledged"]),
+    }
+
+
+def _encode(message: dict) -> str:
+    return json.dumps(jsonable_encoder(message))
+
+
+class WSFanoutHub:
+    """Computes WebSocket payloads once per tenant and fans them out."""
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        get_pool: Callable[[], Awaitable[asyncpg.Pool]],
+        refresh_seconds: float,
+    ):
+        self._manager = manager
+        self._get_pool = get_pool
+        self._refresh_seconds = refresh_seconds
+        self._dirty: set[str] = set()
+        self._all_dirty = False
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self, tenant_id: str | None = None) -> None:
+        """Schedule a refresh for one tenant, or for every tenant when None."""
+        if tenant_id:
+            self._dirty.add(tenant_id)
+        else:
+            self._all_dirty = True
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ws_fanout_hub")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self._refresh_seconds)
+                except asyncio.TimeoutError:
+                    # Periodic refresh keeps idle dashboards current even without NOTIFY.
+                    self._all_dirty = True
+                self._wake.clear()
+                await self.refresh_dirty()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("[ws] fan-out hub cycle failed")
+
+    async def refresh_dirty(self) -> None:
+        """Refresh every dirty tenant that currently has subscribers."""
+        by_tenant = self._manager.connections_by_tenant()
+        if self._all_dirty:
+            tenants = set(by_tenant)
+        else:
+            tenants = self._dirty & set(by_tenant)
+        self._dirty.clear()
+        self._all_dirty = False
+
+        for tenant_id in tenants:
+            try:
+                await self.refresh_tenant(tenant_id, by_tenant[tenant_id])
+            except Exception:
+                logger.debug("[ws] refresh failed for tenant=%s", tenant_id, exc_info=True)
+
+    async def refresh_tenant(self, tenant_id: str, conns: list[WSConnection]) -> None:
+        """Compute each subscribed topic once for the tenant and enqueue it to subscribers."""
+        device_ids: set[str] = set()
+        want_alerts = False
+        want_fleet = False
+        for conn in conns:
+            device_ids.update(conn.device_subscriptions)
+            want_alerts = want_alerts or conn.alert_subscription
+            want_fleet = want_fleet or conn.fleet_subscription
+        if not device_ids and not want_alerts and not want_fleet:
+            return
+
+        started = time.perf_counter()
+        latest: dict[str, dict] = {}
+        alerts: list[dict] | None = None
+        summary: dict | None = None
+        pool = await self._get_pool()
+        async with tenant_connection(pool, tenant_id) as db_conn:
+            if device_ids:
+                latest = await fetch_devices_telemetry_latest(db_conn, tenant_id, sorted(device_ids))
+            if want_alerts:
+                alerts = await fetch_alerts(db_conn, tenant_id, status="OPEN", limit=100)
+            if want_fleet:
+                summary = await fetch_fleet_summary_for_tenant(db_conn, tenant_id)
+
+        telemetry_frames = {
+            device_id: _encode({"type": "telemetry", "device_id": device_id, "data": data})
+            for device_id, data in latest.items()
+        }
+        alerts_frame = _encode({"type": "alerts", "alerts": alerts}) if alerts is not None else None
+        fleet_frame = _encode({"type": "fleet_summary", "data": summary}) if summary is not None else None
+
+        for conn in conns:
+            for device_id in conn.device_subscriptions:
+                frame = telemetry_frames.get(device_id)
+                if frame is not None:
+                    self._manager.enqueue(conn, frame)
+            if alerts_frame is not None and conn.alert_subscription:
+                self._manager.enqueue(conn, alerts_frame)
+            if fleet_frame is not None and conn.fleet_subscription:
+                self._manager.enqueue(conn, fleet_frame)
+
+        ws_fanout_refresh_seconds.observe(time.perf_counter() - started)
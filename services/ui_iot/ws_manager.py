@@ -1,10 +1,16 @@
+import asyncio
 import logging
+import os
 from dataclasses import dataclass, field
 
 from starlette.websockets import WebSocket
 
+from shared.metrics import ws_frames_dropped_total
+
 logger = logging.getLogger(__name__)
 
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "32"))
+
 
 @dataclass
 class WSConnection:
@@ -15,6 +21,8 @@ class WSConnection:
     device_subscriptions: set = field(default_factory=set)
     alert_subscription: bool = False
     fleet_subscription: bool = False
+    send_queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE))
+    frames_dropped: int = 0
 
 
 class ConnectionManager:
@@ -61,6 +69,32 @@ class ConnectionManager:
         """Disable fleet summary push for this connection."""
         conn.fleet_subscription = False
 
+    def enqueue(self, conn: WSConnection, frame: str) -> None:
+        """Queue a pre-serialized frame for a connection without blocking.
+
+        Frames are full snapshots, so when a slow client's queue is full the
+        oldest frame is discarded in favour of the newest one.
+        """
+        queue = conn.send_queue
+        while True:
+            try:
+                queue.put_nowait(frame)
+                return
+            except asyncio.QueueFull:
+                try:
+                    queue.get_nowait()
+                    conn.frames_dropped += 1
+                    ws_frames_dropped_total.inc()
+                except asyncio.QueueEmpty:
+                    pass
+
+    def connections_by_tenant(self) -> dict[str, list[WSConnection]]:
+        """Group active connections by tenant."""
+        grouped: dict[str, list[WSConnection]] = {}
+        for conn in self.connections:
+            grouped.setdefault(conn.tenant_id, []).append(conn)
+        return grouped
+
     async def broadcast_fleet_summary(self, tenant_id: str, summary: dict) -> None:
         """Push fleet summary to all fleet-subscribed connections for a tenant."""
         stale: list[WSConnection] = []
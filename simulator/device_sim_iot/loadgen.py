@@ -0,0 +1,455 @@
+"""
+High-rate load generator for capacity-testing ingest.
+
+The regular simulator (simulator.py) models device behaviour with one
+asyncio task per device and tops out at a few thousand msgs/s. This mode
+trades realism for rate:
+
+- The fleet is sharded across LOADGEN_PROCESSES worker processes, each
+  sending LOADGEN_RATE / LOADGEN_PROCESSES msgs/s for its share of devices.
+- Each device's payload is serialized once into a byte template; a send only
+  splices in the timestamp and sequence number.
+- Sends follow an open-loop schedule: message i is due at start + i/rate
+  whether or not earlier sends have been acknowledged. Latency is measured
+  from the *scheduled* send time, so a stalled broker shows up as latency
+  instead of silently lowering the offered rate (no coordinated omission).
+
+Transports (LOADGEN_TRANSPORT):
+    mqtt  publish to tenant/{tenant}/device/{device}/telemetry via the broker.
+          Ack latency is the PUBACK round trip at QoS 1; at QoS 0 it only
+          covers handing the message to the socket.
+    nats  publish the bridge envelope straight to JetStream telemetry.{tenant},
+          skipping MQTT and the bridge. Ack latency is the JetStream PubAck
+          round trip (LOADGEN_NATS_ACK=0 uses core publish, no ack).
+
+Run with SIM_MODE=loadgen via simulator.py, or `python loadgen.py`. Devices
+use the simulator's deterministic tokens (tok-<device_id>), so register them
+first or run ingest with AUTO_PROVISION=1 and REQUIRE_TOKEN=0.
+"""
+
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+MQTT_HOST = os.getenv("MQTT_HOST", "iot-mqtt")
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+NATS_URL = os.getenv("NATS_URL", "nats://iot-nats:4222")
+
+LOADGEN_TRANSPORT = os.getenv("LOADGEN_TRANSPORT", "mqtt")
+LOADGEN_RATE = float(os.getenv("LOADGEN_RATE", "10000"))
+LOADGEN_DURATION_SECONDS = float(os.getenv("LOADGEN_DURATION_SECONDS", "60"))
+LOADGEN_PROCESSES = int(os.getenv("LOADGEN_PROCESSES", str(os.cpu_count() or 1)))
+LOADGEN_TENANTS = int(os.getenv("LOADGEN_TENANTS", "1"))
+LOADGEN_TENANT_PREFIX = os.getenv("LOADGEN_TENANT_PREFIX", "loadgen-tenant")
+LOADGEN_DEVICES_PER_TENANT = int(os.getenv("LOADGEN_DEVICES_PER_TENANT", "1000"))
+LOADGEN_SITES_PER_TENANT = int(os.getenv("LOADGEN_SITES_PER_TENANT", "5"))
+LOADGEN_METRICS = int(os.getenv("LOADGEN_METRICS", "4"))
+LOADGEN_MESSAGE_BYTES = int(os.getenv("LOADGEN_MESSAGE_BYTES", "0"))
+LOADGEN_MQTT_QOS = int(os.getenv("LOADGEN_MQTT_QOS", "1"))
+LOADGEN_NATS_ACK = os.getenv("LOADGEN_NATS_ACK", "1") == "1"
+LOADGEN_MAX_IN_FLIGHT = int(os.getenv("LOADGEN_MAX_IN_FLIGHT", "10000"))
+LOADGEN_REPORT_PATH = os.getenv("LOADGEN_REPORT_PATH", "")
+
+# Sends due at the same moment are issued in batches of at most this many
+# before the scheduler re-reads the clock.
+MAX_SEND_BATCH = 1000
+
+
+class LatencyHistogram:
+    """Log-linear histogram in microseconds (4 buckets per power of two), mergeable across processes."""
+
+    SUB_BUCKETS = 4
+    MAX_BUCKETS = 40 * SUB_BUCKETS  # up to ~2^40 us
+
+    def __init__(self, counts=None):
+        self.counts = list(counts) if counts is not None else [0] * self.MAX_BUCKETS
+        self.total = sum(self.counts)
+        self.max_us = 0.0
+
+    def _index(self, us: float) -> int:
+        if us < 1.0:
+            return 0
+        return min(int(math.log2(us) * self.SUB_BUCKETS), self.MAX_BUCKETS - 1)
+
+    def record(self, seconds: float) -> None:
+        us = max(seconds, 0.0) * 1_000_000
+        self.counts[self._index(us)] += 1
+        self.total += 1
+        if us > self.max_us:
+            self.max_us = us
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+        self.max_us = max(self.max_us, other.max_us)
+
+    def bucket_upper_us(self, index: int) -> float:
+        return 2 ** ((index + 1) / self.SUB_BUCKETS)
+
+    def percentile_ms(self, pct: float) -> float:
+        if self.total == 0:
+            return 0.0
+        target = math.ceil(pct / 100.0 * self.total)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.bucket_upper_us(i), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def summary(self) -> dict:
+        return {
+            "count": self.total,
+            "p50_ms": round(self.percentile_ms(50), 3),
+            "p90_ms": round(self.percentile_ms(90), 3),
+            "p99_ms": round(self.percentile_ms(99), 3),
+            "p999_ms": round(self.percentile_ms(99.9), 3),
+            "max_ms": round(self.max_us / 1000.0, 3),
+        }
+
+
+class OpenLoopSchedule:
+    """Message i is due at start + i / rate, independent of how earlier sends went."""
+
+    def __init__(self, rate: float, start: float):
+        self.rate = rate
+        self.start = start
+        self.next_index = 0
+
+    def intended(self, index: int) -> float:
+        return self.start + index / self.rate
+
+    def due(self, now: float) -> range:
+        """Indices due by ``now`` that have not been issued yet (at most MAX_SEND_BATCH)."""
+        due_count = int((now - self.start) * self.rate) + 1 if now >= self.start else 0
+        end = min(due_count, self.next_index + MAX_SEND_BATCH)
+        issued = range(self.next_index, max(end, self.next_index))
+        self.next_index = issued.stop
+        return issued
+
+    def next_time(self) -> float:
+        return self.intended(self.next_index)
+
+
+def build_fleet(shard: int = 0, shards: int = 1) -> list[dict]:
+    """Devices owned by ``shard``: every ``shards``-th device of the full fleet."""
+    fleet = []
+    index = 0
+    for t in range(LOADGEN_TENANTS):
+        tenant_id = f"{LOADGEN_TENANT_PREFIX}-{t + 1:03d}"
+        for d in range(LOADGEN_DEVICES_PER_TENANT):
+            if index % shards == shard:
+                site_id = f"lg-site-{(d % LOADGEN_SITES_PER_TENANT) + 1}"
+                fleet.append(
+                    {
+                        "tenant_id": tenant_id,
+                        "site_id": site_id,
+                        "device_id": f"{site_id}-lg-{d + 1:06d}",
+                    }
+                )
+            index += 1
+    return fleet
+
+
+class PayloadTemplate:
+    """A device's telemetry message, serialized once; ``render`` splices in ts and seq."""
+
+    __slots__ = ("topic", "subject", "_head", "_tail")
+
+    def __init__(self, device: dict, envelope: bool, metrics: int, message_bytes: int, rng: random.Random):
+        tenant_id = device["tenant_id"]
+        device_id = device["device_id"]
+        self.topic = f"tenant/{tenant_id}/device/{device_id}/telemetry"
+        self.subject = f"telemetry.{tenant_id}"
+        body = {
+            "site_id": device["site_id"],
+            "provision_token": f"tok-{device_id}",
+            "metrics": {f"metric_{i}": round(rng.uniform(0, 100), 3) for i in range(metrics)},
+        }
+        tail = json.dumps(body, separators=(",", ":"))[1:]
+        # '{"ts":"<iso>","seq":<n>,' + tail; pad up to the requested size.
+        natural = len(tail) + len('{"ts":"2026-01-01T00:00:00.000000+00:00","seq":1000000,')
+        if message_bytes > natural + len(',"pad":""'):
+            body["pad"] = "x" * (message_bytes - natural - len(',"pad":""'))
+            tail = json.dumps(body, separators=(",", ":"))[1:]
+        self._head = b'{"ts":"'
+        self._tail = b"," + tail.encode()
+        if envelope:
+            prefix = json.dumps(
+                {
+                    "topic": self.topic,
+                    "tenant_id": tenant_id,
+                    "device_id": device_id,
+                    "msg_type": "telemetry",
+                    "username": "",
+                },
+                separators=(",", ":"),
+            )[:-1]
+            self._head = prefix.encode() + b',"payload":' + self._head
+            self._tail = self._tail + b"}"
+
+    def render(self, ts: bytes, seq: int) -> bytes:
+        return b"".join((self._head, ts, b'","seq":', b"%d" % seq, self._tail))
+
+
+class _IsoClock:
+    """ISO-8601 timestamp bytes, rebuilt at most once per millisecond."""
+
+    def __init__(self):
+        self._ms = -1
+        self._value = b""
+
+    def now(self) -> bytes:
+        now = time.time()
+        ms = int(now * 1000)
+        if ms != self._ms:
+            self._ms = ms
+            self._value = datetime.fromtimestamp(now, timezone.utc).isoformat().encode()
+        return self._value
+
+
+class ShardStats:
+    def __init__(self, duration: float):
+        self.sent_per_second = [0] * (int(math.ceil(duration)) + 1)
+        self.latency = LatencyHistogram()
+        self.sent = 0
+        self.acked = 0
+        self.errors = 0
+
+    def count_send(self, start: float) -> None:
+        self.sent += 1
+        second = int(time.perf_counter() - start)
+        if 0 <= second < len(self.sent_per_second):
+            self.sent_per_second[second] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "sent_per_second": self.sent_per_second,
+            "latency_counts": self.latency.counts,
+            "latency_max_us": self.latency.max_us,
+            "sent": self.sent,
+            "acked": self.acked,
+            "errors": self.errors,
+        }
+
+
+def _run_mqtt_shard(templates: list[PayloadTemplate], rate: float, duration: float, stats: ShardStats) -> None:
+    import paho.mqtt.client as mqtt
+
+    acks: deque = deque()
+    client = mqtt.Client()
+    client.max_inflight_messages_set(LOADGEN_MAX_IN_FLIGHT)
+    # Runs on paho's network thread; only appends, matching happens below.
+    client.on_publish = lambda _client, _userdata, mid: acks.append((mid, time.perf_counter()))
+    client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
+    client.loop_start()
+
+    pending: dict[int, float] = {}
+    early: dict[int, float] = {}
+
+    def match_acks():
+        while acks:
+            mid, acked_at = acks.popleft()
+            intended = pending.pop(mid, None)
+            if intended is None:
+                early[mid] = acked_at
+                continue
+            stats.acked += 1
+            stats.latency.record(acked_at - intended)
+
+    clock = _IsoClock()
+    seqs = [0] * len(templates)
+    schedule = OpenLoopSchedule(rate, time.perf_counter() + 0.1)
+    end = schedule.start + duration
+    try:
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            ts = clock.now()
+            for i in schedule.due(now):
+                intended = schedule.intended(i)
+                slot = i % len(templates)
+                seqs[slot] += 1
+                template = templates[slot]
+                info = client.publish(template.topic, template.render(ts, seqs[slot]), qos=LOADGEN_MQTT_QOS)
+                stats.count_send(schedule.start)
+                if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                    stats.errors += 1
+                    continue
+                acked_at = early.pop(info.mid, None)
+                if acked_at is not None:
+                    stats.acked += 1
+                    stats.latency.record(acked_at - intended)
+                else:
+                    pending[info.mid] = intended
+            match_acks()
+            delay = schedule.next_time() - time.perf_counter()
+            if delay > 0:
+                time.sleep(min(delay, 0.01))
+        drain_until = time.perf_counter() + 5.0
+        while pending and time.perf_counter() < drain_until:
+            match_acks()
+            time.sleep(0.01)
+        match_acks()
+        stats.errors += len(pending)
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+
+async def _run_nats_shard(templates: list[PayloadTemplate], rate: float, duration: float, stats: ShardStats) -> None:
+    import nats
+
+    nc = await nats.connect(NATS_URL)
+    js = nc.jetstream(publish_async_max_pending=LOADGEN_MAX_IN_FLIGHT)
+    in_flight: set = set()
+
+    def on_ack(intended):
+        def done(future):
+            in_flight.discard(future)
+            if future.cancelled() or future.exception() is not None:
+                stats.errors += 1
+                return
+            stats.acked += 1
+            stats.latency.record(time.perf_counter() - intended)
+
+        return done
+
+    clock = _IsoClock()
+    seqs = [0] * len(templates)
+    schedule = OpenLoopSchedule(rate, time.perf_counter() + 0.1)
+    end = schedule.start + duration
+    try:
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            ts = clock.now()
+            for i in schedule.due(now):
+                intended = schedule.intended(i)
+                slot = i % len(templates)
+                seqs[slot] += 1
+                template = templates[slot]
+                payload = template.render(ts, seqs[slot])
+                stats.count_send(schedule.start)
+                try:
+                    if LOADGEN_NATS_ACK:
+                        future = await js.publish_async(template.subject, payload, wait_stall=1.0)
+                        in_flight.add(future)
+                        future.add_done_callback(on_ack(intended))
+                    else:
+                        await nc.publish(template.subject, payload)
+                        stats.latency.record(time.perf_counter() - intended)
+                except Exception:
+                    stats.errors += 1
+            await asyncio.sleep(max(0.0, schedule.next_time() - time.perf_counter()))
+        if in_flight:
+            await asyncio.wait(list(in_flight), timeout=5.0)
+        stats.errors += len(in_flight)
+    finally:
+        await nc.drain()
+
+
+def run_shard(shard: int, shards: int, rate: float, duration: float, results) -> None:
+    fleet = build_fleet(shard, shards)
+    stats = ShardStats(duration)
+    if not fleet:
+        results.put(stats.to_dict())
+        return
+    rng = random.Random(shard)
+    envelope = LOADGEN_TRANSPORT == "nats"
+    templates = [PayloadTemplate(d, envelope, LOADGEN_METRICS, LOADGEN_MESSAGE_BYTES, rng) for d in fleet]
+    try:
+        if LOADGEN_TRANSPORT == "nats":
+            asyncio.run(_run_nats_shard(templates, rate, duration, stats))
+        else:
+            _run_mqtt_shard(templates, rate, duration, stats)
+    except Exception as exc:
+        print(f"[loadgen] shard {shard} failed: {exc}")
+        stats.errors += 1
+    results.put(stats.to_dict())
+
+
+def merge_shards(shard_results: list[dict], duration: float) -> dict:
+    sent_per_second = [0] * (int(math.ceil(duration)) + 1)
+    latency = LatencyHistogram()
+    totals = {"sent": 0, "acked": 0, "errors": 0}
+    for result in shard_results:
+        for second, count in enumerate(result["sent_per_second"]):
+            sent_per_second[second] += count
+        shard_latency = LatencyHistogram(result["latency_counts"])
+        shard_latency.max_us = result["latency_max_us"]
+        latency.merge(shard_latency)
+        for key in totals:
+            totals[key] += result[key]
+    # The last slot only holds the partial final second.
+    full_seconds = sent_per_second[: int(duration)] or sent_per_second
+    return {
+        **totals,
+        "offered_rate": LOADGEN_RATE,
+        "achieved_rate": round(totals["sent"] / duration, 1) if duration > 0 else 0.0,
+        "send_rate": {
+            "min": min(full_seconds),
+            "mean": round(sum(full_seconds) / len(full_seconds), 1),
+            "max": max(full_seconds),
+            "per_second": sent_per_second,
+        },
+        "ack_latency": latency.summary(),
+        "ack_latency_histogram": [
+            {"le_ms": round(latency.bucket_upper_us(i) / 1000.0, 4), "count": count}
+            for i, count in enumerate(latency.counts)
+            if count
+        ],
+    }
+
+
+def main():
+    shards = max(1, LOADGEN_PROCESSES)
+    rate = LOADGEN_RATE / shards
+    print(
+        f"[loadgen] transport={LOADGEN_TRANSPORT} rate={LOADGEN_RATE:.0f}/s "
+        f"duration={LOADGEN_DURATION_SECONDS:.0f}s processes={shards} "
+        f"tenants={LOADGEN_TENANTS} devices={LOADGEN_TENANTS * LOADGEN_DEVICES_PER_TENANT}"
+    )
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=run_shard,
+            args=(shard, shards, rate, LOADGEN_DURATION_SECONDS, results),
+        )
+        for shard in range(shards)
+    ]
+    for proc in procs:
+        proc.start()
+    shard_results = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    report = merge_shards(shard_results, LOADGEN_DURATION_SECONDS)
+    latency = report["ack_latency"]
+    send_rate = report["send_rate"]
+    print(
+        f"[loadgen] sent={report['sent']} acked={report['acked']} errors={report['errors']} "
+        f"achieved={report['achieved_rate']}/s "
+        f"send_rate(min/mean/max)={send_rate['min']}/{send_rate['mean']}/{send_rate['max']}"
+    )
+    print(
+        f"[loadgen] ack_latency p50={latency['p50_ms']}ms p90={latency['p90_ms']}ms "
+        f"p99={latency['p99_ms']}ms p99.9={latency['p999_ms']}ms max={latency['max_ms']}ms"
+    )
+    if LOADGEN_REPORT_PATH:
+        with open(LOADGEN_REPORT_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[loadgen] report written to {LOADGEN_REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
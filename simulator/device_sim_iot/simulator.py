@@ -36,6 +36,9 @@ FAILURE_DOWNTIME_MAX_SECONDS = int(os.getenv("FAILURE_DOWNTIME_MAX_SECONDS", "30
 
 LOG_STATS_SECONDS = int(os.getenv("LOG_STATS_SECONDS", "30"))
 
+# devices: per-device behaviour model (below); loadgen: high-rate load generator (loadgen.py)
+SIM_MODE = os.getenv("SIM_MODE", "devices")
+
 
 def clamp(v, lo, hi):
     return max(lo, min(hi, v))
@@ -259,4 +262,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if SIM_MODE == "loadgen":
+        import loadgen
+
+        loadgen.main()
+    else:
+        asyncio.run(main())
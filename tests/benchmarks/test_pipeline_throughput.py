@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from tests.benchmarks import pipeline_harness as harness
+
+pytestmark = [pytest.mark.benchmark]
+
+ROUNDS = 3
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+@pytest.fixture(scope="module")
+def jetstream(loop):
+    ctx = harness.open_jetstream()
+    js, backend = loop.run_until_complete(ctx.__aenter__())
+    yield js, backend
+    loop.run_until_complete(ctx.__aexit__(None, None, None))
+
+
+@pytest.fixture(scope="module")
+def pipeline_pool(loop):
+    pool = loop.run_until_complete(harness.open_db_pool())
+    if pool is None:
+        pytest.skip(f"Postgres not reachable at {harness.DATABASE_URL}")
+    loop.run_until_complete(harness.cleanup_db(pool))
+    loop.run_until_complete(harness.seed_devices(pool))
+    yield pool
+    loop.run_until_complete(harness.cleanup_db(pool))
+    loop.run_until_complete(pool.close())
+
+
+def _run_stage(benchmark, loop, make_coro, **extra):
+    results = []
+
+    def runner():
+        results.append(loop.run_until_complete(make_coro()))
+
+    benchmark.pedantic(runner, rounds=ROUNDS, iterations=1, warmup_rounds=1)
+    # Drop the warmup round: caches and prepared statements are cold in it.
+    # With --benchmark-disable pedantic runs once, so keep that single round.
+    summary = harness.merge_results(results[1:] or results).summary()
+    benchmark.extra_info.update(summary, **extra)
+    assert summary["messages"] > 0
+    return summary
+
+
+def test_benchmark_pipeline_bridge(benchmark, loop, jetstream):
+    js, backend = jetstream
+    _run_stage(benchmark, loop, lambda: harness.run_bridge_stage(js), jetstream=backend)
+
+
+def test_benchmark_pipeline_ingest(benchmark, loop, jetstream, pipeline_pool):
+    js, backend = jetstream
+    _run_stage(benchmark, loop, lambda: harness.run_ingest_stage(js, pipeline_pool), jetstream=backend)
+
+
+def test_benchmark_pipeline_batch_writer(benchmark, loop, pipeline_pool):
+    _run_stage(benchmark, loop, lambda: harness.run_batch_writer_stage(pipeline_pool))
+
+
+def test_benchmark_pipeline_evaluator(benchmark, loop, pipeline_pool):
+    loop.run_until_complete(harness.seed_telemetry(pipeline_pool))
+    summary = _run_stage(benchmark, loop, lambda: harness.run_evaluator_stage(pipeline_pool))
+    assert summary["messages"] % harness.BENCH_DEVICES == 0
+
+
+def test_benchmark_pipeline_delivery(benchmark, loop, jetstream):
+    js, backend = jetstream
+    _run_stage(benchmark, loop, lambda: harness.run_delivery_stage(js), jetstream=backend)
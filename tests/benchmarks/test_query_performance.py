@@ -9,6 +9,8 @@ import time
 import asyncpg
 import pytest
 
+from shared.db_context import set_db_context
+
 pytestmark = [pytest.mark.benchmark, pytest.mark.asyncio]
 
 DATABASE_URL = os.getenv(
@@ -292,3 +294,35 @@ def test_benchmark_rls_overhead(benchmark, db_context):
     print(
         f"RLS overhead p95: {overhead_ms:.2f}ms (with={p95_with_rls:.2f}ms, without={p95_without_rls:.2f}ms)"
     )
+
+
+def test_benchmark_tenant_context_setup(benchmark, db_context):
+    """Per-request cost of entering a tenant RLS context: one statement vs two."""
+    loop, conn = db_context
+    tenant_id = TENANTS[0]
+
+    async def _combined():
+        async with conn.transaction():
+            await set_db_context(conn, role="pulse_app", tenant_id=tenant_id)
+
+    async def _separate():
+        async with conn.transaction():
+            await conn.execute("SET LOCAL ROLE pulse_app")
+            await conn.execute("SELECT set_config('app.tenant_id', $1, true)", tenant_id)
+
+    benchmark.pedantic(lambda: loop.run_until_complete(_combined()), rounds=50, warmup_rounds=3)
+    p95_combined = _p95_ms(benchmark)
+
+    timings = []
+    for _ in range(50):
+        start = time.perf_counter()
+        loop.run_until_complete(_separate())
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    index = max(int(math.ceil(0.95 * len(timings))) - 1, 0)
+    p95_separate = timings[index] * 1000.0
+    print(
+        f"Tenant context setup p95: {p95_combined:.2f}ms single statement, "
+        f"{p95_separate:.2f}ms separate (saved {p95_separate - p95_combined:.2f}ms)"
+    )
+    assert p95_combined < 50
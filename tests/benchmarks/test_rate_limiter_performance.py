@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from shared.rate_limiter import GcraWindow, RateLimiter
+
+pytestmark = [pytest.mark.benchmark]
+
+GLOBAL_LIMIT = 10_000
+
+
+class _ListWindow:
+    """The previous timestamp-list window, kept here as the comparison point."""
+
+    def __init__(self):
+        self.timestamps = []
+        self.lock = threading.Lock()
+
+    def add_request(self, now, window_seconds, max_requests):
+        with self.lock:
+            cutoff = now - window_seconds
+            self.timestamps = [ts for ts in self.timestamps if ts > cutoff]
+            if len(self.timestamps) >= max_requests:
+                return False, len(self.timestamps)
+            self.timestamps.append(now)
+            return True, len(self.timestamps)
+
+
+def _saturated_runner(window):
+    # Keep the window full at the global limit, as under sustained ingest load.
+    clock = {"now": 1000.0}
+    step = 1.0 / GLOBAL_LIMIT
+
+    def runner():
+        clock["now"] += step
+        return window.add_request(clock["now"], 1.0, GLOBAL_LIMIT)
+
+    for _ in range(GLOBAL_LIMIT):
+        runner()
+    return runner
+
+
+def test_benchmark_gcra_window_at_global_limit(benchmark):
+    benchmark(_saturated_runner(GcraWindow()))
+    assert benchmark.stats.stats.mean < 0.0001
+
+
+def test_benchmark_list_window_at_global_limit(benchmark):
+    benchmark.pedantic(_saturated_runner(_ListWindow()), rounds=200, warmup_rounds=5)
+
+
+def test_benchmark_check_all_known_device(benchmark):
+    limiter = RateLimiter()
+    limiter.config["global"].requests = 10**9
+    limiter.config["device"].requests = 10**9
+    limiter.config["ip_known"].requests = 10**9
+    devices = [f"device-{i}" for i in range(1000)]
+    state = {"i": 0}
+
+    def runner():
+        state["i"] += 1
+        return limiter.check_all(devices[state["i"] % len(devices)], "10.0.0.1", True)
+
+    benchmark(runner)
+    assert benchmark.stats.stats.mean < 0.0005
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db.analytics_planner import build_analytics_sql, floor_to_bucket, plan_analytics_query
+
+pytestmark = [pytest.mark.unit]
+
+NOW = datetime(2026, 3, 10, 14, 37, tzinfo=timezone.utc)
+CONDITIONS = ["tenant_id = $3", "time > now() - $4::interval"]
+
+
+def test_short_range_is_raw_only():
+    plan = plan_analytics_query("avg", timedelta(hours=1), timedelta(minutes=1), now=NOW)
+    assert plan.tier is None
+    assert plan.boundary is None
+
+
+def test_long_range_splits_at_bucket_aligned_boundary():
+    plan = plan_analytics_query("avg", timedelta(days=30), timedelta(hours=6), now=NOW)
+    assert plan.tier.relation == "telemetry_rollup_1h"
+    assert plan.boundary == datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+    assert plan.boundary == floor_to_bucket(plan.boundary, timedelta(hours=6))
+
+
+def test_p95_uses_sketch_tier():
+    plan = plan_analytics_query("p95", timedelta(days=7), timedelta(hours=1), now=NOW)
+    assert plan.tier.relation == "telemetry_sketch_1h"
+    assert plan.boundary == datetime(2026, 3, 10, 14, 0, tzinfo=timezone.utc)
+
+
+def test_p95_below_sketch_resolution_is_raw():
+    plan = plan_analytics_query("p95", timedelta(hours=24), timedelta(minutes=15), now=NOW)
+    assert plan.tier is None
+
+
+def test_site_grouping_is_raw():
+    plan = plan_analytics_query("avg", timedelta(days=30), timedelta(hours=6), group_by="site", now=NOW)
+    assert plan.tier is None
+
+
+def test_unknown_aggregation_rejected():
+    with pytest.raises(ValueError):
+        plan_analytics_query("median", timedelta(days=1), timedelta(hours=1))
+
+
+def test_raw_sql_matches_single_source():
+    plan = plan_analytics_query("avg", timedelta(hours=1), timedelta(minutes=1), now=NOW)
+    sql = build_analytics_sql(plan, "'all'", grouped=False, conditions=CONDITIONS)
+    assert "FROM telemetry" in sql
+    assert "UNION ALL" not in sql
+    assert "metrics ? $2" in sql
+
+
+def test_tiered_sql_unions_rollup_and_raw_at_boundary():
+    plan = plan_analytics_query("max", timedelta(days=7), timedelta(hours=1), now=NOW)
+    sql = build_analytics_sql(plan, "device_id", grouped=True, conditions=CONDITIONS, boundary_param="$5")
+    rollup, raw = sql.split("UNION ALL")
+    assert "FROM telemetry_rollup_1h" in rollup
+    assert "MAX(max_value)" in rollup
+    assert "time < $5" in rollup
+    assert "FROM telemetry\n" in raw
+    assert "time >= $5" in raw
+
+
+def test_p95_sql_reads_sketch_bins():
+    plan = plan_analytics_query("p95", timedelta(days=30), timedelta(hours=6), now=NOW)
+    sql = build_analytics_sql(plan, "'all'", grouped=False, conditions=CONDITIONS, boundary_param="$5")
+    sketch, raw = sql.split("UNION ALL")
+    assert "FROM telemetry_sketch_1h" in sketch
+    assert "telemetry_sketch_value(bin)" in sketch
+    assert "percentile_cont(0.95)" in raw
+
+
+def test_tiered_plan_requires_boundary_param():
+    plan = plan_analytics_query("avg", timedelta(days=7), timedelta(hours=1), now=NOW)
+    with pytest.raises(ValueError):
+        build_analytics_sql(plan, "'all'", grouped=False, conditions=CONDITIONS)
@@ -1,4 +1,5 @@
 import importlib
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -18,6 +19,13 @@ def _auth_module():
     return importlib.import_module("middleware.auth")
 
 
+@pytest.fixture(autouse=True)
+def _clear_token_cache():
+    _auth_module().clear_token_cache()
+    yield
+    _auth_module().clear_token_cache()
+
+
 def _make_request(headers=None, cookies=None):
     headers = headers or {}
     cookie_header = ""
@@ -262,6 +270,53 @@ async def test_validate_token_other_http_exception_reraises():
     assert err.value.detail == "Invalid token"
 
 
+async def test_validate_token_caches_verified_claims_until_exp():
+    auth = _auth_module()
+    payload = {"sub": "user-1", "exp": time.time() + 300}
+    decode = MagicMock(return_value=payload)
+    construct = MagicMock(return_value=MagicMock())
+    with patch("middleware.auth.get_jwks", AsyncMock(return_value={"keys": [{"kid": "k1", "n": "abc"}]})), patch(
+        "middleware.auth.get_signing_key", return_value={"kid": "k1", "n": "abc"}
+    ), patch("middleware.auth.jwk.construct", construct), patch("middleware.auth.jwt.decode", decode):
+        first = await auth.validate_token("cached.jwt.token")
+        second = await auth.validate_token("cached.jwt.token")
+        await auth.validate_token("other.jwt.token")
+    assert first == second == payload
+    assert decode.call_count == 2
+    assert construct.call_count == 1
+
+
+async def test_validate_token_cache_skips_expired_and_exp_less_tokens():
+    auth = _auth_module()
+    decode = MagicMock(side_effect=[{"sub": "a", "exp": time.time() - 1}, {"sub": "b"}, {"sub": "c"}])
+    with patch("middleware.auth.get_jwks", AsyncMock(return_value={"keys": [{"kid": "k1"}]})), patch(
+        "middleware.auth.get_signing_key", return_value={"kid": "k1"}
+    ), patch("middleware.auth.jwk.construct", return_value=MagicMock()), patch("middleware.auth.jwt.decode", decode):
+        await auth.validate_token("expired.jwt.token")
+        await auth.validate_token("expired.jwt.token")
+        result = await auth.validate_token("expired.jwt.token")
+    assert result == {"sub": "c"}
+    assert decode.call_count == 3
+
+
+async def test_validate_token_cache_invalidated_on_jwks_rotation():
+    auth = _auth_module()
+    payload = {"sub": "user-1", "exp": time.time() + 300}
+    decode = MagicMock(return_value=payload)
+    get_jwks = AsyncMock(
+        side_effect=[
+            {"keys": [{"kid": "k1", "n": "abc"}]},
+            {"keys": [{"kid": "k2", "n": "def"}]},
+        ]
+    )
+    with patch("middleware.auth.get_jwks", get_jwks), patch(
+        "middleware.auth.get_signing_key", return_value={"kid": "k1", "n": "abc"}
+    ), patch("middleware.auth.jwk.construct", return_value=MagicMock()), patch("middleware.auth.jwt.decode", decode):
+        await auth.validate_token("rotated.jwt.token")
+        await auth.validate_token("rotated.jwt.token")
+    assert decode.call_count == 2
+
+
 async def test_jwt_bearer_from_header():
     auth = _auth_module()
     request = _make_request(headers={"authorization": "Bearer token123"})
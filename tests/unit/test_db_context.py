@@ -0,0 +1,40 @@
+import pytest
+
+from shared.db_context import db_context_statement, set_db_context
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+
+class FakeConn:
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+
+
+async def test_role_and_tenant_set_in_one_statement():
+    conn = FakeConn()
+    await set_db_context(conn, role="pulse_app", tenant_id="tenant-a")
+    assert conn.executed == [
+        (
+            "SELECT set_config('role', $1, true), set_config('app.tenant_id', $2, true)",
+            ("pulse_app", "tenant-a"),
+        )
+    ]
+
+
+async def test_role_only_and_tenant_only():
+    assert db_context_statement(role="pulse_operator") == (
+        "SELECT set_config('role', $1, true)",
+        ("pulse_operator",),
+    )
+    assert db_context_statement(tenant_id="tenant-a") == (
+        "SELECT set_config('app.tenant_id', $1, true)",
+        ("tenant-a",),
+    )
+
+
+async def test_context_requires_role_or_tenant():
+    with pytest.raises(ValueError):
+        db_context_statement()
@@ -61,11 +61,12 @@ async def test_tenant_connection_sets_rls_context():
     async with tenant_connection(pool, "tenant-a") as c:
         assert c is conn
 
-    assert ("SET LOCAL ROLE pulse_app", ()) in conn.executed
-    assert (
-        "SELECT set_config('app.tenant_id', $1, true)",
-        ("tenant-a",),
-    ) in conn.executed
+    assert conn.executed == [
+        (
+            "SELECT set_config('role', $1, true), set_config('app.tenant_id', $2, true)",
+            ("pulse_app", "tenant-a"),
+        )
+    ]
 
 
 async def test_tenant_connection_uses_transaction():
@@ -91,7 +92,7 @@ async def test_operator_connection_sets_operator_role():
     async with operator_connection(pool) as c:
         assert c is conn
 
-    assert ("SET LOCAL ROLE pulse_operator", ()) in conn.executed
+    assert ("SELECT set_config('role', $1, true)", ("pulse_operator",)) in conn.executed
 
 
 async def test_tenant_connection_different_tenants():
@@ -110,10 +111,7 @@ async def test_tenant_connection_different_tenants():
         pass
 
     assert first != conn.executed
-    assert (
-        "SELECT set_config('app.tenant_id', $1, true)",
-        ("tenant-b",),
-    ) in conn.executed
+    assert conn.executed[0][1] == ("pulse_app", "tenant-b")
 
 
 async def test_tenant_connection_propagates_exceptions():
@@ -195,11 +193,12 @@ async def test_tenant_connection_sets_rls_context():
     async with tenant_connection(pool, "tenant-a") as c:
         assert c is conn
 
-    assert ("SET LOCAL ROLE pulse_app", ()) in conn.executed
-    assert (
-        "SELECT set_config('app.tenant_id', $1, true)",
-        ("tenant-a",),
-    ) in conn.executed
+    assert conn.executed == [
+        (
+            "SELECT set_config('role', $1, true), set_config('app.tenant_id', $2, true)",
+            ("pulse_app", "tenant-a"),
+        )
+    ]
 
 
 async def test_tenant_connection_uses_transaction():
@@ -225,7 +224,7 @@ async def test_operator_connection_sets_operator_role():
     async with operator_connection(pool) as c:
         assert c is conn
 
-    assert ("SET LOCAL ROLE pulse_operator", ()) in conn.executed
+    assert ("SELECT set_config('role', $1, true)", ("pulse_operator",)) in conn.executed
 
 
 async def test_tenant_connection_different_tenants():
@@ -244,10 +243,7 @@ async def test_tenant_connection_different_tenants():
         pass
 
     assert first != conn.executed
-    assert (
-        "SELECT set_config('app.tenant_id', $1, true)",
-        ("tenant-b",),
-    ) in conn.executed
+    assert conn.executed[0][1] == ("pulse_app", "tenant-b")
 
 
 async def test_tenant_connection_propagates_exceptions():
@@ -328,11 +324,12 @@ async def test_tenant_connection_sets_rls_context():
     async with tenant_connection(pool, "tenant-a") as c:
         assert c is conn
 
-    assert ("SET LOCAL ROLE pulse_app", ()) in conn.executed
-    assert (
-        "SELECT set_config('app.tenant_id', $1, true)",
-        ("tenant-a",),
-    ) in conn.executed
+    assert conn.executed == [
+        (
+            "SELECT set_config('role', $1, true), set_config('app.tenant_id', $2, true)",
+            ("pulse_app", "tenant-a"),
+        )
+    ]
 
 
 async def test_tenant_connection_uses_transaction():
@@ -358,7 +355,7 @@ async def test_operator_connection_sets_operator_role():
     async with operator_connection(pool) as c:
         assert c is conn
 
-    assert ("SET LOCAL ROLE pulse_operator", ()) in conn.executed
+    assert ("SELECT set_config('role', $1, true)", ("pulse_operator",)) in conn.executed
 
 
 async def test_tenant_connection_different_tenants():
@@ -377,10 +374,7 @@ async def test_tenant_connection_different_tenants():
         pass
 
     assert first != conn.executed
-    assert (
-        "SELECT set_config('app.tenant_id', $1, true)",
-        ("tenant-b",),
-    ) in conn.executed
+    assert conn.executed[0][1] == ("pulse_app", "tenant-b")
 
 
 async def test_tenant_connection_propagates_exceptions():
@@ -18,8 +18,10 @@ class FakeConn:
     def __init__(self):
         self.fetch_result = []
         self.fetchval_result = 0
+        self.fetchrow_result = None
         self.fetch_calls = []
         self.fetchval_calls = []
+        self.fetchrow_calls = []
 
     async def fetch(self, query, *args):
         self.fetch_calls.append((query, args))
@@ -29,6 +31,10 @@ class FakeConn:
         self.fetchval_calls.append((query, args))
         return self.fetchval_result
 
+    async def fetchrow(self, query, *args):
+        self.fetchrow_calls.append((query, args))
+        return self.fetchrow_result
+
 
 async def test_fetch_devices_v2_returns_total():
     conn = FakeConn()
@@ -67,9 +73,24 @@ async def test_fetch_devices_v2_tag_filter():
 
 async def test_fetch_fleet_summary_returns_correct_shape():
     conn = FakeConn()
-    conn.fetch_result = [{"status": "ONLINE", "count": 10}, {"status": "STALE", "count": 3}]
+    # devices_* include device_state rows of non-ACTIVE devices; the summary
+    # only counts ACTIVE registry devices.
+    conn.fetchrow_result = {
+        "devices_online": 12,
+        "devices_stale": 4,
+        "active_online": 10,
+        "active_stale": 3,
+        "registered_active": 16,
+    }
     summary = await fetch_fleet_summary(conn, "tenant-a")
+    assert "FROM fleet_counters" in conn.fetchrow_calls[0][0]
     assert summary["ONLINE"] == 10
     assert summary["STALE"] == 3
-    assert summary["OFFLINE"] == 0
-    assert summary["total"] == 13
+    assert summary["OFFLINE"] == 3
+    assert summary["total"] == 16
+
+
+async def test_fetch_fleet_summary_without_counter_row_is_empty():
+    conn = FakeConn()
+    summary = await fetch_fleet_summary(conn, "tenant-a")
+    assert summary == {"ONLINE": 0, "STALE": 0, "OFFLINE": 0, "total": 0}
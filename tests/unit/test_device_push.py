@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.ingest_iot import ingest
+from services.ingest_iot.device_push import DeviceTokenCache, DeviceWorkNotifier
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+
+@pytest.fixture
+def notifier(monkeypatch):
+    notifier = DeviceWorkNotifier()
+    notifier.connected = True
+    monkeypatch.setattr(ingest, "INGESTOR_REF", SimpleNamespace(device_work=notifier))
+    return notifier
+
+
+def _fetcher(*results):
+    calls = []
+    queue = list(results)
+
+    async def fetch():
+        calls.append(1)
+        return queue.pop(0) if queue else []
+
+    return fetch, calls
+
+
+async def test_token_cache_expires_entries(monkeypatch):
+    cache = DeviceTokenCache(ttl_seconds=60)
+    now = {"v": 100.0}
+    monkeypatch.setattr("services.ingest_iot.device_push.time.monotonic", lambda: now["v"])
+    cache.put("hash", "t1", "d1")
+    assert cache.get("hash") == ("t1", "d1")
+    now["v"] += 61
+    assert cache.get("hash") is None
+
+
+async def test_idle_device_answered_from_quiet_marker(notifier):
+    fetch, calls = _fetcher([])
+    assert await ingest._pending_for_device("command", "t1", "d1", fetch, 0) == []
+    assert await ingest._pending_for_device("command", "t1", "d1", fetch, 0) == []
+    assert len(calls) == 1
+
+
+async def test_notify_clears_quiet_marker(notifier):
+    fetch, calls = _fetcher([], ["cmd-1"])
+    await ingest._pending_for_device("command", "t1", "d1", fetch, 0)
+    notifier.on_notify(None, 0, "device_work", '{"tenant_id": "t1", "device_id": "d1", "kind": "command"}')
+    assert await ingest._pending_for_device("command", "t1", "d1", fetch, 0) == ["cmd-1"]
+    assert len(calls) == 2
+
+
+async def test_long_poll_wakes_on_notify(notifier):
+    fetch, calls = _fetcher([], ["job-1"])
+    task = asyncio.create_task(ingest._pending_for_device("job", "t1", "d1", fetch, 5))
+    await asyncio.sleep(0.01)
+    notifier.notify("t1", "d1", "job")
+    assert await asyncio.wait_for(task, 1) == ["job-1"]
+    assert len(calls) == 2
+
+
+async def test_long_poll_times_out_without_extra_query(notifier):
+    fetch, calls = _fetcher([])
+    assert await ingest._pending_for_device("job", "t1", "d1", fetch, 0.01) == []
+    assert len(calls) == 1
+
+
+async def test_quiet_markers_ignored_while_listener_down(notifier):
+    fetch, calls = _fetcher([], [])
+    await ingest._pending_for_device("command", "t1", "d1", fetch, 0)
+    notifier.connected = False
+    notifier.reset()
+    await ingest._pending_for_device("command", "t1", "d1", fetch, 0)
+    assert len(calls) == 2
+
+
+async def test_long_poll_requeries_after_wait_without_listener(notifier):
+    notifier.connected = False
+    fetch, calls = _fetcher([], ["cmd-1"])
+    assert await ingest._pending_for_device("command", "t1", "d1", fetch, 0.01) == ["cmd-1"]
+    assert len(calls) == 2
+    assert not notifier.is_quiet("t1", "d1", "command")
@@ -0,0 +1,89 @@
+import pytest
+
+from db import device_search
+from db.device_search import SearchCache, escape_like, search_devices, search_document_pattern
+from db.queries import fetch_devices_v2
+
+pytestmark = [pytest.mark.unit]
+
+
+class FakeConn:
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.fetch_calls = []
+
+    async def fetch(self, query, *args):
+        self.fetch_calls.append((query, args))
+        return self.rows
+
+    async def fetchval(self, query, *args):
+        return 0
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch):
+    monkeypatch.setattr(device_search, "_search_cache", SearchCache(ttl_seconds=10))
+
+
+def test_like_wildcards_are_escaped():
+    assert escape_like("50%_off\\") == "50\\%\\_off\\\\"
+    assert search_document_pattern("  Rack  A_1 ") == "%rack a\\_1%"
+
+
+def test_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(device_search.time, "monotonic", lambda: now[0])
+    cache = SearchCache(ttl_seconds=5, max_entries=2)
+
+    cache.put(("a",), [1])
+    cache.put(("b",), [2])
+    assert cache.get(("a",)) == [1]
+    cache.put(("c",), [3])
+    assert cache.get(("b",)) is None  # least recently used
+    now[0] += 6
+    assert cache.get(("a",)) is None
+
+
+async def test_search_ranks_and_filters_by_tenant():
+    conn = FakeConn(rows=[{"device_id": "pump-01"}])
+
+    results = await search_devices(conn, "Pump", tenant_id="tenant-a", limit=5)
+
+    query, args = conn.fetch_calls[0]
+    assert results == [{"device_id": "pump-01"}]
+    assert args == ("pump", "pump%", "%pump%", "tenant-a", 5)
+    assert "$1 <% dr.search_document" in query
+    assert "ORDER BY match_rank DESC, score DESC" in query
+    assert "dr.tenant_id = $4" in query
+
+
+async def test_short_query_skips_fuzzy_match():
+    conn = FakeConn()
+    await search_devices(conn, "p1")
+    query, args = conn.fetch_calls[0]
+    assert "<%" not in query
+    assert "tenant_id = $" not in query
+    assert args[-1] == 20
+
+
+async def test_repeated_query_served_from_cache():
+    conn = FakeConn(rows=[{"device_id": "d1"}])
+    await search_devices(conn, "sensor", tenant_id="tenant-a")
+    await search_devices(conn, "  SENSOR ", tenant_id="tenant-a")
+    await search_devices(conn, "sensor", tenant_id="tenant-b")
+    assert len(conn.fetch_calls) == 2
+
+
+async def test_empty_query_returns_nothing():
+    conn = FakeConn()
+    assert await search_devices(conn, "   ") == []
+    assert conn.fetch_calls == []
+
+
+async def test_device_list_q_uses_search_document():
+    conn = FakeConn()
+    await fetch_devices_v2(conn, "tenant-a", q="Rack%")
+    query, args = conn.fetch_calls[0]
+    assert "dr.search_document LIKE $2" in query
+    assert "ILIKE" not in query
+    assert args[1] == "%rack\\%%"
@@ -127,10 +127,12 @@ async def test_uptime_range_7d(client, monkeypatch):
 
 async def test_fleet_uptime_summary_counts(client, monkeypatch):
     conn = FakeConn()
+    # Two open NO_TELEMETRY alerts on the same device count it offline once.
     conn.fetchrow_results = [
-        {"total_devices": 3, "online": 2, "offline": 1},
+        {"registered_total": 3, "alerts_no_telemetry_open": 2},
         {"avg_uptime_pct": 98.7},
     ]
+    conn.fetchval_results = [1]
     _mock_customer_deps(monkeypatch, conn)
     resp = await client.get("/customer/fleet/uptime-summary", headers=_auth_header())
     assert resp.status_code == 200
@@ -142,10 +144,25 @@ async def test_fleet_uptime_summary_counts(client, monkeypatch):
 async def test_fleet_uptime_avg_calculation(client, monkeypatch):
     conn = FakeConn()
     conn.fetchrow_results = [
-        {"total_devices": 4, "online": 3, "offline": 1},
+        {"registered_total": 4, "alerts_no_telemetry_open": 1},
         {"avg_uptime_pct": 97.234},
     ]
+    conn.fetchval_results = [1]
     _mock_customer_deps(monkeypatch, conn)
     resp = await client.get("/customer/fleet/uptime-summary", headers=_auth_header())
     assert resp.status_code == 200
     assert resp.json()["avg_uptime_pct"] == 97.2
+
+
+async def test_fleet_uptime_summary_skips_gap_query_without_open_gaps(client, monkeypatch):
+    conn = FakeConn()
+    conn.fetchrow_results = [
+        {"registered_total": 4, "alerts_no_telemetry_open": 0},
+        {"avg_uptime_pct": 100},
+    ]
+    conn.fetchval_results = [99]
+    _mock_customer_deps(monkeypatch, conn)
+    resp = await client.get("/customer/fleet/uptime-summary", headers=_auth_header())
+    assert resp.status_code == 200
+    assert resp.json()["offline"] == 0
+    assert conn.fetchval_results == [99]
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from shared.downsample import chart_bucket, format_interval, lttb, lttb_indices
+
+pytestmark = [pytest.mark.unit]
+
+
+def test_lttb_returns_all_points_under_threshold():
+    assert lttb_indices([0, 1, 2], [5, 6, 7], 10) == [0, 1, 2]
+
+
+def test_lttb_keeps_endpoints_and_threshold():
+    xs = list(range(1000))
+    ys = [(i * 37) % 101 for i in xs]
+    kept = lttb_indices(xs, ys, 100)
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert kept == sorted(set(kept))
+
+
+def test_lttb_preserves_spike():
+    xs = list(range(200))
+    ys = [0.0] * 200
+    ys[123] = 50.0
+    assert 123 in lttb_indices(xs, ys, 20)
+
+
+def test_lttb_on_dict_points():
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    points = [{"time": start + timedelta(seconds=i), "value": i % 3} for i in range(30)]
+    sampled = lttb(points, 10)
+    assert len(sampled) == 10
+    assert sampled[0] is points[0] and sampled[-1] is points[-1]
+
+
+def test_chart_bucket_widens_to_tileable_width():
+    assert chart_bucket(timedelta(hours=24), timedelta(minutes=15), None) == timedelta(minutes=15)
+    assert chart_bucket(timedelta(hours=24), timedelta(minutes=15), 500) == timedelta(minutes=15)
+    assert chart_bucket(timedelta(hours=24), timedelta(minutes=15), 50) == timedelta(minutes=30)
+    assert chart_bucket(timedelta(days=30), timedelta(hours=6), 20) == timedelta(days=2)
+
+
+def test_format_interval():
+    assert format_interval(timedelta(minutes=1)) == "1 minute"
+    assert format_interval(timedelta(minutes=30)) == "30 minutes"
+    assert format_interval(timedelta(hours=6)) == "6 hours"
+    assert format_interval(timedelta(days=2)) == "2 days"
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from shared.export_columnar import resolve_metric_type, write_telemetry_columnar
+from shared.export_stream import aiter_rows
+
+pytestmark = [pytest.mark.unit]
+
+TS = datetime(2026, 1, 1, tzinfo=timezone.utc)
+METRIC_TYPES = {"door_open": "boolean", "label": "string", "temp": "number"}
+
+
+def _records(n):
+    for i in range(n):
+        yield {
+            "time": TS + timedelta(seconds=i),
+            "device_id": f"dev-{i % 3}",
+            "site_id": "site-a" if i % 2 else None,
+            "seq": i,
+            "metrics": {"temp": i * 1.5, "door_open": i % 2 == 0, "label": {"v": i}},
+        }
+
+
+def test_resolve_metric_type():
+    assert resolve_metric_type(["number"]) == "number"
+    assert resolve_metric_type(["boolean"]) == "boolean"
+    assert resolve_metric_type(["number", "boolean"]) == "string"
+    assert resolve_metric_type(["json"]) == "string"
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+async def test_columnar_round_trip_across_row_groups(tmp_path, fmt):
+    pa = pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"export.{fmt}")
+
+    count = await write_telemetry_columnar(
+        path, fmt, aiter_rows(_records(25)), METRIC_TYPES, row_group_rows=10
+    )
+
+    assert count == 25
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        assert pq.ParquetFile(path).metadata.num_row_groups == 3
+        table = pq.read_table(path)
+    else:
+        table = pa.ipc.open_file(path).read_all()
+
+    assert table.num_rows == 25
+    assert table.column_names == ["time", "device_id", "site_id", "seq", *METRIC_TYPES]
+    assert pa.types.is_dictionary(table.schema.field("device_id").type)
+    assert table.schema.field("temp").type == pa.float64()
+    assert table.schema.field("door_open").type == pa.bool_()
+    rows = table.to_pylist()
+    assert rows[24]["device_id"] == "dev-0"
+    assert rows[24]["site_id"] is None
+    assert rows[24]["temp"] == 36.0
+    assert rows[24]["label"] == '{"v": 24}'
+
+
+async def test_empty_export_is_a_valid_file(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "empty.parquet")
+
+    count = await write_telemetry_columnar(path, "parquet", aiter_rows([]), {"temp": "number"})
+
+    assert count == 0
+    assert pq.read_table(path).column_names == ["time", "device_id", "site_id", "seq", "temp"]
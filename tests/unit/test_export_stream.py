@@ -0,0 +1,81 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from shared.export_stream import (
+    TELEMETRY_BASE_COLUMNS,
+    aiter_rows,
+    csv_chunks,
+    gzip_chunks,
+    json_document_chunks,
+    map_rows,
+    ndjson_chunks,
+    telemetry_csv_row,
+    telemetry_row,
+)
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+TS = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def _record(i, metrics):
+    return {"time": TS, "device_id": f"dev-{i}", "site_id": None, "seq": i, "metrics": metrics}
+
+
+async def test_csv_chunks_are_bounded():
+    rows = aiter_rows([["dev-1", i, "x" * 50] for i in range(1000)])
+    chunks = await _collect(csv_chunks(["device_id", "n", "pad"], rows, chunk_bytes=4096))
+
+    assert len(chunks) > 10
+    assert all(len(chunk) < 4096 + 100 for chunk in chunks)
+    lines = b"".join(chunks).decode().splitlines()
+    assert lines[0] == "device_id,n,pad"
+    assert len(lines) == 1001
+
+
+async def test_csv_header_only_when_empty():
+    chunks = await _collect(csv_chunks(TELEMETRY_BASE_COLUMNS, aiter_rows([])))
+    assert b"".join(chunks).decode().splitlines() == ["time,device_id,site_id,seq"]
+
+
+async def test_telemetry_csv_pivots_metrics():
+    records = [_record(1, {"temp": 21.5, "rssi": -60}), _record(2, json.dumps({"temp": 22}))]
+    keys = ["rssi", "temp"]
+    chunks = await _collect(
+        csv_chunks([*TELEMETRY_BASE_COLUMNS, *keys], map_rows(aiter_rows(records), lambda r: telemetry_csv_row(r, keys)))
+    )
+    lines = b"".join(chunks).decode().splitlines()
+    assert lines[1] == "2026-01-01T00:00:00+00:00,dev-1,,1,-60,21.5"
+    assert lines[2] == "2026-01-01T00:00:00+00:00,dev-2,,2,,22"
+
+
+async def test_ndjson_one_object_per_line():
+    records = [_record(i, {"temp": i}) for i in range(3)]
+    chunks = await _collect(ndjson_chunks(map_rows(aiter_rows(records), telemetry_row)))
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["metrics"]["temp"] for line in lines] == [0, 1, 2]
+
+
+async def test_json_document_is_valid_json():
+    rows = aiter_rows([{"n": i} for i in range(500)])
+    chunks = await _collect(json_document_chunks("telemetry", rows, chunk_bytes=256))
+    doc = json.loads(b"".join(chunks))
+    assert doc["count"] == 500
+    assert doc["telemetry"][499] == {"n": 499}
+
+    empty = json.loads(b"".join(await _collect(json_document_chunks("data", aiter_rows([])))))
+    assert empty == {"data": [], "count": 0}
+
+
+async def test_gzip_round_trip():
+    rows = aiter_rows([["a", i] for i in range(2000)])
+    compressed = b"".join(await _collect(gzip_chunks(csv_chunks(["k", "v"], rows))))
+    text = gzip.decompress(compressed).decode()
+    assert text.splitlines()[-1] == "a,1999"
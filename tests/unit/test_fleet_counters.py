@@ -0,0 +1,69 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from db.fleet_counters import fetch_fleet_counters, status_summary
+from services.ops_worker.workers.fleet_counters_worker import run_fleet_counters_reconcile_tick
+
+pytestmark = [pytest.mark.unit]
+
+
+class FakeConn:
+    def __init__(self, row=None, tenants=(), drifted=()):
+        self.row = row
+        self.tenants = tenants
+        self.drifted = set(drifted)
+        self.reconciled = []
+        self.transactions = 0
+
+    async def fetchrow(self, query, *args):
+        assert "FROM fleet_counters" in query
+        return self.row
+
+    async def fetch(self, query, *args):
+        return [{"tenant_id": t} for t in self.tenants]
+
+    async def fetchval(self, query, tenant_id):
+        assert "reconcile_fleet_counters" in query
+        self.reconciled.append(tenant_id)
+        return tenant_id in self.drifted
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.transactions += 1
+        yield
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+async def test_fetch_fleet_counters_defaults_to_zero():
+    counters = await fetch_fleet_counters(FakeConn(), "tenant-a")
+    assert counters["tenant_id"] == "tenant-a"
+    assert counters["devices_online"] == 0
+    assert counters["alerts_open"] == 0
+    assert counters["last_activity"] is None
+
+
+def test_status_summary_counts_unreported_devices_offline():
+    summary = status_summary({"active_online": 5, "active_stale": 1, "registered_active": 9})
+    assert summary == {"ONLINE": 5, "STALE": 1, "OFFLINE": 3, "total": 9}
+
+
+def test_status_summary_never_negative():
+    summary = status_summary({"active_online": 5, "active_stale": 2, "registered_active": 4})
+    assert summary["OFFLINE"] == 0
+    assert summary["total"] == 7
+
+
+async def test_reconcile_tick_uses_one_transaction_per_tenant():
+    conn = FakeConn(tenants=["tenant-a", "tenant-b", "tenant-c"], drifted=["tenant-b"])
+    await run_fleet_counters_reconcile_tick(FakePool(conn))
+    assert conn.reconciled == ["tenant-a", "tenant-b", "tenant-c"]
+    assert conn.transactions == 3
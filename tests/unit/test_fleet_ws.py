@@ -20,19 +20,13 @@ class FakeWebSocket:
 
 
 class FakeConn:
-    def __init__(self, device_rows, alert_count):
-        self.device_rows = device_rows
-        self.alert_count = alert_count
+    def __init__(self, counters):
+        self.counters = counters
 
-    async def fetch(self, query, tenant_id):
-        assert "FROM device_state" in query
+    async def fetchrow(self, query, tenant_id):
+        assert "FROM fleet_counters" in query
         assert tenant_id == "tenant-a"
-        return self.device_rows
-
-    async def fetchval(self, query, tenant_id):
-        assert "FROM fleet_alert" in query
-        assert tenant_id == "tenant-a"
-        return self.alert_count
+        return self.counters
 
 
 async def test_subscribe_fleet_sets_flag():
@@ -78,12 +72,14 @@ async def test_broadcast_fleet_summary_tenant_isolation():
 
 async def test_fetch_fleet_summary_for_tenant():
     conn = FakeConn(
-        device_rows=[
-            {"status": "ONLINE", "cnt": 4},
-            {"status": "STALE", "cnt": 2},
-            {"status": "OFFLINE", "cnt": 1},
-        ],
-        alert_count=3,
+        {
+            "devices_total": 7,
+            "devices_online": 4,
+            "devices_stale": 2,
+            "devices_offline": 1,
+            "alerts_open": 2,
+            "alerts_acknowledged": 1,
+        }
     )
     summary = await fetch_fleet_summary_for_tenant(conn, "tenant-a")
     assert summary == {"ONLINE": 4, "STALE": 2, "OFFLINE": 1, "total": 7, "active_alerts": 3}
@@ -47,6 +47,8 @@ def mock_app():
     app.state.get_nats = AsyncMock(return_value=app.state.nats_client)
     limiter = SimpleNamespace(
         check_all=lambda *args, **kwargs: (True, "", 200),
+        check_all_async=AsyncMock(return_value=(True, "", 200)),
+        check_many_async=AsyncMock(side_effect=lambda requests: [(True, "", 200)] * len(requests)),
         get_stats=lambda: {"allowed": 1},
     )
     import routes.ingest as ingest_routes
@@ -1,8 +1,10 @@
 import asyncio
 import hashlib
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
+import asyncpg
 import pytest
 
 from services.shared.ingest_core import (
@@ -15,6 +17,7 @@ from services.shared.ingest_core import (
     validate_and_prepare,
 )
 from services.ingest_iot.ingest import topic_extract
+from shared.telemetry_spool import QUARANTINE_FILE, TelemetrySpool
 
 pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
 
@@ -25,6 +28,8 @@ class FakeConn:
         self.fetchrow_calls = 0
         self.executemany_calls = []
         self.copy_calls = []
+        self.copy_streams = []
+        self.execute_calls = []
 
     async def fetchrow(self, *_args, **_kwargs):
         self.fetchrow_calls += 1
@@ -36,7 +41,11 @@ class FakeConn:
     async def copy_records_to_table(self, _table, records, columns):
         self.copy_calls.append((records, columns))
 
-    async def execute(self, *_args, **_kwargs):
+    async def copy_to_table(self, _table, source, columns, format):
+        self.copy_streams.append((bytes(source), columns, format))
+
+    async def execute(self, *args, **_kwargs):
+        self.execute_calls.append(args)
         return "SELECT 1"
 
 
@@ -462,8 +471,9 @@ async def test_batch_writer_flushes_at_batch_size():
     await writer.add(_record(1))
     assert writer.get_stats()["pending_records"] == 1
     await writer.add(_record(2))
+    assert writer.get_stats()["pending_records"] == 0
+    await writer._drain_in_flight()
     stats = writer.get_stats()
-    assert stats["pending_records"] == 0
     assert stats["records_written"] == 2
     assert len(conn.executemany_calls) == 1
 
@@ -484,9 +494,74 @@ async def test_batch_writer_large_batch_uses_copy():
     conn = FakeConn()
     writer = TimescaleBatchWriter(pool=FakePool(conn), batch_size=101, flush_interval_ms=10000)
     await writer.add_many([_record(i) for i in range(101)])
+    await writer._drain_in_flight()
     assert len(conn.copy_calls) == 1
 
 
+class BlockingConn(FakeConn):
+    """Holds every write until released, tracking how many run at once."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+        self.active = 0
+        self.max_active = 0
+
+    async def executemany(self, query, rows):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await self.release.wait()
+        self.active -= 1
+        await super().executemany(query, rows)
+
+
+async def test_batch_writer_add_does_not_wait_on_flush():
+    conn = BlockingConn()
+    writer = TimescaleBatchWriter(
+        pool=FakePool(conn), batch_size=2, flush_interval_ms=10000, max_concurrent_flushes=2
+    )
+    for i in range(10):
+        await asyncio.wait_for(writer.add(_record(i)), timeout=0.1)
+    await asyncio.sleep(0)
+
+    stats = writer.get_stats()
+    assert stats["flushes_in_flight"] == 2
+    assert conn.max_active == 2
+    # Both slots are busy, so the rest waits in the buffer.
+    assert stats["pending_records"] == 6
+
+    conn.release.set()
+    await writer.stop()
+    assert writer.get_stats()["records_written"] == 10
+    assert writer.get_stats()["pending_records"] == 0
+
+
+async def test_batch_writer_adapts_batch_size_and_interval():
+    writer = TimescaleBatchWriter(
+        pool=FakePool(FakeConn()),
+        batch_size=500,
+        flush_interval_ms=1000,
+        max_concurrent_flushes=4,
+        min_batch_size=50,
+        max_batch_size=5000,
+        min_flush_interval_ms=20,
+    )
+    # 10k records/s with 200ms flushes: 4 slots need ~500 records each, x2 headroom.
+    writer.arrival_rate = 10000.0
+    writer._rate_sampled_at = time.monotonic()
+    writer._adapt(200.0)
+    assert writer.batch_size == 1000
+    assert writer.flush_interval == pytest.approx(0.1)
+
+    # Fast flushes at a trickle: small batches, but never below the floor
+    # and never waiting longer than flush_interval_ms.
+    writer.arrival_rate = 10.0
+    writer.flush_latency_ewma_ms = 0.0
+    writer._adapt(5.0)
+    assert writer.batch_size == 50
+    assert writer.flush_interval == pytest.approx(1.0)
+
+
 async def test_topic_extract_valid_topic():
     tenant_id, device_id, msg_type = topic_extract("tenant/acme/device/sensor-01/telemetry")
     assert tenant_id == "acme"
@@ -504,3 +579,109 @@ async def test_topic_extract_bad_topic():
 async def test_normalize_metric_multiplier_and_offset():
     assert normalize_metric(1000, multiplier=0.1, offset=0) == pytest.approx(100.0)
     assert normalize_metric(0, multiplier=1.0, offset=-273.15) == pytest.approx(-273.15)
+
+
+class DownConn(FakeConn):
+    async def executemany(self, _query, _rows):
+        raise ConnectionError("database unavailable")
+
+
+async def test_batch_writer_spills_failed_flush_and_overflow_to_spool(tmp_path):
+    conn = DownConn()
+    writer = TimescaleBatchWriter(
+        pool=FakePool(conn),
+        batch_size=3,
+        flush_interval_ms=10000,
+        max_buffer_size=4,
+        max_concurrent_flushes=1,
+        spool=TelemetrySpool(str(tmp_path)),
+    )
+    await writer.add_many([_record(i) for i in range(3)])
+    await writer._drain_in_flight()
+    assert writer.get_stats()["write_errors"] == 1
+    assert writer.get_stats()["spool_pending_records"] == 3
+
+    # Overflow spills the oldest buffered batch instead of dropping records.
+    await writer.add_many([_record(i) for i in range(3, 8)])
+    stats = writer.get_stats()
+    assert stats["records_spooled"] == 7
+    assert stats["pending_records"] == 1
+    writer.spool.close()
+
+
+async def test_batch_writer_replays_spool_with_binary_copy(tmp_path):
+    conn = FakeConn()
+    spool = TelemetrySpool(str(tmp_path))
+    writer = TimescaleBatchWriter(
+        pool=FakePool(conn), batch_size=10, flush_interval_ms=20, spool=spool, spool_replay_rate=1000
+    )
+    writer._spill([_record(i) for i in range(5)], "flush_failed")
+
+    await writer.start()
+    for _ in range(50):
+        if writer.records_replayed == 5:
+            break
+        await asyncio.sleep(0.01)
+    await writer.stop()
+
+    assert writer.records_replayed == 5
+    stream, columns, fmt = conn.copy_streams[0]
+    assert fmt == "binary"
+    assert columns[0] == "time" and columns[-1] == "metrics"
+    assert stream.startswith(b"PGCOPY\n\xff\r\n\x00")
+    assert spool.pending_records == 0
+    # Replayed rows wake telemetry_inserted listeners like live writes do.
+    assert ("SELECT pg_notify('telemetry_inserted', $1)", '{"tenant_ids": ["tenant-a"]}') in conn.execute_calls
+
+
+class RejectingConn(FakeConn):
+    """A database that is up but rejects every write (e.g. invalid jsonb)."""
+
+    async def executemany(self, _query, _rows):
+        raise asyncpg.DataError("unsupported Unicode escape sequence")
+
+    async def copy_to_table(self, _table, source, columns, format):
+        raise asyncpg.DataError("unsupported Unicode escape sequence")
+
+
+async def test_batch_writer_does_not_spool_rows_the_database_rejects(tmp_path):
+    conn = RejectingConn()
+    spool = TelemetrySpool(str(tmp_path))
+    writer = TimescaleBatchWriter(
+        pool=FakePool(conn), batch_size=3, flush_interval_ms=20, spool=spool, spool_replay_rate=1000
+    )
+    await writer.add_many([_record(i) for i in range(3)])
+    await writer._drain_in_flight()
+    assert writer.records_rejected == 3
+    assert spool.pending_records == 0
+
+    # Rows already spooled (e.g. during an outage) are quarantined, not retried forever.
+    writer._spill([_record(i) for i in range(5)], "flush_failed")
+    await writer.start()
+    for _ in range(100):
+        if writer.records_replayed == 5:
+            break
+        await asyncio.sleep(0.01)
+    await writer.stop()
+    assert writer.records_replayed == 5
+    assert writer.records_rejected == 8
+    assert spool.pending_records == 0
+    assert (tmp_path / QUARANTINE_FILE).stat().st_size > 0
+
+
+class PartlyRejectingConn(FakeConn):
+    async def executemany(self, _query, rows):
+        if any(row[2] == "device-2" for row in rows):
+            raise asyncpg.DataError("NaN is not valid jsonb")
+        self.executemany_calls.append(rows)
+
+
+async def test_batch_writer_splits_rejected_batch_to_keep_good_rows():
+    conn = PartlyRejectingConn()
+    writer = TimescaleBatchWriter(pool=FakePool(conn), batch_size=5, flush_interval_ms=10000)
+    await writer.add_many([_record(i) for i in range(5)])
+    await writer._drain_in_flight()
+    written = sorted(row[2] for rows in conn.executemany_calls for row in rows)
+    assert written == ["device-0", "device-1", "device-3", "device-4"]
+    assert writer.records_written == 4
+    assert writer.records_rejected == 1
@@ -42,6 +42,8 @@ def ingest_app():
     app.state.get_nats = AsyncMock(return_value=app.state.nats_client)
     limiter = SimpleNamespace(
         check_all=lambda *args, **kwargs: (True, "", 200),
+        check_all_async=AsyncMock(return_value=(True, "", 200)),
+        check_many_async=AsyncMock(side_effect=lambda requests: [(True, "", 200)] * len(requests)),
         get_stats=lambda: {"allowed": 1},
     )
     import routes.ingest as ingest_routes
@@ -56,6 +58,10 @@ def ingest_app():
 def _mock_limiter(monkeypatch, allowed=True, status=200, reason=""):
     limiter = MagicMock()
     limiter.check_all.return_value = (allowed, reason, status)
+    limiter.check_all_async = AsyncMock(return_value=(allowed, reason, status))
+    limiter.check_many_async = AsyncMock(
+        side_effect=lambda requests: [(allowed, reason, status)] * len(requests)
+    )
     limiter.get_stats.return_value = {"allowed": 1}
     monkeypatch.setattr("routes.ingest.get_rate_limiter", lambda: limiter)
     return limiter
@@ -171,6 +177,25 @@ async def test_batch_partial_success(ingest_app, monkeypatch):
     assert resp.json()["rejected"] == 1
 
 
+async def test_batch_checks_rate_limits_in_one_call(ingest_app, monkeypatch):
+    limiter = _mock_limiter(monkeypatch, allowed=True)
+    monkeypatch.setattr("routes.ingest.validate_and_prepare", AsyncMock(return_value=IngestResult(success=True)))
+    client = TestClient(ingest_app)
+    payload = {
+        "messages": [
+            {"tenant_id": "t1", "device_id": "d1", "msg_type": "telemetry", "provision_token": "tok", "site_id": "s1", "metrics": {}},
+            {"tenant_id": "t1", "device_id": "d2", "msg_type": "bogus", "provision_token": "tok", "site_id": "s1", "metrics": {}},
+            {"tenant_id": "t1", "device_id": "d3", "msg_type": "heartbeat", "provision_token": "tok", "site_id": "s1", "metrics": {}},
+        ]
+    }
+    resp = client.post("/ingest/v1/batch", json=payload)
+    assert resp.status_code == 202
+    limiter.check_many_async.assert_awaited_once()
+    requests = limiter.check_many_async.await_args.args[0]
+    assert requests == [("t1", "d1", "telemetry"), ("t1", "d3", "heartbeat")]
+    limiter.check_all_async.assert_not_awaited()
+
+
 async def test_batch_max_100_messages(ingest_app):
     client = TestClient(ingest_app)
     payload = {
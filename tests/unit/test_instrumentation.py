@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+from shared import instrumentation
+from shared.metrics import pulse_stage_duration_seconds
+
+pytestmark = [pytest.mark.unit]
+
+
+@pytest.fixture
+def stage_timing():
+    instrumentation.set_stage_timing(True)
+    yield
+    instrumentation.set_stage_timing(False)
+
+
+def _count(service, stage):
+    for metric in pulse_stage_duration_seconds.collect():
+        for sample in metric.samples:
+            if (
+                sample.name.endswith("_count")
+                and sample.labels.get("service") == service
+                and sample.labels.get("stage") == stage
+            ):
+                return sample.value
+    return 0.0
+
+
+def test_disabled_clock_is_shared_noop():
+    instrumentation.set_stage_timing(False)
+    clock = instrumentation.stage_clock("unit-test")
+    assert clock is instrumentation.stage_clock("other-service")
+    clock.lap("parse")
+    assert _count("unit-test", "parse") == 0
+
+
+def test_laps_record_stage_durations(stage_timing):
+    clock = instrumentation.stage_clock("unit-test-laps")
+    clock.lap("parse")
+    clock.lap(None)
+    clock.lap("db_write")
+    assert _count("unit-test-laps", "parse") == 1
+    assert _count("unit-test-laps", "db_write") == 1
+
+
+def test_stage_names_capped_per_service(stage_timing, monkeypatch):
+    monkeypatch.setattr(instrumentation, "MAX_STAGES_PER_SERVICE", 2)
+    clock = instrumentation.stage_clock("unit-test-cap")
+    for stage in ("a", "b", "c", "d"):
+        clock.lap(stage)
+    assert _count("unit-test-cap", "c") == 0
+    assert _count("unit-test-cap", "other") == 2
+
+
+def test_sample_stacks_captures_busy_thread():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=busy_worker)
+    thread.start()
+    try:
+        counts = instrumentation.sample_stacks(thread.ident, 0.05, 0.005)
+    finally:
+        stop.set()
+        thread.join()
+    assert counts
+    assert all("busy_worker" in stack for stack in counts)
+    assert instrumentation.folded_stacks(counts).splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+
+def test_profile_route_is_opt_in(monkeypatch):
+    app = web.Application()
+    instrumentation.add_debug_routes(app)
+    assert not any(r.resource.canonical == "/debug/profile" for r in app.router.routes())
+
+    monkeypatch.setattr(instrumentation, "_profiling", True)
+    app = web.Application()
+    instrumentation.add_debug_routes(app)
+    assert any(r.resource.canonical == "/debug/profile" for r in app.router.routes())
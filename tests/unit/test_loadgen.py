@@ -0,0 +1,98 @@
+import json
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, "simulator/device_sim_iot")
+import loadgen  # noqa: E402
+
+pytestmark = [pytest.mark.unit]
+
+DEVICE = {"tenant_id": "loadgen-tenant-001", "site_id": "lg-site-1", "device_id": "lg-site-1-lg-000001"}
+
+
+def test_open_loop_schedule_does_not_slow_down_when_behind():
+    schedule = loadgen.OpenLoopSchedule(rate=100.0, start=10.0)
+
+    assert list(schedule.due(9.0)) == []
+    assert list(schedule.due(10.0)) == [0]
+    # A 1s stall: everything scheduled in that second is due at once, and each
+    # keeps its original intended time so the stall is charged as latency.
+    assert list(schedule.due(11.0)) == list(range(1, 101))
+    assert schedule.intended(50) == pytest.approx(10.5)
+    assert schedule.next_time() == pytest.approx(11.01)
+
+
+def test_open_loop_schedule_caps_batch(monkeypatch):
+    monkeypatch.setattr(loadgen, "MAX_SEND_BATCH", 10)
+    schedule = loadgen.OpenLoopSchedule(rate=1000.0, start=0.0)
+    assert len(schedule.due(1.0)) == 10
+    assert schedule.due(1.0).start == 10
+
+
+def test_latency_histogram_percentiles_and_merge():
+    fast = loadgen.LatencyHistogram()
+    for _ in range(99):
+        fast.record(0.001)
+    slow = loadgen.LatencyHistogram()
+    slow.record(0.5)
+
+    merged = loadgen.LatencyHistogram(fast.counts)
+    merged.max_us = fast.max_us
+    merged.merge(slow)
+
+    assert merged.total == 100
+    assert merged.percentile_ms(50) == pytest.approx(1.0, rel=0.2)
+    assert merged.percentile_ms(99) == pytest.approx(1.0, rel=0.2)
+    assert merged.percentile_ms(100) == pytest.approx(500.0)
+
+
+def test_payload_template_renders_valid_telemetry():
+    template = loadgen.PayloadTemplate(DEVICE, False, 3, 0, random.Random(1))
+    payload = json.loads(template.render(b"2026-01-01T00:00:00+00:00", 7))
+
+    assert template.topic == "tenant/loadgen-tenant-001/device/lg-site-1-lg-000001/telemetry"
+    assert payload["seq"] == 7
+    assert payload["site_id"] == "lg-site-1"
+    assert payload["provision_token"] == "tok-lg-site-1-lg-000001"
+    assert sorted(payload["metrics"]) == ["metric_0", "metric_1", "metric_2"]
+
+
+def test_payload_template_envelope_and_padding():
+    template = loadgen.PayloadTemplate(DEVICE, True, 2, 512, random.Random(1))
+    raw = template.render(b"2026-01-01T00:00:00.000000+00:00", 1)
+    envelope = json.loads(raw)
+
+    assert template.subject == "telemetry.loadgen-tenant-001"
+    assert envelope["topic"] == template.topic
+    assert envelope["payload"]["seq"] == 1
+    payload_size = len(json.dumps(envelope["payload"], separators=(",", ":")))
+    assert 500 <= payload_size <= 512
+
+
+def test_build_fleet_shards_partition_devices(monkeypatch):
+    monkeypatch.setattr(loadgen, "LOADGEN_TENANTS", 2)
+    monkeypatch.setattr(loadgen, "LOADGEN_DEVICES_PER_TENANT", 5)
+    shards = [loadgen.build_fleet(i, 3) for i in range(3)]
+    ids = [(d["tenant_id"], d["device_id"]) for shard in shards for d in shard]
+    assert len(ids) == len(set(ids)) == 10
+
+
+def test_merge_shards_combines_rates_and_latency():
+    a = loadgen.ShardStats(2)
+    a.sent_per_second = [5, 5, 0]
+    a.sent = 10
+    a.latency.record(0.002)
+    b = loadgen.ShardStats(2)
+    b.sent_per_second = [5, 3, 0]
+    b.sent = 8
+    b.errors = 1
+
+    report = loadgen.merge_shards([a.to_dict(), b.to_dict()], 2)
+
+    assert report["sent"] == 18
+    assert report["errors"] == 1
+    assert report["send_rate"]["per_second"] == [10, 8, 0]
+    assert report["send_rate"]["min"] == 8
+    assert report["ack_latency"]["count"] == 1
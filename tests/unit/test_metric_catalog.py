@@ -0,0 +1,99 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+from services.ingest_iot import ingest as ingest_module
+from services.ingest_iot.ingest import Ingestor, _metric_value_type
+
+pytestmark = [pytest.mark.unit]
+
+TS = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeConn:
+    def __init__(self, fail_on=None):
+        self.executed = []
+        self.fail_on = fail_on
+
+    async def execute(self, query, *args):
+        if self.fail_on and self.fail_on in query:
+            raise RuntimeError("boom")
+        self.executed.append((query, args))
+
+    async def fetch(self, query, *args):
+        return [{"metric_key": "temp"}, {"metric_key": "rssi"}]
+
+    async def fetchrow(self, query, *args):
+        return None
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+def _ingestor(conn):
+    ingestor = Ingestor()
+    ingestor.pool = FakePool(conn)
+    return ingestor
+
+
+def _catalog_writes(conn):
+    return [args for query, args in conn.executed if "telemetry_metric_catalog" in query]
+
+
+async def test_catalog_written_once_per_touch_interval(monkeypatch):
+    conn = FakeConn()
+    ingestor = _ingestor(conn)
+    ingestor._known_sensors.update({("t1", "d1", "temp"), ("t1", "d1", "rssi")})
+
+    await ingestor._ensure_sensors("t1", "d1", {"temp": 21.5, "rssi": -60}, TS)
+    await ingestor._ensure_sensors("t1", "d1", {"temp": 22.0, "rssi": -61}, TS)
+
+    writes = _catalog_writes(conn)
+    assert len(writes) == 1
+    assert writes[0][2] == ["temp", "rssi"]
+    assert writes[0][3] == ["number", "number"]
+
+    monkeypatch.setattr(ingest_module, "METRIC_CATALOG_TOUCH_SECONDS", 0)
+    await ingestor._ensure_sensors("t1", "d1", {"temp": 22.5}, TS)
+    assert len(_catalog_writes(conn)) == 2
+
+
+async def test_new_key_cataloged_on_discovery_path():
+    conn = FakeConn()
+    ingestor = _ingestor(conn)
+
+    await ingestor._ensure_sensors("t1", "d1", {"door_open": True}, TS)
+
+    writes = _catalog_writes(conn)
+    assert len(writes) == 1
+    assert writes[0][2] == ["door_open"]
+    assert writes[0][3] == ["boolean"]
+
+
+async def test_failed_write_makes_keys_due_again():
+    conn = FakeConn(fail_on="telemetry_metric_catalog")
+    ingestor = _ingestor(conn)
+    ingestor._known_sensors.add(("t1", "d1", "temp"))
+
+    await ingestor._ensure_sensors("t1", "d1", {"temp": 1}, TS)
+
+    assert ingestor._catalog_due("t1", "d1", {"temp": 1}) == ["temp"]
+
+
+def test_metric_value_types():
+    assert _metric_value_type(True) == "boolean"
+    assert _metric_value_type(3) == "number"
+    assert _metric_value_type(2.5) == "number"
+    assert _metric_value_type("open") == "string"
+    assert _metric_value_type({"x": 1}) == "json"
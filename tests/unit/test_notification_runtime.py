@@ -0,0 +1,195 @@
+import asyncio
+import threading
+
+import pytest
+
+from notifications import runtime as runtime_module
+from notifications import senders as senders_module
+from notifications.runtime import LaneConfig, NotificationSenderRuntime
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+
+def _alert(alert_id, severity=3):
+    return {"alert_id": alert_id, "alert_type": "THRESHOLD", "severity": severity, "device_id": f"dev-{alert_id}"}
+
+
+async def _runtime(lanes):
+    runtime = NotificationSenderRuntime(lanes=lanes)
+    await runtime.start()
+    return runtime
+
+
+async def test_slack_alerts_batched_into_one_digest_per_webhook(monkeypatch):
+    posts = []
+
+    async def fake_digest(webhook_url, alerts, client=None):
+        posts.append((webhook_url, [a["alert_id"] for a in alerts]))
+        return {"success": True, "status_code": 200}
+
+    monkeypatch.setattr(runtime_module, "send_slack_digest", fake_digest)
+    runtime = await _runtime({"slack": LaneConfig(workers=1, max_batch=10, linger_ms=50)})
+    try:
+        results = await asyncio.gather(
+            *(runtime.send("slack", {"webhook_url": "https://hooks/a"}, _alert(i)) for i in range(5)),
+            runtime.send("slack", {"webhook_url": "https://hooks/b"}, _alert(99)),
+        )
+    finally:
+        await runtime.stop()
+
+    assert all(r["success"] for r in results)
+    assert sorted(posts) == [("https://hooks/a", [0, 1, 2, 3, 4]), ("https://hooks/b", [99])]
+
+
+async def test_slow_channel_type_does_not_block_others(monkeypatch):
+    release = asyncio.Event()
+
+    async def slow_pagerduty(integration_key, alerts, client=None):
+        await release.wait()
+        return [{"success": True} for _ in alerts]
+
+    async def fast_teams(webhook_url, alerts, client=None):
+        return {"success": True}
+
+    monkeypatch.setattr(runtime_module, "send_pagerduty_batch", slow_pagerduty)
+    monkeypatch.setattr(runtime_module, "send_teams_digest", fast_teams)
+    runtime = await _runtime({
+        "pagerduty": LaneConfig(workers=1),
+        "teams": LaneConfig(workers=1),
+    })
+    try:
+        stuck = asyncio.create_task(runtime.send("pagerduty", {"integration_key": "k"}, _alert(1)))
+        result = await asyncio.wait_for(
+            runtime.send("teams", {"webhook_url": "https://teams"}, _alert(2)), timeout=1.0
+        )
+        assert result == {"success": True}
+        assert not stuck.done()
+        release.set()
+        assert (await stuck)["success"]
+    finally:
+        await runtime.stop()
+
+
+async def test_batch_failure_reported_per_alert(monkeypatch):
+    async def broken(webhook_url, alerts, client=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(runtime_module, "send_slack_digest", broken)
+    runtime = await _runtime({"slack": LaneConfig(workers=1, max_batch=5, linger_ms=10)})
+    try:
+        results = await asyncio.gather(
+            *(runtime.send("slack", {"webhook_url": "https://hooks/a"}, _alert(i)) for i in range(3))
+        )
+    finally:
+        await runtime.stop()
+    assert [r["success"] for r in results] == [False, False, False]
+
+
+async def test_short_batch_result_resolves_every_alert(monkeypatch):
+    async def short(integration_key, alerts, client=None):
+        return [{"success": True}]
+
+    monkeypatch.setattr(runtime_module, "send_pagerduty_batch", short)
+    runtime = await _runtime({"pagerduty": LaneConfig(workers=1, max_batch=5, linger_ms=50)})
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*(runtime.send("pagerduty", {"integration_key": "k"}, _alert(i)) for i in range(3))),
+            timeout=1.0,
+        )
+    finally:
+        await runtime.stop()
+    assert [r["success"] for r in results] == [True, False, False]
+    assert "no result" in results[2]["error"]
+
+
+async def test_stop_fails_deliveries_already_taken_by_a_worker(monkeypatch):
+    started = asyncio.Event()
+
+    async def hanging(integration_key, alerts, client=None):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(runtime_module, "send_pagerduty_batch", hanging)
+    runtime = await _runtime({"pagerduty": LaneConfig(workers=1, max_batch=5, linger_ms=10)})
+    sends = [
+        asyncio.create_task(runtime.send("pagerduty", {"integration_key": "k"}, _alert(i))) for i in range(2)
+    ]
+    await asyncio.wait_for(started.wait(), timeout=1.0)
+    await runtime.stop()
+
+    outcomes = await asyncio.wait_for(asyncio.gather(*sends, return_exceptions=True), timeout=1.0)
+    assert [str(o) for o in outcomes] == ["notification runtime stopped"] * 2
+
+
+async def test_unknown_channel_type_rejected():
+    runtime = await _runtime({"slack": LaneConfig(workers=1)})
+    try:
+        with pytest.raises(ValueError):
+            await runtime.send("carrier-pigeon", {}, _alert(1))
+    finally:
+        await runtime.stop()
+
+
+async def test_pagerduty_batch_collapses_dedup_keys(monkeypatch):
+    sent = []
+
+    async def fake_send(integration_key, alert, client=None):
+        sent.append(alert)
+        return {"success": True, "status_code": 202}
+
+    monkeypatch.setattr(senders_module, "send_pagerduty", fake_send)
+    first = {**_alert(7), "summary": "first"}
+    second = {**_alert(7), "summary": "second"}
+    results = await senders_module.send_pagerduty_batch("key", [first, _alert(8), second])
+
+    assert len(sent) == 2
+    assert [a["summary"] for a in sent if a["alert_id"] == 7] == ["second"]
+    assert len(results) == 3
+
+
+class _FakeMQTTClient:
+    created = []
+
+    def __init__(self):
+        self.on_connect = None
+        self.on_disconnect = None
+        self.credentials = None
+        self.closed = False
+        _FakeMQTTClient.created.append(self)
+
+    def username_pw_set(self, username, password):
+        self.credentials = (username, password)
+
+    def connect(self, host, port, keepalive=60):
+        pass
+
+    def loop_start(self):
+        # CONNACK arrives later, on paho's network thread.
+        threading.Timer(0.05, self.on_connect, args=(self, None, {}, 0)).start()
+
+    def loop_stop(self):
+        self.closed = True
+
+    def disconnect(self):
+        pass
+
+
+async def test_mqtt_pool_waits_for_connack_and_keys_on_credentials(monkeypatch):
+    import paho.mqtt.client as paho_mqtt
+
+    _FakeMQTTClient.created = []
+    monkeypatch.setattr(paho_mqtt, "Client", _FakeMQTTClient)
+    pool = senders_module.MQTTPublisherPool(connect_timeout=1.0)
+    settings = {"broker_host": "broker", "broker_port": 1883, "username": "u", "password": "p1"}
+
+    clients = await asyncio.gather(*(asyncio.to_thread(pool._client_for, settings) for _ in range(4)))
+
+    # Concurrent callers share the one connecting client instead of replacing it.
+    assert len(_FakeMQTTClient.created) == 1
+    assert all(c is clients[0] for c in clients)
+    assert not clients[0].closed
+
+    rotated = await asyncio.to_thread(pool._client_for, {**settings, "password": "p2"})
+    assert rotated is not clients[0]
+    assert rotated.credentials == ("u", "p2")
+    pool.close()
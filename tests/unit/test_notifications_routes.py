@@ -232,11 +232,15 @@ async def test_test_channel_webhook_returns_delivery_payload(client, monkeypatch
         "is_enabled": True,
     }
     _mock_customer_deps(monkeypatch, conn)
-    monkeypatch.setattr(notifications_routes, "send_webhook", AsyncMock(return_value={"ok": True}))
+    send = AsyncMock(return_value={"ok": True})
+    monkeypatch.setattr(notifications_routes.notification_runtime, "send", send)
 
     resp = await client.post("/api/v1/customer/notification-channels/1/test", headers=_auth_header())
     assert resp.status_code == 200
     assert resp.json()["delivery"]["ok"] is True
+    channel_type, config, _alert = send.await_args.args
+    assert channel_type == "webhook"
+    assert config["url"] == "https://example.com/hook"
 
 
 async def test_test_channel_slack_success(client, monkeypatch):
@@ -250,7 +254,9 @@ async def test_test_channel_slack_success(client, monkeypatch):
         "is_enabled": True,
     }
     _mock_customer_deps(monkeypatch, conn)
-    monkeypatch.setattr(notifications_routes, "send_slack", AsyncMock())
+    monkeypatch.setattr(
+        notifications_routes.notification_runtime, "send", AsyncMock(return_value={"success": True})
+    )
 
     resp = await client.post("/api/v1/customer/notification-channels/2/test", headers=_auth_header())
     assert resp.status_code == 200
@@ -267,10 +273,34 @@ async def test_test_channel_sender_error_returns_502(client, monkeypatch):
         "is_enabled": True,
     }
     _mock_customer_deps(monkeypatch, conn)
-    monkeypatch.setattr(notifications_routes, "send_slack", AsyncMock(side_effect=Exception("boom")))
+    monkeypatch.setattr(
+        notifications_routes.notification_runtime, "send", AsyncMock(side_effect=Exception("boom"))
+    )
+
+    resp = await client.post("/api/v1/customer/notification-channels/2/test", headers=_auth_header())
+    assert resp.status_code == 502
+
+
+async def test_test_channel_failed_delivery_returns_502(client, monkeypatch):
+    conn = FakeConn()
+    conn.fetchrow_result = {
+        "channel_id": 2,
+        "tenant_id": "tenant-a",
+        "name": "S",
+        "channel_type": "slack",
+        "config": {"webhook_url": "https://hooks.slack/test"},
+        "is_enabled": True,
+    }
+    _mock_customer_deps(monkeypatch, conn)
+    monkeypatch.setattr(
+        notifications_routes.notification_runtime,
+        "send",
+        AsyncMock(return_value={"success": False, "status_code": 404}),
+    )
 
     resp = await client.post("/api/v1/customer/notification-channels/2/test", headers=_auth_header())
     assert resp.status_code == 502
+    assert "status 404" in resp.json()["detail"]
 
 
 async def test_list_routing_rules(client, monkeypatch):
@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from db.pagination import (
+    count_rows,
+    decode_cursor,
+    encode_cursor,
+    keyset_predicate,
+    next_cursor,
+)
+from db.queries import fetch_alerts_v2, fetch_devices_v2
+
+pytestmark = [pytest.mark.unit]
+
+TS = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+class FakeConn:
+    def __init__(self, rows=None, plan_rows=1234):
+        self.rows = rows or []
+        self.plan_rows = plan_rows
+        self.fetch_calls = []
+        self.fetchval_calls = []
+
+    async def fetch(self, query, *args):
+        self.fetch_calls.append((query, args))
+        return self.rows
+
+    async def fetchval(self, query, *args):
+        self.fetchval_calls.append((query, args))
+        if query.startswith("EXPLAIN"):
+            return [{"Plan": {"Plan Rows": self.plan_rows}}]
+        return 7
+
+
+def test_cursor_round_trip_preserves_types():
+    token = encode_cursor("site-a", "dev-1", 42, TS)
+    assert decode_cursor(token, (str, str, int, datetime)) == ["site-a", "dev-1", 42, TS]
+
+
+@pytest.mark.parametrize("token", ["not-base64!", encode_cursor("only-one"), "e30"])
+def test_malformed_cursor_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, (str, str))
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ({"ts": 5}, 1),
+        ({"ts": "not-a-time"}, 1),
+        ("x", 1),
+        (TS.isoformat(), 1),
+        ({"ts": TS.isoformat()}, "1"),
+        ({"ts": TS.isoformat()}, True),
+        ({"ts": TS.isoformat()}, 2**63),
+    ],
+)
+def test_cursor_value_types_checked(values):
+    token = encode_cursor(*values)
+    with pytest.raises(ValueError):
+        decode_cursor(token, (datetime, int))
+
+
+def test_keyset_predicate_direction():
+    assert keyset_predicate(["a", "b"], 3) == "(a, b) > ($3, $4)"
+    assert keyset_predicate(["created_at", "id"], 2, descending=True) == "(created_at, id) < ($2, $3)"
+
+
+def test_next_cursor_only_when_more_rows():
+    rows = [{"site_id": "s", "device_id": f"d{i}"} for i in range(3)]
+    assert next_cursor(rows[:2], 2, ("site_id", "device_id")) is None
+    assert decode_cursor(next_cursor(rows, 2, ("site_id", "device_id")), (str, str)) == ["s", "d1"]
+
+
+async def test_count_rows_estimate_uses_explain():
+    conn = FakeConn(plan_rows=98765)
+    assert await count_rows(conn, "FROM fleet_alert WHERE tenant_id = $1", "t1", mode="estimate") == 98765
+    assert conn.fetchval_calls[0][0].startswith("EXPLAIN (FORMAT JSON) SELECT 1 FROM fleet_alert")
+    assert await count_rows(conn, "FROM fleet_alert WHERE tenant_id = $1", "t1") == 7
+
+
+async def test_devices_v2_keyset_page():
+    rows = [{"site_id": "s1", "device_id": f"d{i}"} for i in range(3)]
+    conn = FakeConn(rows=rows)
+    cursor = encode_cursor("s0", "d9")
+
+    result = await fetch_devices_v2(conn, "tenant-a", limit=2, offset=50, cursor=cursor)
+
+    query, args = conn.fetch_calls[0]
+    assert "(dr.site_id, dr.device_id) > ($2, $3)" in query
+    assert "OFFSET" in query and args[-2:] == (3, 0)
+    assert args[1:3] == ("s0", "d9")
+    assert "to_regclass" not in query
+    assert "FROM device_sensors s" in query
+    assert [d["device_id"] for d in result["devices"]] == ["d0", "d1"]
+    assert decode_cursor(result["next_cursor"], (str, str)) == ["s1", "d1"]
+
+
+async def test_alerts_v2_keyset_descending():
+    conn = FakeConn()
+    await fetch_alerts_v2(conn, "tenant-a", cursor=encode_cursor(TS, 17))
+
+    query, args = conn.fetch_calls[0]
+    assert "(created_at, id) < ($3, $4)" in query
+    assert "ORDER BY created_at DESC, id DESC" in query
+    assert args[2:4] == (TS, 17)
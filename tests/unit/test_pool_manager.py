@@ -0,0 +1,103 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from db import pool_manager as pool_manager_module
+from db.pool_manager import PoolManager, WorkloadPool
+
+pytestmark = [pytest.mark.unit]
+
+
+class FakePool:
+    def __init__(self, dsn=None):
+        self.dsn = dsn
+        self.active = 0
+        self.peak = 0
+        self.closed = False
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            yield object()
+        finally:
+            self.active -= 1
+
+    def get_size(self):
+        return 4
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def created(monkeypatch):
+    pools = []
+
+    async def _create_pool(**kwargs):
+        pool = FakePool(kwargs.get("dsn"))
+        pools.append(pool)
+        return pool
+
+    monkeypatch.setattr(pool_manager_module.asyncpg, "create_pool", _create_pool)
+    return pools
+
+
+async def test_workload_budget_limits_concurrency():
+    pool = FakePool()
+    view = WorkloadPool("background", pool, budget=2)
+    release = asyncio.Event()
+
+    async def worker():
+        async with view.acquire():
+            await release.wait()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    assert pool.active == 2
+    assert view.waiting == 3
+    release.set()
+    await asyncio.gather(*tasks)
+    assert pool.peak == 2
+    assert view.in_use == 0 and view.waiting == 0
+
+
+async def test_workload_pool_delegates_pool_attributes():
+    view = WorkloadPool("interactive", FakePool(), budget=1)
+    assert view.get_size() == 4
+
+
+async def test_all_workloads_share_one_primary_pool(created):
+    manager = PoolManager(dsn="postgresql://primary/db", max_size=8)
+    views = [await manager.get(name) for name in ("interactive", "analytics", "background", "streaming")]
+    assert len(created) == 1
+    assert {v.budget for v in views} == {8, 4, 2}
+    assert await manager.get("interactive") is views[0]
+
+
+async def test_analytics_routes_to_replica_when_configured(created):
+    manager = PoolManager(dsn="postgresql://primary/db", replica_dsn="postgresql://replica/db")
+    interactive = await manager.get("interactive")
+    analytics = await manager.get("analytics")
+    assert [p.dsn for p in created] == ["postgresql://primary/db", "postgresql://replica/db"]
+    assert interactive._pool is created[0]
+    assert analytics._pool is created[1]
+    await manager.close()
+    assert all(p.closed for p in created)
+
+
+async def test_unknown_workload_rejected():
+    with pytest.raises(ValueError):
+        await PoolManager().get("reporting")
+
+
+def test_budgets_from_env(monkeypatch):
+    monkeypatch.setenv("PG_POOL_MAX", "20")
+    monkeypatch.setenv("PG_BUDGET_ANALYTICS", "3")
+    monkeypatch.setenv("PG_REPLICA_URL", "postgresql://replica/db")
+    manager = PoolManager.from_env()
+    assert manager.budgets["analytics"] == 3
+    assert manager.budgets["interactive"] == 20
+    assert manager.replica_dsn == "postgresql://replica/db"
@@ -1,9 +1,10 @@
 import asyncio
+import time
 from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
-from services.shared.rate_limiter import RateLimiter, SlidingWindow
+from services.shared.rate_limiter import GcraWindow, RateLimiter, SlidingWindow
 
 pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
 
@@ -209,3 +210,117 @@ async def test_get_stats_includes_limit_counters(monkeypatch):
     stats = limiter.get_stats()
     assert stats.get("allowed", 0) >= 1
     assert stats.get("device_limited", 0) >= 1
+
+
+async def test_gcra_window_keeps_constant_state_at_high_limits():
+    window = GcraWindow()
+    now = 1000.0
+    for _ in range(10_000):
+        allowed, _ = window.add_request(now, 1.0, 10_000)
+        assert allowed
+    allowed, count = window.add_request(now, 1.0, 10_000)
+    assert allowed is False
+    assert count == 10_000
+    # Half the window later, half the burst has drained; this request is counted too.
+    assert window.add_request(now + 0.5, 1.0, 10_000) == (True, 5_001)
+    assert not hasattr(window, "timestamps")
+    assert SlidingWindow is GcraWindow
+
+
+class _FakeBackend:
+    def __init__(self, results=None, error=None):
+        self.results = results
+        self.error = error
+        self.calls = []
+
+    async def acquire(self, checks):
+        self.calls.append(checks)
+        if self.error:
+            raise self.error
+        return self.results or [(True, 1)] * len(checks)
+
+
+async def test_check_all_async_uses_shared_backend_in_one_call():
+    backend = _FakeBackend()
+    limiter = RateLimiter(backend=backend)
+    ok, _reason, status = await limiter.check_all_async("d1", "10.0.0.1", True)
+    assert ok and status == 200
+    assert [c[0] for c in backend.calls[0]] == ["global:global", "device:d1", "ip_known:10.0.0.1"]
+
+
+async def test_check_all_async_reports_first_rejected_limit():
+    backend = _FakeBackend(results=[(True, 1), (False, 2), (True, 1)])
+    limiter = RateLimiter(backend=backend)
+    ok, reason, status = await limiter.check_all_async("d1", "10.0.0.1", True)
+    assert ok is False and status == 429
+    assert reason.startswith("Device d1 rate limited")
+    assert limiter.get_stats()["device_limited"] == 1
+
+
+async def test_check_all_async_falls_back_to_local_on_backend_error():
+    limiter = RateLimiter(backend=_FakeBackend(error=RuntimeError("db down")))
+    ok, _reason, status = await limiter.check_all_async(None, "1.2.3.4", False)
+    assert ok and status == 200
+    assert "1.2.3.4" in limiter._unknown_ip_windows
+
+
+async def test_check_many_async_uses_one_backend_call_for_a_batch():
+    backend = _FakeBackend(results=[(True, 1), (True, 1), (True, 1), (True, 1), (False, 2), (True, 1)])
+    limiter = RateLimiter(backend=backend)
+    verdicts = await limiter.check_many_async([("d1", "10.0.0.1", True), ("d2", "10.0.0.1", True)])
+    assert len(backend.calls) == 1
+    assert [c[0] for c in backend.calls[0]] == [
+        "global:global", "device:d1", "ip_known:10.0.0.1",
+        "global:global", "device:d2", "ip_known:10.0.0.1",
+    ]
+    assert verdicts[0] == (True, "", 200)
+    assert verdicts[1][0] is False and verdicts[1][1].startswith("Device d2 rate limited")
+
+
+class _GcraBackend:
+    """In-memory model of rate_limit_acquire (migration 130)."""
+
+    def __init__(self):
+        self.windows = {}
+
+    async def acquire(self, checks):
+        results = []
+        rejected = None
+        for key, requests, window_seconds, request_no in checks:
+            if request_no == rejected:
+                results.append((None, None))
+                continue
+            window = self.windows.setdefault(key, GcraWindow())
+            allowed, used = window.add_request(time.time(), window_seconds, requests)
+            if not allowed:
+                rejected = request_no
+            results.append((allowed, used))
+        return results
+
+
+async def test_shared_backend_matches_local_limiter_on_mixed_batch(monkeypatch):
+    monkeypatch.setattr("services.shared.rate_limiter.time.time", lambda: 1000.0)
+    backend = _GcraBackend()
+    shared = RateLimiter(backend=backend)
+    local = RateLimiter()
+    for limiter in (shared, local):
+        limiter.config["global"].requests = 4
+        limiter.config["device"].requests = 2
+        limiter.config["ip_unknown"].requests = 1
+
+    requests = [
+        ("d1", "10.0.0.1", True),
+        ("d1", "10.0.0.1", True),
+        ("d1", "10.0.0.1", True),  # device limit rejects
+        (None, "10.0.0.9", False),
+        ("d2", "10.0.0.1", True),  # global limit rejects; device/ip not charged
+        (None, "10.0.0.9", False),
+    ]
+    verdicts = await shared.check_many_async(requests)
+
+    assert verdicts == [local.check_all(*request) for request in requests]
+    assert [v[2] for v in verdicts] == [200, 200, 429, 200, 503, 503]
+    assert set(backend.windows) == {"global:global", "device:d1", "ip_known:10.0.0.1", "ip_unknown:10.0.0.9"}
+    assert backend.windows["device:d1"].tat == local._device_windows["d1"].tat
+    assert backend.windows["ip_known:10.0.0.1"].tat == local._ip_windows["10.0.0.1"].tat
+    assert backend.windows["global:global"].tat == local._global_window.tat
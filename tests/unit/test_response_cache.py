@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from response_cache import ResponseCache
+
+pytestmark = [pytest.mark.unit]
+
+
+async def test_concurrent_misses_share_one_computation():
+    cache = ResponseCache("test", ttl_seconds=60)
+    calls = 0
+    release = asyncio.Event()
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"value": calls}
+
+    waiters = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+    assert calls == 1
+    assert all(r == {"value": 1} for r in results)
+
+
+async def test_value_cached_until_ttl_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("response_cache.time.monotonic", lambda: now[0])
+    cache = ResponseCache("test", ttl_seconds=5)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert await cache.get_or_compute("k", compute) == 1
+    now[0] += 4
+    assert await cache.get_or_compute("k", compute) == 1
+    now[0] += 2
+    assert await cache.get_or_compute("k", compute) == 2
+
+
+async def test_failure_propagates_and_is_not_cached():
+    cache = ResponseCache("test", ttl_seconds=60)
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("db down")
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("k", compute)
+    assert await cache.get_or_compute("k", compute) == "ok"
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_work():
+    cache = ResponseCache("test", ttl_seconds=60)
+    release = asyncio.Event()
+
+    async def compute():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(cache.get_or_compute("k", compute))
+    second = asyncio.create_task(cache.get_or_compute("k", compute))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == "done"
+
+
+async def test_keys_are_independent_and_invalidate_clears():
+    cache = ResponseCache("test", ttl_seconds=60)
+    counter = {"a": 0, "b": 0}
+
+    def compute_for(key):
+        async def compute():
+            counter[key] += 1
+            return counter[key]
+        return compute
+
+    await cache.get_or_compute("a", compute_for("a"))
+    await cache.get_or_compute("b", compute_for("b"))
+    cache.invalidate("a")
+    assert await cache.get_or_compute("a", compute_for("a")) == 2
+    assert await cache.get_or_compute("b", compute_for("b")) == 1
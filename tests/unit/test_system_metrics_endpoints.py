@@ -11,6 +11,13 @@ from tests.unit.test_system_routes import _Pool, _auth_header, _mock_auth
 pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
 
 
+@pytest.fixture(autouse=True)
+def _clear_response_cache():
+    system_routes.operator_response_cache.invalidate()
+    yield
+    system_routes.operator_response_cache.invalidate()
+
+
 @pytest.fixture
 async def client():
     app_module.app.router.on_startup.clear()
@@ -42,7 +49,7 @@ async def test_system_metrics_history_returns_points(client, monkeypatch):
     _mock_auth(monkeypatch, role="operator")
     conn = AsyncMock()
     now = datetime.now(timezone.utc)
-    conn.fetch.return_value = [{"time": now, "value": 12.5}]
+    conn.fetch.return_value = [{"metric_name": "messages_written", "time": now, "value": 12.5}]
     monkeypatch.setattr(system_routes, "get_pool", AsyncMock(return_value=_Pool(conn)))
     resp = await client.get(
         "/operator/system/metrics/history?metric=messages_written&minutes=60",
@@ -2,6 +2,7 @@ from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
 from unittest.mock import AsyncMock
 
+import asyncpg
 import httpx
 import pytest
 
@@ -52,6 +53,13 @@ def _mock_auth(monkeypatch, role="operator"):
     monkeypatch.setattr(permissions_module, "inject_permissions", _grant_all)
 
 
+@pytest.fixture(autouse=True)
+def _clear_response_cache():
+    system_routes.operator_response_cache.invalidate()
+    yield
+    system_routes.operator_response_cache.invalidate()
+
+
 @pytest.fixture
 async def client():
     app_module.app.router.on_startup.clear()
@@ -121,8 +129,8 @@ async def test_system_metrics_history_returns_time_series(client, monkeypatch):
     now = datetime.now(timezone.utc)
     conn = AsyncMock()
     conn.fetch.return_value = [
-        {"time": now - timedelta(minutes=1), "value": 1},
-        {"time": now, "value": 2},
+        {"metric_name": "test_metric", "time": now - timedelta(minutes=1), "value": 1},
+        {"metric_name": "test_metric", "time": now, "value": 2},
     ]
     monkeypatch.setattr(system_routes, "get_pool", AsyncMock(return_value=_Pool(conn)))
 
@@ -135,18 +143,90 @@ async def test_system_metrics_history_returns_time_series(client, monkeypatch):
 
 async def test_system_metrics_history_batch_returns_multiple(client, monkeypatch):
     _mock_auth(monkeypatch, role="operator")
-    monkeypatch.setattr(
-        system_routes,
-        "get_metrics_history",
-        AsyncMock(side_effect=[
-            {"metric": "m1", "points": [{"time": "t1", "value": 1}]},
-            {"metric": "m2", "points": [{"time": "t2", "value": 2}]},
-        ]),
-    )
+    now = datetime.now(timezone.utc)
+    conn = AsyncMock()
+    conn.fetch.return_value = [
+        {"metric_name": "m1", "time": now, "value": 1},
+        {"metric_name": "m2", "time": now, "value": 2},
+    ]
+    monkeypatch.setattr(system_routes, "get_pool", AsyncMock(return_value=_Pool(conn)))
     resp = await client.get("/operator/system/metrics/history/batch?metrics=m1,m2&minutes=5", headers=_auth_header())
     assert resp.status_code == 200
     data = resp.json()
-    assert "m1" in data and "m2" in data
+    assert data["m1"]["points"][0]["value"] == 1
+    assert data["m2"]["points"][0]["value"] == 2
+    assert conn.fetch.await_count == 1
+    assert conn.fetch.await_args.args[1] == ["m1", "m2"]
+
+
+async def test_system_metrics_history_batch_isolates_failing_metric(client, monkeypatch):
+    _mock_auth(monkeypatch, role="operator")
+    now = datetime.now(timezone.utc)
+    conn = AsyncMock()
+
+    async def _fetch(_query, metrics, *_args):
+        if "m2" in metrics:
+            raise asyncpg.DataError("bad metric")
+        return [{"metric_name": "m1", "time": now, "value": 1}]
+
+    conn.fetch.side_effect = _fetch
+    monkeypatch.setattr(system_routes, "get_pool", AsyncMock(return_value=_Pool(conn)))
+    resp = await client.get("/operator/system/metrics/history/batch?metrics=m1,m2&minutes=5", headers=_auth_header())
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["m1"]["points"][0]["value"] == 1
+    assert data["m2"] == {"points": [], "error": "bad metric"}
+
+
+async def test_system_metrics_history_batch_does_not_requery_when_db_unavailable(client, monkeypatch):
+    _mock_auth(monkeypatch, role="operator")
+    conn = AsyncMock()
+    conn.fetch.side_effect = ConnectionRefusedError("connection refused")
+    monkeypatch.setattr(system_routes, "get_pool", AsyncMock(return_value=_Pool(conn)))
+    resp = await client.get("/operator/system/metrics/history/batch?metrics=m3,m4&minutes=5", headers=_auth_header())
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "m3": {"points": [], "error": "connection refused"},
+        "m4": {"points": [], "error": "connection refused"},
+    }
+    assert conn.fetch.await_count == 1
+
+
+async def test_system_metrics_history_rate_keeps_single_sample_raw(client, monkeypatch):
+    _mock_auth(monkeypatch, role="operator")
+    now = datetime.now(timezone.utc)
+    conn = AsyncMock()
+    conn.fetch.return_value = [
+        {"metric_name": "test_metric", "time": now, "value": 42, "rate_value": None, "samples": 1},
+    ]
+    monkeypatch.setattr(system_routes, "get_pool", AsyncMock(return_value=_Pool(conn)))
+
+    resp = await client.get(
+        "/operator/system/metrics/history?metric=test_metric&minutes=5&rate=true",
+        headers=_auth_header(),
+    )
+    assert resp.status_code == 200
+    assert [p["value"] for p in resp.json()["points"]] == [42]
+
+
+async def test_system_metrics_history_downsamples_to_max_points(client, monkeypatch):
+    _mock_auth(monkeypatch, role="operator")
+    start = datetime.now(timezone.utc) - timedelta(minutes=100)
+    conn = AsyncMock()
+    conn.fetch.return_value = [
+        {"metric_name": "test_metric", "time": start + timedelta(seconds=10 * i), "value": i % 7}
+        for i in range(500)
+    ]
+    monkeypatch.setattr(system_routes, "get_pool", AsyncMock(return_value=_Pool(conn)))
+
+    resp = await client.get(
+        "/operator/system/metrics/history?metric=test_metric&minutes=120&max_points=50",
+        headers=_auth_header(),
+    )
+    assert resp.status_code == 200
+    points = resp.json()["points"]
+    assert len(points) == 50
+    assert points[0]["time"] == start.isoformat()
 
 
 async def test_system_metrics_latest_returns_current_values(client, monkeypatch):
@@ -178,8 +258,8 @@ async def test_aggregates_returns_platform_counts(client, monkeypatch):
     _mock_auth(monkeypatch, role="operator")
     now = datetime.now(timezone.utc)
     conn = AsyncMock()
-    conn.fetchrow = AsyncMock(side_effect=[
-        {
+    conn.fetchrow = AsyncMock(
+        return_value={
             "tenants_active": 1,
             "tenants_suspended": 0,
             "tenants_deleted": 0,
@@ -206,13 +286,11 @@ async def test_aggregates_returns_platform_counts(client, monkeypatch):
             "deliveries_failed": 2,
             "deliveries_24h": 12,
             "sites_total": 1,
-        },
-        {
             "last_alert": now,
             "last_device_activity": now,
             "last_delivery": now,
-        },
-    ])
+        }
+    )
     monkeypatch.setattr(system_routes, "get_pool", AsyncMock(return_value=_Pool(conn)))
     monkeypatch.setattr(system_routes, "operator_connection", _operator_connection(conn))
     resp = await client.get("/operator/system/aggregates", headers=_auth_header())
@@ -221,6 +299,19 @@ async def test_aggregates_returns_platform_counts(client, monkeypatch):
     assert data["tenants"]["total"] == 1
     assert data["alerts"]["open"] == 3
     assert data["integrations"]["total"] == 3
+    assert conn.fetchrow.await_count == 1
+    assert "FILTER (WHERE" in conn.fetchrow.await_args.args[0]
+
+
+async def test_aggregates_served_from_cache(client, monkeypatch):
+    _mock_auth(monkeypatch, role="operator")
+    load = AsyncMock(return_value={"tenants": {"total": 7}})
+    monkeypatch.setattr(system_routes, "_load_system_aggregates", load)
+    for _ in range(3):
+        resp = await client.get("/operator/system/aggregates", headers=_auth_header())
+        assert resp.status_code == 200
+        assert resp.json()["tenants"]["total"] == 7
+    assert load.await_count == 1
 
 
 async def test_aggregates_requires_operator_role(client, monkeypatch):
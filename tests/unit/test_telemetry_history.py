@@ -181,3 +181,15 @@ async def test_telemetry_history_tenant_isolation(client, monkeypatch):
     )
     assert resp.status_code == 200
     assert "WHERE tenant_id = $3" in conn.last_query
+
+
+async def test_telemetry_history_max_points_widens_bucket(client, monkeypatch):
+    conn = FakeConn()
+    _mock_customer_deps(monkeypatch, conn)
+    resp = await client.get(
+        "/customer/devices/dev-1/telemetry/history?metric=temperature&range=7d&max_points=50",
+        headers=_auth_header(),
+    )
+    assert resp.status_code == 200
+    assert resp.json()["bucket_size"] == "6 hours"
+    assert "telemetry_rollup_1h" in conn.last_query
@@ -9,6 +9,8 @@ from services.ui_iot.db.telemetry_queries import (
     fetch_device_telemetry_latest,
     fetch_telemetry_time_series,
     fetch_fleet_telemetry_summary,
+    parse_interval,
+    select_rollup_tier,
 )
 
 
@@ -83,6 +85,23 @@ class TestAggregatedQueries:
         call_args = mock_conn.fetch.call_args[0][0]
         assert "time_bucket" in call_args
 
+    @pytest.mark.asyncio
+    async def test_long_range_reads_rollup_tier(self, mock_conn):
+        mock_conn.fetch.return_value = []
+
+        await fetch_telemetry_time_series(
+            mock_conn,
+            tenant_id="tenant-a",
+            device_id=None,
+            metric_key="temperature",
+            hours=24 * 30,
+            bucket_minutes=360,
+        )
+
+        query = mock_conn.fetch.call_args[0][0]
+        assert "FROM telemetry_rollup_1h" in query
+        assert "metric_key = $2" in query
+
     @pytest.mark.asyncio
     async def test_fleet_summary_query(self, mock_conn):
         mock_conn.fetchrow.return_value = {
@@ -102,3 +121,25 @@ class TestAggregatedQueries:
 
         assert result["metrics"]["temperature"]["avg"] is None
         assert mock_conn.fetchrow.called
+
+
+class TestRollupTierSelection:
+    def test_short_range_uses_raw(self):
+        assert select_rollup_tier(timedelta(hours=1), timedelta(minutes=1)) is None
+
+    def test_picks_coarsest_tier_that_tiles_bucket(self):
+        assert select_rollup_tier(timedelta(hours=24), timedelta(minutes=15)).relation == "telemetry_rollup_1m"
+        assert select_rollup_tier(timedelta(days=7), timedelta(hours=1)).relation == "telemetry_rollup_1h"
+        assert select_rollup_tier(timedelta(days=30), timedelta(hours=6)).relation == "telemetry_rollup_1h"
+        assert select_rollup_tier(timedelta(days=90), timedelta(days=1)).relation == "telemetry_rollup_1d"
+
+    def test_sub_minute_or_unknown_bucket_uses_raw(self):
+        assert select_rollup_tier(timedelta(days=1), timedelta(seconds=30)) is None
+        assert select_rollup_tier(timedelta(days=1), timedelta(seconds=90)) is None
+        assert select_rollup_tier(timedelta(days=1), None) is None
+
+    def test_parse_interval(self):
+        assert parse_interval("5 minutes") == timedelta(minutes=5)
+        assert parse_interval("1 hour") == timedelta(hours=1)
+        assert parse_interval("2 days") == timedelta(days=2)
+        assert parse_interval("1 month") is None
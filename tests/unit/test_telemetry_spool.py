@@ -0,0 +1,145 @@
+import os
+import struct
+from datetime import datetime, timezone
+
+import pytest
+
+from shared.ingest_core import TelemetryRecord
+from shared.telemetry_spool import (
+    COPY_HEADER,
+    COPY_TRAILER,
+    FRAME,
+    QUARANTINE_FILE,
+    SEGMENT_SUFFIX,
+    TelemetrySpool,
+    copy_payload,
+    copy_row_tenant,
+    encode_copy_row,
+)
+
+pytestmark = [pytest.mark.unit]
+
+
+def _record(seq, site_id="site-a"):
+    return TelemetryRecord(
+        time=datetime(2000, 1, 1, 0, 0, 1, tzinfo=timezone.utc),
+        tenant_id="tenant-a",
+        device_id=f"device-{seq}",
+        site_id=site_id,
+        msg_type="telemetry",
+        seq=seq,
+        metrics={"temp_c": 21.5},
+    )
+
+
+def _segments(path):
+    return [n for n in os.listdir(path) if n.endswith(SEGMENT_SUFFIX)]
+
+
+def _fields(row: bytes):
+    (count,) = struct.unpack_from(">h", row, 0)
+    offset = 2
+    fields = []
+    for _ in range(count):
+        (length,) = struct.unpack_from(">i", row, offset)
+        offset += 4
+        if length < 0:
+            fields.append(None)
+            continue
+        fields.append(row[offset : offset + length])
+        offset += length
+    assert offset == len(row)
+    return fields
+
+
+def test_encode_copy_row_uses_postgres_binary_formats():
+    fields = _fields(encode_copy_row(_record(7, site_id=None)))
+
+    assert struct.unpack(">q", fields[0])[0] == 1_000_000  # microseconds since 2000-01-01
+    assert fields[1:5] == [b"tenant-a", b"device-7", None, b"telemetry"]
+    assert struct.unpack(">q", fields[5])[0] == 7
+    assert fields[6] == b'\x01{"temp_c": 21.5}'  # jsonb version byte + text
+
+    assert copy_row_tenant(encode_copy_row(_record(7))) == "tenant-a"
+
+    stream = copy_payload([b"row"])
+    assert stream.startswith(COPY_HEADER) and stream.endswith(COPY_TRAILER)
+
+
+def test_spool_append_read_commit(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), max_bytes=1 << 20, segment_bytes=1 << 16)
+    for i in range(5):
+        assert spool.append(encode_copy_row(_record(i)))
+    assert spool.pending_records == 5
+
+    rows, offset = spool.read(3)
+    assert [_fields(r)[2] for r in rows] == [b"device-0", b"device-1", b"device-2"]
+    # Reading without committing does not consume.
+    assert spool.read(3)[0] == rows
+
+    spool.commit(len(rows), offset)
+    rows, offset = spool.read(10)
+    assert [_fields(r)[2] for r in rows] == [b"device-3", b"device-4"]
+    spool.commit(len(rows), offset)
+    assert spool.pending_records == 0
+    assert spool.pending_bytes == 0
+    spool.close()
+
+
+def test_spool_recovers_after_restart_and_ignores_torn_tail(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), max_bytes=1 << 20, segment_bytes=1 << 16)
+    for i in range(4):
+        spool.append(encode_copy_row(_record(i)))
+    rows, offset = spool.read(1)
+    spool.commit(1, offset)
+    # Simulate a crash mid-append: a frame header whose payload never landed.
+    segment = spool._active
+    segment.mm[segment.write_offset : segment.write_offset + FRAME.size] = FRAME.pack(40, 12345)
+    spool.close()
+
+    reopened = TelemetrySpool(str(tmp_path), max_bytes=1 << 20, segment_bytes=1 << 16)
+    assert reopened.pending_records == 3
+    rows, _ = reopened.read(10)
+    assert [_fields(r)[2] for r in rows] == [b"device-1", b"device-2", b"device-3"]
+
+    # Recovered segments are sealed; new appends start a fresh segment.
+    reopened.append(encode_copy_row(_record(9)))
+    assert len(_segments(tmp_path)) == 2
+    reopened.close()
+
+
+def test_spool_rotates_deletes_consumed_segments_and_enforces_cap(tmp_path):
+    row = encode_copy_row(_record(1))
+    segment_bytes = 4096
+    spool = TelemetrySpool(str(tmp_path), max_bytes=segment_bytes * 2, segment_bytes=segment_bytes)
+    appended = 0
+    while spool.append(row):
+        appended += 1
+    assert len(_segments(tmp_path)) == 2
+    assert spool.pending_records == appended
+
+    # Draining the sealed head segment deletes it and frees room.
+    rows, offset = spool.read(appended)
+    spool.commit(len(rows), offset)
+    assert len(_segments(tmp_path)) == 1
+    assert spool.append(row)
+    spool.close()
+
+
+def test_spool_directory_is_locked_to_one_owner(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), max_bytes=1 << 20, segment_bytes=1 << 16)
+    with pytest.raises(RuntimeError, match="in use"):
+        TelemetrySpool(str(tmp_path), max_bytes=1 << 20, segment_bytes=1 << 16)
+    spool.close()
+    TelemetrySpool(str(tmp_path), max_bytes=1 << 20, segment_bytes=1 << 16).close()
+
+
+def test_quarantine_keeps_rejected_rows_out_of_replay(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), max_bytes=1 << 20, segment_bytes=1 << 16)
+    bad = encode_copy_row(_record(1))
+    spool.quarantine([bad])
+    assert spool.pending_records == 0
+    data = (tmp_path / QUARANTINE_FILE).read_bytes()
+    assert FRAME.unpack_from(data, 0)[0] == len(bad)
+    assert data[FRAME.size :] == bad
+    spool.close()
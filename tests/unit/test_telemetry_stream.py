@@ -0,0 +1,260 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from telemetry_stream import StreamSubscription, TelemetryStreamManager
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+
+class FakeNatsSub:
+    def __init__(self, subject):
+        self.subject = subject
+        self.unsubscribed = False
+
+    async def unsubscribe(self):
+        self.unsubscribed = True
+
+
+class FakeJetStream:
+    def __init__(self):
+        self.subscriptions = []
+
+    async def subscribe(self, subject, **kwargs):
+        sub = FakeNatsSub(subject)
+        self.subscriptions.append(sub)
+        return sub
+
+
+class FakeNats:
+    def __init__(self):
+        self.js = FakeJetStream()
+
+    def jetstream(self):
+        return self.js
+
+
+def _msg(tenant_id, device_id, metrics, msg_type="telemetry"):
+    envelope = {
+        "topic": f"tenant/{tenant_id}/device/{device_id}/{msg_type}",
+        "tenant_id": tenant_id,
+        "device_id": device_id,
+        "msg_type": msg_type,
+        "payload": {"ts": "2024-01-01T00:00:00Z", "metrics": metrics},
+    }
+    return SimpleNamespace(subject=f"telemetry.{tenant_id}", data=json.dumps(envelope).encode())
+
+
+def _manager():
+    return TelemetryStreamManager()
+
+
+def _drain(sub):
+    items = []
+    while not sub.queue.empty():
+        items.append(json.loads(sub.queue.get_nowait()))
+    return items
+
+
+async def test_tenant_consumer_follows_local_clients():
+    manager = _manager()
+    nc = FakeNats()
+    await manager.start(nc)
+
+    first = manager.register("tenant-a")
+    second = manager.register("tenant-a")
+    await asyncio.gather(*manager._sync_tasks)
+    assert [sub.subject for sub in nc.js.subscriptions] == ["telemetry.tenant-a"]
+
+    manager.unregister(first)
+    await asyncio.gather(*manager._sync_tasks)
+    assert not nc.js.subscriptions[0].unsubscribed
+
+    manager.unregister(second)
+    await asyncio.gather(*manager._sync_tasks)
+    assert nc.js.subscriptions[0].unsubscribed
+    assert manager._nats_subs == {}
+
+
+async def test_non_telemetry_and_uninterested_messages_ignored():
+    manager = _manager()
+    sub = manager.register("tenant-a")
+
+    await manager._on_nats_message(_msg("tenant-b", "dev-1", {"temp": 1}))
+    await manager._on_nats_message(_msg("tenant-a", "dev-1", {"temp": 1}, msg_type="heartbeat"))
+
+    assert sub.queue.empty()
+
+
+async def test_routes_by_device_filter():
+    manager = _manager()
+    dev1 = manager.register("tenant-a", device_ids=["dev-1"])
+    dev2 = manager.register("tenant-a", device_ids=["dev-2"])
+    everything = manager.register("tenant-a")
+
+    await manager._on_nats_message(_msg("tenant-a", "dev-1", {"temp": 1}))
+
+    assert [e["device_id"] for e in _drain(dev1)] == ["dev-1"]
+    assert _drain(dev2) == []
+    assert [e["device_id"] for e in _drain(everything)] == ["dev-1"]
+
+
+async def test_metric_filter_serialized_once_per_filter(monkeypatch):
+    manager = _manager()
+    a = manager.register("tenant-a", metric_names=["temp"])
+    b = manager.register("tenant-a", metric_names=["temp"])
+    c = manager.register("tenant-a", metric_names=["humidity"])
+    filter_event = MagicMock(wraps=TelemetryStreamManager._filter_event)
+    monkeypatch.setattr(manager, "_filter_event", filter_event)
+
+    await manager._on_nats_message(_msg("tenant-a", "dev-1", {"temp": 1, "rssi": -50}))
+
+    assert filter_event.call_count == 2
+    assert _drain(a)[0]["metrics"] == {"temp": 1}
+    assert _drain(b)[0]["metrics"] == {"temp": 1}
+    assert _drain(c) == []
+
+
+async def test_update_filters_reindexes():
+    manager = _manager()
+    sub = manager.register("tenant-a", device_ids=["dev-1"])
+    manager.update_filters(sub, device_ids=["dev-2"])
+
+    await manager._on_nats_message(_msg("tenant-a", "dev-1", {"temp": 1}))
+    await manager._on_nats_message(_msg("tenant-a", "dev-2", {"temp": 2}))
+
+    assert [e["device_id"] for e in _drain(sub)] == ["dev-2"]
+
+
+async def test_unregister_cleans_index_and_counts():
+    manager = _manager()
+    sub = manager.register("tenant-a", device_ids=["dev-1"])
+    assert manager.tenant_connection_count("tenant-a") == 1
+
+    manager.unregister(sub)
+
+    assert manager.connection_count == 0
+    assert manager._index == {}
+
+
+async def test_conflate_keeps_latest_value_per_device_metric():
+    manager = _manager()
+    sub = manager.register("tenant-a", mode="conflate", interval_ms=100)
+
+    for i in range(50):
+        await manager._on_nats_message(_msg("tenant-a", "dev-1", {"temp": i}))
+    await manager._on_nats_message(_msg("tenant-a", "dev-2", {"rssi": -40}))
+
+    frame = json.loads(await sub.get(timeout=1.0))
+    assert frame["type"] == "telemetry_batch"
+    assert frame["devices"]["dev-1"]["metrics"] == {"temp": 49}
+    assert frame["devices"]["dev-2"]["metrics"] == {"rssi": -40}
+    assert sub.queue.empty()
+
+
+async def test_conflate_respects_flush_interval():
+    sub = StreamSubscription(tenant_id="tenant-a")
+    sub.configure(mode="conflate", interval_ms=200)
+    loop = asyncio.get_running_loop()
+
+    sub.conflate({"device_id": "dev-1", "timestamp": "t1", "metrics": {"temp": 1}})
+    await sub.get(timeout=1.0)
+    started = loop.time()
+    sub.conflate({"device_id": "dev-1", "timestamp": "t2", "metrics": {"temp": 2}})
+    await sub.get(timeout=1.0)
+
+    assert loop.time() - started >= 0.19
+
+
+async def test_conflate_idle_times_out():
+    sub = StreamSubscription(tenant_id="tenant-a")
+    sub.configure(mode="conflate", interval_ms=100)
+    with pytest.raises(asyncio.TimeoutError):
+        await sub.get(timeout=0.05)
+
+
+async def test_mode_change_wakes_getter_in_conflate_interval():
+    sub = StreamSubscription(tenant_id="tenant-a")
+    sub.configure(mode="conflate", interval_ms=5000)
+    loop = asyncio.get_running_loop()
+
+    sub.conflate({"device_id": "dev-1", "timestamp": "t1", "metrics": {"temp": 1}})
+    await sub.get(timeout=1.0)
+    sub.conflate({"device_id": "dev-1", "timestamp": "t2", "metrics": {"temp": 2}})
+    getter = asyncio.create_task(sub.get(timeout=30.0))
+    await asyncio.sleep(0.05)
+
+    started = loop.time()
+    sub.configure(mode="raw")
+    sub.offer('{"temp": 3}')
+    assert await asyncio.wait_for(getter, timeout=1.0) == '{"temp": 3}'
+    assert loop.time() - started < 1.0
+
+
+async def test_mode_change_wakes_getter_waiting_on_raw_queue():
+    sub = StreamSubscription(tenant_id="tenant-a")
+    getter = asyncio.create_task(sub.get(timeout=30.0))
+    await asyncio.sleep(0.05)
+
+    sub.configure(mode="conflate", interval_ms=100)
+    sub.conflate({"device_id": "dev-1", "timestamp": "t1", "metrics": {"temp": 1}})
+    frame = json.loads(await asyncio.wait_for(getter, timeout=1.0))
+    assert frame["devices"]["dev-1"]["metrics"] == {"temp": 1}
+
+
+async def test_mode_change_drops_events_queued_under_old_mode():
+    sub = StreamSubscription(tenant_id="tenant-a")
+    sub.offer('{"temp": 1}')
+    sub.offer('{"temp": 2}')
+
+    sub.configure(mode="conflate")
+    sub.configure(mode="raw")
+    assert sub.queue.empty()
+    sub.offer('{"temp": 3}')
+    assert await sub.get(timeout=1.0) == '{"temp": 3}'
+
+
+async def test_rejected_configure_leaves_settings_unchanged():
+    sub = StreamSubscription(tenant_id="tenant-a")
+    before = (sub.mode, sub.interval_ms, sub.max_rate, sub.frame_format)
+
+    with pytest.raises(ValueError):
+        sub.configure(mode="sample", interval_ms=5000, max_rate=0)
+    assert (sub.mode, sub.interval_ms, sub.max_rate, sub.frame_format) == before
+
+
+async def test_delta_format_only_sends_changed_metrics():
+    sub = StreamSubscription(tenant_id="tenant-a")
+    sub.configure(mode="conflate", interval_ms=100, frame_format="delta")
+
+    sub.conflate({"device_id": "dev-1", "timestamp": "t1", "metrics": {"temp": 1, "rssi": -50}})
+    first = json.loads(await sub.get(timeout=1.0))
+    sub.conflate({"device_id": "dev-1", "timestamp": "t2", "metrics": {"temp": 2, "rssi": -50}})
+    second = json.loads(await sub.get(timeout=1.0))
+
+    assert first["devices"]["dev-1"]["metrics"] == {"temp": 1, "rssi": -50}
+    assert second["devices"]["dev-1"]["metrics"] == {"temp": 2}
+    assert second["format"] == "delta"
+
+
+async def test_sample_mode_caps_rate():
+    manager = _manager()
+    sub = manager.register("tenant-a", mode="sample", max_rate=5)
+
+    for i in range(100):
+        await manager._on_nats_message(_msg("tenant-a", "dev-1", {"temp": i}))
+
+    assert sub.queue.qsize() == 5
+    assert sub.events_dropped == 95
+
+
+async def test_invalid_delivery_settings_rejected():
+    manager = _manager()
+    with pytest.raises(ValueError):
+        manager.register("tenant-a", mode="bogus")
+    with pytest.raises(ValueError):
+        manager.register("tenant-a", frame_format="delta")
+    assert manager.connection_count == 0
@@ -0,0 +1,140 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+import ws_hub as ws_hub_module
+from ws_hub import WSFanoutHub
+from ws_manager import ConnectionManager
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+
+class FakeWebSocket:
+    async def accept(self):
+        return None
+
+
+class FakeConn:
+    def __init__(self):
+        self.fetch_calls = []
+
+    async def fetch(self, query, *args):
+        self.fetch_calls.append(query)
+        if "unnest" in query:
+            return [
+                {
+                    "device_id": device_id,
+                    "time": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                    "metrics": {"temp_c": 21.5},
+                    "seq": 1,
+                }
+                for device_id in args[1]
+            ]
+        if "FROM fleet_alert" in query:
+            return [{"alert_id": 1, "tenant_id": args[0], "status": "OPEN"}]
+        return []
+
+    async def fetchrow(self, query, *args):
+        self.fetch_calls.append(query)
+        if "FROM fleet_counters" in query:
+            return {
+                "devices_total": 2,
+                "devices_online": 2,
+                "devices_stale": 0,
+                "devices_offline": 0,
+                "alerts_open": 1,
+                "alerts_acknowledged": 0,
+            }
+        return None
+
+    async def fetchval(self, query, *args):
+        return 0
+
+
+def _tenant_connection(conn, tenants):
+    @asynccontextmanager
+    async def _ctx(_pool, tenant_id):
+        tenants.append(tenant_id)
+        yield conn
+
+    return _ctx
+
+
+async def _get_pool():
+    return object()
+
+
+async def test_refresh_tenant_queries_once_for_all_subscribers(monkeypatch):
+    db_conn = FakeConn()
+    opened = []
+    monkeypatch.setattr(ws_hub_module, "tenant_connection", _tenant_connection(db_conn, opened))
+    manager = ConnectionManager()
+    hub = WSFanoutHub(manager, _get_pool, refresh_seconds=10)
+
+    conns = []
+    for _ in range(5):
+        conn = await manager.connect(FakeWebSocket(), "tenant-a", {})
+        manager.subscribe_device(conn, "dev-1")
+        manager.subscribe_alerts(conn)
+        manager.subscribe_fleet(conn)
+        conns.append(conn)
+
+    hub.mark_dirty("tenant-a")
+    await hub.refresh_dirty()
+
+    assert opened == ["tenant-a"]
+    assert len(db_conn.fetch_calls) == 3
+    frames = [conn.send_queue.get_nowait() for conn in conns for _ in range(3)]
+    assert len(set(frames)) == 3
+    assert all(conn.send_queue.empty() for conn in conns)
+
+
+async def test_refresh_only_sends_subscribed_topics(monkeypatch):
+    db_conn = FakeConn()
+    monkeypatch.setattr(ws_hub_module, "tenant_connection", _tenant_connection(db_conn, []))
+    manager = ConnectionManager()
+    hub = WSFanoutHub(manager, _get_pool, refresh_seconds=10)
+
+    fleet_conn = await manager.connect(FakeWebSocket(), "tenant-a", {})
+    manager.subscribe_fleet(fleet_conn)
+    device_conn = await manager.connect(FakeWebSocket(), "tenant-a", {})
+    manager.subscribe_device(device_conn, "dev-2")
+
+    hub.mark_dirty("tenant-a")
+    await hub.refresh_dirty()
+
+    assert fleet_conn.send_queue.qsize() == 1
+    assert '"fleet_summary"' in fleet_conn.send_queue.get_nowait()
+    assert device_conn.send_queue.qsize() == 1
+    assert '"dev-2"' in device_conn.send_queue.get_nowait()
+
+
+async def test_refresh_skips_clean_tenants(monkeypatch):
+    opened = []
+    monkeypatch.setattr(ws_hub_module, "tenant_connection", _tenant_connection(FakeConn(), opened))
+    manager = ConnectionManager()
+    hub = WSFanoutHub(manager, _get_pool, refresh_seconds=10)
+    for tenant_id in ("tenant-a", "tenant-b"):
+        conn = await manager.connect(FakeWebSocket(), tenant_id, {})
+        manager.subscribe_fleet(conn)
+
+    hub.mark_dirty("tenant-b")
+    await hub.refresh_dirty()
+    assert opened == ["tenant-b"]
+
+    hub.mark_dirty()
+    await hub.refresh_dirty()
+    assert sorted(opened[1:]) == ["tenant-a", "tenant-b"]
+
+
+async def test_enqueue_drops_oldest_when_full():
+    manager = ConnectionManager()
+    conn = await manager.connect(FakeWebSocket(), "tenant-a", {})
+    capacity = conn.send_queue.maxsize
+    for i in range(capacity + 3):
+        manager.enqueue(conn, f"frame-{i}")
+
+    assert conn.send_queue.qsize() == capacity
+    assert conn.frames_dropped == 3
+    assert conn.send_queue.get_nowait() == "frame-3"